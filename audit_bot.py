@@ -1,49 +1,42 @@
-import csv
-import json
-import os
 import time
-
-JOURNAL_PATH = "trading_journal.csv"
-MEMORY_PATH = "memories/bot_brain.json"
+from datetime import datetime
+import trade_store
+import trade_ledger
 
 def audit_books():
     print("\n[AUDIT] STARTING FORENSIC AUDIT...")
     print("--------------------------------")
     
-    # 1. Analyze Journal (The Books)
-    csv_balance = 100000.0 # Starting Balance
+    # 1. Analyze Journal (The Books): broker receipts (V2 rows) carry total_cost
+    store = trade_store.get_store()
+    book_balance = trade_ledger.STARTING_BALANCE # Starting Balance
     trade_count = 0
-    
-    try:
-        with open(JOURNAL_PATH, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if 'total_cost' in row:
-                    cost = float(row['total_cost'])
-                    csv_balance -= cost
-                    trade_count += 1
-    except FileNotFoundError:
-        print("[ERROR] Journal File Missing!")
-        return
+    receipts = [row for row in store.journal() if row['total_cost'] is not None]
+    for row in receipts:
+        book_balance -= row['total_cost']
+        trade_count += 1
 
     # 2. Analyze Wallet (The Truth)
-    real_balance = 0.0
     try:
-        with open(MEMORY_PATH, 'r') as f:
-            data = json.load(f)
-            real_balance = data.get("wallet_balance", 0.0)
-    except:
-        print("[ERROR] Brain/Wallet Missing!")
+        real_balance = trade_ledger.get_ledger().get_balance()
+    except Exception as e:
+        print(f"[ERROR] Ledger/Wallet unavailable: {e}")
         return
 
     # 3. Check Liveness
-    last_modified = os.path.getmtime(JOURNAL_PATH)
-    seconds_ago = time.time() - last_modified
+    last = store.journal_tail(1)
+    if not last:
+        print("[ERROR] Journal is empty!")
+        return
+    try:
+        seconds_ago = time.time() - datetime.fromisoformat(last[0]['ts']).timestamp()
+    except ValueError:
+        seconds_ago = 0.0
     liveness = f"{int(seconds_ago)} seconds ago" if seconds_ago < 60 else f"{int(seconds_ago/60)} minutes ago"
 
     # 4. The Report
     print(f"[REPORT] Trades Audited: {trade_count}")
-    print(f"[REPORT] Calculated Balance (CSV): INR {csv_balance:,.2f}")
+    print(f"[REPORT] Calculated Balance (Journal): INR {book_balance:,.2f}")
     print(f"[REPORT] Actual Wallet Balance:    INR {real_balance:,.2f}")
     print("--------------------------------")
     
@@ -51,23 +44,19 @@ def audit_books():
     integrity_issues = []
     
     # Check 1: Balance Match
-    diff = abs(csv_balance - real_balance)
+    diff = abs(book_balance - real_balance)
     if diff >= 1.0:
         integrity_issues.append(f"Financial Discrepancy: INR {diff:,.2f}")
 
     # Check 2: Duplicate Order IDs
     seen_ids = set()
     duplicates = []
-    try:
-        with open(JOURNAL_PATH, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                oid = row.get('order_id')
-                if oid:
-                    if oid in seen_ids:
-                        duplicates.append(oid)
-                    seen_ids.add(oid)
-    except: pass
+    for row in receipts:
+        oid = row['order_id']
+        if oid:
+            if oid in seen_ids:
+                duplicates.append(oid)
+            seen_ids.add(oid)
     
     if duplicates:
         integrity_issues.append(f"Duplicate Order IDs found: {len(duplicates)}")
@@ -46,6 +46,7 @@ if __name__ == "__main__":
     # auto_trader.run()
 
 from oracle import Oracle
+import knowledge_index
 from mock_broker import MockDhanClient
 from dhan_broker import DhanBroker
 from risk_manager import RiskManager
@@ -62,6 +63,7 @@ def run_auto_pilot():
     print("--------------------------------------------------")
     
     oracle = Oracle()
+    knowledge_index.get_index(background=True) # Scholar passages build while the first patrol runs
     
     # Select Broker based on Config
     if getattr(config, 'DATA_SOURCE', 'YFINANCE') == 'DHAN':
@@ -140,6 +142,24 @@ def run_auto_pilot():
             # Smart Recovery: Get Dynamic Confidence
             min_conf = risk_manager.get_required_confidence()
             
+            # Quant Votes for the whole watchlist (one batched fetch + one model call)
+            try:
+                quant_votes = oracle.analyze_batch(watchlist)
+            except Exception as e:
+                print(f"   [ERR] Oracle batch failed: {e}")
+                quant_votes = {}
+
+            # Council Rulings for the whole watchlist (one Judge call)
+            try:
+                # Lazy Import to avoid circular dep issues during init
+                from council import Council
+                if 'council' not in locals():
+                     council = Council()
+                rulings = council.convene_batch(watchlist, q_votes=quant_votes)
+            except Exception as e:
+                print(f"   [ERR] Council session failed: {e}")
+                rulings = {}
+
             for symbol in watchlist:
                 # Double Safety Check inside loop
                 if os.path.exists("STOP.flag"): break
@@ -150,15 +170,9 @@ def run_auto_pilot():
                         live_settings = json.load(f)
                 except: pass
 
-                # 1. Convene The Council (Super-Intelligence)
+                # 1. The Council's Ruling (Super-Intelligence)
                 try:
-                    # Lazy Import to avoid circular dep issues during init
-                    from council import Council
-                    if 'council' not in locals():
-                         council = Council()
-                    
-                    # The Ruling
-                    analysis = council.convene(symbol)
+                    analysis = rulings.get(symbol) or quant_votes.get(symbol) or {}
                     
                     signal = analysis.get('signal', 'HOLD')
                     confidence = analysis.get('confidence', 0.0)
@@ -169,44 +183,39 @@ def run_auto_pilot():
                     if signal != "HOLD" and confidence >= min_conf:
                         print(f"   >>> COUNCIL RULING: {signal} {symbol} ({reason})")
                         
-                        # Filter: Chop Mode (Low Volatility) -> Only take very high confidence or Skip?
-                        # For now, we trust the Oracle, but maybe increase min_conf?
-                        if regime == "CHOP" and confidence < 0.85:
-                            print(f"      [SKIP] Regime is CHOP. Ignoring weak signal ({confidence}).")
-                            continue
-
-                        # 3. Position Sizing (The Risk Check)
-                        quantity = risk_manager.get_position_size(price)
-
                         # --- PERSISTENCE: CHECK PORTFOLIO ---
                         if getattr(config, 'DATA_SOURCE', 'YFINANCE') != 'DHAN':
                             portfolio = broker.get_portfolio(origin="BOT") # ISOLATION: Bot only sees Bot trades
                         else:
                             portfolio = {} # Todo: Real Dhan Portfolio Fetch
 
-                        if signal == "SELL":
-                            held_qty = portfolio.get(symbol, 0)
-                            if held_qty > 0:
-                                print(f"   [EXEC] CLOSING POSITION: Selling {held_qty} {symbol} @ {price:.2f}...")
-                                result = broker.place_order(symbol, held_qty, signal, price) # Sell All
-                            else:
-                                print(f"      [SKIP] SELL Signal ignored. No holdings in {symbol}.")
-                                continue # Skip the trade
-
-                        # BUY LOGIC
-                        elif signal == "BUY":
-                            if quantity > 0:
-                                print(f"   [EXEC] OPENING POSITION: Buying {quantity} {symbol} @ {price:.2f}...")
-                                result = broker.place_order(symbol, quantity, signal, price)
-                            else:
-                                print(f"      [SKIP] {symbol} too expensive/risky.")
-                                continue
+                        # 3. Gate: CHOP filter, position sizing (The Risk Check), holdings for SELL
+                        action, quantity, gate = risk_manager.plan_order(
+                            signal, confidence, price, regime, portfolio.get(symbol, 0), min_conf=min_conf)
+
+                        if gate == "chop":
+                            print(f"      [SKIP] Regime is CHOP. Ignoring weak signal ({confidence}).")
+                            continue
+                        if gate == "no_holdings":
+                            print(f"      [SKIP] SELL Signal ignored. No holdings in {symbol}.")
+                            continue
+                        if gate == "size":
+                            print(f"      [SKIP] {symbol} too expensive/risky.")
+                            continue
+                        if action is None:
+                            continue
+
+                        if action == "SELL":
+                            print(f"   [EXEC] CLOSING POSITION: Selling {quantity} {symbol} @ {price:.2f}...") # Sell All
+                        else:
+                            print(f"   [EXEC] OPENING POSITION: Buying {quantity} {symbol} @ {price:.2f}...")
+                        result = broker.place_order(symbol, quantity, action, price)
 
                         # Handle Result
-                        if 'result' in locals() and result['status'] == 'success':
+                        if result['status'] == 'success':
                              print(f"      [OK] ORDER FILLED. ID: {result.get('order_id', 'N/A')}")
                              risk_manager.update_pnl(0) 
-                        elif 'result' in locals():
+                        else:
                              print(f"      [ERR] ORDER FAILED: {result['message']}")
                             
                     else:
@@ -216,9 +225,6 @@ def run_auto_pilot():
                 
                 except Exception as e:
                     print(f"   [ERR] Council Failed for {symbol}: {e}")
-
-                # Tiny pause to be polite to the API (Round Robin Breath)
-                time.sleep(1)
             
             # Wait for next Tick
             delay = random.randint(30, 60)
@@ -1,59 +1,39 @@
-import pandas as pd
-import numpy as np
-import joblib
-import pandas_ta as ta
 import matplotlib.pyplot as plt
-import glob
-import os
 import io
+import columnar_history
+import model_registry
+import feature_pipeline
 
 # Config
 HISTORY_DIR = "memories/history"
-MODEL_PATH = "memories/models/reliance_rf_v1.joblib"
+MODEL_NAME = "reliance_rf"
+SYMBOL = "RELIANCE.NS"
 
 def calculate_technical_features(df):
     """
-    Standard Feature Engineering (Must match brain_factory.py)
+    Standard Feature Engineering (shared pipeline, identical to brain_factory.py and the Oracle)
     """
-    df = df.copy()
-    
-    # 1. Trend Indicators
-    df['SMA_50'] = df['Close'].rolling(window=50).mean()
-    df['SMA_200'] = df['Close'].rolling(window=200).mean()
-    df['Trend_Signal'] = np.where(df['SMA_50'] > df['SMA_200'], 1, 0)
-    
-    # 2. Momentum
-    # Recalculate RSI manually to match brain_factory exactly or use TA lib if consistent
-    # Using simple pandas calculation here for consistency with brain_factory
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-    
-    # 3. Volatility
-    df['Returns'] = df['Close'].pct_change()
-    df['Volatility'] = df['Returns'].rolling(window=20).std()
-    
+    df = feature_pipeline.build_features(df, symbol=SYMBOL, interval="1d")
     df.dropna(inplace=True)
     return df
 
-def run_backtest():
+def run_backtest(version=None):
     print("\n[BACKTEST ENGINE] Initializing Simulation...")
     
-    # 1. Load Model
-    if not os.path.exists(MODEL_PATH):
-        print("[ERROR] AI Brain not found.")
+    # 1. Load Model (promoted registry version unless one is requested)
+    brain = model_registry.load(MODEL_NAME, version)
+    if brain is None:
+        print("[ERROR] AI Brain not found. Run brain_factory.py first.")
         return
-    model = joblib.load(MODEL_PATH)
-    print(f"[AI] Loaded Brain: {MODEL_PATH}")
+    model = brain.predictor
+    print(f"[AI] Loaded Brain: {MODEL_NAME}/{brain.version} (features {brain.feature_version})")
+    if brain.feature_version != feature_pipeline.FEATURE_VERSION:
+        print(f"[WARN] Brain expects feature set {brain.feature_version}, pipeline builds {feature_pipeline.FEATURE_VERSION}.")
     
-    # 2. Load Data
-    files = glob.glob(f"{HISTORY_DIR}/*.csv")
-    if not files: return
-    latest_file = max(files, key=os.path.getctime)
-    df = pd.read_csv(latest_file)
-    df['Date'] = pd.to_datetime(df['Date'])
+    # 2. Load Data (Memory-mapped columnar history, CSV fallback)
+    df = columnar_history.load_or_legacy(SYMBOL, "1d", HISTORY_DIR)
+    if df is None or df.empty: return
+    df = df.reset_index()
     
     # 3. Filter for Testing Period (2024 onwards)
     # accurately simulating "Unseen Future"
@@ -67,7 +47,7 @@ def run_backtest():
     print(f"[SIMULATION] Replaying {len(test_data)} trading days from 2024...")
     
     # 4. Generate AI Signals
-    features = ['RSI', 'Trend_Signal', 'Volatility', 'SMA_50', 'SMA_200']
+    features = feature_pipeline.FEATURE_COLUMNS
     X_test = test_data[features]
     
     test_data['AI_Signal'] = model.predict(X_test)
@@ -101,4 +81,5 @@ def run_backtest():
     print("-" * 40)
 
 if __name__ == "__main__":
-    run_backtest()
+    import sys
+    run_backtest(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,399 @@
+import os
+import re
+import json
+import time
+import threading
+from contextlib import ExitStack
+import pandas as pd
+import yfinance as yf
+import config
+import columnar_history
+
+# --- BAR STORE: Local Incremental OHLCV Cache ---
+# Purpose: Every consumer used to call yf.download() for the FULL window on every patrol.
+# The store keeps one persistent series per (symbol, interval) under memories/history
+# (columnar, memory-mapped: see columnar_history.py), serves reads from memory,
+# and only asks the network for the missing TAIL.
+# With OFFLINE mode on, the whole system runs from recorded bars (no network at all).
+# Locking: one lock per (symbol, interval) is held across its load / fetch / persist, so a slow
+# download of one series never blocks readers of another; the shared lock only guards the dicts.
+
+HISTORY_DIR = "memories/history"
+STORE_DIR = os.path.join(HISTORY_DIR, "bars")
+INFO_DIR = os.path.join(HISTORY_DIR, "info")
+EXCHANGE_TZ = "Asia/Kolkata"
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Bar length per interval (also drives "is the last bar still forming?")
+INTERVAL_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 5400,
+    '1h': 3600, '1d': 86400, '5d': 5 * 86400, '1wk': 7 * 86400, '1mo': 30 * 86400, '3mo': 90 * 86400,
+}
+
+# Minimum seconds between two network refreshes of the same series
+REFRESH_SECONDS = {'1m': 15, '2m': 30, '5m': 60, '15m': 120, '30m': 300, '60m': 300, '1h': 300, '1d': 900}
+
+# yfinance only serves limited intraday history, so a tail fetch older than this falls back to a period fetch
+MAX_INTRADAY_LOOKBACK_DAYS = {'1m': 7, '2m': 59, '5m': 59, '15m': 59, '30m': 59, '60m': 729, '1h': 729}
+
+
+def is_intraday(interval):
+    return INTERVAL_SECONDS.get(interval, 86400) < 86400
+
+
+def _safe_name(symbol):
+    return re.sub(r"[^A-Za-z0-9._-]", "_", symbol)
+
+
+def normalize_bars(df, interval):
+    """Flattens yfinance output into a clean OHLCV frame with a sorted, de-duplicated index."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV)
+
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df = df[[c for c in OHLCV if c in df.columns]]
+
+    index = pd.DatetimeIndex(pd.to_datetime(df.index, utc=is_intraday(interval)))
+    if is_intraday(interval):
+        index = index.tz_convert(EXCHANGE_TZ)
+    elif index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index
+    df.index.name = 'Datetime' if is_intraday(interval) else 'Date'
+
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df.astype(float)
+
+
+def slice_period(df, period, interval):
+    """
+    Returns the yfinance-style `period` window from a longer series.
+    Day periods on intraday bars count trading SESSIONS (like yfinance), everything else is calendar time.
+    """
+    if df.empty or not period or period == 'max':
+        return df
+
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        if period == 'ytd':
+            return df[df.index >= df.index[-1].normalize().replace(month=1, day=1)]
+        return df
+
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'd' and is_intraday(interval):
+        sessions = df.index.normalize().unique()
+        return df[df.index.normalize() >= sessions[-min(n, len(sessions))]]
+
+    offsets = {
+        'd': pd.DateOffset(days=n), 'wk': pd.DateOffset(weeks=n),
+        'mo': pd.DateOffset(months=n), 'y': pd.DateOffset(years=n),
+    }
+    return df[df.index > df.index[-1] - offsets[unit]]
+
+
+def _download(symbol, interval, period=None, start=None):
+    """Single network entry point (patched out in offline tests)."""
+    kwargs = {'interval': interval, 'progress': False, 'auto_adjust': True}
+    if start is not None:
+        kwargs['start'] = start
+    else:
+        kwargs['period'] = period
+    return yf.download(symbol, **kwargs)
+
+
+def _download_info(symbol):
+    return yf.Ticker(symbol).info
+
+
+def _download_group(symbols, interval, period=None, start=None):
+    """One yfinance request for a list of tickers (columns: Ticker -> OHLCV)."""
+    kwargs = {'interval': interval, 'progress': False, 'auto_adjust': True,
+              'group_by': 'ticker', 'threads': True}
+    if start is not None:
+        kwargs['start'] = start
+    else:
+        kwargs['period'] = period
+    return yf.download(list(symbols), **kwargs)
+
+
+class BarStore:
+    """
+    Persistent, incrementally refreshed bar cache keyed by (symbol, interval).
+    Reads are served from memory. The network is only asked for bars AFTER the last known one.
+    """
+    def __init__(self, root=STORE_DIR, offline=None, fetcher=None, group_fetcher=None,
+                 info_dir=INFO_DIR, info_fetcher=None):
+        self.root = root
+        self.info_dir = info_dir
+        self.offline = getattr(config, 'OFFLINE_DATA', False) if offline is None else offline
+        self.fetcher = fetcher or _download
+        self.group_fetcher = group_fetcher or _download_group
+        self.info_fetcher = info_fetcher or _download_info
+        self._frames = {}          # (symbol, interval) -> DataFrame (includes the forming bar)
+        self._persisted_until = {} # (symbol, interval) -> last bar written to disk
+        self._last_refresh = {}    # (symbol, interval) -> epoch seconds
+        self._rewrite = set()      # keys whose disk copy must be rewritten once (after a backfill)
+        self._key_locks = {}       # (symbol, interval) -> RLock held across load / fetch / persist
+        self._lock = threading.RLock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.RLock()
+            return lock
+
+    def _cached(self, key):
+        """In-memory series for `key`, loaded from disk on first touch (caller holds the key lock)."""
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is None:
+            frame = self._load(*key)
+            if not frame.empty:
+                self._persisted_until[key] = frame.index[-1]
+        return frame
+
+    def _publish(self, key, frame):
+        with self._lock:
+            self._frames[key] = frame
+
+    # --- DISK ---
+    def _path(self, symbol, interval):
+        return columnar_history.series_path(symbol, interval, self.root)
+
+    def _load(self, symbol, interval):
+        path = self._path(symbol, interval)
+        legacy_csv = os.path.join(self.root, f"{_safe_name(symbol)}_{interval}.csv")
+        try:
+            if os.path.exists(path):
+                return normalize_bars(columnar_history.read_history(path), interval)
+            if os.path.exists(legacy_csv):
+                # Pre-columnar store file: migrate on first touch
+                df = normalize_bars(pd.read_csv(legacy_csv, index_col=0), interval)
+                columnar_history.write_history(path, df, symbol=symbol, interval=interval, source=os.path.basename(legacy_csv))
+                return df
+        except Exception as e:
+            print(f"[BAR STORE] Corrupt cache {path}: {e}. Starting fresh.")
+        return pd.DataFrame(columns=OHLCV)
+
+    def _persist(self, key, df):
+        """Appends CLOSED bars that are not on disk yet. The forming bar stays in memory only."""
+        symbol, interval = key
+        if df.empty:
+            return
+
+        now = pd.Timestamp.now(tz=EXCHANGE_TZ)
+        if is_intraday(interval):
+            cutoff = now - pd.Timedelta(seconds=INTERVAL_SECONDS[interval])
+        else:
+            cutoff = now.tz_localize(None).normalize() # Today's daily bar is still forming
+        closed = df[df.index < cutoff]
+
+        path = self._path(symbol, interval)
+
+        # A backfill added bars BEFORE what is on disk -> one full rewrite, then back to appends
+        if key in self._rewrite:
+            self._rewrite.discard(key)
+            if not closed.empty:
+                columnar_history.write_history(path, closed, symbol=symbol, interval=interval)
+                self._persisted_until[key] = closed.index[-1]
+            return
+
+        last = self._persisted_until.get(key)
+        new_rows = closed if last is None else closed[closed.index > last]
+        if new_rows.empty:
+            return
+
+        columnar_history.append_history(path, new_rows, symbol=symbol, interval=interval)
+        self._persisted_until[key] = new_rows.index[-1]
+
+    # --- NETWORK ---
+    def _fetch(self, symbol, interval, period=None, start=None):
+        try:
+            return normalize_bars(self.fetcher(symbol, interval, period=period, start=start), interval)
+        except Exception as e:
+            print(f"[BAR STORE] Fetch failed for {symbol} ({interval}): {e}")
+            return pd.DataFrame(columns=OHLCV)
+
+    def _plan(self, key, frame, period):
+        """
+        Decides what a refresh needs: None (fresh enough), ('period', None) for a full/backfill
+        fetch, or ('tail', start) to fetch only bars from the last known one onwards.
+        """
+        interval = key[1]
+        now = time.time()
+        if now - self._last_refresh.get(key, 0) < REFRESH_SECONDS.get(interval, 300):
+            return None
+        self._last_refresh[key] = now
+
+        needs_backfill = frame.empty or not self._covers(frame, period, interval)
+        lookback = MAX_INTRADAY_LOOKBACK_DAYS.get(interval)
+        too_old = (not frame.empty and lookback is not None
+                   and frame.index[-1] < pd.Timestamp.now(tz=EXCHANGE_TZ) - pd.Timedelta(days=lookback))
+
+        if needs_backfill or too_old:
+            return ('period', None)
+        # Tail only: re-request from the last bar (it may have been a partial bar)
+        return ('tail', frame.index[-1].to_pydatetime())
+
+    def _merge(self, key, frame, fresh):
+        if fresh.empty:
+            return frame
+        if frame.empty:
+            return fresh
+        if fresh.index[0] < frame.index[0]:
+            self._rewrite.add(key)
+
+        merged = pd.concat([frame[frame.index < fresh.index[0]], fresh])
+        return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+    def _refresh(self, key, frame, period):
+        plan = self._plan(key, frame, period)
+        if plan is None:
+            return frame
+        mode, start = plan
+        if mode == 'period':
+            fresh = self._fetch(key[0], key[1], period=period)
+        else:
+            fresh = self._fetch(key[0], key[1], start=start)
+        return self._merge(key, frame, fresh)
+
+    def _fetch_group(self, symbols, interval, period=None, start=None):
+        """One network request for many symbols. Returns {symbol: bars}."""
+        try:
+            raw = self.group_fetcher(symbols, interval, period=period, start=start)
+        except Exception as e:
+            print(f"[BAR STORE] Group fetch failed ({len(symbols)} symbols, {interval}): {e}")
+            return {}
+        if raw is None or raw.empty:
+            return {}
+
+        result = {}
+        if isinstance(raw.columns, pd.MultiIndex):
+            tickers = raw.columns.get_level_values(0).unique()
+            for sym in symbols:
+                if sym in tickers:
+                    bars = raw[sym].dropna(how='all')
+                    result[sym] = normalize_bars(bars, interval)
+        elif len(symbols) == 1:
+            result[symbols[0]] = normalize_bars(raw, interval)
+        return result
+
+    @staticmethod
+    def _covers(frame, period, interval):
+        """True if the cached series already reaches back as far as `period` asks."""
+        match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or '')
+        if not match:
+            return True # 'max' / 'ytd': whatever is recorded is extended by tail fetches
+        n, unit = int(match.group(1)), match.group(2)
+        if unit == 'd' and is_intraday(interval):
+            return frame.index.normalize().nunique() >= n
+        days = {'d': 1, 'wk': 7, 'mo': 30, 'y': 365}[unit] * n
+        span = frame.index[-1] - frame.index[0]
+        # Weekends/holidays: allow a few days of slack before declaring a gap
+        return span >= pd.Timedelta(days=days - 5)
+
+    # --- PUBLIC API ---
+    def get_bars(self, symbol, period="1y", interval="1d"):
+        """
+        Returns OHLCV bars for the last `period`.
+        Cost: O(new bars) network + disk; reads after the first are pure memory.
+        """
+        key = (symbol, interval)
+        with self._key_lock(key):
+            frame = self._cached(key)
+            if not self.offline:
+                frame = self._refresh(key, frame, period)
+                self._persist(key, frame)
+            self._publish(key, frame)
+            return slice_period(frame, period, interval).copy()
+
+    def get_many(self, symbols, period="1y", interval="1d", group_size=50):
+        """
+        Batched get_bars() for a whole universe.
+        Series that need network are grouped into a handful of multi-ticker requests
+        (one for backfills, one per group of tails) instead of one request per symbol.
+        Returns {symbol: bars} (symbols with no data are left out).
+        """
+        symbols = list(dict.fromkeys(symbols))
+        with ExitStack() as held:
+            # Sorted acquisition: two overlapping get_many calls cannot deadlock
+            for sym in sorted(symbols):
+                held.enter_context(self._key_lock((sym, interval)))
+            frames = {sym: self._cached((sym, interval)) for sym in symbols}
+
+            if not self.offline:
+                backfill, tails = [], []
+                for sym in symbols:
+                    plan = self._plan((sym, interval), frames[sym], period)
+                    if plan is None:
+                        continue
+                    if plan[0] == 'period':
+                        backfill.append(sym)
+                    else:
+                        tails.append((plan[1], sym))
+
+                fetched = {}
+                for i in range(0, len(backfill), group_size):
+                    fetched.update(self._fetch_group(backfill[i:i + group_size], interval, period=period))
+
+                # Tails: sort by last bar so each group starts from its OLDEST member's tail
+                tails.sort(key=lambda t: pd.Timestamp(t[0]))
+                for i in range(0, len(tails), group_size):
+                    group = tails[i:i + group_size]
+                    fetched.update(self._fetch_group([sym for _, sym in group], interval, start=group[0][0]))
+
+                for sym, fresh in fetched.items():
+                    key = (sym, interval)
+                    frames[sym] = self._merge(key, frames[sym], fresh)
+                    self._persist(key, frames[sym])
+
+            result = {}
+            for sym in symbols:
+                self._publish((sym, interval), frames[sym])
+                window = slice_period(frames[sym], period, interval)
+                if not window.empty:
+                    result[sym] = window.copy()
+            return result
+
+    def get_info(self, symbol, max_age=86400):
+        """Fundamentals snapshot (yf.Ticker.info), cached on disk for a day."""
+        path = os.path.join(self.info_dir, f"{_safe_name(symbol)}.json")
+        cached = None
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    cached = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[BAR STORE] Unreadable info cache {path}: {e}")
+                cached = None
+
+        if cached and (self.offline or time.time() - cached.get('fetched_at', 0) < max_age):
+            return cached.get('info', {})
+        if self.offline:
+            return {}
+
+        try:
+            info = self.info_fetcher(symbol) or {}
+        except Exception as e:
+            print(f"[BAR STORE] Info fetch failed for {symbol}: {e}")
+            return cached.get('info', {}) if cached else {}
+
+        os.makedirs(self.info_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'fetched_at': time.time(), 'info': info}, f, default=str)
+        return info
+
+
+# Shared per-process store (all adapters read the same in-memory series)
+_store = None
+_store_lock = threading.Lock()
+
+def get_bar_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BarStore()
+        return _store
@@ -1,67 +1,50 @@
 import pandas as pd
-import numpy as np
-import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
-import os
-import glob
+import columnar_history
+import feature_pipeline
+import model_registry
 
 # Config
 HISTORY_DIR = "memories/history"
-MODEL_DIR = "memories/models"
-MODEL_PATH = f"{MODEL_DIR}/reliance_rf_v1.joblib"
+MODEL_NAME = "reliance_rf" # Model registry name (memories/models/registry/reliance_rf)
+SYMBOL = "RELIANCE.NS"
+TARGET_HORIZON = 5      # Bars ahead the answer key looks (walk_forward purges this many dates)
+TARGET_RETURN = 0.01    # Rise over the horizon that counts as a BUY
 
-# Technical Indicator Functions (Manual Calculation to avoid strict dependency on pandas_ta if not present)
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def build_features(df):
+def build_features(df, symbol=SYMBOL, cache_dir=feature_pipeline.CACHE_DIR):
     """
-    The Gym: Calculates clues for the AI.
+    The Gym: Calculates clues for the AI (shared feature pipeline) plus the answer key.
     """
-    df = df.copy()
-    
-    # 1. Trend Indicators
-    df['SMA_50'] = df['Close'].rolling(window=50).mean()
-    df['SMA_200'] = df['Close'].rolling(window=200).mean()
-    df['Trend_Signal'] = np.where(df['SMA_50'] > df['SMA_200'], 1, 0) # Golden Cross status
-    
-    # 2. Momentum
-    df['RSI'] = calculate_rsi(df['Close'], 14)
+    df = feature_pipeline.build_features(df, symbol=symbol, interval="1d", cache_dir=cache_dir)
     
-    # 3. Volatility (Risk)
-    df['Returns'] = df['Close'].pct_change()
-    df['Volatility'] = df['Returns'].rolling(window=20).std()
-    
-    # 4. Target Variable (The Answer Key)
+    # Target Variable (The Answer Key)
     # Did price go up > 1% in next 5 days?
-    df['Future_Close'] = df['Close'].shift(-5)
+    df['Future_Close'] = df['Close'].shift(-TARGET_HORIZON)
     df['Target_Return'] = (df['Future_Close'] - df['Close']) / df['Close']
-    df['Target'] = (df['Target_Return'] > 0.01).astype(int) # 1 = Buy, 0 = Hold/Wait
+    df['Target'] = (df['Target_Return'] > TARGET_RETURN).astype(int) # 1 = Buy, 0 = Hold/Wait
     
     # Clean up NaNs from rolling windows
     df.dropna(inplace=True)
     return df
 
+def make_forest(n_jobs=None, n_estimators=100):
+    """The production forest (same hyperparameters for train_brain and the walk-forward study)."""
+    return RandomForestClassifier(n_estimators=n_estimators, min_samples_split=10, random_state=42, n_jobs=n_jobs)
+
 def train_brain():
     print("\n[BRAIN FACTORY] initializing training sequence...")
     
-    # 1. Load Data (The Food)
-    files = glob.glob(f"{HISTORY_DIR}/*.csv")
-    if not files:
+    # 1. Load Data (The Food) - Memory-mapped columnar history (CSV fallback)
+    print(f"[INPUT] Loading {SYMBOL} daily history...")
+    df = columnar_history.load_or_legacy(SYMBOL, "1d", HISTORY_DIR)
+    if df is None or df.empty:
         print("[ERROR] No history files found. Run data_collector.py first.")
         return
-
-    latest_file = max(files, key=os.path.getctime)
-    print(f"[INPUT] Loading {latest_file}...")
-    df = pd.read_csv(latest_file)
+    df = df.reset_index()
     
     # 2. Engineer Features (The Gym)
-    print("[GYM] Calculating RSI, SMA, and Volatility...")
+    print(f"[GYM] Calculating RSI, SMA, and Volatility (feature set {feature_pipeline.FEATURE_VERSION})...")
     df_processed = build_features(df)
     
     # 3. Time Travel Split
@@ -77,7 +60,7 @@ def train_brain():
     print(f"[SPLIT] Training Samples: {len(train_data)} | Testing Samples: {len(test_data)}")
     
     # Define Inputs (X) and Answer (y)
-    features = ['RSI', 'Trend_Signal', 'Volatility', 'SMA_50', 'SMA_200']
+    features = feature_pipeline.FEATURE_COLUMNS
     X_train = train_data[features]
     y_train = train_data['Target']
     
@@ -86,7 +69,7 @@ def train_brain():
     
     # 4. Train Model (The Learning)
     print(f"[TRAINING] Growing Random Forest (100 Trees)... using features: {features}")
-    model = RandomForestClassifier(n_estimators=100, min_samples_split=10, random_state=42)
+    model = make_forest()
     model.fit(X_train, y_train)
     
     # 5. Evaluate (The Exam)
@@ -100,10 +83,22 @@ def train_brain():
     print("\nDetailed Report:")
     print(classification_report(y_test, predictions))
     
-    # 6. Save Brain
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print(f"\n[PERSISTENCE] Brain saved to {MODEL_PATH}")
+    # 6. Register Brain (versioned + compiled; the running swarm hot-swaps to it)
+    metadata = {
+        "feature_version": feature_pipeline.FEATURE_VERSION,
+        "feature_columns": list(features),
+        "symbol": SYMBOL,
+        "interval": "1d",
+        "training_window": {"start": str(train_data['Date'].min().date()), "end": str(train_data['Date'].max().date())},
+        "test_window": {"start": str(test_data['Date'].min().date()), "end": str(test_data['Date'].max().date())},
+        "metrics": {
+            "accuracy": float(accuracy),
+            "report": classification_report(y_test, predictions, output_dict=True),
+        },
+        "params": model.get_params(),
+    }
+    version = model_registry.ModelRegistry().register(MODEL_NAME, model, metadata, promote=True)
+    print(f"\n[PERSISTENCE] Brain registered as {MODEL_NAME}/{version} (promoted)")
     print("[COMPLETE] AI is ready for inference.")
 
 if __name__ == "__main__":
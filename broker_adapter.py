@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-import yfinance as yf
 import pandas as pd
+from bar_store import get_bar_store
 
 class BrokerAdapter(ABC):
     """
@@ -12,20 +12,45 @@ class BrokerAdapter(ABC):
     def fetch_data(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
         pass
 
+    def fetch_batch(self, symbols: list, period: str = "1y", interval: str = "1d") -> dict:
+        """Symbol-keyed panel {symbol: DataFrame}. Default: one fetch_data() per symbol."""
+        panel = {}
+        for symbol in symbols:
+            df = self.fetch_data(symbol, period=period, interval=interval)
+            if not df.empty:
+                panel[symbol] = df
+        return panel
+
+    def fetch_info(self, symbol: str) -> dict:
+        """Fundamentals snapshot (P/E, sector, ROE...). Optional for adapters."""
+        return {}
+
 class YFinanceAdapter(BrokerAdapter):
     """
     Concrete implementation for Yahoo Finance (Research/Free Tier).
+    Reads go through the local BarStore first; the network only fills the missing tail.
     """
+    def __init__(self, store=None):
+        self.store = store or get_bar_store()
+
     def fetch_data(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
         try:
-            df = yf.download(symbol, period=period, interval=interval, progress=False)
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-            return df
+            return self.store.get_bars(symbol, period=period, interval=interval)
         except Exception as e:
             print(f"YFinance Error on {symbol}: {e}")
             return pd.DataFrame()
 
+    def fetch_batch(self, symbols: list, period: str = "1y", interval: str = "1d", group_size: int = 50) -> dict:
+        """Whole universe in grouped multi-ticker requests (instead of one download per symbol)."""
+        try:
+            return self.store.get_many(symbols, period=period, interval=interval, group_size=group_size)
+        except Exception as e:
+            print(f"YFinance Batch Error ({len(symbols)} symbols): {e}")
+            return {}
+
+    def fetch_info(self, symbol: str) -> dict:
+        return self.store.get_info(symbol)
+
 # Factory to get the configured adapter
 def get_broker_adapter(mode="research"):
     if mode == "research":
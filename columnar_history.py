@@ -0,0 +1,343 @@
+import os
+import re
+import sys
+import glob
+import json
+import numpy as np
+import pandas as pd
+
+# --- COLUMNAR HISTORY: Memory-Mapped Bar Files ---
+# Purpose: Replaces re-parsing CSVs (pd.read_csv) on every run.
+# Each series is a folder:  <name>.cols/
+#     meta.json        -> small header (symbol, interval, tz, rows, column dtypes, first/last
+#                         timestamp, generation)
+#     ts.<gen>.bin     -> int64 epoch nanoseconds (UTC for intraday, wall-clock for daily)
+#     Open.<gen>.bin.. -> float32 prices, int64 volume (raw little-endian, no per-file header)
+# Readers np.memmap the columns and binary-search the timestamps, so slicing 10 years of
+# history is a zero-copy view instead of a full parse. Appends write only the new rows.
+# A full rewrite never touches the live files: it writes the next generation's columns beside
+# them and commits by replacing meta.json (readers see the old series or the new one, and
+# maps already open keep their old files). Series written before generations use ts.bin etc.
+
+HISTORY_DIR = "memories/history"
+FORMAT_NAME = "sovereign-columnar"
+FORMAT_VERSION = 1
+SUFFIX = ".cols"
+COLUMN_DTYPES = {
+    'Open': 'float32', 'High': 'float32', 'Low': 'float32', 'Close': 'float32', 'Volume': 'int64',
+}
+
+
+def _meta_path(path):
+    return os.path.join(path, "meta.json")
+
+
+def _column_path(path, name, generation=None):
+    return os.path.join(path, f"{name}.{generation}.bin" if generation else f"{name}.bin")
+
+
+def _write_meta(path, meta):
+    """Atomic header update (write temp + rename) so readers never see a half-written header."""
+    tmp = _meta_path(path) + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=4)
+    os.replace(tmp, _meta_path(path))
+
+
+def read_meta(path):
+    with open(_meta_path(path), 'r') as f:
+        return json.load(f)
+
+
+def _to_ns(index):
+    """DatetimeIndex -> int64 ns (UTC instant if tz-aware, wall clock if naive), plus the tz name."""
+    index = pd.DatetimeIndex(index)
+    tz = str(index.tz) if index.tz is not None else None
+    return index.as_unit('ns').asi8.astype(np.int64), tz
+
+
+def _column_arrays(df):
+    arrays = {}
+    for name, dtype in COLUMN_DTYPES.items():
+        if name in df.columns:
+            values = pd.to_numeric(df[name], errors='coerce')
+            if dtype.startswith('int'):
+                values = values.fillna(0).round()
+            arrays[name] = values.to_numpy().astype(dtype)
+    return arrays
+
+
+def _write_column(file_path, values):
+    with open(file_path, 'wb') as f:
+        values.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_history(path, df, symbol=None, interval=None, source=None):
+    """
+    Writes a full series (replaces any existing one). `df` needs a DatetimeIndex and OHLC(V)
+    columns. The new columns go to fresh generation files; meta.json is swapped last.
+    """
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    ts, tz = _to_ns(df.index)
+    arrays = _column_arrays(df)
+
+    os.makedirs(path, exist_ok=True)
+    try:
+        generation = int(read_meta(path).get("generation") or 0) + 1
+    except (FileNotFoundError, json.JSONDecodeError):
+        generation = 1
+    _write_column(_column_path(path, "ts", generation), ts)
+    for name, values in arrays.items():
+        _write_column(_column_path(path, name, generation), values)
+
+    meta = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "symbol": symbol,
+        "interval": interval,
+        "tz": tz,
+        "rows": int(len(ts)),
+        "ts_unit": "ns",
+        "columns": {name: str(values.dtype) for name, values in arrays.items()},
+        "first_ts": int(ts[0]) if len(ts) else None,
+        "last_ts": int(ts[-1]) if len(ts) else None,
+        "source": source,
+        "generation": generation,
+    }
+    _write_meta(path, meta)
+    _drop_stale_columns(path, generation)
+    return meta
+
+
+def _drop_stale_columns(path, generation):
+    """Removes column files of earlier generations (best effort: Windows refuses while mapped)."""
+    live = f".{generation}.bin"
+    for file_path in glob.glob(os.path.join(path, "*.bin")):
+        if not file_path.endswith(live):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+def append_history(path, df, symbol=None, interval=None):
+    """
+    Appends rows strictly newer than the stored tail. Cost is O(new rows).
+    Creates the series if it does not exist yet.
+    """
+    if not os.path.exists(_meta_path(path)):
+        return write_history(path, df, symbol=symbol, interval=interval)
+
+    meta = read_meta(path)
+    ts, _ = _to_ns(df.index)
+    if meta["last_ts"] is not None:
+        keep = ts > meta["last_ts"]
+        df, ts = df[keep], ts[keep]
+    if len(ts) == 0:
+        return meta
+
+    arrays = _column_arrays(df)
+    rows = meta["rows"]
+    for name, dtype in [("ts", "int64")] + list(meta["columns"].items()):
+        values = ts if name == "ts" else arrays.get(name, np.zeros(len(ts), dtype=dtype)).astype(dtype)
+        col_path = _column_path(path, name, meta.get("generation"))
+        with open(col_path, 'r+b' if os.path.exists(col_path) else 'wb') as f:
+            # Drop bytes from an interrupted append (header is the source of truth)
+            f.truncate(rows * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            values.tofile(f)
+
+    meta["rows"] = rows + len(ts)
+    meta["last_ts"] = int(ts[-1])
+    if meta["first_ts"] is None:
+        meta["first_ts"] = int(ts[0])
+    _write_meta(path, meta)
+    return meta
+
+
+class ColumnarHistory:
+    """Read-only, memory-mapped view of one series."""
+    def __init__(self, path):
+        self.path = path
+        self.meta = read_meta(path)
+        if self.meta.get("format") != FORMAT_NAME:
+            raise ValueError(f"{path} is not a {FORMAT_NAME} series")
+        self.rows = self.meta["rows"]
+        self.tz = self.meta.get("tz")
+        self._maps = {}
+
+    def column(self, name):
+        if name not in self._maps:
+            dtype = "int64" if name == "ts" else self.meta["columns"][name]
+            if self.rows == 0:
+                self._maps[name] = np.empty(0, dtype=dtype)
+            else:
+                self._maps[name] = np.memmap(_column_path(self.path, name, self.meta.get("generation")), dtype=dtype, mode='r', shape=(self.rows,))
+        return self._maps[name]
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"].keys())
+
+    def _bound(self, value):
+        stamp = pd.Timestamp(value)
+        if self.tz is not None:
+            stamp = stamp.tz_localize(self.tz) if stamp.tz is None else stamp.tz_convert(self.tz)
+        elif stamp.tz is not None:
+            stamp = stamp.tz_localize(None)
+        return stamp.as_unit('ns').value
+
+    def row_range(self, start=None, end=None):
+        """[i0, i1) row bounds for start <= ts <= end, via binary search on the mmapped timestamps."""
+        ts = self.column("ts")
+        i0 = 0 if start is None else int(np.searchsorted(ts, self._bound(start), side='left'))
+        i1 = self.rows if end is None else int(np.searchsorted(ts, self._bound(end), side='right'))
+        return i0, i1
+
+    def index(self, i0=0, i1=None):
+        ts = self.column("ts")[i0:i1]
+        if self.tz is not None:
+            return pd.DatetimeIndex(pd.to_datetime(ts, utc=True)).tz_convert(self.tz)
+        return pd.DatetimeIndex(pd.to_datetime(ts))
+
+    def to_frame(self, start=None, end=None, columns=None):
+        """DataFrame over a date range. Column data are views on the memory map (no parse, no copy)."""
+        i0, i1 = self.row_range(start, end)
+        data = {name: self.column(name)[i0:i1] for name in (columns or self.columns)}
+        frame = pd.DataFrame(data, index=self.index(i0, i1), copy=False)
+        frame.index.name = 'Datetime' if self.tz is not None else 'Date'
+        return frame
+
+
+def read_history(path, start=None, end=None, columns=None):
+    try:
+        return ColumnarHistory(path).to_frame(start=start, end=end, columns=columns)
+    except FileNotFoundError:
+        # A rewrite committed (and dropped our generation) between the header read and the map
+        return ColumnarHistory(path).to_frame(start=start, end=end, columns=columns)
+
+
+def series_path(symbol, interval, root=None):
+    """Canonical location for a (symbol, interval) series (shared with the BarStore)."""
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", symbol)
+    return os.path.join(root or os.path.join(HISTORY_DIR, "bars"), f"{safe}_{interval}{SUFFIX}")
+
+
+def list_series(root=None):
+    """All stored series: [{'symbol', 'interval', 'rows', 'path'}, ...]"""
+    root = root or os.path.join(HISTORY_DIR, "bars")
+    found = []
+    for path in sorted(glob.glob(os.path.join(root, f"*{SUFFIX}"))):
+        try:
+            meta = read_meta(path)
+            found.append({"symbol": meta.get("symbol"), "interval": meta.get("interval"),
+                          "rows": meta.get("rows"), "path": path})
+        except Exception:
+            continue
+    return found
+
+
+def load_history(symbol, interval="1d", start=None, end=None, root=None):
+    """Columnar series for a symbol, or None if it has not been recorded/converted yet."""
+    path = series_path(symbol, interval, root)
+    if not os.path.exists(_meta_path(path)):
+        return None
+    return read_history(path, start=start, end=end)
+
+
+def load_or_legacy(symbol, interval="1d", history_dir=HISTORY_DIR):
+    """
+    float64 OHLCV frame for a symbol: the columnar series if one exists (mmap, no parse),
+    else the newest legacy CSV for that symbol (run this module once to convert it).
+    """
+    df = load_history(symbol, interval, root=os.path.join(history_dir, "bars"))
+    if df is not None and not df.empty:
+        return df.astype(float)
+
+    legacy = glob.glob(os.path.join(history_dir, f"{symbol}_*.csv"))
+    if not legacy:
+        return None
+    print(f"[COLUMNAR] No columnar series for {symbol}. Parsing CSV (run 'python columnar_history.py' to convert).")
+    df, _ = read_legacy_csv(max(legacy, key=os.path.getctime))
+    df.index.name = 'Datetime' if df.index.tz is not None else 'Date'
+    return df.apply(pd.to_numeric, errors='coerce')
+
+
+# --- ONE-SHOT CONVERTER (Legacy CSVs -> Columnar) ---
+def read_legacy_csv(csv_path):
+    """
+    Parses the CSV layouts found in memories/history:
+      - plain 'Date,Close,High,Low,Open,Volume'
+      - yfinance multi-header ('Price,...' / 'Ticker,^NSEI,...' / 'Datetime,,,')
+    Returns (DataFrame, ticker_or_None).
+    """
+    with open(csv_path, 'r') as f:
+        head = [f.readline() for _ in range(3)]
+
+    ticker = None
+    if head[1].startswith("Ticker,"):
+        ticker = head[1].strip().split(",")[1] or None
+        df = pd.read_csv(csv_path, skiprows=[1, 2], index_col=0)
+    else:
+        df = pd.read_csv(csv_path, index_col=0)
+
+    df.index = pd.to_datetime(df.index, utc=any(c in str(df.index[0]) for c in ("+", "Z")) if len(df) else False)
+    return df, ticker
+
+
+def _infer_interval(index):
+    if len(index) < 2:
+        return "1d"
+    step = pd.Series(index).diff().median()
+    if step < pd.Timedelta(hours=1):
+        return f"{max(1, int(step.total_seconds() // 60))}m"
+    if step < pd.Timedelta(days=1):
+        return "1h"
+    return "1d"
+
+
+def convert_csv(csv_path, root=None):
+    """Converts one legacy CSV into the columnar store. Returns the output path."""
+    df, ticker = read_legacy_csv(csv_path)
+    interval = _infer_interval(df.index)
+
+    symbol = ticker
+    if not symbol:
+        # e.g. 'RELIANCE.NS_2015-01-01_2026-01-21.csv' -> 'RELIANCE.NS', '^NSEI_daily.csv' -> '^NSEI'
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        symbol = re.split(r"_(?:\d{4}-\d{2}-\d{2}|daily|intraday)", stem)[0]
+
+    if df.index.tz is not None:
+        df.index = df.index.tz_convert("Asia/Kolkata")
+
+    out = series_path(symbol, interval, root)
+    if os.path.exists(_meta_path(out)):
+        # Merge with what the BarStore already recorded
+        existing = read_history(out)
+        df = pd.concat([existing.astype(float), df[[c for c in COLUMN_DTYPES if c in df.columns]].astype(float)])
+    write_history(out, df, symbol=symbol, interval=interval, source=os.path.basename(csv_path))
+    return out
+
+
+def convert_history_dir(history_dir=HISTORY_DIR, root=None):
+    """Converts every CSV in memories/history (and legacy BarStore CSVs) into columnar series."""
+    converted = []
+    csvs = glob.glob(os.path.join(history_dir, "*.csv")) + glob.glob(os.path.join(history_dir, "bars", "*.csv"))
+    for csv_path in sorted(csvs):
+        try:
+            out = convert_csv(csv_path, root=root)
+            rows = read_meta(out)["rows"]
+            print(f"[COLUMNAR] {os.path.basename(csv_path)} -> {out} ({rows} rows)")
+            converted.append(out)
+        except Exception as e:
+            print(f"[COLUMNAR] Skipped {csv_path}: {e}")
+    return converted
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else HISTORY_DIR
+    print(f"[COLUMNAR] Converting CSV history in '{target}'...")
+    done = convert_history_dir(target)
+    print(f"[COLUMNAR] Complete. {len(done)} series ready for memory-mapped reads.")
@@ -59,6 +59,7 @@ WATCHLIST = [
     'TATAMOTORS.NS',  # Auto (EV Growth)
     'MARUTI.NS'       # Auto (Premium)
 ]
+SWARM_MODE = "DRONES"        # "DRONES" (one worker per asset, the original swarm) or "BATCH" (one Oracle pass per patrol)
 
 # --- BROKER CREDENTIALS (KEEP SECRET) ---
 DHAN_CLIENT_ID = ""      # Client ID (e.g. "10000xxxxx")
@@ -66,6 +67,7 @@ DHAN_ACCESS_TOKEN = ""   # Optional: Paste manually if you don't want auto-login
 DHAN_PASSWORD = ""       # Optional: For Auto-Login
 DHAN_TOTP_SECRET = ""    # Optional: TOTP Secret (Get this from Dhan 2FA setup)
 DATA_SOURCE = "YFINANCE" # Options: "YFINANCE" (Sim), "DHAN" (Real)
+OFFLINE_DATA = os.getenv("SOVEREIGN_OFFLINE", "0") == "1" # Serve market data only from memories/history (No Network)
 
 # --- DASHBOARD SETTINGS (Restored) ---
 RISK_PER_TRADE = 0.02        # Default risk per trade (2%)
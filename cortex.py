@@ -4,6 +4,8 @@ import time
 import glob
 from google import genai
 import config
+import llm_cache
+import state_store
 
 # --- CORTEX: THE REASONING ENGINE ---
 # Purpose: Reads scattered news, synthesizes a "World View", and sets the Global DEFCON Level.
@@ -97,11 +99,13 @@ class Cortex:
         """
         
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash", 
-                contents=prompt,
-                config={'response_mime_type': 'application/json'}
-            )
+            cortex_config = {'response_mime_type': 'application/json'}
+            response = llm_cache.cached_generate(
+                "cortex.world_view", "gemini-2.0-flash", prompt,
+                lambda: key_rotator.pool().generate(
+                    "gemini-2.0-flash", prompt, config=cortex_config, priority="intel"
+                ).result(),
+                config=cortex_config)
             
             world_view = json.loads(response.text)
             world_view['timestamp'] = time.time()
@@ -124,9 +128,8 @@ class Cortex:
             return None
 
     def _save_memory(self, data):
-        os.makedirs("memories", exist_ok=True)
-        with open(self.memory_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        # Atomic: Oracle/Council read world_view.json while the next view is being written
+        state_store.get_state_file(self.memory_path).write(data)
 
 if __name__ == "__main__":
     brain = Cortex()
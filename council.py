@@ -2,8 +2,9 @@ import random
 import time
 import json
 import os
-import yfinance as yf
 from oracle import Oracle
+from broker_adapter import get_broker_adapter
+import llm_cache
 import config
 from google import genai
 
@@ -30,7 +31,7 @@ class Shard:
             self.win_rate = wins / total
 
 class Council:
-    def __init__(self):
+    def __init__(self, oracle=None):
         # 1. The Agents (Shards)
         self.shards = [
             Shard("Sniper", "High Precision, High Confidence Only"),
@@ -41,17 +42,19 @@ class Council:
         self.active_shard = self.shards[0] # Default
         
         # 2. To avoid losing the 'Quant', we integrate Oracle as a tool for Shards
-        self.oracle = Oracle()
+        self.oracle = oracle or Oracle()
         
         # 3. The Judge (LLM) - Using Key Manager
+        self._connect_judge()
+
+    def _connect_judge(self):
         from utils.key_manager import key_rotator
         self.key_rotator = key_rotator
         self.client = self.key_rotator.get_client()
 
     def _get_fundamentals(self, symbol):
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = get_broker_adapter(mode="research").fetch_info(symbol) # Cached daily
             return {
                 "pe_ratio": info.get('forwardPE', 'N/A'),
                 "sector": info.get('sector', 'N/A'),
@@ -61,21 +64,15 @@ class Council:
         except:
             return {"status": "No Data"}
 
-    def convene(self, symbol):
-        """ The Main Entry Point for Auto-Trader """
-        print(f"\n[COUNCIL] THE COUNCIL IS CONVENING for {symbol}...")
-        
-        # 1. Gather Evidence
-        q_vote = self.oracle.analyze(symbol)
-        f_data = self._get_fundamentals(symbol)
-        
-        world_view = {}
+    def _load_world_view(self):
         try:
             with open(os.path.join("memories", "world_view.json"), "r") as f:
-                 world_view = json.load(f)
-        except: pass
-        
-        # 2. Shards Cast Votes (Simulated based on Oracle Data + their Personality)
+                return json.load(f)
+        except:
+            return {}
+
+    def _shard_votes(self, q_vote, world_view):
+        """ Shards Cast Votes (Simulated based on Oracle Data + their Personality) """
         votes = {}
         for shard in self.shards:
             # Logic: Map Oracle data to Shard Personality
@@ -105,6 +102,38 @@ class Council:
             
             votes[shard.name] = vote
             # print(f"   [{shard.name}] Votes: {vote} (WR: {shard.win_rate:.0%})")
+        return votes
+
+    def _judge(self, prompt):
+        """ One CIO call (cached, scheduled as a trade decision on the key pool). Returns parsed JSON. """
+        judge_config = {'response_mime_type': 'application/json'}
+        response = llm_cache.cached_generate(
+            "council.judge", "gemini-2.0-flash", prompt,
+            # Trade decisions jump the pool queue ahead of intel/log calls
+            lambda: self.key_rotator.pool().generate(
+                "gemini-2.0-flash", prompt, config=judge_config, priority="trade"
+            ).result(),
+            config=judge_config)
+        return json.loads(response.text)
+
+    def _on_judge_error(self, e):
+        print(f"   [JUDGE ERR] {e}")
+        if "429" in str(e) or "quota" in str(e).lower():
+            self.key_rotator.rotate_key()
+            self.client = self.key_rotator.get_client()
+
+    def convene(self, symbol, q_vote=None):
+        """ The Main Entry Point for Auto-Trader. `q_vote`: Oracle analysis already computed for this patrol. """
+        print(f"\n[COUNCIL] THE COUNCIL IS CONVENING for {symbol}...")
+        
+        # 1. Gather Evidence
+        if q_vote is None:
+            q_vote = self.oracle.analyze(symbol)
+        f_data = self._get_fundamentals(symbol)
+        world_view = self._load_world_view()
+        
+        # 2. Shards Cast Votes
+        votes = self._shard_votes(q_vote, world_view)
 
         # 3. The Judge Deliberates
         if not self.client:
@@ -137,12 +166,7 @@ class Council:
         """
         
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash", 
-                contents=prompt,
-                config={'response_mime_type': 'application/json'}
-            )
-            verdict = json.loads(response.text)
+            verdict = self._judge(prompt)
             verdict['price'] = q_vote.get('price')
             
             print(f"   [JUDGE] VERDICT: {verdict.get('signal')} ({verdict.get('confidence'):.2f})")
@@ -150,12 +174,95 @@ class Council:
             return verdict
             
         except Exception as e:
-            print(f"   [JUDGE ERR] {e}")
-            if "429" in str(e) or "quota" in str(e).lower():
-                self.key_rotator.rotate_key()
-                self.client = self.key_rotator.get_client()
+            self._on_judge_error(e)
             return q_vote
 
+    def convene_batch(self, symbols, q_votes=None):
+        """
+        Batched session for a whole watchlist: evidence and shard votes are gathered for every
+        symbol first, then the Judge rules on all cases in ONE call (a JSON array of verdicts).
+        `q_votes`: {symbol: Oracle analysis} already computed for this patrol (else analyze_batch).
+        Returns {symbol: verdict}; a symbol the Judge skipped keeps its Oracle vote.
+        """
+        symbols = list(symbols)
+        print(f"\n[COUNCIL] THE COUNCIL IS CONVENING for {len(symbols)} cases...")
+        if q_votes is None:
+            q_votes = self.oracle.analyze_batch(symbols)
+        world_view = self._load_world_view()
+
+        # 1. Gather Evidence (all cases before the Judge is called)
+        cases = []
+        for symbol in symbols:
+            q_vote = q_votes.get(symbol) or {"signal": "HOLD", "confidence": 0.0, "reason": "No Oracle vote"}
+            cases.append({
+                "symbol": symbol,
+                "q_vote": q_vote,
+                "f_data": self._get_fundamentals(symbol),
+                "votes": self._shard_votes(q_vote, world_view),
+            })
+
+        rulings = {c["symbol"]: c["q_vote"] for c in cases}
+        if not self.client or not cases:
+            return rulings # Fallback
+
+        # 2. One Judge call for every case
+        case_files = "\n".join(
+            f"""
+        CASE {i}: {c['symbol']}
+        - Technicals (Oracle): {c['q_vote'].get('signal')} ({c['q_vote'].get('confidence') or 0.0:.2f})
+        - Fundamentals: P/E {c['f_data'].get('pe_ratio')}, Rec {c['f_data'].get('recommendation')}
+        - Council Votes: {json.dumps(c['votes'])}"""
+            for i, c in enumerate(cases, 1))
+
+        prompt = f"""
+        You are the CHIEF INVESTMENT OFFICER.
+        
+        Global Macro (Cortex): {world_view.get('risk_level', 'UNKNOWN')} ({world_view.get('reasoning', 'N/A')})
+        {case_files}
+        
+        TASK:
+        Issue a FINAL VERDICT for EVERY case, independently.
+        1. Weigh the votes. 'Sniper' (Precision) is usually right. 'Contrarian' is good for hedging.
+        2. If Cortex says DANGER, be very hesitant to BUY.
+        
+        OUTPUT A JSON ARRAY ONLY (one object per case, same order):
+        [
+            {{
+                "symbol": "TICKER",
+                "signal": "BUY/SELL/HOLD",
+                "confidence": float (0.0 to 1.0),
+                "reason": "Short explanation."
+            }}
+        ]
+        """
+
+        try:
+            verdicts = self._judge(prompt)
+            if isinstance(verdicts, dict):
+                verdicts = verdicts.get('verdicts', [verdicts])
+        except Exception as e:
+            self._on_judge_error(e)
+            return rulings
+
+        by_symbol = {c["symbol"]: c for c in cases}
+        for verdict in verdicts:
+            case = by_symbol.get(str(verdict.get('symbol', '')).strip()) if isinstance(verdict, dict) else None
+            if case is None:
+                continue
+            try:
+                verdict['confidence'] = float(verdict.get('confidence', 0.0))
+            except (TypeError, ValueError):
+                continue
+            verdict['signal'] = str(verdict.get('signal', 'HOLD')).upper()
+            verdict['price'] = case['q_vote'].get('price')
+            rulings[case['symbol']] = verdict
+            print(f"   [JUDGE] {case['symbol']}: {verdict['signal']} ({verdict['confidence']:.2f}) \"{verdict.get('reason')}\"")
+
+        missing = [s for s in symbols if rulings[s] is by_symbol[s]['q_vote']]
+        if missing:
+            print(f"   [JUDGE] No ruling for {missing}. Keeping Oracle votes.")
+        return rulings
+
     # --- Backward Compatibility for Tests ---
     def get_market_verdict(self, analysis):
         # Mocks the old function used by test_council.py
@@ -1,12 +1,12 @@
 # import yfinance as yf (Removed)
 import pandas as pd
-import pandas_ta_classic as ta
 import time
 import logging
 import os
 from dotenv import load_dotenv
-from datetime import datetime
 from broker_adapter import get_broker_adapter
+from screener import Panel, Screener, load_universe
+from bar_store import REFRESH_SECONDS
 
 # Load Environment Variables
 load_dotenv()
@@ -41,68 +41,70 @@ SYMBOLS = [
     "DEXUS.NS", "ETERNAL.NS"
 ]
 
+screener = Screener() # Sovereign Rules: Price > SMA200 + RSI 40-50
+
 def analyze_stock(symbol):
     """
-    The Scout's Eyes: Checks Sovereign Rules (SMA200 + RSI).
-    Returns a dictionary of data if a match is found, else None.
+    Single-symbol screen (same rules as the batched scan).
+    Returns a candidate dictionary if a match is found, else None.
     """
     try:
         # Use Broker Adapter to fetch data
         df = broker.fetch_data(symbol)
-        
         if len(df) < 200: return None
         
-        # Calculate Sovereign Indicators
-        # Adapter handles MultiIndex cleaning
-        
-        df['SMA200'] = ta.sma(df['Close'], length=200)
-        df['RSI'] = ta.rsi(df['Close'], length=14)
-        
-        last_row = df.iloc[-1]
-        price = last_row['Close']
-        sma = last_row['SMA200']
-        rsi = last_row['RSI']
-        
-        # Strategy: Bullish Trend (Price > SMA200) + Pullback (RSI 40-50)
-        # Note: We return the FULL DF because the Oracle needs history for features.
-        if price > sma and 40 <= rsi <= 50:
-            return {
-                "symbol": symbol,
-                "price": round(price, 2),
-                "rsi": round(rsi, 2),
-                "timestamp": str(datetime.now()),
-                "data": df  # Pass the full dataframe for the Oracle
-            }
-        return None
+        table = screener.run(Panel.from_frames({symbol: df}))
+        return table.to_dict('records')[0] if len(table) else None
     except Exception as e:
         print(f"Error scanning {symbol}: {e}")
         return None
 
-def fetch_and_scan():
+def fetch_and_scan(symbols=None):
     """
-    The Scout's Mission: Scans all symbols and yields candidates.
+    The Scout's Mission: Pulls the universe in grouped requests, loads it into a symbols x bars
+    NumPy panel and screens every symbol in one vectorized pass.
+    Returns compact candidate dicts (symbol, price, rsi, sma200, bars, timestamp).
+    Bars stay in the Bar Store; use broker.fetch_data(symbol) when a consumer needs history.
     """
-    print("SCOUT: Starting market scan...")
-    candidates = []
+    symbols = symbols or SYMBOLS
+    print(f"SCOUT: Starting market scan ({len(symbols)} symbols)...")
+    start = time.time()
     
-    for s in SYMBOLS:
-        try:
-            res = analyze_stock(s)
-            if res:
-                print(f"SCOUT: Match found - {s} (RSI: {res['rsi']})")
-                logging.info(f"match found for {s}")
-                candidates.append(res)
-            
-            # Rate limit to be polite
-            time.sleep(0.5) 
-            
-        except Exception as e:
-            print(f"SCOUT: Failed on {s}: {e}")
-            logging.error(f"Error processing {s}: {e}")
+    try:
+        frames = broker.fetch_batch(symbols)
+    except Exception as e:
+        print(f"SCOUT: Batch fetch failed: {e}")
+        logging.error(f"Batch fetch failed: {e}")
+        return []
+    
+    missing = [s for s in symbols if s not in frames]
+    if missing:
+        print(f"SCOUT: No data for {len(missing)} symbols: {missing}")
+        
+    panel = Panel.from_frames(frames)
+    candidates = screener.run(panel).to_dict('records')
+    for res in candidates:
+        print(f"SCOUT: Match found - {res['symbol']} (RSI: {res['rsi']})")
+        logging.info(f"match found for {res['symbol']}")
             
-    print(f"SCOUT: Mission Complete. Found {len(candidates)} candidates.")
+    print(f"SCOUT: Mission Complete. Scanned {len(panel)} symbols in {time.time() - start:.1f}s. Found {len(candidates)} candidates.")
     return candidates
 
+def watch_nifty100(every_seconds=REFRESH_SECONDS['1d']):
+    """
+    Continuous mode: screens the full Nifty 100 once per Bar Store refresh of daily bars
+    (a faster loop would only re-screen the same cached bars; only new bars hit the network).
+    """
+    universe = load_universe()
+    while True:
+        started = time.time()
+        fetch_and_scan(universe)
+        time.sleep(max(0, every_seconds - (time.time() - started)))
+
 if __name__ == "__main__":
-    # Test Run
-    fetch_and_scan()
+    import sys
+    if "--watch" in sys.argv:
+        watch_nifty100()
+    else:
+        # Test Run
+        fetch_and_scan()
@@ -1,41 +1,24 @@
-import pandas as pd
 import json
-import os
 from datetime import datetime
+import trade_store
 
-JOURNAL_PATH = "trading_journal.csv"
 REPORT_PATH = "daily_report.json"
 
 def generate_daily_report():
     print("[DEBRIEF] Generating Daily Pulse Report...")
     
-    # 1. Load Data
-    if not os.path.exists(JOURNAL_PATH):
-        return {"grade": "N/A", "message": "No trades recorded today."}
-        
+    # 1. Load Data (per-origin counts for today: an index range scan, not a journal re-read)
     try:
-        df = pd.read_csv(JOURNAL_PATH)
-        # Filter for Today (simulation: assume all fits for now or filter by date)
-        # df['timestamp'] = pd.to_datetime(df['timestamp'])
-        # today = datetime.now().date()
-        # today_trades = df[df['timestamp'].dt.date == today]
-        today_trades = df # For MVP, analyze all
-        
-        if today_trades.empty:
+        counts = trade_store.get_store().journal_counts(day=datetime.now().strftime("%Y-%m-%d"))
+        total_trades = sum(counts.values())
+
+        if total_trades == 0:
              return {"grade": "N/A", "message": "No trades today. Market was quiet."}
 
         # 2. Analyze Performance
-        total_trades = len(today_trades)
-        
-        # Calculate Win Rate (Heuristic: BUYs followed by SELLs?)
         # For MVP, we check "Discipline": Ratio of Bot vs User trades
-        # If 'source' column exists
-        if 'source' in today_trades.columns:
-            manual_trades = len(today_trades[today_trades['source'] == 'USER'])
-            bot_trades = len(today_trades[today_trades['source'] != 'USER'])
-        else:
-            manual_trades = 0
-            bot_trades = total_trades
+        manual_trades = counts.get('USER', 0)
+        bot_trades = total_trades - manual_trades
 
         discipline_score = 100
         if total_trades > 0:
@@ -116,9 +116,7 @@ app.add_middleware(
 
 # Paths
 MEMORY_PATH = "memories/bot_brain.json"
-JOURNAL_PATH = "trading_journal.csv"
 PAPER_TRADES_PATH = "memories/paper_trades.json"
-HISTORY_PATH = "memories/account_history.csv"
 
 # Global Settings State
 SETTINGS_PATH = "memories/settings.json"
@@ -136,8 +134,8 @@ def load_settings():
     }
 
 def save_settings(new_settings):
-    with open(SETTINGS_PATH, 'w') as f:
-        json.dump(new_settings, f, indent=4)
+    import state_store
+    state_store.get_state_file(SETTINGS_PATH).write(new_settings)
 
 # Global State initialized from file
 current_settings = load_settings()
@@ -195,13 +193,9 @@ def execute_manual_trade(order: ManualOrder, force: bool = False, current_user:
 
 @app.get("/api/user_trades")
 def get_user_trades(current_user: str = Depends(get_current_user)):
-    if not os.path.exists(PAPER_TRADES_PATH):
-        return []
-    with open(PAPER_TRADES_PATH, 'r') as f:
-        trades = json.load(f)
-    # Filter for USER trades and reverse (newest first)
-    user_trades = [t for t in trades if t.get('origin') == 'USER']
-    return user_trades[::-1]
+    import trade_ledger
+    # USER trades, newest first
+    return trade_ledger.get_ledger().trades(origin='USER')[::-1]
 
 class TradeAnalysisRequest(BaseModel):
     trade_id: str
@@ -212,13 +206,8 @@ class TradeAnalysisRequest(BaseModel):
 @app.post("/api/analyze_trade")
 def analyze_trade(request: TradeAnalysisRequest, current_user: str = Depends(get_current_user)):
     # 1. Find Trade
-    if not os.path.exists(PAPER_TRADES_PATH):
-        return {"error": "No trades found"}
-    
-    with open(PAPER_TRADES_PATH, 'r') as f:
-        trades = json.load(f)
-    
-    trade = next((t for t in trades if t.get('order_id') == request.trade_id), None)
+    import trade_ledger
+    trade = trade_ledger.get_ledger().find(request.trade_id)
     if not trade:
         return {"error": "Trade not found"}
 
@@ -383,48 +372,41 @@ def get_performance():
         "monthly_returns": []
     }
     
-    if os.path.exists(HISTORY_PATH):
-        try:
-            df = pd.read_csv(HISTORY_PATH)
-            
-            # Sanitize Data (Fix for 500 Errors caused by NaN or Strings)
-            if 'equity' in df.columns:
-                df['equity'] = pd.to_numeric(df['equity'], errors='coerce').fillna(0)
-            
-            df = df.fillna(0) # Catch all NaNs
+    try:
+        import trade_store
+        curve = trade_store.get_store().equity_curve()
 
-            # Equity Curve
-            response["equity_curve"] = df.rename(columns={"date": "name", "equity": "value"}).to_dict(orient="records")
-            
-            # Calculate Monthly Returns (Simple Logic)
-            latest_equity = df.iloc[-1]['equity'] if not df.empty else 100000
-            start_equity = 100000 # Base
-            
-            # Authentic Data: Just Jan for now
-            total_pnl = float(latest_equity) - float(start_equity)
-            
-            response["monthly_returns"] = [
-                {"name": "Jan", "pnl": total_pnl}
-            ]
-            
-        except Exception as e:
-            print(f"Error reading history: {e}")
-            # Return empty structure instead of crashing
-            response = {"equity_curve": [], "monthly_returns": []}
+        # Equity Curve
+        response["equity_curve"] = [{"name": p["date"], "value": p["equity"] or 0} for p in curve]
+
+        # Calculate Monthly Returns (Simple Logic)
+        latest_equity = curve[-1]["equity"] if curve else 100000
+        start_equity = 100000 # Base
+
+        # Authentic Data: Just Jan for now
+        total_pnl = float(latest_equity) - float(start_equity)
+
+        response["monthly_returns"] = [
+            {"name": "Jan", "pnl": total_pnl}
+        ]
+
+    except Exception as e:
+        print(f"Error reading history: {e}")
+        # Return empty structure instead of crashing
+        response = {"equity_curve": [], "monthly_returns": []}
             
     return response
 
 @app.get("/api/daily-pulse")
 def get_daily_pulse():
     """Created by Bot"""
-    if not os.path.exists(JOURNAL_PATH): return {"error": "Journal not found"}
     try:
-        column_names = ['timestamp', 'order_id', 'symbol', 'action', 'price', 'quantity', 'taxes', 'total_cost', 'origin']
-        df = pd.read_csv(JOURNAL_PATH, names=column_names, on_bad_lines='skip', dtype=str, index_col=False)
-        if df.empty: return {"error": "No trades"}
+        import trade_store
+        counts = trade_store.get_store().journal_counts()
+        if not counts: return {"error": "No trades"}
         
-        bot = len(df[df['origin'] == 'BOT'])
-        manual = len(df[df['origin'] == 'MANUAL'])
+        bot = counts.get('BOT', 0)
+        manual = counts.get('USER', 0) + counts.get('MANUAL', 0)
         grade = "B"
         insight = "Consistent execution."
         if manual > bot: grade, insight = "C", "High manual interference."
@@ -433,160 +415,111 @@ def get_daily_pulse():
         return {
             "date": pd.Timestamp.now().strftime("%Y-%m-%d"),
             "grade": grade, "insight": insight,
-            "stats": {"trades": len(df), "bot": bot, "manual": manual}
+            "stats": {"trades": sum(counts.values()), "bot": bot, "manual": manual}
         }
     except Exception as e: return {"error": str(e)}
 
 @app.get("/api/alpha_details")
 def get_alpha_details():
-    if os.path.exists(JOURNAL_PATH):
-        try:
-            # CSV has no header and mixed formats (Old v1 vs New v2)
-            # We define the V2 columns. V1 rows will be misaligned but we can filter them.
-            column_names = ['timestamp', 'order_id', 'symbol', 'action', 'price', 'quantity', 'taxes', 'total_cost', 'origin']
+    try:
+        # Journal rows are normalized at write/migration time (V1 and V2 share one schema),
+        # so no column-shift recovery is needed here.
+        import trade_store
+        rows = trade_store.get_store().journal()  # Oldest first (ts index) to replay history
+
+        # --- TRADE RECONSTRUCTION LOGIC ---
+        # Goal: Group executed trades into "Round Trips" (Buy + Sell pair) or "Open Positions"
+        trades = []
+        open_positions = {} # Key: Symbol, Value: Buy Row Data
+
+        for row in rows:
+            symbol = row['symbol']
+            action = row['action']
+            price = row['price'] or 0.0
+            order_id = row['order_id'] or "V1-LEGACY"
+            origin = row['origin'] or 'BOT'
+
+            # Basic sanity check
+            if price == 0.0: continue
             
-            # Use on_bad_lines='skip' to avoid crashing on V1 rows if they have different field counts
-            # index_col=False prevents pandas from guessing ID column is index
-            df = pd.read_csv(JOURNAL_PATH, names=column_names, on_bad_lines='skip', dtype=str, index_col=False)
+            # Timestamp Parsing
+            ts = row['ts']
+            try:
+                dt_obj = datetime.strptime(str(ts), "%Y-%m-%d %H:%M:%S.%f")
+            except:
+                try: dt_obj = datetime.strptime(str(ts), "%Y-%m-%d %H:%M:%S")
+                except: dt_obj = datetime.now()
             
-            # --- TRADE RECONSTRUCTION LOGIC ---
-            # Goal: Group executed trades into "Round Trips" (Buy + Sell pair) or "Open Positions"
+            date_str = dt_obj.strftime("%d/%m/%Y")
+            time_str = dt_obj.strftime("%H:%M:%S")
+            # Store sortable dt for final sort
+            sortable_dt = dt_obj
+
+            if action == 'BUY':
+                # Start a new Open Position
+                open_positions[symbol] = {
+                    "id": order_id,
+                    "date": date_str,
+                    "time": time_str,
+                    "sort_dt": sortable_dt,
+                    "orderId": order_id,
+                    "symbol": symbol,
+                    "entryPrice": price,
+                    "exitPrice": "-", # Pending
+                    "action": "OPEN",
+                    "profitability": "Pending",
+                    "rationale": "Alpha Signal (High Confidence)",
+                    "origin": origin
+                }
             
-            # 1. Sort by Time Ascending to replay history
-            if 'timestamp' in df.columns:
-                # Ensure it's string (handled by dtype above, but safe to be sure)
-                df['timestamp'] = df['timestamp'].astype(str).str.strip()
-                
-                # Manual parsing is safer for mixed garbage
-                def parse_dt(x):
-                    try: return pd.to_datetime(x)
-                    except: return pd.NaT
-                
-                df['dt_temp'] = df['timestamp'].apply(parse_dt)
-                
-                # Filter out rows where timestamp was invalid (likely V1 headers or garbage)
-                df = df.dropna(subset=['dt_temp'])
-                df = df.sort_values(by='dt_temp', ascending=True)
-
-            trades = []
-            open_positions = {} # Key: Symbol, Value: Buy Row Data
-
-            for _, row in df.iterrows():
-                # --- FIELD RECOVERY LOGIC (V1 vs V2) ---
-                # V2: order_id=ORD-..., symbol=REL, action=BUY, price=100
-                # V1: order_id=REL, symbol=BUY, action=100 (Shifted)
-                
-                real_symbol = str(row.get('symbol')).strip()
-                real_action = str(row.get('action')).strip()
-                raw_price_col = str(row.get('price', 0))
-                
-                # Check for Shift (V1 Signature: Symbol field is 'BUY' or 'SELL')
-                is_v1_shifted = False
-                if real_symbol in ['BUY', 'SELL'] and real_action.replace('.','',1).isdigit():
-                    is_v1_shifted = True
-                
-                if is_v1_shifted:
-                    # Remap V1
-                    real_action = real_symbol # "BUY"
-                    real_symbol = str(row.get('order_id')).strip() # "RELIANCE.NS"
-                    try: real_price = float(row.get('action', 0)) # Used action col for price
-                    except: real_price = 0.0
-                    real_order_id = "V1-LEGACY"
+            elif action == 'SELL':
+                # Close the position if exists
+                if symbol in open_positions:
+                    trade = open_positions.pop(symbol)
+                    trade['exitPrice'] = price
+                    trade['action'] = "CLOSED"
+                    trade['time'] = time_str # Show Close Time
+                    trade['date'] = date_str
+                    trade['sort_dt'] = sortable_dt # Update to Close Time for sorting "Status Update"
+                    
+                    # Calculate ROI
+                    entry_p = trade['entryPrice']
+                    if entry_p > 0:
+                        roi_pct = ((price - entry_p) / entry_p) * 100
+                        trade['profitability'] = f"{roi_pct:+.2f}%"
+                    
+                    trades.append(trade)
                 else:
-                    # Standard V2
-                    real_order_id = str(row.get('order_id')).strip()
-                    try: real_price = float(row.get('price', 0))
-                    except: real_price = 0.0
-
-                symbol = real_symbol
-                action = real_action
-                price = real_price
-                order_id = real_order_id
-                origin = str(row.get('origin', 'BOT')).strip() # Default to BOT if missing
-                if origin == 'nan': origin = 'BOT'
-
-                # Basic sanity check
-                if price == 0.0: continue
-                
-                # Timestamp Parsing
-                ts = row.get('timestamp', str(datetime.now()))
-                try:
-                    dt_obj = datetime.strptime(str(ts), "%Y-%m-%d %H:%M:%S.%f")
-                except:
-                    try: dt_obj = datetime.strptime(str(ts), "%Y-%m-%d %H:%M:%S")
-                    except: dt_obj = datetime.now()
-                
-                date_str = dt_obj.strftime("%d/%m/%Y")
-                time_str = dt_obj.strftime("%H:%M:%S")
-                # Store sortable dt for final sort
-                sortable_dt = dt_obj
-
-                if action == 'BUY':
-                    # Start a new Open Position
-                    open_positions[symbol] = {
+                    trades.append({
                         "id": order_id,
                         "date": date_str,
                         "time": time_str,
                         "sort_dt": sortable_dt,
                         "orderId": order_id,
                         "symbol": symbol,
-                        "entryPrice": price,
-                        "exitPrice": "-", # Pending
-                        "action": "OPEN",
-                        "profitability": "Pending",
-                        "rationale": "Alpha Signal (High Confidence)",
+                        "entryPrice": "-",
+                        "exitPrice": price,
+                        "action": "ORPHAN SELL",
+                        "profitability": "-",
+                        "rationale": "Manual/Unknown Close",
                         "origin": origin
-                    }
-                
-                elif action == 'SELL':
-                    # Close the position if exists
-                    if symbol in open_positions:
-                        trade = open_positions.pop(symbol)
-                        trade['exitPrice'] = price
-                        trade['action'] = "CLOSED"
-                        trade['time'] = time_str # Show Close Time
-                        trade['date'] = date_str
-                        trade['sort_dt'] = sortable_dt # Update to Close Time for sorting "Status Update"
-                        
-                        # Calculate ROI
-                        entry_p = trade['entryPrice']
-                        if entry_p > 0:
-                            roi_pct = ((price - entry_p) / entry_p) * 100
-                            trade['profitability'] = f"{roi_pct:+.2f}%"
-                        
-                        trades.append(trade)
-                    else:
-                        trades.append({
-                            "id": order_id,
-                            "date": date_str,
-                            "time": time_str,
-                            "sort_dt": sortable_dt,
-                            "orderId": order_id,
-                            "symbol": symbol,
-                            "entryPrice": "-",
-                            "exitPrice": price,
-                            "action": "ORPHAN SELL",
-                            "profitability": "-",
-                            "rationale": "Manual/Unknown Close",
-                            "origin": origin
-                        })
-
-            # Add remaining Open Positions to the list
-            for symbol, trade in open_positions.items():
-                trades.append(trade)
-
-            # Explicit Sort by Date/Time Descending (Newest First)
-            trades.sort(key=lambda x: x.get('sort_dt', datetime.min), reverse=True)
-            
-            # Remove sort_dt helper before sending JSON (optional, but clean)
-            for t in trades:
-                t.pop('sort_dt', None)
+                    })
 
-            return trades
-        except Exception as e:
-            print(f"Error reading Alpha journal: {e}")
-            return []
-    return []
+        # Add remaining Open Positions to the list
+        for symbol, trade in open_positions.items():
+            trades.append(trade)
+
+        # Explicit Sort by Date/Time Descending (Newest First)
+        trades.sort(key=lambda x: x.get('sort_dt', datetime.min), reverse=True)
+        
+        # Remove sort_dt helper before sending JSON (optional, but clean)
+        for t in trades:
+            t.pop('sort_dt', None)
+
+        return trades
+    except Exception as e:
+        print(f"Error reading Alpha journal: {e}")
+        return []
 
 @app.get("/api/settings")
 def get_settings():
@@ -605,36 +538,34 @@ def get_status():
     status_data = {}
     latest_confidence = 0.0 # Logic skipped for brevity
     
-    # Wallet Balance from Brain
+    # Wallet Balance from the Ledger
     wallet_balance = 100000.0
-    if os.path.exists(MEMORY_PATH):
-        try:
-            with open(MEMORY_PATH, 'r') as f:
-                data = json.load(f)
-                wallet_balance = data.get("wallet_balance", 100000.0)
-        except: pass
+    try:
+        import trade_ledger
+        wallet_balance = trade_ledger.get_ledger().get_balance()
+    except Exception as e:
+        print(f"[API] Ledger unavailable: {e}")
 
     # Risk Status (The Dialogue Box Data)
     risk_status_msg = "UNKNOWN"
-    daily_stats_path = "memories/daily_stats.json"
-    if os.path.exists(daily_stats_path):
-        try:
-             with open(daily_stats_path, 'r') as f:
-                 stats = json.load(f)
-                 # Map internal status to User Friendly Message
-                 s = stats.get("status", "ACTIVE")
-                 if s == "ACTIVE":
-                     if stats.get("is_cautious_mode", False):
-                         risk_status_msg = "CAUTIOUS MODE (Recovering Loss - Sniper Only)"
-                     else:
-                         risk_status_msg = "TRADING ACTIVE (Hunting for Opportunities)"
-                 elif s == "STOP_LOSS":
-                     risk_status_msg = "STOPPED (Max Loss Hit - Done for the Day)"
-                 elif s == "TARGET_HIT":
-                     risk_status_msg = "STOPPED (Profit Target Hit - Bag Secured)"
-                 else:
-                     risk_status_msg = s
-        except: pass
+    try:
+        import trade_store
+        stats = trade_store.get_store().get_daily_stats()
+        if stats:
+            # Map internal status to User Friendly Message
+            s = stats.get("status", "ACTIVE")
+            if s == "ACTIVE":
+                if stats.get("is_cautious_mode", False):
+                    risk_status_msg = "CAUTIOUS MODE (Recovering Loss - Sniper Only)"
+                else:
+                    risk_status_msg = "TRADING ACTIVE (Hunting for Opportunities)"
+            elif s == "STOP_LOSS":
+                risk_status_msg = "STOPPED (Max Loss Hit - Done for the Day)"
+            elif s == "TARGET_HIT":
+                risk_status_msg = "STOPPED (Profit Target Hit - Bag Secured)"
+            else:
+                risk_status_msg = s
+    except: pass
 
     from utils.market_hours import MarketSchedule
     status_data['market_status'] = MarketSchedule.get_status_message()
@@ -684,22 +615,17 @@ class BacktestRequest(BaseModel):
 @app.post("/api/backtest")
 def run_backtest(req: BacktestRequest, current_user: str = Depends(get_current_user)):
     try:
-        import yfinance as yf
         import numpy as np
+        from broker_adapter import get_broker_adapter
 
         print(f"[BACKTEST] simulating {req.symbol} for {req.period}...")
         
-        # 1. Fetch Data (Auto Adjust for Dividends/Splits)
-        df = yf.download(req.symbol, period=req.period, interval="1d", auto_adjust=True, progress=False)
+        # 1. Fetch Data (Bar Store: Auto Adjusted, only the missing tail hits the network)
+        df = get_broker_adapter(mode="research").fetch_data(req.symbol, period=req.period, interval="1d")
         
         if df.empty:
             return {"status": "error", "message": "No data found for symbol"}
 
-        # Fix for MultiIndex Columns (common in new yfinance)
-        # e.g. columns are ('Close', 'RELIANCE.NS'), we just want 'Close'
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-
         # 2. Indicators (Vectorized)
         df['SMA_20'] = df['Close'].rolling(window=20).mean()
         df['SMA_50'] = df['Close'].rolling(window=50).mean()
@@ -796,6 +722,34 @@ def run_backtest(req: BacktestRequest, current_user: str = Depends(get_current_u
         print(f"[BACKTEST ERROR] {e}")
         return {"status": "error", "message": str(e)}
 
+class SweepRequest(BaseModel):
+    symbols: list[str]
+    period: str = "5y"
+    grid: Optional[dict] = None   # {param: [values]}, missing params use sweep_engine.DEFAULT_GRID
+    rank_by: str = "sharpe"
+    top: int = 20
+
+@app.post("/api/backtest/sweep")
+def run_backtest_sweep(req: SweepRequest, current_user: str = Depends(get_current_user)):
+    """Ranks a whole parameter grid over a set of symbols (portfolio metrics per param set)."""
+    try:
+        import sweep_engine
+        from broker_adapter import get_broker_adapter
+
+        frames = get_broker_adapter(mode="research").fetch_batch(req.symbols, period=req.period, interval="1d")
+        if not frames:
+            return {"status": "error", "message": "No data found for symbols"}
+        ranked = sweep_engine.run_sweep(frames, req.grid, rank_by=req.rank_by)
+        return {
+            "status": "success",
+            "symbols": list(frames),
+            "evaluated": len(ranked),
+            "results": ranked.head(req.top).round(4).to_dict('records')
+        }
+    except Exception as e:
+        print(f"[SWEEP ERROR] {e}")
+        return {"status": "error", "message": str(e)}
+
 # --- DAILY CAPTAIN'S LOG ---
 @app.get("/api/logs")
 def get_logs():
@@ -832,20 +786,16 @@ class ForecastRequest(BaseModel):
 @app.post("/api/forecast")
 def run_forecast(req: ForecastRequest, current_user: str = Depends(get_current_user)):
     try:
-        import yfinance as yf
         import numpy as np
+        from broker_adapter import get_broker_adapter
         
         print(f"[ORACLE] Forecasting {req.symbol} for {req.days} days...")
         
-        # 1. Fetch History (1 Year for Volatility Context)
-        df = yf.download(req.symbol, period="1y", interval="1d", auto_adjust=True, progress=False)
+        # 1. Fetch History (1 Year for Volatility Context) via the Bar Store
+        df = get_broker_adapter(mode="research").fetch_data(req.symbol, period="1y", interval="1d")
         
         if df.empty:
             return {"status": "error", "message": "No data found"}
-            
-        # Fix MultiIndex if present
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
 
         # 2. Derive Stats (Smart Drift)
         # Log Returns = ln(Pt / Pt-1)
@@ -1082,20 +1032,13 @@ def save_journal(entry: JournalEntry):
     try:
         journal_file = "memories/trade_journal.json"
         
-        # Load Existing
-        history = []
-        if os.path.exists(journal_file):
-            with open(journal_file, "r") as f:
-                history = json.load(f)
-        
-        # Add New
         new_entry = entry.dict()
         new_entry['timestamp'] = datetime.now().isoformat()
-        history.insert(0, new_entry) # Add to top
         
-        # Save
-        with open(journal_file, "w") as f:
-            json.dump(history, f, indent=4)
+        # Locked read-modify-write: concurrent saves can't drop each other's entries
+        import state_store
+        state_store.get_state_file(journal_file, default=list).update(
+            lambda history: history.insert(0, new_entry)) # Add to top
             
         print("[OK] Journal Entry Saved.")
         return {"status": "success"}
@@ -3,18 +3,18 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from memory_manager import MemoryManager
-import requests
-import pandas as pd
+from trade_store import TradeStore
+import tempfile
 import json
 
 def verify_journal_integration():
-    TEST_JOURNAL = "test_journal.csv"
-    if os.path.exists(TEST_JOURNAL):
-        os.remove(TEST_JOURNAL) # Clean start
+    # Clean start: a throwaway store instead of the live memories/sovereign.db
+    TEST_STORE = os.path.join(tempfile.mkdtemp(), "test_store.db")
 
     print("1. Logging a test trade with Confidence...")
-    # Inject test path
-    mm = MemoryManager(journal_path=TEST_JOURNAL)
+    # Inject test store
+    store = TradeStore(TEST_STORE, auto_migrate=False)
+    mm = MemoryManager(store=store)
     
     test_trade = {
         "symbol": "TEST.NS",
@@ -24,9 +24,8 @@ def verify_journal_integration():
     }
     mm.log_trade(test_trade)
     
-    print("2. Verifying CSV content...")
-    df = pd.read_csv(TEST_JOURNAL)
-    last_row = df.iloc[-1]
+    print("2. Verifying journal content...")
+    last_row = store.journal_tail(1)[-1]
     print(f"Last Row Confidence: {last_row['oracle_confidence']}")
     assert float(last_row['oracle_confidence']) == 0.95
     
@@ -43,11 +42,9 @@ def verify_journal_integration():
             status_data = json.load(f)
         
     latest_confidence = 0.0
-    df = pd.read_csv(TEST_JOURNAL)
-    if not df.empty and 'oracle_confidence' in df.columns:
-        val = df.iloc[-1]['oracle_confidence']
-        if pd.notnull(val):
-            latest_confidence = float(val)
+    rows = store.journal_tail(1)
+    if rows and rows[-1]['oracle_confidence'] is not None:
+        latest_confidence = float(rows[-1]['oracle_confidence'])
             
     print(f"Server Logic Confidence: {latest_confidence}")
     assert latest_confidence == 0.95
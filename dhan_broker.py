@@ -1,5 +1,6 @@
 import config
 import pyotp
+from instrument_master import get_instrument_master
 try:
     from dhanhq import dhanhq
 except ImportError:
@@ -9,6 +10,7 @@ class DhanBroker:
     def __init__(self):
         print("\n[BROKER] Initializing DhanHQ Connection...")
         self.dhan = None
+        self.instruments = get_instrument_master(refresh=True)
         
         # 1. Validation
         if not config.DHAN_CLIENT_ID:
@@ -77,16 +79,20 @@ class DhanBroker:
         # Determine Exchange Segment (NSE Equity vs F&O)
         # For this pilot, assuming NSE Equity (EQ)
         exchange_segment = self.dhan.NSE
+
+        # Dhan wants its numeric Security ID ('1333' for HDFCBANK), not the ticker
+        security_id = self.instruments.security_id(symbol, exchange="NSE")
+        if security_id is None:
+            print(f"❌ [ERROR] No Dhan security ID for {symbol} (instrument master day: "
+                  f"{self.instruments.meta['day'] if self.instruments.loaded else 'not built'})")
+            return {'status': 'failed', 'message': f'Unknown instrument {symbol}'}
         
         try:
             # Map parameters to Dhan API format
             txn_type = self.dhan.BUY if transaction_type == "BUY" else self.dhan.SELL
             
             response = self.dhan.place_order(
-                security_id=symbol, # Note: Dhan uses numeric Security IDs, we might need a lookup map in a real prod system. 
-                                    # For now, assuming user provides correct ID or ticker if API supports it.
-                                    # WARNING: Dhan API usually requires '1333' for HDFC, not 'HDFC'. 
-                                    # This is a critical mapping step needed for V2.
+                security_id=security_id,
                 exchange_segment=exchange_segment,
                 transaction_type=txn_type,
                 quantity=quantity,
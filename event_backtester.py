@@ -0,0 +1,495 @@
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import tempfile
+from contextlib import ExitStack, redirect_stdout
+import numpy as np
+import pandas as pd
+import config
+import llm_cache
+import state_store
+import knowledge_index
+import model_registry
+import trade_ledger
+import trade_store
+import columnar_history
+from market_regime import regime_series
+from oracle import Oracle, MODEL_NAME, SCHOLAR_PASSAGES
+from risk_manager import RiskManager
+from mock_broker import MockDhanClient
+from exchange_simulator import ExchangeSimulator
+
+# --- EVENT BACKTESTER: Stored Bars Through the Live Decision Pipeline ---
+# Purpose: backtest_engine multiplies model.predict by next-day returns and /api/backtest tests a fixed
+# SMA cross; neither runs the code that actually trades. This replays recorded bars event by event:
+#     clock    -> merged bar timestamps of the watchlist; one event = one closed bar. RiskManager
+#                 rolls its day on the simulated date (cautious mode, daily limits), never the wall clock
+#     oracle   -> ReplayOracle: the real Oracle (streaming indicators, registry brain, Scholar check)
+#                 fed only bars up to the clock; regime, world view and "My Recent Trades" come
+#                 from the replay. The brain is loaded read-only from the registry (no live handle,
+#                 no legacy import / compile) and research passages come from the knowledge index
+#                 already on disk (loaded once, never rescanned)
+#     council  -> ReplayCouncil: real shard votes + convene_batch; the Judge answers from a recorded
+#                 LLM cache or not at all (Oracle votes stand, exactly as when the live Judge fails)
+#     gates    -> the auto-pilot loop: CRASH halt, can_trade, get_required_confidence and
+#                 RiskManager.plan_order (CHOP filter, sizing, holdings check)
+#     broker   -> ExchangeSimulator (latency, next-bar fills, tax_engine charges) or the paper
+#                 MockDhanClient on a throwaway ledger opened with `cash` (instant fills at the
+#                 decision price)
+#     LLM      -> ReplayLLM: a recorded llm_cache.db answer for the exact prompt key (expiry ignored),
+#                 else a deterministic stub. Replay answers go to a private in-memory cache.
+# Ledger, journal and scoreboard live in a temp directory; registry and knowledge index are only
+# read, so a replay writes nothing under memories/.
+
+INTERVAL = "1m"
+INDEX_SYMBOL = "^NSEI"
+REGIME_WINDOW_BARS = 5 * 375    # Live regime check reads 5 days of 1m NIFTY bars
+PATROL_EVERY = 1                # Bars between patrols (live scans every 15-120 s on 1m bars)
+STUB_SCHOLAR_ANSWER = "YES. Replay stub (prompt absent from the recording)."   # Any "NO" substring is a veto
+JUDGE_MODEL = "gemini-2.0-flash"
+JUDGE_CONFIG = {'response_mime_type': 'application/json'}
+
+
+class NoRecordedRuling(Exception):
+    pass
+
+
+class ReplayLLM:
+    """Stands in for Gemini during a replay: recorded responses first, deterministic stub otherwise."""
+    def __init__(self, recorded_path=None, scholar_answer=STUB_SCHOLAR_ANSWER):
+        self.recorded = None
+        self.models = {}
+        if recorded_path:
+            self.recorded = sqlite3.connect(f"file:{recorded_path}?mode=ro", uri=True, check_same_thread=False)
+            for caller, model in self.recorded.execute("SELECT DISTINCT caller, model FROM responses"):
+                self.models.setdefault(caller, []).append(model)
+        self.scholar_answer = scholar_answer
+        self.stats = {"recorded": 0, "stubbed": 0, "judge_missed": 0}
+
+    def lookup(self, caller, model, contents, config=None):
+        """Recorded text for this exact prompt (same key llm_cache uses), or None."""
+        if self.recorded is None:
+            return None
+        decimals = llm_cache.CALLER_POLICIES.get(caller, llm_cache.CALLER_POLICIES["default"])["decimals"]
+        for name in ([model] if model else []) + [m for m in self.models.get(caller, []) if m != model]:
+            row = self.recorded.execute("SELECT text FROM responses WHERE key=?",
+                                        (llm_cache.cache_key(name, contents, config, decimals),)).fetchone()
+            if row is not None:
+                self.stats["recorded"] += 1
+                return row[0]
+        return None
+
+    def scholar(self):
+        return _ReplayModel(self, "oracle.scholar")
+
+
+class _ReplayModel:
+    """The Oracle's `llm` during a replay (model_name + generate_content, like GeminiModelWrapper)."""
+    def __init__(self, llm, caller, model_name="replay"):
+        self.llm = llm
+        self.caller = caller
+        self.model_name = model_name
+
+    def generate_content(self, contents):
+        text = self.llm.lookup(self.caller, None, contents)
+        if text is None:
+            self.llm.stats["stubbed"] += 1
+            text = self.llm.scholar_answer
+        return llm_cache.CachedResponse(text)
+
+
+class ReplayOracle(Oracle):
+    def __init__(self, replay, llm, brain=None, library=None):
+        super().__init__()
+        self.replay = replay
+        self.llm = llm.scholar()
+        self.library = library
+        self._passages = {}
+        if brain is None:
+            brain = model_registry.ModelRegistry().load(MODEL_NAME)    # Promoted version, read-only
+        self.pin(brain)
+
+    def _load_brain(self):
+        return None     # No LiveModel: it would import/compile into the registry and hot-swap mid-run
+
+    def pin(self, brain):
+        """
+        Freezes the model for the whole replay (no registry hot-swap mid-run): a registry
+        LoadedModel, or any scorer with predict_proba / classes_ / feature_names.
+        """
+        self.brain = None
+        if brain is None:
+            return
+        if hasattr(brain, 'meta') and hasattr(brain, 'version'):
+            self._loaded, self._version, self._model, self.scorer = brain, brain.version, None, brain.scorer
+        else:
+            self._loaded, self._version, self._model, self.scorer = None, "pinned", None, brain
+
+    def _regime(self):
+        return self.replay.regime
+
+    def _world_view(self):
+        return self.replay.world_view
+
+    def _research(self, regime, symbol, world_view):
+        key = (regime, symbol)
+        if key not in self._passages:
+            if self.library is None:
+                self.library = knowledge_index.KnowledgeIndex().load()
+            query = knowledge_index.regime_query(regime, symbol, world_view.get('reasoning'))
+            self._passages[key] = self.library.passages(query, k=SCHOLAR_PASSAGES)
+        return self._passages[key]
+
+    def _recent_trades(self, n):
+        return self.replay.recent_trades(n)
+
+    def _verdict(self, symbol, price, live_row, prediction, confidence):
+        # Only a BUY prediction can survive the Scholar; anything else ends HOLD either way
+        if prediction != 1:
+            return {"signal": "HOLD", "confidence": confidence, "reason": "RF says Wait.", "price": price}
+        return super()._verdict(symbol, price, live_row, prediction, confidence)
+
+
+def _replay_council(oracle, llm, world_view):
+    from council import Council     # Imported on demand (pulls in the Gemini SDK)
+
+    class ReplayCouncil(Council):
+        def _connect_judge(self):
+            self.key_rotator = None
+            self.client = llm           # Truthy: convene_batch asks the Judge
+
+        def _get_fundamentals(self, symbol):
+            return {"status": "No Data"}    # Point-in-time fundamentals are not recorded
+
+        def _load_world_view(self):
+            return world_view
+
+        def _judge(self, prompt):
+            text = llm.lookup("council.judge", JUDGE_MODEL, prompt, JUDGE_CONFIG)
+            if text is None:
+                raise NoRecordedRuling()
+            return json.loads(text)
+
+        def _on_judge_error(self, e):
+            llm.stats["judge_missed"] += 1
+
+    return ReplayCouncil(oracle=oracle)
+
+
+class EventBacktester:
+    def __init__(self, symbols=None, interval=INTERVAL, start=None, end=None, frames=None, broker="exchange",
+                 cash=trade_ledger.STARTING_BALANCE, brain=None, council=True, llm_cache_path=None,
+                 world_view=None, patrol_every=PATROL_EVERY, index_symbol=INDEX_SYMBOL,
+                 regime_window=REGIME_WINDOW_BARS, library=None, quiet=True):
+        """
+        `frames` ({symbol: OHLCV DataFrame}) replaces loading from memories/history; the index
+        bars for the regime come from frames[index_symbol] when present.
+        `brain`: registry version name, LoadedModel or compiled scorer (default: promoted version).
+        `library`: anything with passages(query, k) for the Scholar (default: the knowledge index
+        on disk, read-only). `cash`: opening balance for either broker.
+        """
+        self.quiet = quiet
+        self.patrol_every = max(1, int(patrol_every))
+        self.world_view = world_view or {}
+        self.regime = "UNKNOWN"
+        self.trades = []
+        self.equity_curve = []
+        self.stats = {"events": 0, "patrols": 0, "signals": 0, "orders": 0, "fills": 0, "rejected": 0,
+                      "gates": {}, "elapsed_s": 0.0}
+
+        # 1. Bars (closed bars only; NaN rows dropped so every component sees the same clock)
+        frames = dict(frames or {})
+        index_df = frames.pop(index_symbol, None)
+        symbols = list(symbols or frames or getattr(config, 'WATCHLIST', ['RELIANCE.NS']))
+        if index_df is None:
+            index_df = columnar_history.load_or_legacy(index_symbol, interval)
+        self.frames = {}
+        for symbol in symbols:
+            df = frames.get(symbol)
+            if df is None:
+                df = columnar_history.load_or_legacy(symbol, interval)
+            df = self._window(df, start, end)
+            if df is None or df.empty:
+                print(f"[REPLAY] No {interval} bars for {symbol}. Skipped.")
+                continue
+            self.frames[symbol] = df
+        if not self.frames:
+            raise ValueError("No bars to replay")
+        self.symbols = list(self.frames)
+
+        self._ts = {s: df.index.as_unit('ns').asi8 for s, df in self.frames.items()}
+        self.clock = np.unique(np.concatenate(list(self._ts.values())))
+        tz = next(iter(self.frames.values())).index.tz
+        stamps = pd.DatetimeIndex(self.clock, tz='UTC')
+        self.tz = tz
+        self.days = (stamps.tz_convert(tz) if tz is not None else stamps.tz_localize(None)).strftime('%Y-%m-%d')
+        self._cursor = dict.fromkeys(self.symbols, 0)     # Bars closed so far per symbol
+        self._fed = dict.fromkeys(self.symbols, 0)        # Bars already shown to the Oracle
+
+        # 2. Regime track (same thresholds as the live check, evaluated once for every index bar)
+        self._regime_ts, self._regimes = None, None
+        index_df = self._window(index_df, start, end)
+        if index_df is not None and not index_df.empty:
+            self._regime_ts = index_df.index.as_unit('ns').asi8
+            self._regimes = regime_series(index_df, regime_window).to_numpy()
+        else:
+            print(f"[REPLAY] No {index_symbol} bars: regime stays UNKNOWN (no CRASH halt / CHOP filter).")
+
+        # 3. Pipeline on a throwaway ledger/journal/scoreboard
+        self.workdir = tempfile.mkdtemp(prefix="replay_")
+        db_path = os.path.join(self.workdir, "replay.db")
+        self.store = trade_store.TradeStore(db_path, auto_migrate=False)
+        self.llm = ReplayLLM(llm_cache_path)
+        if isinstance(brain, str):
+            brain = model_registry.ModelRegistry().load(MODEL_NAME, brain)
+
+        with self._muted():
+            self.risk = RiskManager(store=self.store, today=self.days[0])
+            self.oracle = ReplayOracle(self, self.llm, brain, library)
+            self.council = _replay_council(self.oracle, self.llm, self.world_view) if council else None
+
+        self.broker_mode = broker
+        if broker == "exchange":
+            self.broker = ExchangeSimulator(cash=cash, on_fill=self._on_exchange_fill)
+            for symbol, df in self.frames.items():
+                self.broker.load_bars(symbol, df)
+            self._realized = {}
+            self._order_pnl = {}
+        elif broker == "mock":
+            # The ledger opens its wallet from bot_brain.json on first run: seed it with `cash`
+            memory_path = os.path.join(self.workdir, "bot_brain.json")
+            state_store.atomic_write_json(memory_path, {"wallet_balance": float(cash), "score": 0})
+            self.ledger = trade_ledger.TradeLedger(db_path, paper_trades_path=os.path.join(self.workdir, "paper_trades.json"),
+                                                   memory_path=memory_path)
+            self.broker = MockDhanClient(ledger=self.ledger, store=self.store)
+        else:
+            raise ValueError(f"Unknown broker '{broker}' (exchange | mock)")
+        self.start_equity = self.broker.get_fund_balance()
+
+    @staticmethod
+    def _window(df, start, end):
+        if df is None or df.empty:
+            return df
+        df = df.dropna(subset=['Open', 'High', 'Low', 'Close']).sort_index()
+        tz = df.index.tz
+        bound = lambda v: pd.Timestamp(v).tz_localize(tz) if tz is not None and pd.Timestamp(v).tz is None else pd.Timestamp(v)
+        if start is not None:
+            df = df[df.index >= bound(start)]
+        if end is not None:
+            df = df[df.index <= bound(end)]
+        return df
+
+    # --- ISOLATION ---
+    def _muted(self):
+        stack = ExitStack()
+        if self.quiet:
+            stack.enter_context(redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        return stack
+
+    def _isolated(self):
+        """Private in-memory LLM cache for the whole run (replay answers never reach the live cache)."""
+        stack = self._muted()
+        with llm_cache._cache_lock:
+            live_cache, llm_cache._cache = llm_cache._cache, llm_cache.LLMCache(path=":memory:")
+
+        def restore():
+            with llm_cache._cache_lock:
+                llm_cache._cache = live_cache
+        stack.callback(restore)
+        return stack
+
+    # --- REPLAY LOOP ---
+    def run(self):
+        started = time.perf_counter()
+        regime_i = 0
+        with self._isolated():
+            for event, ts in enumerate(self.clock):
+                day = self.days[event]
+                if day != self.risk.today:
+                    self._mark_equity(self.days[event - 1])
+                    self.risk.roll_day(day)
+
+                # Bar `ts` trades at the exchange (orders sent after the previous bar fill here)
+                if self.broker_mode == "exchange":
+                    self.broker.step()
+                    if self._order_pnl:
+                        self._book_order_pnl(final=False)
+                for symbol, stamps in self._ts.items():
+                    i = self._cursor[symbol]
+                    if i < len(stamps) and stamps[i] <= ts:
+                        self._cursor[symbol] = int(np.searchsorted(stamps, ts, side='right'))
+
+                if self._regimes is not None:
+                    while regime_i < len(self._regime_ts) and self._regime_ts[regime_i] <= ts:
+                        regime_i += 1
+                    self.regime = self._regimes[regime_i - 1] if regime_i else "UNKNOWN"
+
+                self.stats["events"] += 1
+                if event % self.patrol_every == 0:
+                    self._patrol(ts)
+            if self.broker_mode == "exchange":
+                self._book_order_pnl(final=True)
+            self._mark_equity(self.days[-1])
+        self.stats["elapsed_s"] = time.perf_counter() - started
+        return self.report()
+
+    def _gate(self, name):
+        self.stats["gates"][name] = self.stats["gates"].get(name, 0) + 1
+
+    def _patrol(self, ts):
+        """One auto-pilot patrol at the close of bar `ts` (same order of checks as run_auto_pilot)."""
+        self.stats["patrols"] += 1
+        if not self.risk.can_trade():
+            return self._gate("risk_halt")
+        if self.regime == "CRASH":
+            return self._gate("crash")
+        min_conf = self.risk.get_required_confidence()
+
+        # Bars since the last patrol (+ the previously live bar, now closed) per symbol
+        frames = {}
+        for symbol in self.symbols:
+            end = self._cursor[symbol]
+            if end > self._fed[symbol]:
+                frames[symbol] = self.frames[symbol].iloc[max(0, self._fed[symbol] - 1):end]
+                self._fed[symbol] = end
+        if not frames:
+            return
+
+        votes = self.oracle.analyze_batch(list(frames), frames=frames)
+        rulings = votes
+        if self.council is not None and (self.llm.recorded is not None or
+                                         any(v.get('signal', 'HOLD') != "HOLD" for v in votes.values())):
+            rulings = self.council.convene_batch(list(frames), q_votes=votes)
+
+        portfolio = None
+        for symbol in frames:
+            analysis = rulings.get(symbol) or votes.get(symbol) or {}
+            signal = analysis.get('signal', 'HOLD')
+            if signal == "HOLD":
+                continue
+            self.stats["signals"] += 1
+            if portfolio is None:
+                portfolio = self.broker.get_portfolio(origin="BOT")
+            price = analysis.get('price') or 0.0
+            action, quantity, gate = self.risk.plan_order(signal, analysis.get('confidence', 0.0), price,
+                                                          self.regime, portfolio.get(symbol, 0), min_conf=min_conf)
+            self._gate(gate)
+            if action is None:
+                continue
+            self._submit(symbol, action, quantity, float(price), ts)
+            portfolio = None
+
+    def _submit(self, symbol, action, quantity, price, ts):
+        self.stats["orders"] += 1
+        result = self.broker.place_order(symbol, quantity, action, price)
+        if result.get('status') != 'success':
+            self.stats["rejected"] += 1
+            return
+        if self.broker_mode == "mock":
+            # Paper broker fills instantly at the decision price (the live paper-trading behaviour)
+            realized = result.get('realized_pnl', 0.0)
+            self.risk.update_pnl(realized)
+            self.stats["fills"] += 1
+            self.trades.append({"ts": str(self._stamp(ts)), "symbol": symbol, "action": action, "price": price,
+                                "quantity": quantity, "result": f"{realized:.2f}" if action == "SELL" else None,
+                                "origin": "BOT", "order_id": result.get('order_id')})
+
+    def _on_exchange_fill(self, fill):
+        """Exchange fill: books realized PnL (net of sell charges, as MockDhanClient reports it)."""
+        self.stats["fills"] += 1
+        key = (fill['origin'], fill['symbol'])
+        realized = self.broker.position(fill['symbol'], fill['origin'])["realized_pnl"]
+        delta, self._realized[key] = realized - self._realized.get(key, 0.0), realized
+        pnl = self._order_pnl.get(fill['order_id'], 0.0)
+        if fill['action'] == "SELL":
+            pnl += delta - fill['charges']
+        self._order_pnl[fill['order_id']] = pnl
+        self.trades.append({"ts": str(self.broker.timestamp(fill['ts'])), "symbol": fill['symbol'],
+                            "action": fill['action'], "price": fill['price'], "quantity": fill['quantity'],
+                            "result": f"{pnl:.2f}" if fill['action'] == "SELL" else None,
+                            "origin": fill['origin'], "order_id": fill['order_id']})
+        if fill['order_status'] == "FILLED":
+            self.risk.update_pnl(self._order_pnl.pop(fill['order_id']))
+
+    def _book_order_pnl(self, final):
+        """Books the PnL of partly filled orders that will fill no more (cancelled), or of all of them at the end."""
+        for order_id in list(self._order_pnl):
+            if final or self.broker.orders[order_id].status in ("CANCELLED", "REJECTED"):
+                self.risk.update_pnl(self._order_pnl.pop(order_id))
+
+    def recent_trades(self, n):
+        """Last n fills shaped like journal rows (the Scholar prompt's 'My Recent Trades')."""
+        return self.trades[-n:]
+
+    # --- ACCOUNTING ---
+    def _stamp(self, ts):
+        stamp = pd.Timestamp(int(ts), tz='UTC')
+        return stamp.tz_convert(self.tz) if self.tz is not None else stamp.tz_localize(None)
+
+    def _last_close(self, symbol):
+        i = self._cursor[symbol]
+        return float(self.frames[symbol]['Close'].iloc[i - 1]) if i else 0.0
+
+    def equity(self):
+        holdings = self.broker.get_portfolio(origin="BOT")
+        return self.broker.get_fund_balance() + sum(q * self._last_close(s) for s, q in holdings.items() if s in self.frames)
+
+    def _mark_equity(self, day):
+        self.equity_curve.append({"date": day, "equity": round(self.equity(), 2)})
+
+    def report(self):
+        curve = np.array([p["equity"] for p in self.equity_curve] or [self.start_equity], dtype=float)
+        peaks = np.maximum.accumulate(np.r_[self.start_equity, curve])
+        drawdown = float(((np.r_[self.start_equity, curve] - peaks) / peaks).min()) * 100
+        if self.broker_mode == "exchange":
+            charges = self.broker.stats["charges"]
+        else:
+            charges = sum(r["taxes"] or 0.0 for r in self.store.journal(origin="BOT"))
+        elapsed = self.stats["elapsed_s"]
+        return dict(self.stats, symbols=self.symbols, broker=self.broker_mode,
+                    start_equity=self.start_equity, end_equity=float(curve[-1]),
+                    return_pct=(curve[-1] / self.start_equity - 1) * 100, max_drawdown_pct=drawdown,
+                    charges=charges, equity_curve=self.equity_curve, trades=self.trades, llm=dict(self.llm.stats),
+                    events_per_s=self.stats["events"] / elapsed if elapsed else None)
+
+
+    # --- CLEANUP ---
+    def close(self):
+        """Closes the replay's store/ledger/recorded-LLM connections and removes its workdir."""
+        for db in (self.store._db, getattr(getattr(self, "ledger", None), "_db", None), self.llm.recorded):
+            if db is not None:
+                db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def print_report(report):
+    print("-" * 50)
+    print(f"EVENT REPLAY ({report['broker']} broker, {len(report['symbols'])} symbols)")
+    print("-" * 50)
+    print(f"Bars replayed:   {report['events']} ({report['events_per_s'] or 0:,.0f} bars/s, {report['elapsed_s']:.1f}s)")
+    print(f"Patrols/Signals: {report['patrols']} / {report['signals']}")
+    print(f"Gates:           {report['gates']}")
+    print(f"Orders/Fills:    {report['orders']} / {report['fills']} (rejected {report['rejected']})")
+    print(f"Equity:          {report['start_equity']:.2f} -> {report['end_equity']:.2f} "
+          f"({report['return_pct']:+.2f}%, max DD {report['max_drawdown_pct']:.2f}%)")
+    print(f"Charges paid:    {report['charges']:.2f}")
+    print(f"LLM:             {report['llm']}")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    # python event_backtester.py [start] [end] [exchange|mock] [recorded llm_cache.db]
+    args = sys.argv[1:]
+    start, end = (args + [None, None])[:2]
+    with EventBacktester(start=start, end=end, broker=args[2] if len(args) > 2 else "exchange",
+                         llm_cache_path=args[3] if len(args) > 3 else None) as replay:
+        print_report(replay.run())
@@ -0,0 +1,403 @@
+import heapq
+import random
+import itertools
+import numpy as np
+import pandas as pd
+import tax_engine
+import trade_ledger
+
+# --- EXCHANGE SIMULATOR: Local Matching Engine Behind the Broker Interface ---
+# Purpose: MockDhanClient fills everything instantly at the requested price and DhanBroker sends real
+# MARKET orders, so nothing measured how the strategy behaves under realistic execution.
+# ExchangeSimulator has the same place_order / get_fund_balance / get_portfolio / get_position
+# interface, but orders go through a simulated exchange driven by recorded bars:
+#     clock     -> simulation time (bar timestamps), advanced by step()/run(); never wall-clock sleeps
+#     latency   -> an order reaches the exchange at submit time + network latency (+ jitter)
+#                  + queue latency per order already in flight for that symbol. Orders arriving
+#                  after a bar closes match against the NEXT bar (no look-ahead).
+#     book      -> per-symbol synthetic depth rebuilt each bar: BOOK_LEVELS price levels around the
+#                  bar's Open, spread from the bar's range, level size from PARTICIPATION x bar volume
+#     orders    -> MARKET, LIMIT, SL (stop-limit) and SL-M (stop-market)
+#     fills     -> takers walk the levels (price impact) plus SLIPPAGE_BPS; what the book can't absorb
+#                  stays working (partial fills). Resting limits fill only when the bar trades
+#                  THROUGH the price, out of the same per-bar volume budget.
+# Positions use trade_ledger's FIFO lot math; charges come from tax_engine. Everything is
+# in-memory, so thousands of orders per second can be pushed through it offline.
+
+ORDER_TYPES = ("MARKET", "LIMIT", "SL", "SL-M")
+NETWORK_LATENCY_MS = 5.0        # One-way, broker -> exchange
+LATENCY_JITTER_MS = 2.0         # Gaussian sigma on top of the network latency
+QUEUE_LATENCY_MS = 0.2          # Per order already queued for the same symbol
+SLIPPAGE_BPS = 2.0              # Extra adverse move on every taker fill
+BOOK_LEVELS = 5
+PARTICIPATION = 0.10            # Share of a bar's volume our orders may trade
+SPREAD_FRACTION = 0.05          # Half-spread as a fraction of the bar's high-low range
+TICK_SIZE = 0.05
+
+
+class SimOrder:
+    __slots__ = ("id", "symbol", "side", "quantity", "filled", "order_type", "limit", "trigger", "origin",
+                 "status", "submitted", "arrival", "notional", "triggered", "reserved", "reason")
+
+    def __init__(self, order_id, symbol, side, quantity, order_type, limit, trigger, origin, submitted, arrival,
+                 reserved):
+        self.id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.filled = 0
+        self.order_type = order_type
+        self.limit = limit
+        self.trigger = trigger
+        self.origin = origin
+        self.status = "PENDING"          # PENDING -> OPEN / PARTIAL -> FILLED | CANCELLED | REJECTED
+        self.submitted = submitted
+        self.arrival = arrival
+        self.notional = 0.0
+        self.triggered = order_type not in ("SL", "SL-M")
+        self.reserved = reserved         # Cash held back for a BUY until it completes
+        self.reason = None
+
+    @property
+    def remaining(self):
+        return self.quantity - self.filled
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled if self.filled else None
+
+    def as_dict(self):
+        return {"order_id": self.id, "symbol": self.symbol, "action": self.side, "quantity": self.quantity,
+                "filled_quantity": self.filled, "avg_price": self.avg_price, "order_type": self.order_type,
+                "limit_price": self.limit, "trigger_price": self.trigger, "origin": self.origin,
+                "status": self.status, "reason": self.reason}
+
+
+class SymbolBook:
+    """Recorded bars of one symbol plus the synthetic depth of the bar being traded."""
+    def __init__(self, symbol, df):
+        df = df.dropna(subset=['Open', 'High', 'Low', 'Close'])
+        self.symbol = symbol
+        self.ts = df.index.as_unit('ns').asi8 / 1e9
+        self.open, self.high, self.low, self.close = (df[c].to_numpy(dtype=float) for c in ('Open', 'High', 'Low', 'Close'))
+        self.volume = (df['Volume'].to_numpy(dtype=float) if 'Volume' in df else np.full(len(df), 1e6))
+        self.interval = float(np.median(np.diff(self.ts))) if len(self.ts) > 1 else 86400.0
+        self.tz = df.index.tz
+        self.cursor = -1
+        self.asks, self.bids = [], []
+        self.budget = 0.0
+        self.transit = []               # heap of (arrival, seq, order) not yet at the exchange
+        self.working = []               # orders resting / partially filled at the exchange
+
+    def next_ts(self):
+        return self.ts[self.cursor + 1] if self.cursor + 1 < len(self.ts) else None
+
+    def last_price(self):
+        return float(self.close[self.cursor]) if self.cursor >= 0 else float(self.open[0])
+
+    def open_bar(self, levels, participation, spread_fraction):
+        """Advances to the next bar and rebuilds the depth around its Open."""
+        self.cursor += 1
+        i = self.cursor
+        mid, rng = self.open[i], max(self.high[i] - self.low[i], TICK_SIZE)
+        half = max(TICK_SIZE / 2, rng * spread_fraction)
+        step = max(TICK_SIZE, rng / (2 * levels))
+        self.budget = max(1.0, self.volume[i] * participation)
+        size = self.budget / levels
+        self.asks = [[mid + half + k * step, size] for k in range(levels)]
+        self.bids = [[mid - half - k * step, size] for k in range(levels)]
+
+    def take(self, side, quantity, limit=None):
+        """Walks the opposite side up to `limit`; returns [(price, qty)] (may be short of `quantity`)."""
+        levels = self.asks if side == "BUY" else self.bids
+        fills, want = [], min(quantity, int(self.budget))
+        for level in levels:
+            if want <= 0:
+                break
+            price, size = level
+            if limit is not None and (price > limit if side == "BUY" else price < limit):
+                break
+            qty = min(want, int(size))
+            if qty <= 0:
+                continue
+            fills.append((price, qty))
+            level[1] -= qty
+            want -= qty
+            self.budget -= qty
+        return fills
+
+
+class ExchangeSimulator:
+    def __init__(self, cash=trade_ledger.STARTING_BALANCE, network_latency_ms=NETWORK_LATENCY_MS,
+                 latency_jitter_ms=LATENCY_JITTER_MS, queue_latency_ms=QUEUE_LATENCY_MS,
+                 slippage_bps=SLIPPAGE_BPS, levels=BOOK_LEVELS, participation=PARTICIPATION,
+                 spread_fraction=SPREAD_FRACTION, charges=True, seed=7, on_fill=None):
+        self.cash = float(cash)
+        self.network_latency = network_latency_ms / 1000.0
+        self.jitter = latency_jitter_ms / 1000.0
+        self.queue_latency = queue_latency_ms / 1000.0
+        self.slippage = slippage_bps / 10000.0
+        self.levels = levels
+        self.participation = participation
+        self.spread_fraction = spread_fraction
+        self.charges = charges
+        self.on_fill = on_fill
+        self._rng = random.Random(seed)
+        self._seq = itertools.count(1)
+
+        self.books = {}
+        self.orders = {}
+        self.fills = []
+        self.positions = {}             # (origin, symbol) -> trade_ledger position
+        self.reserved_cash = 0.0
+        self.clock = None
+        self.stats = {"orders": 0, "rejected": 0, "fills": 0, "partial_fills": 0, "cancelled": 0,
+                      "latency_ms": 0.0, "charges": 0.0}
+
+    # --- MARKET DATA ---
+    def load_bars(self, symbol, df):
+        """Registers recorded OHLCV bars (DatetimeIndex, Open/High/Low/Close[/Volume]) for a symbol."""
+        book = SymbolBook(symbol, df)
+        if len(book.ts):
+            self.books[symbol] = book
+            first = book.ts[0]
+            self.clock = first if self.clock is None else min(self.clock, first)
+        return book
+
+    def load_recorded(self, symbols, interval="1d"):
+        """Loads bars from the local history store (columnar series or legacy CSV)."""
+        import columnar_history
+        for symbol in symbols:
+            df = columnar_history.load_or_legacy(symbol, interval)
+            if df is not None and not df.empty:
+                self.load_bars(symbol, df)
+        return list(self.books)
+
+    def timestamp(self, ts=None):
+        """Simulation time as a pandas Timestamp (exchange timezone when the bars have one)."""
+        ts = self.clock if ts is None else ts
+        tz = next((b.tz for b in self.books.values() if b.tz is not None), None)
+        stamp = pd.Timestamp(ts, unit='s', tz='UTC')
+        return stamp.tz_convert(tz) if tz is not None else stamp.tz_localize(None)
+
+    # --- BROKER INTERFACE ---
+    def place_order(self, symbol, quantity, action, price=None, origin="BOT", stop_loss=None, target=None,
+                    order_type="MARKET", trigger_price=None):
+        """
+        Submits an order. Same signature/result shape as MockDhanClient.place_order; "success" means
+        ACCEPTED (fills arrive later through on_fill / get_order, as on a real exchange).
+        `price` is the limit for LIMIT/SL orders and the reference price for MARKET/SL-M.
+        """
+        book = self.books.get(symbol)
+        order_type = (order_type or "MARKET").upper()
+        if book is None:
+            return self._reject(f"Unknown symbol {symbol}")
+        if order_type not in ORDER_TYPES:
+            return self._reject(f"Unsupported order type {order_type}")
+        if action not in ("BUY", "SELL") or quantity <= 0:
+            return self._reject("Bad side/quantity")
+        if order_type in ("LIMIT", "SL") and price is None:
+            return self._reject(f"{order_type} needs a limit price")
+        if order_type in ("SL", "SL-M") and trigger_price is None:
+            return self._reject(f"{order_type} needs a trigger price")
+
+        reference = price if price is not None else (trigger_price or book.last_price())
+        reserved = 0.0
+        if action == "BUY":
+            reserved = quantity * reference * (1 + self.slippage) * 1.01   # Headroom for impact/charges
+            if self.cash - self.reserved_cash < reserved:
+                return self._reject(f"Insufficient Funds: Need {reserved:.2f}, Have {self.cash - self.reserved_cash:.2f}",
+                                    "INSUFFICIENT_FUNDS")
+        elif origin == "BOT":
+            # Long only for the bot (same rule as MockDhanClient), counting sells already in flight
+            held = self.position(symbol, origin)["quantity"] - sum(
+                o.remaining for o in self._open_orders(symbol) if o.side == "SELL" and o.origin == origin)
+            if held <= 0:
+                return self._reject("NO_HOLDINGS", "NO_HOLDINGS")
+            quantity = min(quantity, held)
+
+        depth = len(book.transit) + len(book.working)
+        latency = max(0.0, self.network_latency + self._rng.gauss(0.0, self.jitter)) + depth * self.queue_latency
+        now = self.clock
+        order_id = f"SIM-{next(self._seq)}-{symbol}"
+        order = SimOrder(order_id, symbol, action, quantity, order_type,
+                         price if order_type in ("LIMIT", "SL") else None,
+                         trigger_price, origin, now, now + latency, reserved)
+        self.orders[order_id] = order
+        self.reserved_cash += reserved
+        heapq.heappush(book.transit, (order.arrival, next(self._seq), order))
+        self.stats["orders"] += 1
+        self.stats["latency_ms"] += latency * 1000
+        return {"status": "success", "message": "Order Accepted", "order_id": order_id, "order_status": "PENDING"}
+
+    def cancel_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None or order.status in ("FILLED", "CANCELLED", "REJECTED"):
+            return {"status": "failure", "message": "Order not open"}
+        order.status = "CANCELLED"
+        self._release(order)
+        self.stats["cancelled"] += 1
+        return {"status": "success", "message": "Order Cancelled", "order_id": order_id}
+
+    def get_order(self, order_id):
+        order = self.orders.get(order_id)
+        return order.as_dict() if order else None
+
+    def get_fund_balance(self):
+        return self.cash
+
+    def get_positions(self):
+        """Executed fills (MockDhanClient returns its trade list here)."""
+        return list(self.fills)
+
+    def get_portfolio(self, origin=None):
+        portfolio = {}
+        for (o, symbol), position in self.positions.items():
+            if origin and o != origin:
+                continue
+            portfolio[symbol] = portfolio.get(symbol, 0) + position["quantity"]
+        return {k: v for k, v in portfolio.items() if v != 0}
+
+    def get_position(self, symbol, origin="BOT"):
+        return self.position(symbol, origin)
+
+    def position(self, symbol, origin="BOT"):
+        return self.positions.get((origin, symbol)) or trade_ledger.new_position()
+
+    def equity(self):
+        """Cash + open positions marked at each symbol's last traded close."""
+        marked = sum(p["quantity"] * self.books[s].last_price() for (_, s), p in self.positions.items() if s in self.books)
+        return self.cash + marked
+
+    # --- SIMULATION LOOP ---
+    def step(self):
+        """Trades the next bar timestamp (every symbol with a bar there). Returns its time or None at the end."""
+        upcoming = [b.next_ts() for b in self.books.values()]
+        upcoming = [t for t in upcoming if t is not None]
+        if not upcoming:
+            return None
+        ts = min(upcoming)
+        for book in self.books.values():
+            if book.next_ts() == ts:
+                self._trade_bar(book)
+        self.clock = ts + min(b.interval for b in self.books.values())   # Bar closed: strategies act now
+        return ts
+
+    def run(self, on_bar=None, until=None):
+        """Steps through the recorded bars; on_bar(sim, ts) runs after each bar closes (submit orders there)."""
+        while True:
+            if until is not None and self.clock is not None and self.clock >= until:
+                break
+            ts = self.step()
+            if ts is None:
+                break
+            if on_bar:
+                on_bar(self, ts)
+        return self.stats
+
+    # --- MATCHING ---
+    def _trade_bar(self, book):
+        book.open_bar(self.levels, self.participation, self.spread_fraction)
+        i = book.cursor
+        bar_ts, bar_end = book.ts[i], book.ts[i] + book.interval
+
+        # 1. Orders arriving during this bar, in arrival order (marketable part hits the fresh book)
+        while book.transit and book.transit[0][0] < bar_end:
+            order = heapq.heappop(book.transit)[2]
+            if order.status != "PENDING":
+                continue
+            order.status = "OPEN"
+            fill_ts = max(order.arrival, bar_ts)
+            if order.triggered:
+                self._take(book, order, fill_ts)
+            if order.remaining > 0 and order.status != "CANCELLED":
+                book.working.append(order)
+
+        # 2. Working orders against the bar's range: stops trigger, limits fill on a trade-through
+        still_working = []
+        for order in book.working:
+            if order.status in ("FILLED", "CANCELLED"):
+                continue
+            if not order.triggered and self._stop_hit(book, order):
+                order.triggered = True
+                if order.order_type == "SL-M":
+                    self._fill_stop(book, order, bar_ts)
+            elif order.triggered and order.order_type in ("MARKET", "SL-M") and order.remaining > 0:
+                self._take(book, order, bar_ts)            # Leftover from an earlier bar
+            if order.triggered and order.limit is not None and order.remaining > 0:
+                self._fill_resting(book, order, bar_ts)
+            if order.remaining > 0 and order.status != "CANCELLED":
+                still_working.append(order)
+        book.working = still_working
+
+    def _stop_hit(self, book, order):
+        i = book.cursor
+        return book.high[i] >= order.trigger if order.side == "BUY" else book.low[i] <= order.trigger
+
+    def _take(self, book, order, ts):
+        for price, qty in book.take(order.side, order.remaining, order.limit):
+            self._fill(order, self._slipped(order.side, price), qty, ts)
+
+    def _fill_stop(self, book, order, ts):
+        i = book.cursor
+        # Gap through the trigger fills at the open, otherwise at the trigger
+        base = max(order.trigger, book.open[i]) if order.side == "BUY" else min(order.trigger, book.open[i])
+        qty = min(order.remaining, int(book.budget))
+        if qty > 0:
+            book.budget -= qty
+            self._fill(order, self._slipped(order.side, base), qty, ts)
+
+    def _fill_resting(self, book, order, ts):
+        i = book.cursor
+        through = book.low[i] < order.limit if order.side == "BUY" else book.high[i] > order.limit
+        qty = min(order.remaining, int(book.budget))
+        if through and qty > 0:
+            price = min(order.limit, book.open[i]) if order.side == "BUY" else max(order.limit, book.open[i])
+            book.budget -= qty
+            self._fill(order, price, qty, ts)
+
+    def _slipped(self, side, price):
+        return price * (1 + self.slippage) if side == "BUY" else price * (1 - self.slippage)
+
+    def _fill(self, order, price, qty, ts):
+        key = (order.origin, order.symbol)
+        position = self.positions.setdefault(key, trade_ledger.new_position())
+        trade_ledger.apply_fill(position, order.side, qty, price)
+
+        charges = 0.0
+        if self.charges:
+            buy, sell = (price, 0) if order.side == "BUY" else (0, price)
+            charges = tax_engine.calculate_taxes(buy, sell, qty)['total_charges']
+        self.cash += (-qty * price if order.side == "BUY" else qty * price) - charges
+        self._release(order, qty)           # The filled part is paid: its share of the hold goes
+        order.filled += qty
+        order.notional += qty * price
+        order.status = "FILLED" if order.remaining == 0 else "PARTIAL"
+        if order.status == "FILLED":
+            self._release(order)
+
+        fill = {"order_id": order.id, "symbol": order.symbol, "action": order.side, "quantity": qty,
+                "price": price, "charges": charges, "origin": order.origin, "ts": ts,
+                "reported_at": ts + self.network_latency, "order_status": order.status}
+        self.fills.append(fill)
+        self.stats["fills"] += 1
+        self.stats["charges"] += charges
+        if order.status == "PARTIAL":
+            self.stats["partial_fills"] += 1
+        if self.on_fill:
+            self.on_fill(fill)
+
+    def _release(self, order, qty=None):
+        """Frees the order's cash hold: all of it (done/cancelled), or the share of `qty` more shares filled."""
+        amount = order.reserved if qty is None or order.remaining <= qty else order.reserved * qty / order.remaining
+        self.reserved_cash = max(0.0, self.reserved_cash - amount)
+        order.reserved -= amount
+
+    def _open_orders(self, symbol):
+        book = self.books[symbol]
+        return [entry[2] for entry in book.transit if entry[2].status == "PENDING"] + \
+               [o for o in book.working if o.status in ("OPEN", "PARTIAL")]
+
+    def _reject(self, message, code=None):
+        self.stats["rejected"] += 1
+        return {"status": "failure", "message": code or message, "detail": message}
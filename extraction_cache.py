@@ -0,0 +1,190 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# --- EXTRACTION CACHE: Content-Addressed Text of training_raw Documents ---
+# Purpose: PDF parsing (pypdf) takes seconds per paper and used to be redone on every
+# get_knowledge_text() call (Claude forecast/chat path) and every index rebuild.
+# Extracted text is stored once per file CONTENT:
+#     memories/extracted/<sha1 of file bytes>.json  -> {"text": ..., "pages": [[page, start offset], ...]}
+#     memories/extracted/paths.json                 -> {path: {"sig": [size, mtime_ns], "hash": sha1}}
+# An unchanged file (same size/mtime) is not even re-hashed; a renamed or copied file hits by hash.
+# New/changed files are extracted in a process pool (pypdf is pure Python and CPU bound).
+
+CACHE_DIR = os.path.join("memories", "extracted")
+EXTRACT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_memory = {}                # hash -> entry (process-local: repeat calls are dict lookups)
+_lock = threading.Lock()
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def extract_file(path):
+    """
+    Parses one document: {"text": str, "pages": [[page number, start offset in text], ...]}.
+    PDF/PPTX text is page text + newline per page (pages numbered from 1); plain files have one page None.
+    Top-level so it can run in a worker process.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        import pypdf
+        reader = pypdf.PdfReader(path)
+        page_texts = [page.extract_text() or "" for page in reader.pages]
+    elif ext == ".pptx":
+        from pptx import Presentation  # Optional dependency (python-pptx)
+        page_texts = ["\n".join(s.text_frame.text for s in slide.shapes if getattr(s, "has_text_frame", False))
+                      for slide in Presentation(path).slides]
+    else:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return {"text": f.read(), "pages": [[None, 0]]}
+
+    text, pages = "", []
+    for number, page_text in enumerate(page_texts, 1):
+        pages.append([number, len(text)])
+        text += page_text + "\n"
+    return {"text": text, "pages": pages}
+
+
+def page_texts(entry):
+    """[(page, text)] slices of an extracted entry (for chunking with page citations)."""
+    text, pages = entry["text"], entry["pages"]
+    bounds = [start for _, start in pages[1:]] + [len(text)]
+    return [(page, text[start:end]) for (page, start), end in zip(pages, bounds)]
+
+
+class ExtractionCache:
+    def __init__(self, cache_dir=CACHE_DIR, workers=EXTRACT_WORKERS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._paths = None
+
+    # --- PERSISTENCE ---
+    def _entry_path(self, content_hash):
+        return os.path.join(self.cache_dir, f"{content_hash}.json")
+
+    def _paths_file(self):
+        return os.path.join(self.cache_dir, "paths.json")
+
+    def _write_json(self, path, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _load_paths(self):
+        if self._paths is None:
+            try:
+                with open(self._paths_file(), 'r') as f:
+                    self._paths = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._paths = {}
+        return self._paths
+
+    def _hash_for(self, path):
+        """Content hash of `path`, re-hashing only if size/mtime changed. Returns (hash, changed_record)."""
+        key = os.path.abspath(path)
+        signature = _signature(path)
+        record = self._load_paths().get(key)
+        if record and record["sig"] == signature:
+            return record["hash"], False
+        content_hash = file_hash(path)
+        self._paths[key] = {"sig": signature, "hash": content_hash}
+        return content_hash, True
+
+    def _lookup(self, content_hash):
+        entry = _memory.get(content_hash)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._entry_path(content_hash), 'r', encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        _memory[content_hash] = entry
+        return entry
+
+    # --- MAIN ENTRY POINT ---
+    def extract_many(self, paths):
+        """
+        {path: {"text", "pages"}} for every readable path. Cache misses are parsed in parallel
+        worker processes; files that fail to parse are reported and left out.
+        """
+        with _lock:
+            results, misses, records_changed = {}, {}, False
+            for path in paths:
+                try:
+                    content_hash, changed = self._hash_for(path)
+                except OSError as e:
+                    print(f"[EXTRACT] Cannot read {path}: {e}")
+                    continue
+                records_changed |= changed
+                entry = self._lookup(content_hash)
+                if entry is not None:
+                    results[path] = entry
+                else:
+                    misses.setdefault(content_hash, []).append(path)
+
+            if misses:
+                print(f"[EXTRACT] Parsing {len(misses)} new/changed documents...")
+                for content_hash, entry in self._extract_all(misses).items():
+                    self._write_json(self._entry_path(content_hash), entry)
+                    _memory[content_hash] = entry
+                    for path in misses[content_hash]:
+                        results[path] = entry
+
+            if records_changed:
+                self._write_json(self._paths_file(), self._paths)
+            return results
+
+    def _extract_all(self, misses):
+        """{hash: entry} for the cache misses (process pool when there is more than one)."""
+        jobs = {content_hash: paths[0] for content_hash, paths in misses.items()}
+        done = {}
+        if len(jobs) == 1 or self.workers == 1:
+            for content_hash, path in jobs.items():
+                try:
+                    done[content_hash] = extract_file(path)
+                except Exception as e:
+                    print(f"[EXTRACT] Could not read {os.path.basename(path)}: {e}")
+            return done
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+            futures = {content_hash: pool.submit(extract_file, path) for content_hash, path in jobs.items()}
+            for content_hash, future in futures.items():
+                try:
+                    done[content_hash] = future.result()
+                except Exception as e:
+                    print(f"[EXTRACT] Could not read {os.path.basename(jobs[content_hash])}: {e}")
+        return done
+
+    def extract(self, path):
+        """Cached extraction of a single file (None if it cannot be read)."""
+        return self.extract_many([path]).get(path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """Process-wide cache (librarian and knowledge_index share one)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
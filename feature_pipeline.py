@@ -0,0 +1,108 @@
+import os
+import re
+import glob
+import hashlib
+import pandas as pd
+
+# --- FEATURE PIPELINE: One Feature Set for Training, Backtest and Live ---
+# Purpose: brain_factory, backtest_engine and the Oracle used to compute the model inputs
+# three different ways (rolling-mean RSI in training, Wilder RSI live), so live features
+# drifted from what the model was trained on. This module is the single batch definition.
+# The Oracle's streaming IndicatorEngine is the incremental form of the same math and is
+# held to it by test_feature_pipeline.py.
+#
+# Results are cached on disk per (symbol, interval, feature version, data hash), so a retrain
+# or backtest over unchanged history loads features instead of recomputing them.
+# Bump FEATURE_VERSION whenever the math changes (and retrain: old models expect old features).
+
+FEATURE_VERSION = "v2"  # v1 = rolling-mean RSI (pre-pipeline), v2 = Wilder RSI
+FEATURE_COLUMNS = ['RSI', 'Trend_Signal', 'Volatility', 'SMA_50', 'SMA_200']
+CACHE_DIR = "memories/features"
+
+RSI_LENGTH = 14
+SMA_FAST = 50
+SMA_SLOW = 200
+VOL_WINDOW = 20
+
+
+def wilder_rsi(close, length=RSI_LENGTH):
+    """RSI with Wilder smoothing (pandas_ta.rsi / IndicatorState): rma = ewm(alpha=1/n, adjust=True)."""
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1.0 / length, min_periods=length).mean()
+    loss = delta.clip(upper=0).abs().ewm(alpha=1.0 / length, min_periods=length).mean()
+    return 100.0 * gain / (gain + loss)
+
+
+def compute_features(df):
+    """
+    Adds the feature columns (plus 'Returns') to a copy of an OHLC frame. Vectorized, no dropna:
+    warm-up rows stay NaN so callers decide how to trim (training also needs future labels).
+    """
+    df = df.copy()
+    close = df['Close'].astype(float)
+
+    # 1. Trend
+    df['SMA_50'] = close.rolling(window=SMA_FAST).mean()
+    df['SMA_200'] = close.rolling(window=SMA_SLOW).mean()
+    trend = (df['SMA_50'] > df['SMA_200']).astype(float)
+    df['Trend_Signal'] = trend.where(df['SMA_50'].notna() & df['SMA_200'].notna())
+
+    # 2. Momentum
+    df['RSI'] = wilder_rsi(close)
+
+    # 3. Volatility (Risk)
+    df['Returns'] = close.pct_change()
+    df['Volatility'] = df['Returns'].rolling(window=VOL_WINDOW).std()
+    return df
+
+
+# --- DISK CACHE ---
+def data_hash(df):
+    """Content hash of the bars (timestamps + OHLCV); any edited or appended bar changes it."""
+    cols = [c for c in ('Date', 'Datetime', 'Open', 'High', 'Low', 'Close', 'Volume') if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[cols], index=True).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+
+def _cache_stem(symbol, interval):
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", symbol)
+    return f"{safe}_{interval}_{FEATURE_VERSION}"
+
+
+def cache_path(symbol, interval, digest, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{_cache_stem(symbol, interval)}_{digest}.pkl")
+
+
+def build_features(df, symbol=None, interval="1d", cache_dir=CACHE_DIR):
+    """
+    Cached compute_features(). Without a symbol the cache is bypassed.
+    Older entries for the same (symbol, interval, version) are removed when a new one is written.
+    """
+    if symbol is None or cache_dir is None:
+        return compute_features(df)
+
+    digest = data_hash(df)
+    path = cache_path(symbol, interval, digest, cache_dir)
+    if os.path.exists(path):
+        try:
+            print(f"[FEATURES] Cache hit for {symbol} {interval} ({FEATURE_VERSION}).")
+            return pd.read_pickle(path)
+        except Exception as e:
+            print(f"[FEATURES] Cache unreadable ({e}). Recomputing.")
+
+    features = compute_features(df)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(cache_dir, f"{glob.escape(_cache_stem(symbol, interval))}_*.pkl")):
+            os.remove(stale)
+        tmp = path + ".tmp"
+        features.to_pickle(tmp)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[FEATURES] Could not write cache: {e}")
+    return features
+
+
+def feature_matrix(features):
+    """Model input columns in training order."""
+    return features[FEATURE_COLUMNS]
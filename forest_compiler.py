@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+
+# --- FOREST COMPILER: Flat-Array Random Forest Scorer ---
+# Purpose: sklearn's predict_proba has a large fixed cost per call (validation, joblib
+# dispatch, per-tree Python loop), which dominates when the patrol scores one row.
+# compile_forest() flattens every fitted tree into shared contiguous arrays. Nodes are
+# addressed by SLOT = 2 * node id, so a node's two exits sit at slot+0 (left) / slot+1 (right)
+# and one traversal step is a single gather:  slot = children[slot + (x[f] > threshold)]
+#     feature.bin      int64   (2N,) split feature per slot (0 on leaves)
+#     threshold.bin    float64 (2N,) split threshold per slot
+#     children.bin     int64   (2N,) next slot for [slot + go_right]; leaves point to themselves
+#     is_leaf.bin      bool    (2N,) early exit once every tree has landed
+#     missing_left.bin bool    (2N,) where NaN inputs go (sklearn >= 1.3 missing-value support)
+#     leaf.bin         float64 (N, n_classes) normalized class probabilities per node
+#     roots.bin        int64   (n_trees,) root slot of each tree
+#     meta.json        classes, depth, feature names, source model hash
+# CompiledForest walks all trees at once with NumPy gathers and reproduces sklearn's
+# arithmetic exactly: float32 inputs, per-tree normalized leaf values summed tree by tree
+# in estimator order, then divided by the tree count.
+# The artifact is np.memmap'ed, so loading it is a header read instead of an unpickle.
+
+FORMAT_NAME = "sovereign-forest"
+FORMAT_VERSION = 1
+SUFFIX = ".forest"
+ARRAYS = {
+    'feature': 'int64',
+    'threshold': 'float64',
+    'children': 'int64',
+    'is_leaf': 'bool',
+    'missing_left': 'bool',
+    'leaf': 'float64',
+    'roots': 'int64',
+}
+EXIT_CHECK_EVERY = 6  # Traversal steps between "all trees at a leaf?" checks
+
+
+def file_hash(path):
+    """sha1 of the source model file (ties a compiled artifact to the exact joblib it came from)."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_path(model_path):
+    """memories/models/reliance_rf_v1.joblib -> memories/models/reliance_rf_v1.forest"""
+    return os.path.splitext(model_path)[0] + SUFFIX
+
+
+class CompiledForest:
+    """Pure-NumPy evaluator over the flattened arrays (in memory or memory-mapped)."""
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        # Plain ndarray views: indexing a np.memmap subclass is measurably slower per call
+        for name in ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]).view(np.ndarray))
+        self.classes_ = np.asarray(meta['classes'])
+        self.n_trees = int(meta['n_trees'])
+        self.max_depth = int(meta['max_depth'])
+        self.n_features = int(meta['n_features'])
+        self.feature_names = meta.get('feature_names')
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in ARRAYS}
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'to_numpy'):
+            if self.feature_names is not None and hasattr(X, 'columns'):
+                X = X[self.feature_names]
+            X = X.to_numpy()
+        # sklearn scores trees on float32 inputs (compared against float64 thresholds)
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, forest expects {self.n_features}")
+        return X
+
+    def apply(self, X):
+        """Leaf slot reached in every tree: shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        n_rows = X.shape[0]
+        flat = X.ravel()
+        feature, threshold, children, is_leaf = self.feature, self.threshold, self.children, self.is_leaf
+        has_nan = bool(np.isnan(flat).any())
+
+        if n_rows == 1:
+            # Hot path (one patrol row): node vector is (n_trees,), no row offsets
+            slot, base = self.roots, None
+        else:
+            slot = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+            base = (np.arange(n_rows, dtype=np.int64) * self.n_features)[:, None]
+
+        for step in range(self.max_depth):
+            idx = feature[slot] if base is None else feature[slot] + base
+            x = flat[idx]
+            go_right = x > threshold[slot]
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left[slot]
+            slot = children[slot + go_right]
+            if step % EXIT_CHECK_EVERY == EXIT_CHECK_EVERY - 1 and is_leaf[slot].all():
+                break
+        return slot.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        """Same values as RandomForestClassifier.predict_proba (bit for bit)."""
+        leaves = self.leaf[self.apply(X) >> 1]             # (rows, trees, classes)
+        total = np.cumsum(leaves, axis=1)[:, -1, :]        # sequential sum in tree order (like sklearn)
+        return total / self.n_trees
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def compile_forest(model, feature_names=None):
+    """Flattens a fitted RandomForestClassifier (or ExtraTreesClassifier) into a CompiledForest."""
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    trees = [est.tree_ for est in model.estimators_]
+    n_classes = int(model.n_classes_)
+    offsets = np.cumsum([0] + [t.node_count for t in trees])
+    n_nodes = int(offsets[-1])
+
+    feature = np.zeros(n_nodes, dtype=np.int64)
+    threshold = np.zeros(n_nodes, dtype=np.float64)
+    left = np.zeros(n_nodes, dtype=np.int64)
+    right = np.zeros(n_nodes, dtype=np.int64)
+    is_leaf = np.zeros(n_nodes, dtype=bool)
+    missing_left = np.ones(n_nodes, dtype=bool)
+    leaf = np.zeros((n_nodes, n_classes), dtype=np.float64)
+
+    for tree, base in zip(trees, offsets[:-1]):
+        span = slice(base, base + tree.node_count)
+        own = np.arange(base, base + tree.node_count, dtype=np.int64)
+        leaves = tree.children_left == -1
+
+        is_leaf[span] = leaves
+        feature[span] = np.where(leaves, 0, tree.feature)
+        threshold[span] = np.where(leaves, 0.0, tree.threshold)
+        left[span] = np.where(leaves, own, tree.children_left + base)
+        right[span] = np.where(leaves, own, tree.children_right + base)
+        if hasattr(tree, 'missing_go_to_left'):
+            missing_left[span] = tree.missing_go_to_left.astype(bool)
+
+        # DecisionTreeClassifier.predict_proba normalization, done once at compile time
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, None]
+        normalizer[normalizer == 0.0] = 1.0
+        leaf[span] = value / normalizer
+
+    # Slot layout: node i owns slots 2i (left exit) and 2i+1 (right exit)
+    children = np.empty(2 * n_nodes, dtype=np.int64)
+    children[0::2] = 2 * left
+    children[1::2] = 2 * right
+
+    if feature_names is None and hasattr(model, 'feature_names_in_'):
+        feature_names = [str(name) for name in model.feature_names_in_]
+
+    meta = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "n_trees": len(trees),
+        "n_nodes": n_nodes,
+        "n_classes": n_classes,
+        "n_features": int(model.n_features_in_),
+        "max_depth": int(max(t.max_depth for t in trees)),
+        "classes": model.classes_.tolist(),
+        "feature_names": feature_names,
+    }
+    arrays = {
+        'feature': np.repeat(feature, 2),
+        'threshold': np.repeat(threshold, 2),
+        'children': children,
+        'is_leaf': np.repeat(is_leaf, 2),
+        'missing_left': np.repeat(missing_left, 2),
+        'leaf': leaf,
+        'roots': 2 * offsets[:-1].astype(np.int64),
+    }
+    return CompiledForest(arrays, meta)
+
+
+# --- ARTIFACT (memory-mappable) ---
+def _shape(name, meta):
+    if name == 'roots':
+        return (meta['n_trees'],)
+    if name == 'leaf':
+        return (meta['n_nodes'], meta['n_classes'])
+    return (2 * meta['n_nodes'],)
+
+
+def save_compiled(forest, path, source_hash=None):
+    os.makedirs(path, exist_ok=True)
+    arrays = forest.arrays()
+    for name, dtype in ARRAYS.items():
+        np.ascontiguousarray(arrays[name], dtype=dtype).tofile(os.path.join(path, f"{name}.bin"))
+
+    meta = dict(forest.meta, source_hash=source_hash)
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=4)
+    os.replace(tmp, os.path.join(path, "meta.json"))  # Header last: a partial compile is never loadable
+    return path
+
+
+def load_compiled(path, mmap=True):
+    with open(os.path.join(path, "meta.json"), 'r') as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_NAME or meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} v{FORMAT_VERSION} artifact")
+
+    arrays = {}
+    for name, dtype in ARRAYS.items():
+        file = os.path.join(path, f"{name}.bin")
+        if mmap:
+            arrays[name] = np.memmap(file, dtype=dtype, mode='r', shape=_shape(name, meta))
+        else:
+            arrays[name] = np.fromfile(file, dtype=dtype).reshape(_shape(name, meta))
+    return CompiledForest(arrays, meta)
+
+
+def verify(model, forest, X):
+    """Bit-exact parity: compiled probabilities and labels must equal sklearn's."""
+    want = model.predict_proba(X)
+    got = forest.predict_proba(X)
+    return np.array_equal(want, got) and np.array_equal(model.predict(X), forest.predict(X))
+
+
+def probe_rows(forest, n_rows=2000, seed=0):
+    """Rows built from each feature's own split thresholds (exact and jittered) to exercise every edge."""
+    rng = np.random.default_rng(seed)
+    splits = ~forest.is_leaf[0::2]
+    features = forest.feature[0::2][splits]
+    thresholds = forest.threshold[0::2][splits]
+    X = np.zeros((n_rows, forest.n_features))
+    for j in range(forest.n_features):
+        values = thresholds[features == j]
+        if len(values) == 0:
+            continue
+        column = rng.choice(values, size=n_rows)
+        jitter = rng.normal(0, 1e-3, n_rows) * np.maximum(np.abs(column), 1e-6)
+        X[:, j] = np.where(rng.random(n_rows) < 0.5, column, column + jitter)
+    return X
+
+
+def compile_model_file(model_path, out_path=None, X_check=None, model=None):
+    """joblib model -> compiled artifact next to it. Refuses to write if parity fails."""
+    import joblib
+    import pandas as pd
+
+    if model is None:
+        model = joblib.load(model_path)
+    forest = compile_forest(model)
+
+    if X_check is None:
+        X_check = probe_rows(forest)
+        if forest.feature_names:
+            X_check = pd.DataFrame(X_check, columns=forest.feature_names)
+
+    if not verify(model, forest, X_check):
+        raise ValueError(f"Compiled forest does not match sklearn for {model_path}")
+
+    out_path = out_path or compiled_path(model_path)
+    save_compiled(forest, out_path, source_hash=file_hash(model_path))
+    return out_path
+
+
+def load_for_model(model_path, model=None, compile_missing=False):
+    """
+    Compiled scorer for a joblib model (memory-mapped). Returns None if the artifact is missing
+    or was compiled from a different file, unless compile_missing=True (then it is rebuilt).
+    """
+    path = compiled_path(model_path)
+    if os.path.exists(os.path.join(path, "meta.json")):
+        forest = load_compiled(path)
+        if forest.meta.get("source_hash") == file_hash(model_path):
+            return forest
+        print(f"[FOREST] {path} is stale (model changed).")
+    if not compile_missing:
+        return None
+    print(f"[FOREST] Compiling {model_path} -> {path}...")
+    return load_compiled(compile_model_file(model_path, out_path=path, model=model))
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "memories/models/reliance_rf_v1.joblib"
+    print(f"[FOREST] Compiling {target}...")
+    out = compile_model_file(target)
+    print(f"[FOREST] Parity verified against sklearn. Artifact: {out}")
@@ -0,0 +1,325 @@
+import math
+import threading
+from collections import deque
+
+# --- INDICATOR ENGINE: Streaming Technicals (O(1) per Bar) ---
+# Purpose: Keeps running indicator state per symbol so the Oracle only pays for NEW bars,
+# instead of recomputing RSI/MACD/ATR/SMA/Volatility over the whole 5-day frame every patrol.
+#
+# The math mirrors what Oracle.analyze used to compute with pandas_ta:
+#   RSI / ATR  -> Wilder smoothing (pandas_ta.rma = ewm(alpha=1/n, adjust=True, min_periods=n))
+#   MACD       -> EMA(12) - EMA(26), Signal EMA(9), each EMA seeded with an SMA (pandas_ta presma)
+#   SMA_50/200 -> running window sums
+#   Volatility -> rolling std (ddof=1) of 1-bar returns, windowed Welford update
+# The model inputs (FEATURE_COLUMNS) are the streaming form of feature_pipeline.compute_features.
+
+
+class _EWM:
+    """
+    Exponentially weighted mean with the exact recurrence pandas uses for Series.ewm().mean().
+    update() commits a value; peek() returns what the mean WOULD be without committing.
+    """
+    __slots__ = ("alpha", "adjust", "min_periods", "weighted", "old_wt", "nobs")
+
+    def __init__(self, alpha, adjust, min_periods):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.weighted = None
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def _next(self, x):
+        if self.weighted is None:
+            return x, 1.0, 1
+
+        new_wt = 1.0 if self.adjust else self.alpha
+        old_wt = self.old_wt * (1.0 - self.alpha)
+        weighted = self.weighted
+        if weighted != x:
+            weighted = old_wt * weighted + new_wt * x
+            weighted /= (old_wt + new_wt)
+        old_wt = old_wt + new_wt if self.adjust else 1.0
+        return weighted, old_wt, self.nobs + 1
+
+    def _value(self, weighted, nobs):
+        return weighted if nobs >= self.min_periods else None
+
+    def update(self, x):
+        self.weighted, self.old_wt, self.nobs = self._next(x)
+        return self._value(self.weighted, self.nobs)
+
+    def peek(self, x):
+        weighted, _, nobs = self._next(x)
+        return self._value(weighted, nobs)
+
+
+class _SeededEMA:
+    """pandas_ta.ema (presma=True): first value is the SMA of the first N inputs, then EMA(span=N)."""
+    __slots__ = ("length", "seed", "ewm")
+
+    def __init__(self, length):
+        self.length = length
+        self.seed = []
+        self.ewm = _EWM(alpha=2.0 / (length + 1.0), adjust=False, min_periods=0)
+
+    def update(self, x):
+        if self.ewm.weighted is None:
+            self.seed.append(x)
+            if len(self.seed) < self.length:
+                return None
+            value = self.ewm.update(sum(self.seed) / self.length)
+            self.seed = []
+            return value
+        return self.ewm.update(x)
+
+    def peek(self, x):
+        if self.ewm.weighted is None:
+            if len(self.seed) + 1 < self.length:
+                return None
+            return (sum(self.seed) + x) / self.length
+        return self.ewm.peek(x)
+
+
+class _RollingMean:
+    """Fixed window mean from a running sum. The sum is re-synced once per window to stop float drift."""
+    __slots__ = ("window", "buf", "total", "ticks")
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.total = 0.0
+        self.ticks = 0
+
+    def update(self, x):
+        self.buf.append(x)
+        self.total += x
+        if len(self.buf) > self.window:
+            self.total -= self.buf.popleft()
+
+        self.ticks += 1
+        if self.ticks % self.window == 0:
+            self.total = math.fsum(self.buf)
+
+        return self.total / self.window if len(self.buf) == self.window else None
+
+    def peek(self, x):
+        if len(self.buf) + 1 < self.window:
+            return None
+        dropped = self.buf[0] if len(self.buf) == self.window else 0.0
+        return (self.total + x - dropped) / self.window
+
+
+class _RollingStd:
+    """Fixed window sample std (ddof=1) using a windowed Welford update (numerically stable)."""
+    __slots__ = ("window", "buf", "mean", "m2")
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _next(self, x):
+        n = len(self.buf)
+        if n < self.window:
+            delta = x - self.mean
+            mean = self.mean + delta / (n + 1)
+            m2 = self.m2 + delta * (x - mean)
+            return mean, m2, n + 1
+
+        old = self.buf[0]
+        mean = self.mean + (x - old) / n
+        m2 = self.m2 + (x - old) * (x - mean + old - self.mean)
+        return mean, max(m2, 0.0), n
+
+    def _value(self, m2, n):
+        if n < self.window:
+            return None
+        return math.sqrt(m2 / (n - 1))
+
+    def update(self, x):
+        self.mean, self.m2, n = self._next(x)
+        self.buf.append(x)
+        if len(self.buf) > self.window:
+            self.buf.popleft()
+        return self._value(self.m2, n)
+
+    def peek(self, x):
+        _, m2, n = self._next(x)
+        return self._value(m2, n)
+
+
+class IndicatorState:
+    """
+    Running indicator state for ONE symbol.
+    update() commits a closed bar. peek() evaluates the still-forming bar without committing it,
+    so the live (last) 1m bar can change every poll without corrupting the running state.
+    """
+    def __init__(self, rsi_length=14, macd_fast=12, macd_slow=26, macd_signal=9, atr_length=14,
+                 sma_fast=50, sma_slow=200, vol_window=20):
+        self.macd_key = f"{macd_fast}_{macd_slow}_{macd_signal}"
+        self.prev_close = None
+        self.bars = 0
+
+        # RSI (Wilder)
+        self.rsi_gain = _EWM(alpha=1.0 / rsi_length, adjust=True, min_periods=rsi_length)
+        self.rsi_loss = _EWM(alpha=1.0 / rsi_length, adjust=True, min_periods=rsi_length)
+
+        # MACD
+        self.ema_fast = _SeededEMA(macd_fast)
+        self.ema_slow = _SeededEMA(macd_slow)
+        self.ema_signal = _SeededEMA(macd_signal)
+
+        # ATR (Wilder over True Range)
+        self.atr = _EWM(alpha=1.0 / atr_length, adjust=True, min_periods=atr_length)
+
+        # Trend + Volatility
+        self.sma_fast = _RollingMean(sma_fast)
+        self.sma_slow = _RollingMean(sma_slow)
+        self.volatility = _RollingStd(vol_window)
+
+        self.last = None
+
+    def _true_range(self, high, low):
+        return max(high - low, abs(high - self.prev_close), abs(self.prev_close - low))
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if gain is None or loss is None:
+            return None
+        total = gain + abs(loss)
+        return 100.0 * gain / total if total else None
+
+    def _row(self, close, rsi, fast, slow, signal, atr, sma_fast, sma_slow, ret, vol):
+        macd = fast - slow if fast is not None and slow is not None else None
+        hist = macd - signal if macd is not None and signal is not None else None
+        trend = None
+        if sma_fast is not None and sma_slow is not None:
+            trend = 1 if sma_fast > sma_slow else 0
+        return {
+            'Close': close,
+            'RSI': rsi,
+            f'MACD_{self.macd_key}': macd,
+            f'MACDh_{self.macd_key}': hist,
+            f'MACDs_{self.macd_key}': signal,
+            'ATR': atr,
+            'SMA_50': sma_fast,
+            'SMA_200': sma_slow,
+            'Trend_Signal': trend,
+            'Returns': ret,
+            'Volatility': vol,
+        }
+
+    def update(self, high, low, close):
+        """Commits one closed bar. Returns the full indicator row (values may be None while warming up)."""
+        rsi = atr = ret = vol = None
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            rsi = self._rsi(self.rsi_gain.update(max(delta, 0.0)), self.rsi_loss.update(min(delta, 0.0)))
+            atr = self.atr.update(self._true_range(high, low))
+            ret = close / self.prev_close - 1.0
+            vol = self.volatility.update(ret)
+
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        signal = None
+        if fast is not None and slow is not None:
+            signal = self.ema_signal.update(fast - slow)
+
+        row = self._row(close, rsi, fast, slow, signal, atr,
+                        self.sma_fast.update(close), self.sma_slow.update(close), ret, vol)
+        self.prev_close = close
+        self.bars += 1
+        self.last = row
+        return row
+
+    def peek(self, high, low, close):
+        """Indicator row for a forming bar, WITHOUT mutating state."""
+        rsi = atr = ret = vol = None
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            rsi = self._rsi(self.rsi_gain.peek(max(delta, 0.0)), self.rsi_loss.peek(min(delta, 0.0)))
+            atr = self.atr.peek(self._true_range(high, low))
+            ret = close / self.prev_close - 1.0
+            vol = self.volatility.peek(ret)
+
+        fast = self.ema_fast.peek(close)
+        slow = self.ema_slow.peek(close)
+        signal = None
+        if fast is not None and slow is not None:
+            signal = self.ema_signal.peek(fast - slow)
+
+        return self._row(close, rsi, fast, slow, signal, atr,
+                         self.sma_fast.peek(close), self.sma_slow.peek(close), ret, vol)
+
+
+def is_ready(row):
+    """True when every indicator in the row is warmed up (the streaming equivalent of dropna())."""
+    return row is not None and all(v is not None for v in row.values())
+
+
+class IndicatorEngine:
+    """
+    Per-symbol streaming indicator cache shared by the Oracle.
+    Feed it the latest bar frame every patrol; it only walks bars it has not seen yet.
+    """
+    def __init__(self, **indicator_params):
+        self.indicator_params = indicator_params
+        self.states = {}
+        self.last_closed_bar = {}
+        self._lock = threading.Lock()
+
+    def reset(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self.states.clear()
+                self.last_closed_bar.clear()
+            else:
+                self.states.pop(symbol, None)
+                self.last_closed_bar.pop(symbol, None)
+
+    def ingest(self, symbol, data):
+        """
+        Consumes an OHLC frame (DatetimeIndex, sorted) for `symbol`.
+        Every row except the last is treated as a CLOSED bar and committed once;
+        the last row is the live bar and is only peeked.
+        Returns the feature row for the live bar, or None if indicators are still warming up.
+        """
+        if data is None or data.empty:
+            return None
+
+        index = data.index
+        high = data['High'].to_numpy(dtype=float)
+        low = data['Low'].to_numpy(dtype=float)
+        close = data['Close'].to_numpy(dtype=float)
+        closed_end = len(data) - 1
+
+        with self._lock:
+            state = self.states.get(symbol)
+            last_closed = self.last_closed_bar.get(symbol)
+
+            # Cold start, or the feed rewound (new scenario / data reset) -> full warm-up
+            if state is None or last_closed is None or index[-1] < last_closed:
+                state = IndicatorState(**self.indicator_params)
+                self.states[symbol] = state
+                start = 0
+            else:
+                start = index.searchsorted(last_closed, side='right')
+
+            for i in range(start, closed_end):
+                state.update(high[i], low[i], close[i])
+
+            if closed_end > 0:
+                self.last_closed_bar[symbol] = index[closed_end - 1]
+
+            row = state.peek(high[-1], low[-1], close[-1])
+
+        return row if is_ready(row) else None
+
+    def feature_row(self, symbol):
+        """Last COMMITTED row for a symbol (None if unknown or warming up)."""
+        state = self.states.get(symbol)
+        if state is None or not is_ready(state.last):
+            return None
+        return dict(state.last)
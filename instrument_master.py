@@ -0,0 +1,340 @@
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+import config
+from state_store import atomic_write_json
+
+# --- INSTRUMENT MASTER: Memory-Mapped Security-ID Lookup ---
+# Purpose: Dhan's order API takes numeric security IDs ('1333' for HDFCBANK), not tickers.
+# The broker's scrip master CSV (~200k instruments) is ingested ONCE PER DAY into a dated folder:
+#     memories/instruments/<YYYY-MM-DD>/
+#         meta.json         -> header (source, rows, table sizes, build date)
+#         rows.bin          -> fixed-width records (exchange, segment, security_id, symbol, series,
+#                              isin, instrument, lot_size, tick_size, name)
+#         <index>.keys.bin  -> open-addressing hash tables (uint64 key hash, 0 = empty slot)
+#         <index>.rows.bin  -> int32 row number per slot
+#     memories/instruments/current.json -> pointer to the live folder (swapped atomically)
+# Indexes: symbol  = exchange|segment|symbol|series -> row
+#          id      = exchange|segment|security_id   -> row   (reverse direction)
+#          isin    = isin|exchange|segment          -> row   (join key for data/ind_nifty100list.csv)
+# Readers np.memmap everything; a lookup is one hash + a probe or two (O(1), no parse, no dict
+# of 200k Python objects per process).
+
+INSTRUMENT_DIR = "memories/instruments"
+SCRIP_MASTER_URL = "https://images.dhan.co/api-data/api-scrip-master-detailed.csv"
+NIFTY100_PATH = os.path.join("data", "ind_nifty100list.csv")
+FORMAT_NAME = "sovereign-instruments"
+FORMAT_VERSION = 1
+KEEP_BUILDS = 2
+INDEXES = ("symbol", "id", "isin")
+
+ROW_DTYPE = np.dtype([
+    ('exchange', 'S4'), ('segment', 'S1'), ('security_id', '<i8'), ('symbol', 'S32'), ('series', 'S4'),
+    ('isin', 'S12'), ('instrument', 'S12'), ('lot_size', '<i4'), ('tick_size', '<f8'), ('name', 'S48'),
+])
+
+# Dhan publishes two layouts (compact "SEM_*" and detailed); first matching header wins
+COLUMN_ALIASES = {
+    'exchange': ('SEM_EXM_EXCH_ID', 'EXCH_ID'),
+    'segment': ('SEM_SEGMENT', 'SEGMENT'),
+    'security_id': ('SEM_SMST_SECURITY_ID', 'SECURITY_ID'),
+    'symbol': ('SEM_TRADING_SYMBOL', 'TRADING_SYMBOL', 'UNDERLYING_SYMBOL'),
+    'series': ('SEM_SERIES', 'SERIES'),
+    'isin': ('ISIN', 'SEM_ISIN'),
+    'instrument': ('SEM_INSTRUMENT_NAME', 'INSTRUMENT'),
+    'lot_size': ('SEM_LOT_UNITS', 'LOT_SIZE'),
+    'tick_size': ('SEM_TICK_SIZE', 'TICK_SIZE'),
+    'name': ('SM_SYMBOL_NAME', 'SYMBOL_NAME', 'DISPLAY_NAME'),
+}
+
+# yfinance suffix -> Dhan exchange (segment E = cash equity)
+SUFFIX_EXCHANGE = {".NS": "NSE", ".BO": "BSE"}
+
+
+def _hash(key):
+    """Stable 64-bit key hash (Python's hash() is salted per process). 0 is reserved for empty."""
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+def _key(index, row):
+    if index == "symbol":
+        return f"{row['exchange']}|{row['segment']}|{row['symbol']}|{row['series']}"
+    if index == "id":
+        return f"{row['exchange']}|{row['segment']}|{row['security_id']}"
+    return f"{row['isin']}|{row['exchange']}|{row['segment']}"
+
+
+def split_ticker(ticker, exchange=None):
+    """'SBIN.NS' -> ('SBIN', 'NSE'); bare 'SBIN' -> ('SBIN', exchange or 'NSE')."""
+    ticker = ticker.strip().upper()
+    for suffix, exch in SUFFIX_EXCHANGE.items():
+        if ticker.endswith(suffix):
+            return ticker[:-len(suffix)], exchange or exch
+    return ticker, exchange or "NSE"
+
+
+# --- INGEST ---
+def read_scrip_master(path):
+    """Scrip master CSV (either Dhan layout) -> normalized DataFrame with the ROW_DTYPE columns."""
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        found = next((c for c in aliases if c in header), None)
+        if found:
+            usecols[found] = field
+    missing = {'exchange', 'segment', 'security_id', 'symbol'} - set(usecols.values())
+    if missing:
+        raise ValueError(f"{path}: not a scrip master (missing {sorted(missing)})")
+
+    df = pd.read_csv(path, usecols=list(usecols), dtype=str, keep_default_na=False).rename(columns=usecols)
+    for field in COLUMN_ALIASES:
+        if field not in df:
+            df[field] = ""
+    for field in ('exchange', 'segment', 'symbol', 'series', 'isin', 'instrument'):
+        df[field] = df[field].str.strip().str.upper()
+    df['security_id'] = pd.to_numeric(df['security_id'], errors='coerce')
+    df = df[df['security_id'].notna() & (df['symbol'] != "")].copy()
+    df['security_id'] = df['security_id'].astype('int64')
+    df['lot_size'] = pd.to_numeric(df['lot_size'], errors='coerce').fillna(1).clip(lower=1)
+    tick = pd.to_numeric(df['tick_size'], errors='coerce').fillna(0.0)
+    # Cash-equity ticks are published in paise (5.0 = 0.05 rupee)
+    df['tick_size'] = np.where((df['segment'] == "E") & (tick >= 1), tick / 100.0, tick)
+    # Prefer the regular EQ series when an ISIN is listed under several (EQ/BE/BL...)
+    df = df.assign(_rank=(df['series'] != "EQ").astype(int)).sort_values('_rank', kind='stable')
+    return df.drop(columns='_rank').reset_index(drop=True)
+
+
+def _records(df):
+    rows = np.zeros(len(df), dtype=ROW_DTYPE)
+    for field in ROW_DTYPE.names:
+        kind = ROW_DTYPE[field].kind
+        values = df[field].to_numpy()
+        if kind == 'S':
+            width = ROW_DTYPE[field].itemsize
+            rows[field] = np.array([str(v)[:width].encode('ascii', 'replace') for v in values], dtype=ROW_DTYPE[field])
+        else:
+            rows[field] = values.astype(ROW_DTYPE[field])
+    return rows
+
+
+def _build_table(keys):
+    """Open-addressing table (linear probing, load <= 0.5). Duplicate keys: first row wins."""
+    size = 1 << max(4, int(2 * max(len(keys), 1) - 1).bit_length())
+    slots, rows = [0] * size, [-1] * size      # Plain lists while probing; numpy only for the file
+    mask = size - 1
+    for row, key in enumerate(keys):
+        if key is None:
+            continue
+        h = _hash(key)
+        slot = h & mask
+        while slots[slot] and slots[slot] != h:
+            slot = (slot + 1) & mask
+        if not slots[slot]:
+            slots[slot], rows[slot] = h, row
+    return np.array(slots, dtype='<u8'), np.array(rows, dtype='<i4')
+
+
+def build_master(csv_path, root=INSTRUMENT_DIR, day=None):
+    """Builds a dated lookup folder from a scrip master CSV and makes it current. Returns its meta."""
+    df = read_scrip_master(csv_path)
+    day = day or datetime.date.today().isoformat()
+    target = os.path.join(root, day)
+    staging = target + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    _records(df).tofile(os.path.join(staging, "rows.bin"))
+    records = df.to_dict('records')
+    tables = {}
+    for index in INDEXES:
+        keys = [_key(index, r) if (index != "isin" or r['isin']) else None for r in records]
+        slots, rows = _build_table(keys)
+        slots.tofile(os.path.join(staging, f"{index}.keys.bin"))
+        rows.tofile(os.path.join(staging, f"{index}.rows.bin"))
+        tables[index] = int(len(slots))
+
+    meta = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "day": day, "rows": int(len(df)),
+            "tables": tables, "source": os.path.basename(csv_path),
+            "built": datetime.datetime.now().isoformat(timespec='seconds')}
+    with open(os.path.join(staging, "meta.json"), 'w') as f:
+        json.dump(meta, f, indent=4)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    atomic_write_json(os.path.join(root, "current.json"), {"path": day, "day": day})
+    for old in sorted(glob.glob(os.path.join(root, "????-??-??")))[:-KEEP_BUILDS]:
+        if old != target:
+            shutil.rmtree(old, ignore_errors=True)
+    print(f"[INSTRUMENTS] Indexed {meta['rows']} instruments from {meta['source']} ({day}).")
+    return meta
+
+
+def download_scrip_master(root=INSTRUMENT_DIR, url=SCRIP_MASTER_URL):
+    import requests
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, "scrip_master.csv")
+    tmp = path + ".part"
+    with requests.get(url, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        with open(tmp, 'wb') as f:
+            for chunk in resp.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    os.replace(tmp, path)
+    return path
+
+
+# --- LOOKUP ---
+class InstrumentMaster:
+    """Read-only, memory-mapped view of the current build."""
+    def __init__(self, root=INSTRUMENT_DIR):
+        self.root = root
+        self.meta = None
+        self.rows = None
+        self._tables = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.root, "current.json")) as f:
+                path = os.path.join(self.root, json.load(f)["path"])
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, KeyError, json.JSONDecodeError):
+            self.meta, self.rows, self._tables = None, None, {}
+            return False
+        if meta.get("format") != FORMAT_NAME:
+            raise ValueError(f"{path} is not a {FORMAT_NAME} build")
+        self.meta = meta
+        self.rows = np.memmap(os.path.join(path, "rows.bin"), dtype=ROW_DTYPE, mode='r', shape=(meta["rows"],)) \
+            if meta["rows"] else np.zeros(0, dtype=ROW_DTYPE)
+        self._tables = {
+            index: (np.memmap(os.path.join(path, f"{index}.keys.bin"), dtype='<u8', mode='r', shape=(size,)),
+                    np.memmap(os.path.join(path, f"{index}.rows.bin"), dtype='<i4', mode='r', shape=(size,)))
+            for index, size in meta["tables"].items()
+        }
+        return True
+
+    @property
+    def loaded(self):
+        return self.meta is not None
+
+    def is_stale(self, day=None):
+        return not self.loaded or self.meta["day"] != (day or datetime.date.today().isoformat())
+
+    def refresh(self, csv_path=None, force=False):
+        """
+        Rebuilds from `csv_path` (or a fresh download) if today's build is missing.
+        Offline mode or a failed download keeps the previous build.
+        """
+        if not force and not self.is_stale():
+            return False
+        try:
+            if csv_path is None:
+                if getattr(config, 'OFFLINE_DATA', False):
+                    print("[INSTRUMENTS] Offline mode: keeping the existing instrument master.")
+                    return False
+                csv_path = download_scrip_master(self.root)
+            build_master(csv_path, self.root)
+        except Exception as e:
+            print(f"[INSTRUMENTS] Refresh failed ({e}); keeping build {self.meta['day'] if self.loaded else 'none'}.")
+            return False
+        return self._load()
+
+    def _find(self, index, key):
+        if not self.loaded:
+            return None
+        slots, rows = self._tables[index]
+        h = _hash(key)
+        mask = len(slots) - 1
+        slot = h & mask
+        while True:
+            stored = int(slots[slot])
+            if stored == 0:
+                return None
+            if stored == h:
+                return int(rows[slot])
+            slot = (slot + 1) & mask
+
+    def _record(self, row):
+        if row is None:
+            return None
+        rec = self.rows[row]
+        out = {}
+        for field in ROW_DTYPE.names:
+            value = rec[field]
+            out[field] = value.decode('ascii') if isinstance(value, bytes) else value.item()
+        out['security_id'] = str(out['security_id'])
+        return out
+
+    def instrument(self, ticker, exchange=None, segment="E", series="EQ"):
+        """Full record for a ticker ('SBIN.NS' or 'SBIN'); None if unknown."""
+        symbol, exchange = split_ticker(ticker, exchange)
+        return self._record(self._find("symbol", f"{exchange}|{segment}|{symbol}|{series}"))
+
+    def security_id(self, ticker, exchange=None, segment="E", series="EQ"):
+        """The order-path call: ticker -> Dhan security ID string (None if unknown)."""
+        symbol, exchange = split_ticker(ticker, exchange)
+        row = self._find("symbol", f"{exchange}|{segment}|{symbol}|{series}")
+        return None if row is None else str(int(self.rows[row]['security_id']))
+
+    def by_security_id(self, security_id, exchange="NSE", segment="E"):
+        return self._record(self._find("id", f"{exchange}|{segment}|{int(security_id)}"))
+
+    def by_isin(self, isin, exchange="NSE", segment="E"):
+        return self._record(self._find("isin", f"{isin.strip().upper()}|{exchange}|{segment}"))
+
+    def lot_size(self, ticker, **kwargs):
+        rec = self.instrument(ticker, **kwargs)
+        return rec['lot_size'] if rec else 1
+
+    def tick_size(self, ticker, **kwargs):
+        rec = self.instrument(ticker, **kwargs)
+        return rec['tick_size'] if rec else None
+
+    def map_universe(self, path=NIFTY100_PATH, exchange="NSE"):
+        """Joins the Nifty 100 list on ISIN: {'ABB': '13', ...}; symbols without a match map to None."""
+        df = pd.read_csv(path, dtype=str)
+        mapping = {}
+        for symbol, isin in zip(df['Symbol'].str.strip(), df['ISIN Code'].fillna("")):
+            rec = self.by_isin(isin, exchange) if isin else None
+            mapping[symbol] = rec['security_id'] if rec else None
+        return mapping
+
+
+_master = None
+_master_lock = threading.Lock()
+
+
+def get_instrument_master(refresh=False):
+    """Process-wide master; refresh=True rebuilds it first if today's build is missing."""
+    global _master
+    with _master_lock:
+        if _master is None:
+            _master = InstrumentMaster()
+        if refresh:
+            _master.refresh()
+        return _master
+
+
+if __name__ == "__main__":
+    # python instrument_master.py build [scrip_master.csv] | lookup SBIN.NS [...] | universe
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    master = get_instrument_master()
+    if command == "build":
+        master.refresh(csv_path=sys.argv[2] if len(sys.argv) > 2 else None, force=True)
+        print(f"[INSTRUMENTS] Current build: {master.meta}")
+    elif command == "lookup":
+        for ticker in sys.argv[2:]:
+            print(f"{ticker}: {master.instrument(ticker)}")
+    elif command == "universe":
+        mapping = master.map_universe()
+        missing = [s for s, sid in mapping.items() if sid is None]
+        print(f"[INSTRUMENTS] {len(mapping) - len(missing)}/{len(mapping)} Nifty 100 symbols resolved. Missing: {missing}")
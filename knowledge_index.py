@@ -0,0 +1,387 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from scipy import sparse
+import extraction_cache
+
+# --- KNOWLEDGE INDEX: Local Hybrid Retrieval over training_raw ---
+# Purpose: The Scholar check and the Dojo used to attach EVERY uploaded paper to every request.
+# This index is built offline over training_raw (PDF/PPTX/TXT/MD/CSV + the news folder):
+#   - documents are split into ~CHUNK_WORDS word passages (PDF pages are tracked for citations)
+#   - BM25 ranks exact terminology ("stop loss", "RSI divergence")
+#   - TF-IDF cosine similarity catches the rest of the vocabulary overlap
+# Callers attach only the top-k passages for the current regime/symbol as plain text.
+# Updates are incremental: a file is re-extracted only if its size/mtime AND content hash changed.
+#     memories/knowledge_index/manifest.json   -> {relative path: {sig, hash, doc}}
+#     memories/knowledge_index/docs/<id>.json  -> extracted passages of one file
+# Each build publishes one immutable _Corpus (passages + matrices) with a single assignment, so a
+# search never mixes passages of one build with matrices of another. retrieve() (the Scholar hot
+# path) never builds inline: a missing or stale index is rebuilt on a background thread while the
+# previous corpus (or no passages at all) is served. Dojo / the CLI build up front.
+
+KNOWLEDGE_DIR = "training_raw"
+INDEX_DIR = os.path.join("memories", "knowledge_index")
+SUPPORTED = ('.pdf', '.pptx', '.txt', '.md', '.csv')
+
+CHUNK_WORDS = 200           # Passage length
+CHUNK_OVERLAP = 40          # Words shared by consecutive passages
+BM25_K1 = 1.5
+BM25_B = 0.75
+HYBRID_ALPHA = 0.6          # Weight of BM25 vs TF-IDF cosine in the final score
+REFRESH_SECONDS = 300       # Min seconds between directory rescans in a running process
+
+# Search terms per market regime (mirrors the librarian's regime -> paper tags)
+REGIME_QUERIES = {
+    "CRASH": "risk management drawdown macro volatility crash panic psychology stop loss",
+    "TREND": "trend following strategy momentum moving average breakout technical",
+    "CHOP": "range bound mean reversion oscillators rsi psychology sideways market",
+    "UNKNOWN": "trading strategy risk management",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+which we our not can but if then than these those their there they been being also such may into
+""".split())
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+# --- EXTRACTION ---
+def chunk_pages(pages, words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Splits page texts into overlapping word windows: [{'page', 'text'}]."""
+    flat, page_of = [], []
+    for page, text in pages:
+        tokens = text.split()
+        flat.extend(tokens)
+        page_of.extend([page] * len(tokens))
+
+    chunks = []
+    step = max(1, words - overlap)
+    for start in range(0, len(flat), step):
+        window = flat[start:start + words]
+        if not window:
+            break
+        chunks.append({"page": page_of[start], "text": " ".join(window)})
+        if start + words >= len(flat):
+            break
+    return chunks
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class _Corpus:
+    """One build of the index. Never mutated after construction: readers take one reference."""
+    __slots__ = ("chunks", "vocab", "idf", "bm25", "tfidf")
+
+    def __init__(self, chunks, vocab, idf, bm25, tfidf):
+        self.chunks = chunks      # [{'source', 'page', 'text', 'n' (position in its document)}]
+        self.vocab = vocab
+        self.idf = idf
+        self.bm25 = bm25          # CSC: chunk x term BM25 weights
+        self.tfidf = tfidf        # CSR: L2-normalized TF-IDF rows
+
+
+class KnowledgeIndex:
+    def __init__(self, root=KNOWLEDGE_DIR, index_dir=INDEX_DIR):
+        self.root = root
+        self.index_dir = index_dir
+        self.manifest = {}
+        self._corpus = None       # Latest published _Corpus (None until the first build)
+        self._scanned = 0.0
+        self._lock = threading.Lock()
+        self._building = False
+        self._build_lock = threading.Lock()
+        self._load_manifest()
+
+    @property
+    def chunks(self):
+        corpus = self._corpus
+        return corpus.chunks if corpus is not None else []
+
+    def ready(self):
+        """True once a corpus has been published (searches no longer build inline)."""
+        return self._corpus is not None
+
+    # --- PERSISTENCE ---
+    def _manifest_path(self):
+        return os.path.join(self.index_dir, "manifest.json")
+
+    def _doc_path(self, doc_id):
+        return os.path.join(self.index_dir, "docs", f"{doc_id}.json")
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    # --- INCREMENTAL BUILD ---
+    def _scan(self):
+        found = {}
+        if not os.path.isdir(self.root):
+            return found
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                if name.lower().endswith(SUPPORTED):
+                    path = os.path.join(folder, name)
+                    found[os.path.relpath(path, self.root).replace(os.sep, "/")] = path
+        return found
+
+    def update(self):
+        """Re-indexes new/changed files and drops deleted ones. Returns {'added', 'changed', 'removed'}."""
+        with self._lock:
+            found = self._scan()
+            report = {"added": [], "changed": [], "removed": []}
+            touched = False
+
+            for rel in [r for r in self.manifest if r not in found]:
+                doc = self.manifest.pop(rel)
+                try:
+                    os.remove(self._doc_path(doc["doc"]))
+                except FileNotFoundError:
+                    pass
+                report["removed"].append(rel)
+
+            stale = {}
+            for rel, path in sorted(found.items()):
+                entry = self.manifest.get(rel)
+                signature = _signature(path)
+                if entry and entry["sig"] == signature:
+                    continue
+                content_hash = extraction_cache.file_hash(path)
+                if entry and entry["hash"] == content_hash:
+                    entry["sig"] = signature  # Touched but identical: no re-extraction
+                    touched = True
+                    continue
+                stale[rel] = (path, signature, content_hash)
+
+            # Text comes from the shared extraction cache (misses parsed in a process pool)
+            extracted = extraction_cache.get_extraction_cache().extract_many([p for p, _, _ in stale.values()])
+            for rel, (path, signature, content_hash) in stale.items():
+                entry = self.manifest.get(rel)
+                if path not in extracted:
+                    print(f"[INDEX] Skipping {rel}: unreadable document")
+                    continue
+                chunks = chunk_pages(extraction_cache.page_texts(extracted[path]))
+                doc_id = hashlib.sha1(rel.encode("utf-8")).hexdigest()[:16]
+                self._write_json(self._doc_path(doc_id), {"source": rel, "chunks": chunks})
+                self.manifest[rel] = {"sig": signature, "hash": content_hash, "doc": doc_id, "chunks": len(chunks)}
+                report["changed" if entry else "added"].append(rel)
+
+            if touched or any(report.values()) or not os.path.exists(self._manifest_path()):
+                self._write_json(self._manifest_path(), self.manifest)
+            if any(report.values()) or self._corpus is None:
+                self._corpus = self._build()
+            self._scanned = time.monotonic()
+            return report
+
+    def _build(self):
+        """Loads every document's passages and builds the BM25 and TF-IDF matrices into a new _Corpus."""
+        chunks = []
+        for rel in sorted(self.manifest):
+            try:
+                with open(self._doc_path(self.manifest[rel]["doc"]), 'r', encoding="utf-8") as f:
+                    doc = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            for n, chunk in enumerate(doc["chunks"]):
+                chunks.append({"source": rel, "page": chunk["page"], "text": chunk["text"], "n": n})
+
+        vocab, rows, cols, vals, lengths = {}, [], [], [], []
+        for i, chunk in enumerate(chunks):
+            counts = {}
+            for token in tokenize(chunk["text"]):
+                term = vocab.setdefault(token, len(vocab))
+                counts[term] = counts.get(term, 0) + 1
+            rows.extend([i] * len(counts))
+            cols.extend(counts.keys())
+            vals.extend(counts.values())
+            lengths.append(sum(counts.values()))
+
+        n_docs, n_terms = len(chunks), len(vocab)
+        tf = sparse.csr_matrix((np.asarray(vals, dtype=np.float64), (rows, cols)), shape=(n_docs, n_terms))
+        df = np.bincount(np.asarray(cols, dtype=np.int64), minlength=n_terms) if n_terms else np.zeros(0)
+        lengths = np.asarray(lengths, dtype=np.float64)
+
+        # BM25: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avglen))
+        bm25_idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        avg_len = lengths.mean() if n_docs else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(avg_len, 1e-9))
+        bm25 = tf.copy()
+        row_of = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+        bm25.data = bm25_idf[tf.indices] * tf.data * (BM25_K1 + 1) / (tf.data + norm[row_of])
+
+        # TF-IDF (sublinear tf, smooth idf), rows L2-normalized for cosine similarity
+        idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+        tfidf = tf.copy()
+        tfidf.data = (1.0 + np.log(tf.data)) * idf[tf.indices]
+        row_norm = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        tfidf = sparse.diags(1.0 / np.maximum(row_norm, 1e-12)) @ tfidf
+
+        return _Corpus(chunks, vocab, idf, bm25.tocsc(), tfidf.tocsr())
+
+    def load(self):
+        """
+        Publishes the passages already indexed on disk without scanning the library or writing
+        anything (read-only consumers such as replays). Later searches never trigger an update.
+        """
+        with self._lock:
+            self._corpus = self._build()
+            self._scanned = float("inf")
+        return self
+
+    def refresh(self, max_age=REFRESH_SECONDS, background=False):
+        """
+        update() at most every `max_age` seconds (cheap stat() scan otherwise skipped).
+        background=True starts the update on a daemon thread and returns at once; searches keep
+        using the current corpus until the new one is published.
+        """
+        if self._corpus is not None and time.monotonic() - self._scanned < max_age:
+            return self
+        if not background:
+            self.update()
+            return self
+        with self._build_lock:
+            if self._building:
+                return self
+            self._building = True
+        threading.Thread(target=self._update_in_background, daemon=True).start()
+        return self
+
+    def _update_in_background(self):
+        try:
+            started = time.time()
+            changes = self.update()
+            if any(changes.values()):
+                print(f"[INDEX] Background update: {self.stats()} in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"[INDEX] Background update failed: {e}")
+            self._scanned = time.monotonic()  # Retry after REFRESH_SECONDS, not on every call
+        finally:
+            with self._build_lock:
+                self._building = False
+
+    # --- QUERY ---
+    def search(self, query, k=5, alpha=HYBRID_ALPHA, sources=None):
+        """
+        Top-k passages for `query`: [{'source', 'page', 'n', 'text', 'score'}], best first.
+        score = alpha * BM25 (scaled to the best hit) + (1 - alpha) * TF-IDF cosine.
+        `sources`: optional substrings; only passages from matching file names are ranked.
+        """
+        if self._corpus is None:
+            self.refresh()
+        corpus = self._corpus     # One snapshot for the whole query
+        terms = [corpus.vocab[t] for t in tokenize(query) if t in corpus.vocab]
+        if not terms or not corpus.chunks:
+            return []
+
+        unique, counts = np.unique(terms, return_counts=True)
+        bm25 = np.asarray(corpus.bm25[:, unique].sum(axis=1)).ravel()
+        q = (1.0 + np.log(counts)) * corpus.idf[unique]
+        q /= np.linalg.norm(q)
+        cosine = corpus.tfidf[:, unique] @ q
+
+        score = alpha * (bm25 / bm25.max() if bm25.max() > 0 else bm25) + (1 - alpha) * cosine
+        if sources:
+            wanted = [s.lower() for s in sources]
+            allowed = np.array([any(w in c["source"].lower() for w in wanted) for c in corpus.chunks])
+            if allowed.any():
+                score = np.where(allowed, score, 0.0)
+
+        # Overlapping neighbours repeat each other: keep the best of any adjacent pair
+        pool = min(3 * k, len(score))
+        top = np.argpartition(-score, pool - 1)[:pool]
+        top = top[np.argsort(-score[top], kind="stable")]
+        hits, taken = [], set()
+        for i in top:
+            chunk = corpus.chunks[i]
+            if score[i] <= 0 or len(hits) >= k:
+                break
+            if (chunk["source"], chunk["n"] - 1) in taken or (chunk["source"], chunk["n"] + 1) in taken:
+                continue
+            taken.add((chunk["source"], chunk["n"]))
+            hits.append(dict(chunk, score=float(score[i])))
+        return hits
+
+    def passages(self, query, k=5, max_chars=6000, sources=None):
+        """Top-k passages formatted for a prompt (source + page for citations), capped at max_chars."""
+        blocks, used = [], 0
+        for hit in self.search(query, k=k, sources=sources):
+            where = f"{hit['source']}, p.{hit['page']}" if hit['page'] else hit['source']
+            block = f"[{where}]\n{hit['text']}"
+            if used + len(block) > max_chars and blocks:
+                break
+            blocks.append(block)
+            used += len(block)
+        return "\n\n".join(blocks)
+
+    def stats(self):
+        corpus = self._corpus
+        return {"documents": len(self.manifest), "passages": len(corpus.chunks) if corpus else 0,
+                "terms": len(corpus.vocab) if corpus else 0}
+
+
+def regime_query(regime, symbol=None, extra=None):
+    """Search text for the Scholar: regime vocabulary + the symbol + any free text (e.g. Cortex insight)."""
+    parts = [REGIME_QUERIES.get(regime, REGIME_QUERIES["UNKNOWN"])]
+    if symbol:
+        parts.append(symbol.split(".")[0])
+    if extra:
+        parts.append(str(extra))
+    return " ".join(parts)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(background=False):
+    """
+    Process-wide index (rescanned for changed files at most every REFRESH_SECONDS).
+    background=False builds before returning (Dojo, tools); True never blocks the caller.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = KnowledgeIndex()
+    return _index.refresh(background=background)
+
+
+def retrieve(query, k=5, max_chars=6000):
+    """
+    Prompt-ready passages for `query` ('' if nothing is indexed yet). Never builds inline:
+    the first call starts a background build and answers '' until it is published.
+    """
+    index = get_index(background=True)
+    if not index.ready():
+        return ""
+    return index.passages(query, k=k, max_chars=max_chars)
+
+
+if __name__ == "__main__":
+    index = KnowledgeIndex()
+    start = time.time()
+    changes = index.update()
+    print(f"[INDEX] {index.stats()} in {time.time() - start:.1f}s "
+          f"(+{len(changes['added'])} ~{len(changes['changed'])} -{len(changes['removed'])})")
+    if len(sys.argv) > 1:
+        print(index.passages(" ".join(sys.argv[1:]), k=5))
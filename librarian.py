@@ -1,11 +1,12 @@
 import os
 import json
 import time
-import os
-import json
-import time
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
 
 import config # Use Central Config for Decryption
 
@@ -25,6 +26,13 @@ if api_key:
 # Supports multiple formats for robust knowledge base
 KNOWLEDGE_DIR = "training_raw"     
 LIBRARY_CARD = "library_card.json" # Local registry file
+SUPPORTED = ('.pdf', '.ppt', '.pptx', '.txt', '.csv', '.md')
+
+# Remote cache policy: Gemini deletes uploaded files 48h after upload.
+# A file recorded on the card is trusted WITHOUT a network check until it is this close to expiry.
+FILE_TTL = 48 * 3600            # Fallback lifetime when the API gives no expiration_time
+EXPIRY_MARGIN = 2 * 3600        # Re-verify / re-upload this long before expiry
+LIBRARY_WORKERS = 4             # Concurrent verifications / uploads
 
 def _load_registry():
     """Reads the local record of uploaded files."""
@@ -41,12 +49,105 @@ def _save_registry(registry):
     with open(LIBRARY_CARD, 'w') as f:
         json.dump(registry, f, indent=4)
 
+def _content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _is_active(remote_file):
+    return "ACTIVE" in str(remote_file.state)  # 'ACTIVE' or 'State.ACTIVE' depending on SDK version
+
+def _expiry(remote_file, uploaded_at):
+    """Epoch seconds when Gemini deletes the file (API value, else upload time + 48h)."""
+    expiration = getattr(remote_file, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        return expiration.timestamp()
+    return uploaded_at + FILE_TTL
+
+def _card_entry(remote_file, file_path, uploaded_at):
+    return {
+        "uri": remote_file.name,                       # 'files/abc123' (kept as 'uri' for old cards)
+        "file_uri": getattr(remote_file, "uri", None),
+        "mime_type": getattr(remote_file, "mime_type", None),
+        "upload_time": uploaded_at,
+        "expires": _expiry(remote_file, uploaded_at),
+        "sha1": _content_hash(file_path),
+        "sig": _signature(file_path),
+    }
+
+def _card_is_fresh(info, file_path, now):
+    """True if the card alone proves the remote copy is usable: same content and not near expiry."""
+    if not info.get("file_uri") or info.get("expires", 0) - now <= EXPIRY_MARGIN:
+        return False
+    signature = _signature(file_path)
+    if info.get("sig") == signature:
+        return True
+    # Touched (copied, re-synced) but maybe identical: hash before deciding to re-upload
+    if info.get("sha1") == _content_hash(file_path):
+        info["sig"] = signature
+        info["_touched"] = True
+        return True
+    return False
+
+def _file_from_card(filename, info):
+    """Gemini File reference rebuilt from the card (usable in `contents` like a fetched one)."""
+    return types.File(name=info["uri"], uri=info["file_uri"], mime_type=info.get("mime_type"),
+                      display_name=filename, state="ACTIVE")
+
+def _sync_file(filename, file_path, info):
+    """
+    Remote check for one document, uploading it if it is new, changed, expired or FAILED.
+    Returns (filename, File or None, card entry). Runs inside the librarian thread pool.
+    """
+    # VERIFY: Is the recorded copy still alive on Google's server (and still the same content)?
+    if info and info.get("uri"):
+        try:
+            if info.get("sha1") and info["sha1"] != _content_hash(file_path):
+                print(f"   [CHANGED] {filename} edited locally. Re-uploading...")
+            else:
+                remote_file = client.files.get(name=info["uri"])
+                if _is_active(remote_file) and _expiry(remote_file, info.get("upload_time", time.time())) - time.time() > EXPIRY_MARGIN:
+                    print(f"   [CACHE] Verified: {filename}")
+                    return filename, remote_file, _card_entry(remote_file, file_path, info.get("upload_time", time.time()))
+                elif "FAILED" in str(remote_file.state):
+                    print(f"   [FAIL] Cached file failed. Re-uploading: {filename}")
+                else:
+                    print(f"   [EXPIRING] {filename} expires soon. Re-uploading...")
+        except Exception:
+            print(f"   [EXPIRED] Cache expired for {filename}. Re-uploading...")
+
+    # Upload (If new, changed or expired)
+    try:
+        print(f"   [UP] Uploading New: {filename}...")
+        uploaded_at = time.time()
+        # v2 SDK: client.files.upload
+        uploaded_file = client.files.upload(file=file_path, config={'display_name': filename})
+        
+        # Wait for processing (Critical for big PDFs)
+        while "PROCESSING" in str(uploaded_file.state):
+            time.sleep(1)
+            uploaded_file = client.files.get(name=uploaded_file.name)
+            
+        if _is_active(uploaded_file):
+            print(f"   [UP] {filename} Ready.")
+            return filename, uploaded_file, _card_entry(uploaded_file, file_path, uploaded_at)
+        print(f"   [UP] {filename} FAILED (State: {uploaded_file.state})")
+    except Exception as e:
+        print(f"[ERROR] {filename}: {e}")
+    return filename, None, info
+
 def get_knowledge_base(tags=None, regime=None):
     """
     The Master Function.
     1. Scans your 'training_raw' folder.
-    2. Checks if files are already online and valid.
-    3. Uploads ONLY new or expired files.
+    2. Trusts the Library Card for unchanged files far from expiry (no network call).
+    3. Verifies the rest and uploads ONLY new, changed or expiring files (thread pool).
     4. Returns a list of Gemini File objects ready for the AI.
     """
     # Using simple bracket tags instead of emojis for Windows safety
@@ -57,8 +158,6 @@ def get_knowledge_base(tags=None, regime=None):
         return []
 
     registry = _load_registry()
-    active_files = []
-    files_to_update = False
 
     # 1. Check if folder exists
     if not os.path.exists(KNOWLEDGE_DIR):
@@ -66,102 +165,50 @@ def get_knowledge_base(tags=None, regime=None):
         return []
 
     # 2. Scan local documents (PDFs, PPTs, TXT) - RECURSIVE
-    supported = ('.pdf', '.ppt', '.pptx', '.txt', '.csv', '.md')
-    local_docs = []
-    
-    for root, dirs, files in os.walk(KNOWLEDGE_DIR):
-        for file in files:
-            if file.lower().endswith(supported):
-                # We store relative path to keep unique ID if name duplicates in folders
-                # But Librarian ID logic uses filename. 
-                # For simplicity, we just add the filename, assuming unique names or flattening.
-                # Actually, let's keep it flattening for now to avoid registry breaking changes.
-                local_docs.append(file)
-                # Note: This logic assumes flattened filenames in the registry for now.
-                # To support deep structure, we might need full path handling, 
-                # but 'genai.upload_file' takes the path correctly below.
-                
-                # We need to construct the full path loop below differently if we use os.walk here.
-                pass
-
-    # Re-implmenting the loop below to handle paths correctly
-    # Let's verify how step 3 uses 'filename'. 
-    # It does: file_path = os.path.join(KNOWLEDGE_DIR, filename)
-    # This BREAKS if filename is in a subdir.
-    
-    # CORRECT APPROACH: Get full relative paths
+    # Registry IDs are flattened filenames (unique names assumed); we keep the full path for upload.
     local_docs_map = {} # filename -> full_path
     
     for root, dirs, files in os.walk(KNOWLEDGE_DIR):
         for file in files:
-            if file.lower().endswith(supported):
+            if file.lower().endswith(SUPPORTED):
                 local_docs_map[file] = os.path.join(root, file)
-                
-    local_docs = list(local_docs_map.keys())
     
-    if not local_docs:
+    if not local_docs_map:
         print("[WARN] EMPTY VAULT: No supported docs found.")
         return []
 
-    print(f"   Found {len(local_docs)} local research papers/docs.")
+    print(f"   Found {len(local_docs_map)} local research papers/docs.")
 
-    # 3. Process each file
-    for filename in local_docs:
-        # Resolve full path from map (if available) or default (backward compat)
-        if 'local_docs_map' in locals() and filename in local_docs_map:
-            file_path = local_docs_map[filename]
-        else:
-            file_path = os.path.join(KNOWLEDGE_DIR, filename)
-        
-        # Check if we have a record of this file
-        if filename in registry:
-            file_info = registry[filename]
-            uri = file_info.get('uri')
-            
-            # VERIFY: Is the file still alive on Google's server?
-            try:
-                # v2 SDK: client.files.get(name=...)
-                remote_file = client.files.get(name=uri)
-                
-                # Check state (ACTIVE means ready, PROCESSING means wait)
-                # v2 SDK: state is an enum? or string? usually remote_file.state is enough comparison
-                # Safest to print and check, but standard is similar.
-                if str(remote_file.state) == "State.ACTIVE" or str(remote_file.state) == "ACTIVE":
-                    print(f"   [CACHE] Using Cached: {filename}")
-                    active_files.append(remote_file)
-                    continue # Skip upload!
-                elif "FAILED" in str(remote_file.state):
-                    print(f"   [FAIL] Cached file failed. Re-uploading: {filename}")
-            except Exception:
-                print(f"   [EXPIRED] Cache expired for {filename}. Re-uploading...")
-        
-        # 4. Upload (If new or expired)
-        try:
-            print(f"   [UP] Uploading New: {filename}...", end=" ")
-            # v2 SDK: client.files.upload
-            uploaded_file = client.files.upload(file=file_path, config={'display_name': filename})
-            
-            # Wait for processing (Critical for big PDFs)
-            while "PROCESSING" in str(uploaded_file.state):
-                print(".", end="")
-                time.sleep(1)
-                uploaded_file = client.files.get(name=uploaded_file.name)
-                
-            if "ACTIVE" in str(uploaded_file.state):
-                print(" Ready.")
-                active_files.append(uploaded_file)
-                
-                # Update Registry
-                registry[filename] = {
-                    "uri": uploaded_file.name,
-                    "upload_time": time.time()
-                }
+    # 3. Trust the Library Card for files that are unchanged and far from expiry (no network call)
+    now = time.time()
+    ready = {} # filename -> File
+    pending = []
+    files_to_update = False
+    for filename, file_path in local_docs_map.items():
+        info = registry.get(filename)
+        if info and _card_is_fresh(info, file_path, now):
+            ready[filename] = _file_from_card(filename, info)
+            if info.pop("_touched", False):
                 files_to_update = True
-            else:
-                print(f" FAILED (State: {uploaded_file.state.name})")
-                
-        except Exception as e:
-            print(f"[ERROR] {e}")
+        else:
+            pending.append(filename)
+
+    if ready:
+        print(f"   [CACHE] {len(ready)} papers valid per Library Card (no remote check).")
+
+    # 4. Verify / upload the rest concurrently
+    if pending:
+        print(f"   [SYNC] Verifying/uploading {len(pending)} papers ({LIBRARY_WORKERS} workers)...")
+        with ThreadPoolExecutor(max_workers=LIBRARY_WORKERS) as pool:
+            results = list(pool.map(lambda name: _sync_file(name, local_docs_map[name], registry.get(name)), pending))
+        for filename, remote_file, info in results:
+            if remote_file is None:
+                continue
+            ready[filename] = remote_file
+            registry[filename] = info
+            files_to_update = True
+
+    active_files = [ready[name] for name in local_docs_map if name in ready]
 
     # 5. Save changes to Library Card
     if files_to_update:
@@ -214,7 +261,7 @@ def get_knowledge_text(tags=None):
     Extracts RAW TEXT from local documents for Claude.
     Unlike Gemini, we process text locally.
     """
-    import pypdf
+    import extraction_cache
     context_text = ""
     
     print("[LIBRARIAN] 📜 Extracting Text for Claude...")
@@ -226,29 +273,23 @@ def get_knowledge_text(tags=None):
         for file in files:
             if file.lower().endswith(supported):
                 local_docs_map[file] = os.path.join(root, file)
+
+    # Parsed once per file content (cache hit = dictionary lookup; misses run in a process pool)
+    extracted = extraction_cache.get_extraction_cache().extract_many(list(local_docs_map.values()))
                 
     for filename, path in local_docs_map.items():
-        try:
-            content = ""
-            if filename.lower().endswith(".pdf"):
-                reader = pypdf.PdfReader(path)
-                for page in reader.pages:
-                    content += page.extract_text() + "\n"
-            else:
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-            
-            # Append nicely
-            context_text += f"\n\n--- DOCUMENT: {filename} ---\n{content[:5000]} [TRUNCATED]\n" # Truncate to save tokens for now
-            print(f"   [TEXT] Read {filename} ({len(content)} chars)")
-            
-        except Exception as e:
-            print(f"   [ERR] Could not read {filename}: {e}")
+        entry = extracted.get(path)
+        if entry is None:
+            print(f"   [ERR] Could not read {filename}")
+            continue
+        content = entry["text"]
+        
+        # Append nicely
+        context_text += f"\n\n--- DOCUMENT: {filename} ---\n{content[:5000]} [TRUNCATED]\n" # Truncate to save tokens for now
+        print(f"   [TEXT] Read {filename} ({len(content)} chars)")
             
     return context_text
 
-    return context_text
-
 def ingest_daily_briefing():
     """
     RAG AUTOMATION: Scans 'training_raw/news' for today's files, 
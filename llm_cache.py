@@ -0,0 +1,227 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- LLM CACHE: Persistent Response Cache for Gemini Calls ---
+# Purpose: The Scholar check (Oracle), the Judge (Council) and the Cortex re-send identical or
+# near-identical prompts within a patrol window. Each call costs seconds and quota.
+# Responses are cached on disk (SQLite) with an in-memory LRU front, keyed on
+#     sha256(model + normalized prompt + attached file IDs + call config)
+# Every caller has its own TTL (how long an answer stays valid) and number normalization
+# (how "near" two prompts may be, e.g. RSI 43.17 vs 43.21). Hits/misses are counted per caller.
+# Only successful, non-empty text responses are stored; exceptions (429s...) pass straight through.
+
+CACHE_PATH = os.path.join("memories", "llm_cache.db")
+MAX_ENTRIES = 5000          # LRU bound on disk
+MEMORY_ENTRIES = 256        # LRU bound in RAM (hot keys of the current patrol)
+EVICT_EVERY = 50            # Puts between eviction sweeps
+
+# caller -> policy. ttl: seconds; decimals: decimal places kept for numbers in the prompt (None = exact).
+# Decimal places, not significant digits: a price keeps its rupees whatever its magnitude
+# (1523.45 -> "1523.5", never "1.5e+03").
+CALLER_POLICIES = {
+    "oracle.scholar": {"ttl": 15 * 60, "decimals": 1},
+    "council.judge": {"ttl": 10 * 60, "decimals": 1},
+    "cortex.world_view": {"ttl": 60 * 60, "decimals": None},
+    "default": {"ttl": 5 * 60, "decimals": None},
+}
+SMALL_SIGNIFICANT = 2       # |x| < 1 (volatility, ratios) keeps at least this many significant digits
+
+_NUMBER = re.compile(r"-?\d+\.\d+")
+
+
+def _round_number(match, decimals):
+    value = float(match.group(0))
+    if 0 < abs(value) < 1:
+        # 0.0123 at 1 decimal would collapse to "0.0": keep its leading digits instead
+        decimals = max(decimals, SMALL_SIGNIFICANT - 1 - math.floor(math.log10(abs(value))))
+    return f"{value:.{decimals}f}"
+
+
+def normalize_prompt(text, decimals=None):
+    """Collapses whitespace; optionally rounds decimal numbers to `decimals` places."""
+    text = " ".join(str(text).split())
+    if decimals is not None:
+        text = _NUMBER.sub(lambda m: _round_number(m, decimals), text)
+    return text
+
+
+def _part_id(part, decimals):
+    """Stable identity for one item of `contents` (text, or an uploaded Gemini File)."""
+    if isinstance(part, str):
+        return ("text", normalize_prompt(part, decimals))
+    for attr in ("name", "uri"):  # google.genai File objects ('files/abc123')
+        value = getattr(part, attr, None)
+        if value:
+            return ("file", str(value))
+    return ("repr", repr(part))
+
+
+def cache_key(model, contents, config=None, decimals=None):
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    payload = {
+        "model": model,
+        "parts": [_part_id(p, decimals) for p in parts],
+        "config": config if isinstance(config, (dict, type(None))) else repr(config),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Stands in for a google.genai response on a hit (callers only read .text)."""
+    cached = True
+
+    def __init__(self, text):
+        self.text = text
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES, policies=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.policies = dict(CALLER_POLICIES, **(policies or {}))
+        self._memory = OrderedDict()   # key -> (text, expires)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.metrics = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, caller TEXT, model TEXT, text TEXT,
+                created REAL, expires REAL, last_used REAL, hits INTEGER DEFAULT 0
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses(last_used)")
+
+    def policy(self, caller):
+        return self.policies.get(caller, self.policies["default"])
+
+    def _count(self, caller, field, amount=1):
+        stats = self.metrics.setdefault(caller, {"hits": 0, "misses": 0, "saved_seconds": 0.0, "spent_seconds": 0.0})
+        stats[field] += amount
+
+    # --- LOOKUP / STORE ---
+    def get(self, key, now=None):
+        now = now or time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._db.execute("UPDATE responses SET last_used=?, hits=hits+1 WHERE key=?", (now, key))
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._db.execute("SELECT text, expires FROM responses WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM responses WHERE key=?", (key,))
+                return None
+            self._db.execute("UPDATE responses SET last_used=?, hits=hits+1 WHERE key=?", (now, key))
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key, text, caller, model, ttl, now=None):
+        now = now or time.time()
+        expires = now + ttl
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, caller, model, text, created, expires, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)", (key, caller, model, text, now, expires, now))
+            self._remember(key, text, expires)
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _remember(self, key, text, expires):
+        self._memory[key] = (text, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        """Drops expired rows, then the least recently used ones beyond max_entries."""
+        self._db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,))
+
+    # --- MAIN ENTRY POINT ---
+    def generate(self, caller, model, contents, call, config=None):
+        """
+        Returns a cached response for (model, contents, config) or runs `call()` (the real
+        Gemini request) and caches its .text. The returned object always has .text.
+        """
+        policy = self.policy(caller)
+        key = cache_key(model, contents, config, policy["decimals"])
+        start = time.perf_counter()
+
+        text = self.get(key)
+        if text is not None:
+            self._count(caller, "hits")
+            stats = self.metrics[caller]
+            misses = stats["misses"]
+            if misses:
+                stats["saved_seconds"] += stats["spent_seconds"] / misses  # Average cost of a real call
+            return CachedResponse(text)
+
+        response = call()
+        elapsed = time.perf_counter() - start
+        self._count(caller, "misses")
+        self._count(caller, "spent_seconds", elapsed)
+        text = getattr(response, "text", None)
+        if text:
+            self.put(key, text, caller, model, policy["ttl"])
+        return response
+
+    def stats(self):
+        """{caller: {'hits', 'misses', 'hit_rate', 'saved_seconds', 'spent_seconds'}} plus disk size."""
+        report = {}
+        for caller, stats in self.metrics.items():
+            total = stats["hits"] + stats["misses"]
+            report[caller] = dict(stats, hit_rate=stats["hits"] / total if total else 0.0)
+        with self._lock:
+            report["_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return report
+
+    def clear(self, caller=None):
+        with self._lock:
+            if caller is None:
+                self._db.execute("DELETE FROM responses")
+                self._memory.clear()
+            else:
+                self._db.execute("DELETE FROM responses WHERE caller=?", (caller,))
+                self._memory.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide cache (the Oracle, Council and Cortex share one)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cached_generate(caller, model, contents, call, config=None):
+    """Convenience wrapper around get_llm_cache().generate()."""
+    return get_llm_cache().generate(caller, model, contents, call, config=config)
+
+
+if __name__ == "__main__":
+    print(json.dumps(get_llm_cache().stats(), indent=4))
@@ -1,12 +1,12 @@
 import pandas as pd
 import numpy as np
 import os
-import yfinance as yf
-import time
 import json # Added for Scenario Lock
+from broker_adapter import get_broker_adapter
 
-# Cache path for NIFTY data
-NIFTY_DATA_PATH = "memories/history/nifty_intraday.csv"
+ATR_WINDOW = 14
+CRASH_VOL_RATIO = 1.5 # Volatility above 1.5x its average -> CRASH
+CHOP_VOL_RATIO = 0.7  # Volatility below 0.7x its average -> CHOP
 
 def _calculate_regime_from_df(df_input):
     """Refactored logic to calculate regime from any DF (Real or Sim)."""
@@ -23,7 +23,7 @@ def _calculate_regime_from_df(df_input):
     
     # ATR Analysis
     df['High_Low'] = df['High'] - df['Low']
-    df['ATR'] = df['High_Low'].rolling(window=14).mean()
+    df['ATR'] = df['High_Low'].rolling(window=ATR_WINDOW).mean()
     
     # Normalize ATR by Price to get Percentage Volatility
     df['Vol_Pct'] = (df['ATR'] / df['Close']) * 100
@@ -39,13 +39,26 @@ def _calculate_regime_from_df(df_input):
 
     # CRASH LOGIC: Volatility spike AND Price Drop
     # (Simple logic for now: Just Volatility > 1.5x)
-    if current_vol > (avg_vol * 1.5):
+    if current_vol > (avg_vol * CRASH_VOL_RATIO):
         return "CRASH" # High Panic (>1.5x normal)
-    elif current_vol < (avg_vol * 0.7):
+    elif current_vol < (avg_vol * CHOP_VOL_RATIO):
         return "CHOP" # Low Action
     else:
         return "TREND" # Goldilocks
 
+def regime_series(df_input, window=None):
+    """
+    Vectorized _calculate_regime_from_df for EVERY bar: the regime as it read at that bar,
+    averaging volatility over the trailing `window` bars (all bars so far if None).
+    Used by the event backtester instead of re-running the live check once per bar.
+    """
+    df = df_input[['High', 'Low', 'Close']].apply(pd.to_numeric, errors='coerce')
+    atr = (df['High'] - df['Low']).rolling(window=ATR_WINDOW).mean()
+    vol = (atr / df['Close']) * 100
+    avg = vol.rolling(window, min_periods=1).mean() if window else vol.expanding().mean()
+    regime = np.where(vol > avg * CRASH_VOL_RATIO, "CRASH", np.where(vol < avg * CHOP_VOL_RATIO, "CHOP", "TREND"))
+    return pd.Series(np.where(vol.isna(), "UNKNOWN", regime), index=df.index)
+
 def get_market_regime():
     """
     Analyzes NIFTY 50 Volatility to determine the 'Weather'.
@@ -75,40 +88,15 @@ def get_market_regime():
                  print(f"[REGIME] Simulation Error: {e}. Reverting to Reality.")
                  pass
 
-        # 2. Reality (Live Data)
-        # Fetch/Load Data
-        is_stale = False
-        if os.path.exists(NIFTY_DATA_PATH):
-            file_age = time.time() - os.path.getmtime(NIFTY_DATA_PATH)
-            if file_age > 86400: # 24 Hours
-                is_stale = True
-
-        
-        if not os.path.exists(NIFTY_DATA_PATH) or is_stale:
-             print("[REGIME] Refreshing NIFTY Data...")
-             # Force clean download (Intraday 1m for Flash Crash Detection)
-             df = yf.download("^NSEI", period="5d", interval="1m", progress=False, auto_adjust=True)
-             
-             # Create dir if missing
-             if not os.path.exists("memories/history"):
-                os.makedirs("memories/history")
-             
-             df.to_csv(NIFTY_DATA_PATH)
-        else:
-             df = pd.read_csv(NIFTY_DATA_PATH)
-
-        # Flatten MultiIndex
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
+        # 2. Reality (Live Data) via the Bar Store
+        # Intraday 1m for Flash Crash Detection. Only bars newer than the stored tail are downloaded.
+        adapter = get_broker_adapter(mode="research")
+        df = adapter.fetch_data("^NSEI", period="5d", interval="1m")
         
-        # Ensure we have required columns
+        # Ensure we have required columns (Fallback: Daily bars)
         req_cols = ['High', 'Low', 'Close']
-        if not set(req_cols).issubset(df.columns):
-             df = pd.read_csv(NIFTY_DATA_PATH, header=1) 
-             if not set(req_cols).issubset(df.columns):
-                 df = yf.download("^NSEI", period="1y", interval="1d", progress=False, auto_adjust=True)
-                 if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = df.columns.get_level_values(0)
+        if df.empty or not set(req_cols).issubset(df.columns):
+            df = adapter.fetch_data("^NSEI", period="1y", interval="1d")
 
         return _calculate_regime_from_df(df)
 
@@ -1,29 +1,30 @@
-import json
 import os
+import copy
 import datetime
 
-import csv
+import state_store
+import trade_store
 
 MEMORY_PATH = "./memories/bot_brain.json"
-JOURNAL_PATH = "trading_journal.csv"
 
 class MemoryManager:
-    def __init__(self, memory_path=MEMORY_PATH, journal_path=JOURNAL_PATH):
+    def __init__(self, memory_path=MEMORY_PATH, store=None):
         self.memory_path = memory_path
-        self.journal_path = journal_path
+        self.store = store or trade_store.get_store()
+        self.state = state_store.get_state_file(memory_path)
+        self._base = {}  # Brain as last loaded/saved: save_memory() only writes what changed since
+        self._version = None  # File version _base was read at (None = no file yet)
         self.memory = self.load_memory()
 
     def load_memory(self):
         """Loads the bot brain from JSON, or initializes if missing."""
         if os.path.exists(self.memory_path):
-            try:
-                with open(self.memory_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                print(f"Error: Corrupt memory file at {self.memory_path}. Initializing new brain.")
-                return self._initialize_brain()
-        else:
-            return self._initialize_brain()
+            brain, version = self.state.read_versioned()
+            if brain:
+                self._base, self._version = copy.deepcopy(brain), version
+                return brain
+            print(f"Error: Corrupt memory file at {self.memory_path}. Initializing new brain.")
+        return self._initialize_brain()
 
     def _initialize_brain(self):
         """Returns the default brain structure."""
@@ -37,45 +38,77 @@ class MemoryManager:
         }
 
     def save_memory(self):
-        """Saves the current memory state to JSON."""
+        """
+        Saves the top-level keys this manager changed in self.memory into the latest
+        bot_brain.json (locked, atomic). If nobody committed since it was loaded, self.memory is
+        written as is; otherwise (VersionConflict) only the changed keys are merged into the latest
+        file, so fields other processes wrote meanwhile (e.g. the ledger's wallet_balance) are kept.
+        A changed key replaces the stored one whole, so trade-list edits go through _commit() instead.
+        """
+        try:
+            try:
+                self._version = self.state.write(self.memory, expected_version=self._version)
+                self._base = copy.deepcopy(self.memory)
+            except state_store.VersionConflict:
+                with self.state.lock():
+                    merged = self.state.update(lambda latest: state_store.merge_changes(latest, self._base, self.memory))
+                    self._adopt(merged, self.state.version())
+        except Exception as e:
+            print(f"Error saving memory: {e}")
+
+    def _commit(self, mutate):
+        """
+        Applies `mutate(brain)` to the latest committed brain under the file lock and adopts the
+        result: appends to active_trades / past_trades from another process are never dropped.
+        Returns the committed brain (None if the write failed).
+        """
+        def apply(latest):
+            brain = latest or self._initialize_brain()
+            mutate(brain)
+            return brain
         try:
-            with open(self.memory_path, 'w') as f:
-                json.dump(self.memory, f, indent=4)
+            with self.state.lock():
+                brain = self.state.update(apply)
+                self._adopt(brain, self.state.version())
+            return brain
         except Exception as e:
             print(f"Error saving memory: {e}")
+            return None
+
+    def _adopt(self, brain, version):
+        self.memory = brain
+        self._base, self._version = copy.deepcopy(brain), version
 
     def update_karma(self):
         """Updates Karma Score based on past trade results."""
-        past_trades = self.memory.get("past_trades", [])
-        if not past_trades:
-            self.memory["karma_score"] = 0.0
-            return
-
-        wins = sum(1 for t in past_trades if t.get("result") == "WIN")
-        losses = len(past_trades) - wins
-        # simple score: +1 for win, -1 for loss, normalized or raw?
-        # User asked to "check trading_journal.csv for past performance"
-        # For simplicity, we calculate win rate and map to score.
-        win_rate = (wins / len(past_trades)) * 100
-        self.memory["karma_score"] = round(win_rate, 2)
-        self._update_mood()
-        self.save_memory()
+        def score(brain):
+            past_trades = brain.get("past_trades", [])
+            if not past_trades:
+                brain["karma_score"] = 0.0
+                return
+            wins = sum(1 for t in past_trades if t.get("result") == "WIN")
+            # simple score: +1 for win, -1 for loss, normalized or raw?
+            # User asked to "check trading_journal.csv for past performance"
+            # For simplicity, we calculate win rate and map to score.
+            win_rate = (wins / len(past_trades)) * 100
+            brain["karma_score"] = round(win_rate, 2)
+            self._update_mood(brain)
+        self._commit(score)
 
     def update_oracle_confidence(self, confidence):
         """Updates the latest Oracle Confidence score."""
-        self.memory["latest_oracle_confidence"] = float(confidence)
-        self.save_memory()
+        self._commit(lambda brain: brain.update(latest_oracle_confidence=float(confidence)))
 
 
-    def _update_mood(self):
+    def _update_mood(self, brain):
         """Adjusts mood based on Karma (IQ)."""
-        karma = self.memory.get("karma_score", 0)
+        karma = brain.get("karma_score", 0)
         # If High Karma (High Win Rate), likely Aggressive.
         # If Low Karma, Conservative.
         if karma > 60:
-            self.memory["mood"] = "Aggressive"
+            brain["mood"] = "Aggressive"
         else:
-            self.memory["mood"] = "Conservative"
+            brain["mood"] = "Conservative"
 
     def authorize_trade(self, symbol):
         """
@@ -108,40 +141,28 @@ class MemoryManager:
             "status": "OPEN",
             "mood_at_time": self.memory.get("mood", "Conservative")
         }
-        self.memory.setdefault("active_trades", []).append(trade_entry)
-        self.save_memory()
+        self._commit(lambda brain: brain.setdefault("active_trades", []).append(trade_entry))
         
         # Write to CSV
         self.log_journal_entry(trade_entry, action="BUY")
         print(f"Trade LOGGED: {trade_entry['symbol']} @ {trade_entry['entry_price']} ({trade_entry['mood_at_time']}) Conf: {trade_entry['oracle_confidence']}")
 
     def log_journal_entry(self, trade_data, action="BUY", result="OPEN"):
-        """Appends to trading_journal.csv."""
+        """Appends a V1 (Sentinel) row to the trade store journal."""
         try:
-            file_exists = os.path.isfile(self.journal_path)
-            
-            with open(self.journal_path, 'a', newline='') as f:
-                writer = csv.writer(f)
-                
-                # Write Header if new file
-                if not file_exists:
-                    writer.writerow([
-                        'timestamp', 'symbol', 'action', 'price', 
-                        'rsi', 'sma', 'result', 'mood_at_time', 'oracle_confidence'
-                    ])
-                
-                # timestamp,symbol,action,price,rsi,sma,result,mood_at_time,oracle_confidence
-                writer.writerow([
-                    trade_data.get("timestamp"),
-                    trade_data.get("symbol"),
-                    action,
-                    trade_data.get("entry_price"),
-                    trade_data.get("entry_rsi"),
-                    trade_data.get("sma", 0), # Added SMA placeholder if passed
-                    result,
-                    trade_data.get("mood_at_time"),
-                    trade_data.get("oracle_confidence", 0.0)
-                ])
+            self.store.log_journal({
+                "ts": trade_data.get("timestamp"),
+                "symbol": trade_data.get("symbol"),
+                "action": action,
+                "price": trade_data.get("entry_price"),
+                "rsi": trade_data.get("entry_rsi"),
+                "sma": trade_data.get("sma", 0), # Added SMA placeholder if passed
+                "result": result,
+                "mood": trade_data.get("mood_at_time"),
+                "oracle_confidence": trade_data.get("oracle_confidence", 0.0),
+                "origin": "BOT",
+                "schema": "V1"
+            })
         except Exception as e:
             print(f"Error writing to journal: {e}")
 
@@ -152,54 +173,58 @@ class MemoryManager:
         - Profit >= 5% (WIN)
         - Loss >= 2% (LOSS)
         """
-        active_trades = self.memory.get("active_trades", [])
-        still_active = []
-        resolved_count = 0
-        
-        for trade in active_trades:
-            symbol = trade['symbol']
-            if symbol not in current_prices:
-                still_active.append(trade)
-                continue
-                
-            entry_price = trade['entry_price']
-            current_price = current_prices[symbol]
-            
-            # ROI Calculation
-            roi = ((current_price - entry_price) / entry_price) * 100
-            
-            result = None
-            if roi >= 5.0:
-                result = "WIN"
-            elif roi <= -2.0:
-                result = "LOSS"
-                
-            if result:
-                # Close Trade
-                trade['exit_price'] = current_price
-                trade['exit_timestamp'] = str(datetime.datetime.now())
-                trade['result'] = result
-                trade['roi'] = round(roi, 2)
-                trade['status'] = "CLOSED"
-                
-                self.memory.setdefault("past_trades", []).append(trade)
-                self.log_journal_entry(trade, action="SELL", result=result)
-                print(f"Trade CLOSED: {symbol} | Result: {result} | ROI: {trade['roi']}%")
-                resolved_count += 1
-            else:
-                still_active.append(trade)
-        
-        self.memory["active_trades"] = still_active
-        self.save_memory()
-        
-        if resolved_count > 0:
+        closed = []
+
+        def resolve(brain):
+            # Runs on the latest brain: trades logged by other processes since our load are kept
+            del closed[:]
+            still_active = []
+            for trade in brain.get("active_trades", []):
+                symbol = trade['symbol']
+                if symbol not in current_prices:
+                    still_active.append(trade)
+                    continue
+
+                entry_price = trade['entry_price']
+                current_price = current_prices[symbol]
+
+                # ROI Calculation
+                roi = ((current_price - entry_price) / entry_price) * 100
+
+                result = None
+                if roi >= 5.0:
+                    result = "WIN"
+                elif roi <= -2.0:
+                    result = "LOSS"
+
+                if result:
+                    # Close Trade
+                    trade['exit_price'] = current_price
+                    trade['exit_timestamp'] = str(datetime.datetime.now())
+                    trade['result'] = result
+                    trade['roi'] = round(roi, 2)
+                    trade['status'] = "CLOSED"
+                    brain.setdefault("past_trades", []).append(trade)
+                    closed.append(trade)
+                else:
+                    still_active.append(trade)
+            brain["active_trades"] = still_active
+
+        if self._commit(resolve) is None:
+            return
+
+        for trade in closed:
+            self.log_journal_entry(trade, action="SELL", result=trade['result'])
+            print(f"Trade CLOSED: {trade['symbol']} | Result: {trade['result']} | ROI: {trade['roi']}%")
+
+        if closed:
             self.update_karma()
-            print(f"Resolved {resolved_count} trades. New Karma: {self.memory.get('karma_score')}")
+            print(f"Resolved {len(closed)} trades. New Karma: {self.memory.get('karma_score')}")
 
     def update_heartbeat(self):
         """Updates the system heartbeat timestamp."""
-        self.memory["system_heartbeat"] = str(datetime.datetime.now())
-        self.save_memory()
+        heartbeat = str(datetime.datetime.now())
+        self._commit(lambda brain: brain.update(system_heartbeat=heartbeat))
         print(f"System Heartbeat UPDATED: {self.memory['system_heartbeat']}")
 
 if __name__ == "__main__":
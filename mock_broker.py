@@ -1,90 +1,61 @@
-import json
 import os
 import datetime
 import tax_engine
 import uuid
-import csv
+import trade_ledger
+import trade_store
 
-MEMORY_PATH = "memories/bot_brain.json"
-PAPER_TRADES_PATH = "memories/paper_trades.json"
-JOURNAL_PATH = "trading_journal.csv"
-HISTORY_PATH = "memories/account_history.csv"
+MEMORY_PATH = trade_ledger.MEMORY_PATH
+PAPER_TRADES_PATH = trade_ledger.PAPER_TRADES_PATH
 
 class MockDhanClient:
     """
     Simulates the DhanHQ API for Paper Trading.
     Manages a virtual wallet and records fake trades.
+    Wallet, score and holdings are held by the trade ledger (memories/sovereign.db):
+    placing an order is one small append, however long the bot has been running.
+    Journal receipts and equity points go to the trade store (same database, indexed), in the
+    ledger's transaction for the fill.
     """
-    def __init__(self):
-        self._ensure_memory()
-        
-    def _ensure_memory(self):
-        # 1. Ensure Paper Trades File
-        if not os.path.exists(PAPER_TRADES_PATH):
-            os.makedirs("memories", exist_ok=True)
-            with open(PAPER_TRADES_PATH, 'w') as f:
-                json.dump([], f)
-                
-        # 2. Ensure Bot Brain (Wallet)
-        if not os.path.exists(MEMORY_PATH):
-            os.makedirs("memories", exist_ok=True)
-            with open(MEMORY_PATH, 'w') as f:
-                json.dump({"wallet_balance": 100000.0}, f) # Start with 1L
-        else:
-            # Check if wallet exists, if not init
-            with open(MEMORY_PATH, 'r+') as f:
-                try:
-                    data = json.load(f)
-                except:
-                    data = {}
-                
-                if "wallet_balance" not in data:
-                    data["wallet_balance"] = 100000.0
-                    f.seek(0)
-                    json.dump(data, f, indent=4)
-                    f.truncate()
+    def __init__(self, ledger=None, store=None):
+        self.ledger = ledger or trade_ledger.get_ledger()
+        self.store = store or trade_store.get_store()
+        self._shared_db = os.path.abspath(self.ledger.path) == os.path.abspath(self.store.path)
+
+    @staticmethod
+    def _receipt_id(symbol):
+        # 12 hex digits: order_id is UNIQUE in the ledger (4 digits collided after a few hundred orders)
+        return f"ORD-{uuid.uuid4().hex[:12].upper()}-{symbol}"
+
+    def _book(self, trade, cash_delta, score):
+        """Fill + wallet + position + score + journal receipt + equity point: one commit."""
+        total_cost = -cash_delta    # Journal convention: negative cost = credit
+        if self._shared_db:
+            return self.ledger.record_fill(trade, cash_delta, score=score,
+                                           receipt=lambda balance: self.store.fill_statements(trade, total_cost, balance))
+        # Separate database files (custom wiring): two commits, ledger first
+        balance = self.ledger.record_fill(trade, cash_delta, score=score)
+        self.store.log_fill(trade, total_cost, balance)
+        return balance
 
     def get_fund_balance(self):
         """Returns virtual wallet balance."""
-        with open(MEMORY_PATH, 'r') as f:
-            data = json.load(f)
-        return data.get("wallet_balance", 0.0)
+        return self.ledger.get_balance()
 
     def get_positions(self):
         """Returns list of open paper trades."""
-        with open(PAPER_TRADES_PATH, 'r') as f:
-            return json.load(f)
+        return self.ledger.trades()
 
     def get_portfolio(self, origin=None):
         """
-        Calculates Net Holdings from Trade History.
+        Net Holdings per symbol (maintained by the ledger on every fill).
         Returns: { 'SYMBOL': quantity, ... }
         """
-        portfolio = {}
-        if not os.path.exists(PAPER_TRADES_PATH):
-            return portfolio
-            
-        with open(PAPER_TRADES_PATH, 'r') as f:
-            trades = json.load(f)
-            
-        for t in trades:
-            # Filter by Origin if specified
-            if origin and t.get('origin', 'BOT') != origin:
-                continue
+        return self.ledger.get_holdings(origin)
 
-            sym = t['symbol']
-            qty = t['quantity']
-            action = t['action']
-            
-            if sym not in portfolio: portfolio[sym] = 0
-            
-            if action == 'BUY':
-                portfolio[sym] += qty
-            elif action == 'SELL':
-                portfolio[sym] -= qty
-                
-        # Clean up zero positions (Allow negative for Shorts)
-        return {k: v for k, v in portfolio.items() if v != 0}
+    def get_position(self, symbol, origin="BOT"):
+        """Quantity, average cost, realized PnL and open lots for one symbol (O(1) lookup)."""
+        return self.ledger.get_position(symbol, origin)
 
     def place_order(self, symbol, quantity, action, price, origin="BOT", stop_loss=None, target=None):
         """
@@ -96,33 +67,23 @@ class MockDhanClient:
         # --- BANKRUPTCY CHECK ---
         current_balance = self.get_fund_balance()
         
-        # Load Brain for Scoring
-        with open(MEMORY_PATH, 'r+') as f:
-            brain = json.load(f)
-            # Initialize Score if missing
-            if "score" not in brain: brain["score"] = 0
-            
-            # 1. Punishment (Bankruptcy)
-            if current_balance <= 50.0:
-                print("[FATAL] WALLET EMPTY (Simulated Bankruptcy). Trading Rejected.")
-                brain["score"] -= 1000
-                f.seek(0)
-                json.dump(brain, f, indent=4)
-                f.truncate()
-                return {"status": "failure", "message": "BANKRUPT"}
+        # Score (RL reward/punishment) is booked together with the fill
+        score = self.ledger.get_score()
+            
+        # 1. Punishment (Bankruptcy)
+        if current_balance <= 50.0:
+            print("[FATAL] WALLET EMPTY (Simulated Bankruptcy). Trading Rejected.")
+            self.ledger.set_score(score - 1000)
+            return {"status": "failure", "message": "BANKRUPT"}
 
-            # 2. Reward (Doubling Capital) - Reward only once per milestone? 
-            # For simplicity, we check if we crossed a high water mark, but let's keep it simple.
-            starting_cap = 2000.0
-            if current_balance >= (starting_cap * 2):
-                 # Exponential Reward
-                 brain["score"] = max(brain["score"], 10) * 2 # Safety floor 10
-                 print(f"[RL REWARD] Capital Doubled! Score Multiplied to {brain['score']}")
-                 # Reset threshold? No, let's just multiply.
-                 
-            f.seek(0)
-            json.dump(brain, f, indent=4)
-            f.truncate()
+        # 2. Reward (Doubling Capital) - Reward only once per milestone? 
+        # For simplicity, we check if we crossed a high water mark, but let's keep it simple.
+        starting_cap = 2000.0
+        if current_balance >= (starting_cap * 2):
+             # Exponential Reward
+             score = max(score, 10) * 2 # Safety floor 10
+             print(f"[RL REWARD] Capital Doubled! Score Multiplied to {score}")
+             # Reset threshold? No, let's just multiply.
 
 
         if action == "BUY":
@@ -133,18 +94,11 @@ class MockDhanClient:
             stock_cost = quantity * price
             total_cost = stock_cost + total_charges
             
-            # Load Memory
-            with open(MEMORY_PATH, 'r') as f:
-                brain = json.load(f)
-            
-            balance = brain.get("wallet_balance", 0.0)
+            balance = current_balance
             
             if balance >= total_cost:
-                balance -= total_cost
-                brain["wallet_balance"] = balance
-                
                 # Generate Digital Receipt (The Proof)
-                order_id = f"ORD-{uuid.uuid4().hex[:4].upper()}-{symbol}"
+                order_id = self._receipt_id(symbol)
                 
                 # Record Trade
                 trade = {
@@ -161,43 +115,8 @@ class MockDhanClient:
                     "target": target
                 }
                 
-                with open(PAPER_TRADES_PATH, 'r+') as tf:
-                    trades = json.load(tf)
-                    trades.append(trade)
-                    tf.seek(0)
-                    json.dump(trades, tf, indent=4)
-                
-                # Update Wallet
-                with open(MEMORY_PATH, 'w') as bf:
-                    json.dump(brain, bf, indent=4)
-
-                # Log to Account History (Real-time Equity Curve)
-                today_str = datetime.datetime.now().strftime("%b %d")
-                hist_exists = os.path.isfile(HISTORY_PATH)
-                with open(HISTORY_PATH, 'a', newline='') as hf:
-                    writer = csv.writer(hf)
-                    if not hist_exists:
-                        writer.writerow(['date', 'equity'])
-                    writer.writerow([today_str, balance])
-
-                # Log to CSV (Permanent Record)
-                file_exists = os.path.isfile(JOURNAL_PATH)
-                with open(JOURNAL_PATH, 'a', newline='') as csvfile:
-                    fieldnames = ['timestamp', 'order_id', 'symbol', 'action', 'price', 'quantity', 'taxes', 'total_cost', 'origin']
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    if not file_exists:
-                        writer.writeheader()
-                    writer.writerow({
-                        'timestamp': trade['timestamp'],
-                        'order_id': order_id,
-                        'symbol': symbol,
-                        'action': 'BUY',
-                        'price': price,
-                        'quantity': quantity,
-                        'taxes': total_charges,
-                        'total_cost': total_cost,
-                        'origin': origin
-                    })
+                # Book Trade + Wallet + Journal receipt (one transaction)
+                balance = self._book(trade, -total_cost, score)
                     
                 print(f"MOCK BROKER: Bought {quantity} {symbol} @ {price}. Receipt: {order_id} [{origin}]")
                 return {"status": "success", "message": "Paper Order Placed", "order_id": order_id}
@@ -228,16 +147,8 @@ class MockDhanClient:
             stock_value = quantity * price
             net_credit = stock_value - total_charges
             
-            # Load Memory
-            with open(MEMORY_PATH, 'r') as f:
-                brain = json.load(f)
-            
-            balance = brain.get("wallet_balance", 0.0)
-            balance += net_credit # Add to wallet
-            brain["wallet_balance"] = balance
-            
             # Digital Receipt
-            order_id = f"ORD-{uuid.uuid4().hex[:4].upper()}-{symbol}"
+            order_id = self._receipt_id(symbol)
             
             # Record Trade
             trade = {
@@ -254,45 +165,13 @@ class MockDhanClient:
                 "target": target
             }
             
-            with open(PAPER_TRADES_PATH, 'r+') as tf:
-                trades = json.load(tf)
-                trades.append(trade)
-                tf.seek(0)
-                json.dump(trades, tf, indent=4)
-            
-            # Update Wallet
-            with open(MEMORY_PATH, 'w') as bf:
-                json.dump(brain, bf, indent=4)
-
-            # Log to Account History
-            today_str = datetime.datetime.now().strftime("%b %d")
-            hist_exists = os.path.isfile(HISTORY_PATH)
-            with open(HISTORY_PATH, 'a', newline='') as hf:
-                writer = csv.writer(hf)
-                if not hist_exists:
-                    writer.writerow(['date', 'equity'])
-                writer.writerow([today_str, balance])
-                
-            # Log to CSV
-            file_exists = os.path.isfile(JOURNAL_PATH)
-            with open(JOURNAL_PATH, 'a', newline='') as csvfile:
-                fieldnames = ['timestamp', 'order_id', 'symbol', 'action', 'price', 'quantity', 'taxes', 'total_cost', 'origin']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                if not file_exists:
-                     writer.writeheader()
-                writer.writerow({
-                    'timestamp': trade['timestamp'],
-                    'order_id': order_id,
-                    'symbol': symbol,
-                    'action': 'SELL',
-                    'price': price,
-                    'quantity': quantity,
-                    'taxes': total_charges,
-                    'total_cost': -net_credit, # Negative cost = credit
-                    'origin': origin
-                })
+            # Book Trade + Wallet + Journal receipt (one transaction; credit added to wallet)
+            realized_before = self.ledger.get_position(symbol, origin)["realized_pnl"]
+            self._book(trade, net_credit, score)
+            realized_pnl = self.ledger.get_position(symbol, origin)["realized_pnl"] - realized_before
                 
             print(f"MOCK BROKER: Sold {quantity} {symbol} @ {price}. Receipt: {order_id} [{origin}]")
-            return {"status": "success", "message": "Paper Order Placed", "order_id": order_id}
+            return {"status": "success", "message": "Paper Order Placed", "order_id": order_id,
+                    "realized_pnl": realized_pnl - total_charges}  # Net of this order's charges
 
         return {"status": "failure", "message": "Not Implemented"}
@@ -26,8 +26,9 @@ class GeminiModelWrapper:
     """
     Compatibilty layer to make google.genai (v2) look like google.generativeai (v1).
     """
-    def __init__(self, model_name, system_instruction=None):
+    def __init__(self, model_name, system_instruction=None, priority="trade"):
         self.model_name = model_name
+        self.priority = priority  # Queue rank on the shared key pool ('trade' | 'intel' | 'log')
         self.system_instruction = system_instruction
         self.name = f"models/{model_name}" # Compat field
 
@@ -42,29 +43,10 @@ class GeminiModelWrapper:
         if self.system_instruction:
             config = types.GenerateContentConfig(system_instruction=self.system_instruction)
 
-        try:
-            # New SDK Call
-            # New SDK Call
-            response = get_client().models.generate_content(
-                model=self.model_name,
-                contents=contents,
-                config=config
-            )
-            return response
-        except Exception as e:
-            # Auto-Rotate on Quota
-            if "429" in str(e) or "quota" in str(e).lower():
-                print(f"[FACTORY] Quota Hit. Rotating Key...")
-                key_rotator.rotate_key()
-                # Retry once
-                return get_client().models.generate_content(
-                    model=self.model_name,
-                    contents=contents,
-                    config=config
-                )
-            raise e
-            # Basic error handling propogation
-            raise e
+        # Scheduled on the key with the most RPM/TPM headroom; 429s fail over inside the pool
+        return key_rotator.pool().generate(
+            self.model_name, contents, config=config, priority=self.priority
+        ).result()
 
 def get_functional_model(system_instruction=None):
     """
@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+import joblib
+import forest_compiler
+
+# --- MODEL REGISTRY: Versioned Brains + Hot Swap ---
+# Purpose: Replaces hard-coded model paths (memories/models/reliance_rf_v1.joblib,
+# research/oracle_v1.pkl). Every training run becomes an immutable version:
+#     memories/models/registry/<name>/
+#         CURRENT                 -> promoted version (one line, replaced atomically)
+#         v0001/meta.json         -> feature-set version, training window, metrics, sklearn version
+#         v0001/model.joblib      -> sklearn estimator (uncompressed so joblib can mmap its arrays)
+#         v0001/model.forest/     -> compiled flat-array scorer (forest_compiler, np.memmap)
+# Readers memory-map the compiled scorer, so every process shares one page-cache copy and the
+# sklearn pickle is only opened (mmap_mode='r') if something actually asks for it.
+# LiveModel polls CURRENT and loads a newly promoted version on a background thread, then swaps
+# one reference: a nightly retrain reaches the running swarm without a restart or a patrol stall.
+
+REGISTRY_DIR = "memories/models/registry"
+POINTER = "CURRENT"
+POLL_SECONDS = 30
+
+# Pre-registry model files, imported as v0001 the first time their name is requested
+LEGACY_MODELS = {
+    "reliance_rf": ("memories/models/reliance_rf_v1.joblib",
+                    {"feature_version": "v1", "symbol": "RELIANCE.NS", "interval": "1d"}),
+    "research_oracle": (os.path.join("research", "oracle_v1.pkl"),
+                        {"feature_version": "research-v1", "interval": "1d"}),
+}
+
+
+def _version_name(number):
+    return f"v{number:04d}"
+
+
+class LoadedModel:
+    """One registry version. `scorer` is memory-mapped; `model` (sklearn) is unpickled on first use."""
+    def __init__(self, name, version, path, meta, scorer=None):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.meta = meta
+        self.scorer = scorer
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = joblib.load(os.path.join(self.path, "model.joblib"), mmap_mode='r')
+        return self._model
+
+    @property
+    def predictor(self):
+        """Whatever scores fastest: the compiled forest, else the sklearn estimator."""
+        return self.scorer if self.scorer is not None else self.model
+
+    @property
+    def feature_version(self):
+        return self.meta.get("feature_version")
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _dir(self, name, version=None):
+        return os.path.join(self.root, name) if version is None else os.path.join(self.root, name, version)
+
+    # --- READ ---
+    def versions(self, name):
+        if not os.path.isdir(self._dir(name)):
+            return []
+        found = [v for v in os.listdir(self._dir(name)) if re.fullmatch(r"v\d{4,}", v)
+                 and os.path.exists(os.path.join(self._dir(name, v), "meta.json"))]
+        return sorted(found, key=lambda v: int(v[1:]))
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self._dir(name), POINTER), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def read_meta(self, name, version):
+        with open(os.path.join(self._dir(name, version), "meta.json"), 'r') as f:
+            return json.load(f)
+
+    def load(self, name, version=None):
+        """LoadedModel for a version (default: the promoted one). None if the model is unknown."""
+        version = version or self.current_version(name)
+        if version is None:
+            return None
+        path = self._dir(name, version)
+        meta = self.read_meta(name, version)
+
+        scorer = None
+        forest_path = os.path.join(path, "model.forest")
+        if os.path.exists(os.path.join(forest_path, "meta.json")):
+            try:
+                scorer = forest_compiler.load_compiled(forest_path)
+            except Exception as e:
+                print(f"[REGISTRY] {name}/{version}: compiled scorer unreadable ({e}). Using sklearn.")
+        return LoadedModel(name, version, path, meta, scorer)
+
+    # --- WRITE ---
+    def register(self, name, model, metadata=None, promote=True):
+        """
+        Stores a fitted model as the next version (written to a temp dir, then renamed into place,
+        so a half-written version is never visible). Returns the version string.
+        """
+        os.makedirs(self._dir(name), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self._dir(name))
+        try:
+            model_file = os.path.join(staging, "model.joblib")
+            joblib.dump(model, model_file)  # No compression: keeps arrays mmap-able
+
+            meta = {
+                "name": name,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "model_class": type(model).__name__,
+                "sklearn_version": _sklearn_version(),
+                "feature_names": [str(c) for c in getattr(model, "feature_names_in_", [])] or None,
+                "source_hash": forest_compiler.file_hash(model_file),
+                "compiled": False,
+            }
+            meta.update(metadata or {})
+            try:
+                forest_compiler.compile_model_file(model_file, out_path=os.path.join(staging, "model.forest"), model=model)
+                meta["compiled"] = True
+            except Exception as e:
+                print(f"[REGISTRY] Not compiling {name} ({e}). sklearn will serve it.")
+
+            # Claim the next version number (rename fails if another trainer took it first)
+            while True:
+                existing = self.versions(name)
+                version = _version_name(int(existing[-1][1:]) + 1 if existing else 1)
+                meta["version"] = version
+                with open(os.path.join(staging, "meta.json"), 'w') as f:
+                    json.dump(meta, f, indent=4, default=str)
+                try:
+                    os.rename(staging, self._dir(name, version))
+                    break
+                except OSError:
+                    if not os.path.exists(self._dir(name, version)):
+                        raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        print(f"[REGISTRY] Registered {name}/{version}.")
+        if promote:
+            self.promote(name, version)
+        return version
+
+    def promote(self, name, version):
+        """Points CURRENT at a version (atomic rename). Running LiveModels pick it up on their next poll."""
+        if version not in self.versions(name):
+            raise ValueError(f"Unknown version {name}/{version}")
+        pointer = os.path.join(self._dir(name), POINTER)
+        tmp = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(version + "\n")
+        os.replace(tmp, pointer)
+        print(f"[REGISTRY] {name} -> {version} (promoted)")
+
+    def import_legacy(self, name, path, metadata=None):
+        """One-time migration of a hard-coded model file into the registry."""
+        model = joblib.load(path)
+        meta = {"imported_from": path}
+        meta.update(metadata or {})
+        return self.register(name, model, meta, promote=True)
+
+    def ensure(self, name):
+        """Imports the known legacy file for `name` if nothing has been registered yet."""
+        if self.current_version(name) is not None or name not in LEGACY_MODELS:
+            return self.current_version(name)
+        path, meta = LEGACY_MODELS[name]
+        if not os.path.exists(path):
+            return None
+        print(f"[REGISTRY] Importing legacy model {path} as '{name}'...")
+        try:
+            return self.import_legacy(name, path, meta)
+        except Exception as e:
+            print(f"[REGISTRY] Legacy import failed: {e}")
+            return None
+
+
+def _sklearn_version():
+    try:
+        import sklearn
+        return sklearn.__version__
+    except ImportError:
+        return None
+
+
+class LiveModel:
+    """
+    Process-local handle on the promoted version of one model.
+    current() never blocks on a reload: a newly promoted version is loaded on a background
+    thread and swapped in with one reference assignment. Take one snapshot per patrol so a
+    whole batch is scored by the same version.
+    """
+    def __init__(self, name, registry=None, poll_seconds=POLL_SECONDS):
+        self.name = name
+        self.registry = registry or ModelRegistry()
+        self.poll_seconds = poll_seconds
+        self._current = None
+        self._checked = 0.0
+        self._loading = False
+        self._lock = threading.Lock()
+
+        version = self.registry.ensure(name)
+        if version is not None:
+            self._current = self.registry.load(name, version)  # First load is synchronous
+        self._checked = time.monotonic()
+
+    def current(self):
+        """Snapshot of the live version (None if nothing is registered)."""
+        if time.monotonic() - self._checked >= self.poll_seconds:
+            self.poll()
+        return self._current
+
+    def poll(self):
+        """Checks CURRENT; starts a background load if another version was promoted."""
+        self._checked = time.monotonic()
+        version = self.registry.current_version(self.name)
+        live = self._current.version if self._current is not None else None
+        if version is None or version == live:
+            return False
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = True
+        threading.Thread(target=self._swap, args=(version,), daemon=True).start()
+        return True
+
+    def _swap(self, version):
+        try:
+            loaded = self.registry.load(self.name, version)
+            if loaded.scorer is not None:
+                # Fault the mmapped pages in before going live
+                loaded.scorer.predict_proba([0.0] * loaded.scorer.n_features)
+            old = self._current.version if self._current is not None else None
+            self._current = loaded
+            print(f"[REGISTRY] Hot swap: {self.name} {old} -> {version}")
+        except Exception as e:
+            print(f"[REGISTRY] Hot swap to {self.name}/{version} failed: {e}. Keeping current version.")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def wait_for(self, version, timeout=10.0):
+        """Blocks until `version` is live (used by tools/tests, never by the patrol)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._current is not None and self._current.version == version:
+                return True
+            if not self._loading:
+                self.poll()
+            time.sleep(0.01)
+        return False
+
+
+_live_models = {}
+_live_lock = threading.Lock()
+
+
+def get_live_model(name):
+    """Process-wide LiveModel per name (the Oracle, Council and swarm share one)."""
+    with _live_lock:
+        if name not in _live_models:
+            _live_models[name] = LiveModel(name)
+        return _live_models[name]
+
+
+def load(name, version=None):
+    """One-off load (backtests, tools): a pinned version or the promoted one."""
+    registry = ModelRegistry()
+    registry.ensure(name)
+    return registry.load(name, version)
+
+
+if __name__ == "__main__":
+    registry = ModelRegistry()
+    names = sorted(os.listdir(REGISTRY_DIR)) if os.path.isdir(REGISTRY_DIR) else []
+    for model_name in names:
+        live = registry.current_version(model_name)
+        for v in registry.versions(model_name):
+            meta = registry.read_meta(model_name, v)
+            flag = "*" if v == live else " "
+            print(f"{flag} {model_name}/{v}  features={meta.get('feature_version')}  "
+                  f"window={meta.get('training_window')}  metrics={meta.get('metrics', {}).get('accuracy')}")
@@ -1,18 +1,32 @@
-import yfinance as yf
-import pandas_ta as ta
 import pandas as pd
 import numpy as np
 # import dhanhq # Uncomment when using Real API
-import joblib
+import json
 import os
 import config
+import model_registry
+import llm_cache
+import knowledge_index
+import trade_store
+from indicator_engine import IndicatorEngine
+from feature_pipeline import FEATURE_COLUMNS, FEATURE_VERSION
+from broker_adapter import get_broker_adapter
+
+MODEL_NAME = "reliance_rf" # Model registry name (legacy reliance_rf_v1.joblib is imported on first run)
+SCHOLAR_PASSAGES = 5 # Research passages retrieved per Scholar check (instead of every uploaded paper)
 
 class Oracle:
     def __init__(self):
         self.watchlist = ["RELIANCE.NS"]
-        self.model_path = "memories/models/reliance_rf_v1.joblib"
-        self.model = self._load_brain()
+        self.brain = self._load_brain() # Registry handle (hot-swaps newly promoted versions)
+        self._version = None
+        self._loaded = None
+        self._model = None
+        self.scorer = None # Compiled flat-array forest (sklearn stays as fallback)
+        self._sync_brain()
+        self.indicators = IndicatorEngine() # Streaming technicals (only new bars are processed)
         self.data_source = getattr(config, 'DATA_SOURCE', 'YFINANCE') # Default to YFinance
+        self.adapter = get_broker_adapter(mode="research") # Local Bar Store + YFinance tail refresh
         
         if self.data_source == 'DHAN':
             print("[ORACLE] Connecting to Dhan HQ API...")
@@ -25,194 +39,288 @@ class Oracle:
              print("[ORACLE] Dhan API not yet configured. Fallback to YFinance.")
              pass 
         
-        # Default: YFinance (Intraday Real-Time)
-        # 1m data is only available for last 7 days. We fetch 5 days to be safe.
-        data = yf.download(symbol, period="5d", interval="1m", progress=False)
-        return data
+        # Default: YFinance (Intraday Real-Time) via the Bar Store
+        # 1m data is only available for last 7 days. We read 5 days to be safe.
+        # Only bars newer than the stored tail are downloaded.
+        return self.adapter.fetch_data(symbol, period="5d", interval="1m")
 
     def _load_brain(self):
-        if os.path.exists(self.model_path):
-            try:
-                print(f"[ORACLE] Loading AI Brain from {self.model_path}...")
-                return joblib.load(self.model_path)
-            except Exception as e:
-                print(f"[ORACLE] Brain Damage: {e}. Reverting to Lizard Brain (Rules).")
-                return None
-        else:
-            print("[ORACLE] No Brain found. Using basic instinct.")
+        try:
+            print(f"[ORACLE] Loading AI Brain '{MODEL_NAME}' from the model registry...")
+            return model_registry.get_live_model(MODEL_NAME)
+        except Exception as e:
+            print(f"[ORACLE] Brain Damage: {e}. Reverting to Lizard Brain (Rules).")
             return None
 
-    def analyze(self, symbol):
+    def _sync_brain(self):
+        """Adopts the promoted model version (called once per patrol, never mid-batch)."""
+        loaded = self.brain.current() if self.brain is not None else None
+        if loaded is None:
+            if self._version is None:
+                print("[ORACLE] No Brain found. Using basic instinct.")
+            return
+        if loaded.version == self._version:
+            return
+        self._version = loaded.version
+        self._loaded = loaded
+        self._model = None
+        self.scorer = loaded.scorer
+        print(f"[ORACLE] Brain {MODEL_NAME}/{loaded.version} online "
+              f"({'compiled' if loaded.scorer is not None else 'sklearn'}).")
+        if loaded.feature_version != FEATURE_VERSION:
+            print(f"[ORACLE] WARNING: Brain trained on feature set {loaded.feature_version}, "
+                  f"live features are {FEATURE_VERSION}. Retrain with brain_factory.py.")
+
+    @property
+    def model(self):
+        """sklearn estimator of the live version (unpickled lazily; the compiled scorer serves the patrol)."""
+        if self._model is None and self._loaded is not None:
+            self._model = self._loaded.model
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+
+    def fetch_many(self, symbols):
+        """{symbol: bars} for a whole patrol (grouped downloads, same 5d/1m window as fetch_data)."""
+        return self.adapter.fetch_batch(symbols, period="5d", interval="1m")
+
+    def _prepare(self, symbol, data):
         """
-        Fetches live data and asks the AI for a prediction.
+        Live bars -> (price, feature row, early result). The early result is set when the
+        symbol cannot reach the model (no data / warming up).
+        """
+        if data is None or data.empty:
+            return 0.0, None, {"signal": "HOLD", "confidence": 0.0, "reason": "No Data", "price": 0.0}
+        
+        # Flatten MultiIndex if present
+        if isinstance(data.columns, pd.MultiIndex):
+            data.columns = data.columns.get_level_values(0)
+
+        price = data['Close'].iloc[-1]
+        
+        # Feature Engineering (Streaming: O(1) per new bar, not a full-frame recompute)
+        # RSI (Wilder), MACD, ATR, SMA_50/SMA_200 (1m chart -> 200 minutes), Volatility
+        live_row = self.indicators.ingest(symbol, data)
+        
+        if live_row is None:
+             return price, None, {"signal": "HOLD", "confidence": 0.0, "reason": "Not enough data for features", "price": price}
+        return price, live_row, None
+
+    def predict_batch(self, rows):
+        """
+        Random Forest inference for many feature rows in ONE predict_proba call.
+        Returns [(prediction, confidence), ...] in input order; the prediction is the most
+        probable class (what model.predict returns) and confidence is its probability.
         """
+        if not rows:
+            return []
+        if self.scorer is not None:
+            # Compiled forest: same probabilities as sklearn, without its per-call overhead
+            columns = self.scorer.feature_names or FEATURE_COLUMNS
+            X = np.array([[row[c] for c in columns] for row in rows], dtype=float)
+            probabilities = self.scorer.predict_proba(X)
+            classes = self.scorer.classes_
+        else:
+            X = pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+            probabilities = self.model.predict_proba(X)
+            classes = self.model.classes_
+        best = probabilities.argmax(axis=1)
+        predictions = classes[best]
+        confidences = probabilities[np.arange(len(rows)), best]
+        return [(p.item() if hasattr(p, 'item') else p, float(c)) for p, c in zip(predictions, confidences)]
+
+    # --- CONTEXT (the event backtester replays these from its own clock) ---
+    def _regime(self):
+        from market_regime import get_market_regime
+        return get_market_regime()
+
+    def _world_view(self):
+        world_view_path = os.path.join("memories", "world_view.json")
+        if os.path.exists(world_view_path):
+            try:
+                with open(world_view_path, 'r') as f:
+                    return json.load(f)
+            except: pass
+        return {}
+
+    def _research(self, regime, symbol, world_view):
+        return knowledge_index.retrieve(
+            knowledge_index.regime_query(regime, symbol, world_view.get('reasoning')), k=SCHOLAR_PASSAGES)
+
+    def _recent_trades(self, n):
+        """Last n journal rows (index lookup, no file read)."""
+        return trade_store.get_store().journal_tail(n)
+
+    def _verdict(self, symbol, price, live_row, prediction, confidence):
+        """Scholar check + final decision for one symbol's Random Forest output."""
+        # --- V50 UPGRADE: THE SCHOLAR CHECK ---
+        # We ask the LLM to validate the Random Forest's decision using the research passages
+        
+        scholar_signal = "HOLD"
+        scholar_reason = "Scholar Sleeping"
+        
         try:
-            # 1. Fetch Live Data (Need enough for SMA-200)
-            data = self.fetch_data(symbol)
+             # --- DYNAMIC KNOWLEDGE SWITCHING (The Context Switch) ---
+            current_regime = self._regime()
             
-            if data.empty:
-                return {"signal": "HOLD", "confidence": 0.0, "reason": "No Data", "price": 0.0}
+            # --- CORTEX INTEGRATION (The World View) ---
+            world_view = self._world_view()
             
-            # Flatten MultiIndex if present
-            if isinstance(data.columns, pd.MultiIndex):
-                data.columns = data.columns.get_level_values(0)
+            # CORTEX OVERRIDE: If DANGER, we halt immediately.
+            if world_view.get("risk_level") == "DANGER":
+                 print(f"[ORACLE] 🛑 CORTEX OVERRIDE: World Risk is DANGER. Halting.")
+                 return {"signal": "HOLD", "confidence": 0.0, "reason": f"Cortex Halt: {world_view.get('reasoning')}", "price": price}
 
-            price = data['Close'].iloc[-1]
-            
-            # 2. Feature Engineering (Must match brain_factory.py EXACTLY)
-            # RSI
-            data['RSI'] = ta.rsi(data['Close'], length=14)
+            # We store 'last_regime' in self to track state
+            if not hasattr(self, 'last_regime'): self.last_regime = None
             
-            # MACD (Trend Momentum)
-            macd = ta.macd(data['Close'])
-            data = pd.concat([data, macd], axis=1) # Append MACD columns
-            
-            # ATR (Volatility)
-            data['ATR'] = ta.atr(data['High'], data['Low'], data['Close'], length=14)
-
-            # SMAs (Intraday Trends)
-            # Note: SMA_200 on 1m chart = 200 minutes (3.3 hours). Good for intraday trend.
-            data['SMA_50'] = data['Close'].rolling(window=50).mean()
-            data['SMA_200'] = data['Close'].rolling(window=200).mean()
-            data['Trend_Signal'] = np.where(data['SMA_50'] > data['SMA_200'], 1, 0)
-            
-            # Volatility
-            data['Returns'] = data['Close'].pct_change()
-            data['Volatility'] = data['Returns'].rolling(window=20).std()
+            if current_regime != self.last_regime:
+                 print(f"[ORACLE] Market Shift Detected: {self.last_regime} -> {current_regime}")
+                 print(f"[ORACLE] Switching Knowledge Context to '{current_regime}' Mode...")
+                 self.last_regime = current_regime
+
+            # Top-k passages for this regime + symbol from the local index (no PDF uploads per call)
+            passages = self._research(current_regime, symbol, world_view)
             
-            # Drop NaNs
-            data.dropna(inplace=True)
+            if not hasattr(self, 'llm'):
+                import model_factory
+                self.llm = model_factory.get_functional_model()
             
-            if data.empty:
-                 return {"signal": "HOLD", "confidence": 0.0, "reason": "Not enough data for features", "price": price}
-
-            # 3. AI Inference (Random Forest)
-            if self.model:
-                last_row = data.iloc[[-1]] 
-                features = ['RSI', 'Trend_Signal', 'Volatility', 'SMA_50', 'SMA_200']
-                
-                if not all(col in last_row.columns for col in features):
-                     return {"signal": "HOLD", "confidence": 0.0, "reason": "Feature Mismatch", "price": price}
-
-                X_live = last_row[features]
-                prediction = self.model.predict(X_live)[0]
-                probabilities = self.model.predict_proba(X_live)[0]
-                confidence = float(probabilities[1] if prediction == 1 else probabilities[0])
-                
-                # --- V50 UPGRADE: THE SCHOLAR CHECK ---
-                # We ask the LLM to validate the Random Forest's decision using the PDFs
-                
-                scholar_signal = "HOLD"
-                scholar_reason = "Scholar Sleeping"
-                
-                try:
-                    import librarian
-                    import model_factory
-                    from market_regime import get_market_regime
-
-                     # --- DYNAMIC KNOWLEDGE SWITCHING (The Context Switch) ---
-                    current_regime = get_market_regime()
-                    
-                    # --- CORTEX INTEGRATION (The World View) ---
-                    world_view_path = os.path.join("memories", "world_view.json")
-                    world_view = {}
-                    if os.path.exists(world_view_path):
-                        try:
-                            with open(world_view_path, 'r') as f:
-                                world_view = json.load(f)
-                        except: pass
-                    
-                    # CORTEX OVERRIDE: If DANGER, we halt immediately.
-                    if world_view.get("risk_level") == "DANGER":
-                         print(f"[ORACLE] 🛑 CORTEX OVERRIDE: World Risk is DANGER. Halting.")
-                         return {"signal": "HOLD", "confidence": 0.0, "reason": f"Cortex Halt: {world_view.get('reasoning')}", "price": price}
-
-                    # We store 'last_regime' in self to track state
-                    if not hasattr(self, 'last_regime'): self.last_regime = None
-                    
-                    if current_regime != self.last_regime or not hasattr(self, 'textbooks'):
-                         print(f"[ORACLE] Market Shift Detected: {self.last_regime} -> {current_regime}")
-                         print(f"[ORACLE] Switching Knowledge Context to '{current_regime}' Mode...")
-                         self.textbooks = librarian.get_knowledge_base(regime=current_regime)
-                         self.last_regime = current_regime
-                    
-                    if not hasattr(self, 'llm'):
-                        self.llm = model_factory.get_functional_model()
-                    
-                    if self.textbooks:
-                         rsi_val = last_row['RSI'].iloc[0]
-                         vol_val = last_row['Volatility'].iloc[0]
-                         
-                         prompt = (
-                             f"Global Context (The Cortex): Sentiment {world_view.get('sentiment_score', 0)}/10. "
-                             f"Insight: {world_view.get('reasoning', 'No Data')}. "
-                             f"Market Data: Price {price}, RSI {rsi_val:.2f}, Volatility {vol_val:.4f}. "
-                             f"The Random Forest Model predicts: {'BUY' if prediction == 1 else 'WAIT'} with {confidence:.2f} confidence. "
-                         )
-
-                         # --- RL INJECTION: READ PAST MISTAKES ---
-                         # The Bot reads its own diary to avoid repeating errors.
-                         journal_path = "trading_journal.csv"
-                         history_context = ""
-                         if os.path.exists(journal_path):
-                             try:
-                                 # Read last 5 lines roughly
-                                 with open(journal_path, "r") as f:
-                                     lines = f.readlines()[-5:]
-                                 history_context = "\nMy Recent Trades:\n" + "".join(lines)
-                             except:
-                                 pass
-                         
-                         prompt += (
-                             f"\n{history_context}\n"
-                             f"INSTRUCTION: You are a Reinforcement Learning Agent. "
-                             f"1. Look at the attached research papers for strategy. "
-                             f"2. Look at 'My Recent Trades' above. If I lost money recently on similar conditions, say NO. "
-                             f"3. If I am winning, reinforce the strategy. "
-                             f"Answer YES or NO and explain why based on my history."
-                         )
-                         
-                         # Quick check (High priority)
-                         response = self.llm.generate_content(self.textbooks + [prompt])
-                         scholar_reason = response.text[:100] + "..." # Keep it short for logs
-                         
-                         # If Scholar says NO, we downgrade signal
-                         if "NO" in response.text.upper():
-                             return {
-                                 "signal": "HOLD", 
-                                 "confidence": 0.0, 
-                                 "reason": f"Scholar Vetoed: {scholar_reason}", 
-                                 "price": price
-                             }
-                         else:
-                             scholar_signal = "CONFIRMED"
-
-                except Exception as e:
-                    print(f"[ORACLE] Scholar Check Failed: {e}")
-
-                # Final Decision
-                if prediction == 1 and scholar_signal == "CONFIRMED":
-                    return {
-                        "signal": "BUY", 
-                        "confidence": confidence, 
-                        "reason": f"AI + Scholar Agreed. {scholar_reason}", 
-                        "price": price
-                    }
+            if passages:
+                 rsi_val = live_row['RSI']
+                 vol_val = live_row['Volatility']
+                 
+                 prompt = (
+                     f"RESEARCH PASSAGES:\n{passages}\n\n"
+                     f"Global Context (The Cortex): Sentiment {world_view.get('sentiment_score', 0)}/10. "
+                     f"Insight: {world_view.get('reasoning', 'No Data')}. "
+                     f"Market Data: Price {price}, RSI {rsi_val:.2f}, Volatility {vol_val:.4f}. "
+                     f"The Random Forest Model predicts: {'BUY' if prediction == 1 else 'WAIT'} with {confidence:.2f} confidence. "
+                 )
+
+                 # --- RL INJECTION: READ PAST MISTAKES ---
+                 # The Bot reads its own diary to avoid repeating errors.
+                 history_context = ""
+                 try:
+                     # Last 5 journal rows (index lookup, no file read)
+                     lines = [f"{r['ts']},{r['symbol']},{r['action']},{r['price']},{r['result'] or r['origin']}\n"
+                              for r in self._recent_trades(5)]
+                     if lines:
+                         history_context = "\nMy Recent Trades:\n" + "".join(lines)
+                 except:
+                     pass
+                 
+                 prompt += (
+                     f"\n{history_context}\n"
+                     f"INSTRUCTION: You are a Reinforcement Learning Agent. "
+                     f"1. Look at the research passages above for strategy. "
+                     f"2. Look at 'My Recent Trades' above. If I lost money recently on similar conditions, say NO. "
+                     f"3. If I am winning, reinforce the strategy. "
+                     f"Answer YES or NO and explain why based on my history."
+                 )
+                 
+                 # Quick check (High priority)
+                 # Cached: identical evidence within the TTL reuses the last ruling (no Gemini round trip)
+                 contents = [prompt]
+                 response = llm_cache.cached_generate(
+                     "oracle.scholar", self.llm.model_name, contents,
+                     lambda: self.llm.generate_content(contents))
+                 scholar_reason = response.text[:100] + "..." # Keep it short for logs
+                 
+                 # If Scholar says NO, we downgrade signal
+                 if "NO" in response.text.upper():
+                     return {
+                         "signal": "HOLD", 
+                         "confidence": 0.0, 
+                         "reason": f"Scholar Vetoed: {scholar_reason}", 
+                         "price": price
+                     }
+                 else:
+                     scholar_signal = "CONFIRMED"
+
+        except Exception as e:
+            print(f"[ORACLE] Scholar Check Failed: {e}")
+
+        # Final Decision
+        if prediction == 1 and scholar_signal == "CONFIRMED":
+            return {
+                "signal": "BUY", 
+                "confidence": confidence, 
+                "reason": f"AI + Scholar Agreed. {scholar_reason}", 
+                "price": price
+            }
+        else:
+            return {
+                "signal": "HOLD", 
+                "confidence": confidence, 
+                "reason": f"RF says Wait. {scholar_reason}", 
+                "price": price
+            }
+
+    def analyze_batch(self, symbols, frames=None):
+        """
+        Analyzes a whole watchlist: one grouped fetch, one predict_proba call,
+        then the per-symbol Scholar check. Returns {symbol: analysis} in watchlist order.
+        `frames` ({symbol: bars}) skips the fetch when the caller already has the bars.
+        """
+        symbols = list(symbols)
+        self._sync_brain()
+        results = {}
+        pending = []
+        try:
+            if frames is None:
+                frames = self.fetch_many(symbols)
+        except Exception as e:
+            print(f"[ORACLE] Batch fetch failed: {e}")
+            frames = {}
+
+        # 1. Features (per symbol, streaming)
+        for symbol in symbols:
+            try:
+                price, live_row, early = self._prepare(symbol, frames.get(symbol))
+                if early is not None:
+                    results[symbol] = early
+                elif self.scorer is None and self.model is None:
+                    # FALLBACK (Lizard Brain)
+                    results[symbol] = {"signal": "HOLD", "confidence": 0.0, "reason": "No Brain Loaded", "price": price}
                 else:
-                    return {
-                        "signal": "HOLD", 
-                        "confidence": confidence, 
-                        "reason": f"RF says Wait. {scholar_reason}", 
-                        "price": price
-                    }
-                    
-            else:
-                # FALLBACK (Lizard Brain)
-                return {"signal": "HOLD", "confidence": 0.0, "reason": "No Brain Loaded", "price": price}
+                    pending.append((symbol, price, live_row))
+            except Exception as e:
+                print(f"[ORACLE] Error ({symbol}): {e}")
+                results[symbol] = {"signal": "HOLD", "confidence": 0.0, "reason": "Error", "price": 0.0}
+
+        # 2. AI Inference (Random Forest) for the whole patrol at once
+        try:
+            outputs = self.predict_batch([row for _, _, row in pending])
+        except Exception as e:
+            print(f"[ORACLE] Batch inference failed: {e}")
+            outputs = []
+            for symbol, _, _ in pending:
+                results[symbol] = {"signal": "HOLD", "confidence": 0.0, "reason": "Error", "price": 0.0}
+            pending = []
+
+        # 3. Scholar Check + Final Decision
+        for (symbol, price, live_row), (prediction, confidence) in zip(pending, outputs):
+            try:
+                results[symbol] = self._verdict(symbol, price, live_row, prediction, confidence)
+            except Exception as e:
+                print(f"[ORACLE] Error ({symbol}): {e}")
+                results[symbol] = {"signal": "HOLD", "confidence": 0.0, "reason": "Error", "price": 0.0}
 
+        return {symbol: results[symbol] for symbol in symbols}
+
+    def analyze(self, symbol):
+        """
+        Fetches live data and asks the AI for a prediction.
+        """
+        try:
+            data = self.fetch_data(symbol)
         except Exception as e:
             print(f"[ORACLE] Error: {e}")
             return {"signal": "HOLD", "confidence": 0.0, "reason": "Error", "price": 0.0}
+        return self.analyze_batch([symbol], frames={symbol: data})[symbol]
 
 if __name__ == "__main__":
     oracle = Oracle()
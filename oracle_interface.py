@@ -1,24 +1,30 @@
 import pandas as pd
-import joblib
-import os
+import model_registry
 
 import pandas_ta_classic as ta
 
+MODEL_NAME = "research_oracle" # Model registry name (legacy research/oracle_v1.pkl is imported on first run)
+
 class Oracle:
     def __init__(self):
-        self.model = None
+        self.brain = None
         self.load_model()
 
+    @property
+    def model(self):
+        loaded = self.brain.current() if self.brain is not None else None
+        return loaded.predictor if loaded is not None else None
+
     def load_model(self):
-        model_path = os.path.join(os.path.dirname(__file__), 'research', 'oracle_v1.pkl')
-        if os.path.exists(model_path):
-            try:
-                self.model = joblib.load(model_path)
-                print(f"Oracle model loaded from {model_path}")
-            except Exception as e:
-                print(f"Failed to load Oracle model: {e}")
-        else:
-            print(f"Oracle model not found at {model_path}")
+        try:
+            self.brain = model_registry.get_live_model(MODEL_NAME)
+            loaded = self.brain.current()
+            if loaded is not None:
+                print(f"Oracle model loaded from registry: {MODEL_NAME}/{loaded.version}")
+            else:
+                print(f"Oracle model '{MODEL_NAME}' not found in registry")
+        except Exception as e:
+            print(f"Failed to load Oracle model: {e}")
 
     def get_oracle_prediction(self, stock_data):
         """
@@ -0,0 +1,128 @@
+import asyncio
+import time
+import itertools
+
+# --- ORDER PIPELINE: Async Submission Queue for HiveMind ---
+# Purpose: HiveMind.request_action used to hold one global asyncio.Lock across the risk check AND the
+# blocking broker.place_order round-trip, so every drone with a signal waited behind the slowest order.
+# Now request_action only reserves risk under the lock and enqueues an order here:
+#     queue     -> asyncio.Queue of orders, drained by one dispatcher task
+#     pipelining-> each order runs in its own task (broker call in a worker thread), up to
+#                  MAX_CONCURRENT_ORDERS in flight; orders for DIFFERENT symbols overlap
+#     ordering  -> orders for the SAME symbol execute strictly in submission order (each waits
+#                  for the previous one on its symbol)
+#     callbacks -> on_fill(order, result) runs on the event loop after every order (filled or
+#                  rejected), where HiveMind releases the reservation and updates risk state
+# submit() returns an asyncio.Future with the broker result; callers don't have to await it.
+
+MAX_CONCURRENT_ORDERS = 4
+
+
+class Order:
+    _ids = itertools.count(1)
+
+    def __init__(self, symbol, action, quantity, price, meta=None):
+        self.id = next(self._ids)
+        self.symbol = symbol
+        self.action = action
+        self.quantity = quantity
+        self.price = price
+        self.meta = meta or {}
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.future = None
+
+    def __repr__(self):
+        return f"Order#{self.id}({self.action} {self.quantity} {self.symbol} @ {self.price})"
+
+
+class OrderPipeline:
+    def __init__(self, broker, on_fill=None, max_concurrent=MAX_CONCURRENT_ORDERS):
+        self.broker = broker
+        self.on_fill = on_fill
+        self.max_concurrent = max_concurrent
+        self._queue = None
+        self._slots = None
+        self._dispatcher = None
+        self._tails = {}            # symbol -> task of the last order submitted for it
+        self._tasks = set()
+        self.stats = {"submitted": 0, "filled": 0, "rejected": 0, "errors": 0, "queue_ms": 0.0}
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Starts the dispatcher on the running loop (idempotent)."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        return self
+
+    async def drain(self):
+        """Waits until every submitted order has executed and its callback has run."""
+        if self._queue is not None:
+            await self._queue.join()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def stop(self):
+        await self.drain()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    # --- SUBMIT ---
+    def submit(self, symbol, action, quantity, price, meta=None):
+        """Enqueues one order; returns its Future (resolves to the broker result dict)."""
+        self.start()
+        order = Order(symbol, action, quantity, price, meta)
+        order.future = asyncio.get_running_loop().create_future()
+        self.stats["submitted"] += 1
+        self._queue.put_nowait(order)
+        return order.future
+
+    # --- EXECUTION ---
+    async def _dispatch(self):
+        while True:
+            order = await self._queue.get()
+            previous = self._tails.get(order.symbol)
+            task = asyncio.get_running_loop().create_task(self._run(order, previous))
+            self._tails[order.symbol] = task
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._queue.task_done()
+
+    async def _run(self, order, previous):
+        if previous is not None:
+            await asyncio.wait([previous])          # Same symbol: strictly after the earlier order
+        async with self._slots:
+            order.started = time.perf_counter()
+            self.stats["queue_ms"] += (order.started - order.submitted) * 1000
+            try:
+                result = await asyncio.to_thread(self.broker.place_order, order.symbol, order.quantity,
+                                                 order.action, order.price)
+            except Exception as e:
+                self.stats["errors"] += 1
+                result = {"status": "failure", "message": f"Broker error: {e}"}
+        order.finished = time.perf_counter()
+        order.result = result
+        self.stats["filled" if result.get("status") == "success" else "rejected"] += 1
+
+        if self.on_fill:
+            try:
+                self.on_fill(order, result)
+            except Exception as e:
+                print(f"[PIPELINE] Fill callback failed for {order}: {e}")
+        if not order.future.done():
+            order.future.set_result(result)
+        if self._tails.get(order.symbol) is asyncio.current_task():
+            del self._tails[order.symbol]
+
+    def pending(self):
+        """Orders queued or executing."""
+        return (self._queue.qsize() if self._queue else 0) + len(self._tasks)
@@ -1,13 +1,14 @@
-import json
-import os
 import math
 from datetime import datetime
 import config
+import trade_store
+
+CHOP_MIN_CONFIDENCE = 0.85 # Low-volatility regime: only very strong signals pass
 
 class RiskManager:
-    def __init__(self):
-        self.stats_file = "memories/daily_stats.json"
-        self.today = datetime.now().strftime("%Y-%m-%d")
+    def __init__(self, store=None, today=None):
+        self.store = store or trade_store.get_store()
+        self.today = today or datetime.now().strftime("%Y-%m-%d")
         self.stats = self.load_stats()
         
         # Check if it's a new day (Reset Daily P&L, but remember yesterday)
@@ -15,19 +16,15 @@ class RiskManager:
             self.start_new_day()
 
     def load_stats(self):
-        if os.path.exists(self.stats_file):
-            try:
-                with open(self.stats_file, "r") as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """Latest scoreboard row from the trade store ({} on a fresh install)."""
+        try:
+            return self.store.get_daily_stats()
+        except Exception as e:
+            print(f"[RISK MANAGER] Could not load daily stats: {e}")
+            return {}
 
     def save_stats(self):
-        # Create folder if missing
-        os.makedirs("memories", exist_ok=True)
-        with open(self.stats_file, "w") as f:
-            json.dump(self.stats, f, indent=4)
+        self.store.save_daily_stats(self.stats)
 
     def start_new_day(self):
         """Resets daily counters but activates Cautious Mode if yesterday was a loss."""
@@ -50,6 +47,12 @@ class RiskManager:
         if is_cautious:
             print(f"[RISK MANAGER] Recovering from yesterday's loss ({yesterday_pnl}). Cautious Mode ACTIVATED.")
 
+    def roll_day(self, day):
+        """Starts a new scoreboard when `day` (YYYY-MM-DD) is not the current one (backtest clock)."""
+        if day != self.today:
+            self.today = day
+            self.start_new_day()
+
     def update_pnl(self, amount):
         """Called by the Broker after a trade closes to update the Scoreboard."""
         self.stats["daily_pnl"] += amount
@@ -66,11 +69,16 @@ class RiskManager:
         
         self.save_stats()
 
-    def can_trade(self):
-        """The Gatekeeper Function. Called before every trade."""
+    def can_trade(self, in_flight=0, max_trades=None):
+        """
+        The Gatekeeper Function. Called before every trade.
+        `in_flight`: orders sent but not yet booked, counted against `max_trades` (daily cap, if any).
+        """
         # 1. Check Status Flags
         if self.stats["status"] != "ACTIVE":
             return False
+        if max_trades is not None and self.stats["trade_count"] + in_flight >= max_trades:
+            return False
             
         # 2. Redundant Math Check (Double Safety)
         if self.stats["daily_pnl"] <= -config.MAX_DAILY_LOSS:
@@ -80,12 +88,13 @@ class RiskManager:
             
         return True
 
-    def get_position_size(self, price):
-        """Enforces the 'Max ₹500 per trade' rule."""
+    def get_position_size(self, price, cash=None):
+        """Enforces the 'Max ₹500 per trade' rule. `cash`: spendable balance (net of orders in flight)."""
         if price <= 0: return 0
         
         # Calculate how many shares we can buy with ₹500
-        quantity = math.floor(config.MAX_TRADE_AMOUNT / price)
+        budget = config.MAX_TRADE_AMOUNT if cash is None else min(config.MAX_TRADE_AMOUNT, cash)
+        quantity = math.floor(budget / price)
         
         # If stock is expensive (e.g., ₹2000), result is 0. We don't trade.
         if quantity < 1:
@@ -104,3 +113,29 @@ class RiskManager:
             return base_confidence + 0.05 
             
         return base_confidence
+
+    def plan_order(self, signal, confidence, price, regime, held_qty, min_conf=None):
+        """
+        The per-signal gate of the auto-pilot: confidence, CHOP filter, position sizing and the
+        portfolio check. Returns (action, quantity, gate); action is None when the signal is skipped
+        and `gate` names the check that stopped it.
+        """
+        if signal not in ("BUY", "SELL"):
+            return None, 0, "hold"
+        if min_conf is None:
+            min_conf = self.get_required_confidence()
+        if confidence < min_conf:
+            return None, 0, "confidence"
+        if regime == "CHOP" and confidence < CHOP_MIN_CONFIDENCE:
+            return None, 0, "chop"
+
+        if signal == "SELL":
+            # Close the whole position (bot is long only)
+            if held_qty <= 0:
+                return None, 0, "no_holdings"
+            return "SELL", held_qty, "close"
+
+        quantity = self.get_position_size(price)
+        if quantity <= 0:
+            return None, 0, "size"
+        return "BUY", quantity, "open"
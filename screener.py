@@ -0,0 +1,172 @@
+import os
+import numpy as np
+import pandas as pd
+
+# --- SCREENER: Vectorized Cross-Sectional Scan ---
+# Purpose: Holds the universe as a 2-D NumPy panel (symbols x bars, one matrix per field)
+# and evaluates indicators along the time axis for ALL symbols at once.
+# Rules are boolean masks over the last bar; the output is a compact candidate table
+# (one row per match) instead of one DataFrame per symbol.
+
+UNIVERSE_PATH = os.path.join("data", "ind_nifty100list.csv")
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def load_universe(path=UNIVERSE_PATH, suffix=".NS"):
+    """Nifty 100 constituents as yfinance tickers (e.g. 'ABB' -> 'ABB.NS')."""
+    df = pd.read_csv(path)
+    return [f"{sym.strip()}{suffix}" for sym in df['Symbol'].dropna()]
+
+
+class Panel:
+    """
+    Universe as right-aligned matrices: row = symbol, column = bar, last column = latest bar.
+    Shorter histories are NaN-padded on the LEFT, so every indicator is computed on each
+    symbol's own bars (no cross-symbol calendar alignment).
+    """
+    def __init__(self, symbols, fields, last_timestamps):
+        self.symbols = list(symbols)
+        self.fields = fields                  # {'Close': (S, T) float64, ...}
+        self.last_timestamps = last_timestamps # (S,) last bar time per symbol
+        self.bars = np.isfinite(fields['Close']).sum(axis=1)
+
+    @classmethod
+    def from_frames(cls, frames, max_bars=260, fields=FIELDS):
+        """Builds the panel from {symbol: OHLCV DataFrame} (e.g. YFinanceAdapter.fetch_batch)."""
+        symbols = [s for s, df in frames.items() if df is not None and not df.empty]
+        width = min(max_bars, max((len(frames[s]) for s in symbols), default=0))
+        matrices = {}
+        for name in fields:
+            m = np.full((len(symbols), width), np.nan)
+            for i, sym in enumerate(symbols):
+                if name in frames[sym].columns:
+                    values = frames[sym][name].to_numpy(dtype=float)[-width:]
+                    m[i, width - len(values):] = values
+            matrices[name] = m
+        last = [frames[s].index[-1] for s in symbols]
+        return cls(symbols, matrices, last)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def field(self, name):
+        return self.fields[name]
+
+
+# --- INDICATORS (axis=1 is time, every function works on the whole panel) ---
+def sma(x, window):
+    """Rolling mean along time. NaN until `window` valid bars are available (like rolling().mean())."""
+    valid = np.isfinite(x)
+    filled = np.where(valid, x, 0.0)
+    csum = np.cumsum(filled, axis=1)
+    ccount = np.cumsum(valid, axis=1)
+
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] < window:
+        return out
+    sums = csum[:, window - 1:].copy()
+    counts = ccount[:, window - 1:].copy()
+    sums[:, 1:] -= csum[:, :-window]
+    counts[:, 1:] -= ccount[:, :-window]
+    out[:, window - 1:] = np.where(counts == window, sums / window, np.nan)
+    return out
+
+
+def ewm_mean(x, alpha, min_periods=0):
+    """
+    pandas ewm(alpha, adjust=True).mean() along time for every row at once.
+    Loops over bars (T), vectorized over symbols (S); leading NaNs are skipped per symbol.
+    """
+    n_sym, n_bar = x.shape
+    out = np.full(x.shape, np.nan)
+    weighted = np.full(n_sym, np.nan)
+    old_wt = np.ones(n_sym)
+    nobs = np.zeros(n_sym, dtype=int)
+    decay = 1.0 - alpha
+
+    for t in range(n_bar):
+        cur = x[:, t]
+        obs = np.isfinite(cur)
+        started = np.isfinite(weighted)
+
+        first = obs & ~started
+        weighted[first] = cur[first]
+        old_wt[first] = 1.0
+
+        step = obs & started
+        old_wt[started] *= decay
+        w = old_wt[step]
+        weighted[step] = (w * weighted[step] + cur[step]) / (w + 1.0)
+        old_wt[step] += 1.0
+
+        nobs += obs
+        out[:, t] = np.where(nobs >= min_periods, weighted, np.nan)
+    return out
+
+
+def rsi(close, length=14):
+    """Wilder RSI (pandas_ta.rsi smoothing) for the whole panel."""
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    gain = ewm_mean(np.where(np.isfinite(delta), np.maximum(delta, 0.0), np.nan), 1.0 / length, length)
+    loss = ewm_mean(np.where(np.isfinite(delta), np.maximum(-delta, 0.0), np.nan), 1.0 / length, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100.0 * gain / (gain + loss)
+
+
+def last_valid(x):
+    """Latest finite value per row (NaN if none)."""
+    valid = np.isfinite(x)
+    idx = x.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    values = x[np.arange(x.shape[0]), idx]
+    return np.where(valid.any(axis=1), values, np.nan)
+
+
+# --- RULES ---
+def sovereign_rules(ind):
+    """Bullish Trend (Price > SMA200) + Pullback (40 <= RSI <= 50), with 200+ bars of history."""
+    with np.errstate(invalid='ignore'):
+        return {
+            "history": ind["bars"] >= 200,
+            "trend": ind["price"] > ind["sma200"],
+            "pullback": (ind["rsi"] >= 40) & (ind["rsi"] <= 50),
+        }
+
+
+def compute_indicators(panel):
+    """Last-bar indicator vectors (one value per symbol)."""
+    close = panel.field('Close')
+    return {
+        "price": last_valid(close),
+        "sma200": last_valid(sma(close, 200)),
+        "rsi": last_valid(rsi(close, 14)),
+        "bars": panel.bars,
+    }
+
+
+class Screener:
+    """
+    rules: callable(indicators) -> {name: bool mask (S,)}; a symbol is a candidate if ALL masks hold.
+    """
+    def __init__(self, rules=sovereign_rules, indicators=compute_indicators):
+        self.rules = rules
+        self.indicators = indicators
+
+    def run(self, panel):
+        """Returns the compact candidate table: symbol, price, rsi, sma200, bars, timestamp."""
+        columns = ["symbol", "price", "rsi", "sma200", "bars", "timestamp"]
+        if len(panel) == 0:
+            return pd.DataFrame(columns=columns)
+
+        ind = self.indicators(panel)
+        masks = self.rules(ind)
+        hit = np.logical_and.reduce(list(masks.values()))
+
+        rows = np.flatnonzero(hit)
+        return pd.DataFrame({
+            "symbol": [panel.symbols[i] for i in rows],
+            "price": np.round(ind["price"][rows], 2),
+            "rsi": np.round(ind["rsi"][rows], 2),
+            "sma200": np.round(ind["sma200"][rows], 2),
+            "bars": ind["bars"][rows],
+            "timestamp": [str(panel.last_timestamps[i]) for i in rows],
+        }, columns=columns)
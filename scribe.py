@@ -4,6 +4,7 @@ import time
 from datetime import datetime
 from google import genai
 import config
+import trade_store
 
 # Initialize Client
 api_key = config.GEMINI_API_KEY
@@ -18,7 +19,6 @@ if api_key:
 
 LOGS_DIR = "memories/daily_logs"
 NEWS_DIR = "training_raw/news"
-TRADES_PATH = "memories/paper_trades.json"
 
 if not os.path.exists(LOGS_DIR):
     os.makedirs(LOGS_DIR)
@@ -27,6 +27,14 @@ class Scribe:
     """
     The Historian. Writes the Daily Captain's Log.
     """
+    def _generate(self, prompt, gen_config):
+        # Lowest priority on the shared key pool: the log never delays a trade decision
+        from utils.key_manager import key_rotator
+        pool = key_rotator.pool()
+        if pool.slots:
+            return pool.generate("gemini-2.0-flash", prompt, config=gen_config, priority="log").result()
+        return client.models.generate_content(model="gemini-2.0-flash", contents=prompt, config=gen_config)
+
     def generate_daily_log(self, date_str=None):
         if not date_str:
             date_str = datetime.now().strftime("%Y-%m-%d")
@@ -69,11 +77,7 @@ class Scribe:
         """
         
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
-                config={'response_mime_type': 'application/json'}
-            )
+            response = self._generate(prompt, {'response_mime_type': 'application/json'})
             
             data = json.loads(response.text)
             
@@ -123,20 +127,12 @@ class Scribe:
 
     def _gather_trades(self, date_str):
         report = ""
-        if os.path.exists(TRADES_PATH):
-            try:
-                with open(TRADES_PATH, 'r') as f:
-                    trades = json.load(f)
-                    
-                # Filter for Date
-                # Timestamps are likely ISO or various formats.
-                # Simple string match for YYYY-MM-DD
-                daily_trades = [t for t in trades if date_str in str(t.get('timestamp', ''))]
-                
-                for t in daily_trades:
-                    report += f"{t.get('action')} {t.get('symbol')} @ {t.get('avg_price')} (Origin: {t.get('origin')})\n"
-                    
-            except: pass
+        try:
+            # Day range scan on the fills timestamp index (date_str is YYYY-MM-DD)
+            for t in trade_store.get_store().trades(day=date_str):
+                report += f"{t.get('action')} {t.get('symbol')} @ {t.get('avg_price')} (Origin: {t.get('origin')})\n"
+        except Exception as e:
+            print(f"   [SCRIBE] Trade store unavailable: {e}")
         return report if report else "No trades executed."
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from daily_bot import fetch_and_scan
+from daily_bot import fetch_and_scan, broker as scout_adapter
 import oracle_interface
 from risk_manager import guard
 from memory_manager import MemoryManager
@@ -56,13 +56,15 @@ def run_sentinel():
         print(f"\nProcessing {symbol}...")
         
         try:
-            # The Scout passes the full DF in 'data' key for the Oracle
-            # We must pass the DF to the Oracle
-            if 'data' not in candidate:
+            # The Scout returns a compact row; bars come from the Bar Store (memory hit after the scan)
+            stock_data = candidate.pop('data', None)
+            if stock_data is None:
+                stock_data = scout_adapter.fetch_data(symbol)
+            if stock_data is None or stock_data.empty:
                 logging.error(f"DATA MISSING for {symbol}. Skipping.")
                 continue
                 
-            prediction_prob = oracle_interface.get_oracle_prediction(candidate['data'])
+            prediction_prob = oracle_interface.get_oracle_prediction(stock_data)
             print(f"ORACLE: Prediction for {symbol}: {prediction_prob:.2f}")
             
             # --- PHASE 3: THE GUARD ---
@@ -74,9 +76,6 @@ def run_sentinel():
                 candidate['oracle_confidence'] = prediction_prob
                 price = candidate['price']
                 
-                # Remove heavy DF before logging/storing logic
-                del candidate['data'] 
-                
                 # Update Oracle Confidence in Memory for Dashboard
                 mm.update_oracle_confidence(prediction_prob)
                 
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import copy
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl                # POSIX
+except ImportError:
+    fcntl = None
+    import msvcrt               # Windows
+
+# --- STATE STORE: Locked, Atomic, Versioned Access to Shared JSON State ---
+# Purpose: the dashboard (auto-pilot thread + /api endpoints), swarm_engine, sentinel_main and guardian
+# run as separate processes and all rewrote bot_brain.json & co. with plain open(..., 'w'):
+# a reader could see a half-written file, and two read-modify-write cycles could silently drop
+# each other's changes (HiveMind.lock only covers one asyncio loop).
+# Every shared JSON file now goes through a StateFile:
+#     writes   -> temp file in the same directory + fsync + os.replace (readers see old or new, never half)
+#     writers  -> serialized by an advisory lock on "<file>.lock" (fcntl.flock / msvcrt.locking)
+#                 plus a thread lock (several threads of one process)
+#     versions -> (inode, mtime_ns, size) of the file that was read: each commit is a new inode, so a
+#                 write with a stale version raises VersionConflict instead of clobbering
+# update(mutate) = lock, re-read latest, mutate, commit: the lost-update-free read-modify-write.
+# Every read-modify-write goes through it (appends included), never through a copy read earlier.
+# Readers never take the lock.
+
+LOCK_TIMEOUT = 30.0             # Seconds to wait for another process's write
+LOCK_POLL = 0.02
+
+
+class VersionConflict(Exception):
+    """The file was committed by someone else since `expected_version` was read."""
+
+
+class LockTimeout(Exception):
+    pass
+
+
+def _version_of(stat):
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def atomic_write_json(path, data, indent=4, **dump_kwargs):
+    """Temp file + fsync + rename: the only way shared state files are written."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=indent, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class StateFile:
+    def __init__(self, path, default=dict):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.default = default
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+
+    # --- LOCKING ---
+    @contextmanager
+    def lock(self, timeout=LOCK_TIMEOUT):
+        """Exclusive writer lock (re-entrant within a thread; cross-process via the lock file)."""
+        with self._thread_lock:
+            if self._depth == 0:
+                self._acquire(timeout)
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release()
+
+    def _acquire(self, timeout):
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        handle = open(self.lock_path, 'a+')
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    handle.close()
+                    raise LockTimeout(f"{self.path} is locked by another writer")
+                time.sleep(LOCK_POLL)
+        self._lock_file = handle
+
+    def _release(self):
+        handle, self._lock_file = self._lock_file, None
+        try:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            handle.close()
+
+    # --- READ ---
+    def read_versioned(self):
+        """(data, version). Missing/corrupt file -> (default(), None)."""
+        try:
+            with open(self.path, 'r') as f:
+                version = _version_of(os.fstat(f.fileno()))
+                return json.load(f), version
+        except FileNotFoundError:
+            return self.default(), None
+        except json.JSONDecodeError as e:
+            print(f"[STATE] Unreadable {self.path} ({e}); using defaults.")
+            return self.default(), None
+
+    def read(self):
+        """Latest committed data. Missing/corrupt file -> default()."""
+        return self.read_versioned()[0]
+
+    def version(self):
+        try:
+            return _version_of(os.stat(self.path))
+        except FileNotFoundError:
+            return None
+
+    # --- WRITE ---
+    def write(self, data, expected_version=False):
+        """
+        Commits `data` whole. With `expected_version` (from read_versioned; None = "file must not
+        exist") the commit is refused with VersionConflict if another writer got there first;
+        without it the last writer wins (use update() to change part of a file).
+        Returns the new version.
+        """
+        with self.lock():
+            if expected_version is not False and self.version() != expected_version:
+                raise VersionConflict(self.path)
+            atomic_write_json(self.path, data)
+            return self.version()
+
+    def update(self, mutate):
+        """
+        Locked read-modify-write on the latest committed data. `mutate(data)` edits in place or
+        returns a replacement. Returns the committed data.
+        """
+        with self.lock():
+            data = self.read()
+            result = mutate(data)
+            if result is not None:
+                data = result
+            atomic_write_json(self.path, data)
+            return data
+
+
+def merge_changes(latest, base, mine):
+    """
+    Three-way merge of top-level keys: applies to `latest` only the keys `mine` changed
+    relative to `base` (the copy it was loaded from). Keys other writers changed survive;
+    a key both sides changed takes `mine` whole (list appends belong in an update() mutate).
+    """
+    for key, value in mine.items():
+        if key not in base or base[key] != value:
+            latest[key] = copy.deepcopy(value)
+    for key in base:
+        if key not in mine:
+            latest.pop(key, None)
+    return latest
+
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def get_state_file(path, default=dict):
+    """One StateFile per path per process (so its thread lock is shared by every caller)."""
+    key = os.path.abspath(path)
+    with _files_lock:
+        if key not in _files:
+            _files[key] = StateFile(key, default)
+        return _files[key]
@@ -2,9 +2,9 @@ import json
 import pandas as pd
 import os
 from datetime import datetime
+import trade_store
 
 MEMORY_PATH = "memories/bot_brain.json"
-JOURNAL_PATH = "trading_journal.csv"
 
 def show_daily_summary():
     print("="*40)
@@ -39,22 +39,16 @@ def show_daily_summary():
     print("="*40)
     
     # Load the journal to see the work done
-    if os.path.exists(JOURNAL_PATH):
-        try:
-            df = pd.read_csv(JOURNAL_PATH)
-            if not df.empty:
-                print("LATEST ACTIONS (Last 5):")
-                # Adjust columns to match what we actually have: timestamp,symbol,action,price,rsi,sma,result,mood_at_time
-                cols_to_show = ['timestamp', 'symbol', 'action', 'rsi', 'mood_at_time']
-                # Filter strictly for columns that exist
-                existing_cols = [c for c in cols_to_show if c in df.columns]
-                print(df[existing_cols].tail(5).to_string(index=False))
-            else:
-                print("Journal is empty.")
-        except Exception as e:
-            print(f"Error reading journal: {e}")
-    else:
-        print(f"Journal not found at {JOURNAL_PATH}")
+    try:
+        rows = trade_store.get_store().journal_tail(5)
+        if rows:
+            print("LATEST ACTIONS (Last 5):")
+            cols_to_show = ['ts', 'symbol', 'action', 'rsi', 'mood']
+            print(pd.DataFrame(rows)[cols_to_show].to_string(index=False))
+        else:
+            print("Journal is empty.")
+    except Exception as e:
+        print(f"Error reading journal: {e}")
     print("="*40)
 
 if __name__ == "__main__":
@@ -7,9 +7,10 @@ import time
 from datetime import datetime
 import config
 from oracle import Oracle
+import knowledge_index
 from risk_manager import RiskManager
-from dhan_broker import DhanBroker
 from mock_broker import MockDhanClient
+from order_pipeline import OrderPipeline
 
 # --- CONFIGURATION ---
 SCAN_INTERVAL_OPEN = (15, 30)   # Seconds (09:15 - 10:15)
@@ -68,17 +69,36 @@ class HiveMind:
     Agent A. The Central Brain.
     Manages Risk, Regime, and permissions for all Drones.
     """
-    def __init__(self):
-        self.risk_manager = RiskManager()
-        self.lock = asyncio.Lock() # Prevent race conditions on Wallet/Journal
+    def __init__(self, broker=None, risk_manager=None):
+        self.risk_manager = risk_manager or RiskManager()
+        self.lock = asyncio.Lock() # Guards the risk reservation step only (not the broker round-trip)
+        self.pending = {}          # symbol -> {action: reserved quantity} for orders in the pipeline
+        self.reserved_cash = 0.0   # Notional of BUY orders not yet booked (filled + scored) or rejected
+        self._risk_writes = asyncio.Lock() # RiskManager is not thread-safe: one scoreboard write at a time
+        self._bookings = set()
         
         # Select Broker
-        if getattr(config, 'DATA_SOURCE', 'YFINANCE') == 'DHAN':
+        if broker is not None:
+            self.broker = broker
+        elif getattr(config, 'DATA_SOURCE', 'YFINANCE') == 'DHAN':
+            from dhan_broker import DhanBroker # Imported on demand (pulls in the Dhan SDK + TOTP login)
             print("[HIVE] Config: REAL MONEY (Dhan API)")
             self.broker = DhanBroker()
         else:
             print("[HIVE] Config: SIMULATION (Mock Broker)")
             self.broker = MockDhanClient()
+        self.orders = OrderPipeline(self.broker, on_fill=self._on_fill)
+
+    def in_flight(self):
+        """Orders reserved but not yet booked."""
+        return sum(len(sides) for sides in self.pending.values())
+
+    async def _spendable_cash(self):
+        """Broker balance minus BUY notional still in flight (None if the broker reports no balance)."""
+        get_balance = getattr(self.broker, 'get_fund_balance', None)
+        if get_balance is None:
+            return None # Live broker: margin is enforced at the exchange
+        return await asyncio.to_thread(get_balance) - self.reserved_cash
             
     def is_market_open(self):
         """Strict Market Hours Enforcement"""
@@ -107,51 +127,135 @@ class HiveMind:
     async def request_action(self, symbol, signal, confidence, price, analysis):
         """
         Called by Workers when they find an opportunity.
-        Processing involves: Risk Check, Portfolio Check, Execution.
+        Risk check + sizing + reservation run under the lock; the order itself goes to the
+        pipeline. Returns the order's Future (broker result), or None if the request was denied.
         """
-        async with self.lock: # Critical Section
+        async with self.lock: # Critical Section (balance read + reservation are atomic per request)
             print(f"   >>> [HIVE] Received Request: {signal} {symbol} ({confidence*100:.1f}%)")
             
             # 1. State Check (Kill Switch)
             if os.path.exists("STOP.flag"):
                 print("[HIVE] Kill Switch Detected. Request Denied.")
-                return
+                return None
 
-            # 2. Risk Gate
+            # 2. Risk Gate (orders still in the pipeline count as trades already taken)
             required_conf = self.risk_manager.get_required_confidence()
             if confidence < required_conf:
                 print(f"      [DENY] Confidence {confidence:.2f} < Required {required_conf:.2f}")
-                return
+                return None
             
-            if not self.risk_manager.can_trade():
-                print(f"      [DENY] Risk Manager blocking trades (Daily Limit/Target hit).")
-                return
+            if not self.risk_manager.can_trade(in_flight=self.in_flight(),
+                                               max_trades=getattr(config, 'MAX_TRADES_PER_DAY', None)):
+                print(f"      [DENY] Risk Manager blocking trades (Daily Limit/Target hit, {self.in_flight()} in flight).")
+                return None
 
-            # 3. Execution Logic
-            quantity = self.risk_manager.get_position_size(price)
-            
-            # --- PORTFOLIO CHECK (Async) ---
-            # We wrap blocking broker calls
+            # --- PORTFOLIO CHECK ---
             if signal == "SELL":
-                # Only sell if we have it
-                # For MVP, assume we check RiskManager or Broker. 
-                # (Real implementation needs Portfolio Cache in HiveMind to avoid API spam)
-                pass # TODO: Implement Portfolio Check
-                
-            elif signal == "BUY":
-                if quantity > 0:
-                    print(f"   [EXEC] OPENING POSITION: Buying {quantity} {symbol} @ {price}...")
-                    result = await asyncio.to_thread(
-                        self.broker.place_order, symbol, quantity, signal, price
-                    )
-                    
-                    if result['status'] == 'success':
-                        print(f"      [OK] Order Filled: {result.get('order_id')}")
-                        # Update Daily Stats (P&L tracking happens on Sell, but we verify here)
-                    else:
-                        print(f"      [ERR] Execution Failed: {result['message']}")
-                else:
-                    print(f"      [SKIP] Position size 0 (Too expensive or Risk limit).")
+                # Bot is long only: a SELL closes what the bot holds (same gate as the auto-pilot)
+                get_portfolio = getattr(self.broker, 'get_portfolio', None)
+                if get_portfolio is None:
+                    print("      [SKIP] SELL not supported: broker reports no holdings.")
+                    return None
+                held = (await asyncio.to_thread(get_portfolio, "BOT")).get(symbol, 0)
+                action, quantity, gate = self.risk_manager.plan_order(signal, confidence, price, None, held,
+                                                                      min_conf=required_conf)
+                if action is None:
+                    print(f"      [SKIP] Nothing to sell in {symbol} ({gate}).")
+                    return None
+            else:
+                # 3. Execution Logic (sized from the cash not already promised to orders in flight)
+                cash = await self._spendable_cash()
+                quantity = self.risk_manager.get_position_size(price, cash=cash)
+
+                if quantity <= 0:
+                    print(f"      [SKIP] Position size 0 (Too expensive, Risk limit or cash reserved in flight).")
+                    return None
+                if cash is not None and cash < quantity * price:
+                    print(f"      [DENY] Spendable cash {cash:.2f} < {quantity * price:.2f}.")
+                    return None
+
+            # 4. Reservation: one in-flight order per symbol and side (drones re-firing on the same
+            # signal while the first order is still at the broker are dropped)
+            reserved = self.pending.setdefault(symbol, {})
+            if reserved.get(signal):
+                print(f"      [SKIP] {signal} {symbol} already in the order pipeline.")
+                return None
+            reserved[signal] = quantity
+            if signal == "BUY":
+                self.reserved_cash += quantity * price
+
+        if signal == "BUY":
+            print(f"   [EXEC] OPENING POSITION: Buying {quantity} {symbol} @ {price}...")
+        else:
+            print(f"   [EXEC] CLOSING POSITION: Selling {quantity} {symbol} @ {price}...")
+        return self.orders.submit(symbol, signal, quantity, price, meta={"confidence": confidence})
+
+    def _release(self, order):
+        reserved = self.pending.get(order.symbol, {})
+        reserved.pop(order.action, None)
+        if not reserved:
+            self.pending.pop(order.symbol, None)
+        if order.action == "BUY":
+            self.reserved_cash = max(0.0, self.reserved_cash - order.quantity * order.price)
+
+    def _on_fill(self, order, result):
+        """
+        Pipeline callback (event loop). Rejections release the reservation at once; fills keep it
+        until the scoreboard write (SQLite, in a worker thread) has booked them.
+        """
+        if result.get('status') == 'success':
+            latency_ms = (order.finished - order.submitted) * 1000
+            print(f"      [OK] Order Filled: {result.get('order_id')} ({latency_ms:.0f} ms signal-to-fill)")
+            task = asyncio.get_running_loop().create_task(self._book_fill(order, result))
+            self._bookings.add(task)
+            task.add_done_callback(self._bookings.discard)
+        else:
+            print(f"      [ERR] Execution Failed for {order.symbol}: {result.get('message')}")
+            self._release(order)
+
+    async def _book_fill(self, order, result):
+        try:
+            async with self._risk_writes:
+                # Daily P&L / trade count (realized P&L is reported on closing fills)
+                await asyncio.to_thread(self.risk_manager.update_pnl, result.get('realized_pnl', 0.0))
+        except Exception as e:
+            print(f"[HIVE] Could not book {order} in the scoreboard: {e}")
+        finally:
+            self._release(order)
+
+    async def settle(self):
+        """Waits for every submitted order to execute and be booked (shutdown / tests)."""
+        await self.orders.drain()
+        while self._bookings:
+            await asyncio.gather(*list(self._bookings), return_exceptions=True)
+
+    async def patrol(self, oracle, watchlist):
+        """
+        Batched patrol: the whole watchlist is analyzed per cycle with ONE Oracle.analyze_batch
+        call (one grouped fetch, one predict_proba), then actionable signals go through request_action.
+        """
+        print(f"[HIVE] Batched patrol over {len(watchlist)} assets.")
+        while True:
+            try:
+                if not self.is_market_open():
+                    await asyncio.sleep(900)
+                    continue
+
+                analyses = await asyncio.to_thread(oracle.analyze_batch, watchlist)
+                for symbol, analysis in analyses.items():
+                    signal = analysis.get('signal', 'HOLD')
+                    if signal != "HOLD":
+                        await self.request_action(symbol, signal, analysis.get('confidence', 0.0),
+                                                  analysis.get('price', 0.0), analysis)
+
+                await asyncio.sleep(self.get_dynamic_sleep_time())
+
+            except asyncio.CancelledError:
+                print("[HIVE] Patrol Decommissioned.")
+                break
+            except Exception as e:
+                print(f"[ERR] Batched Patrol Crashed: {e}. Rebooting in 10s...")
+                await asyncio.sleep(10)
 
 async def main():
     print(f"\n[{datetime.now()}] [HIVE] SYSTEM INITIALIZING: SWARM PROTOCOL v1.0")
@@ -159,17 +263,22 @@ async def main():
     
     # 1. Initialize Components
     hive = HiveMind()
+    hive.orders.start()
     oracle = Oracle() # Shared Oracle (Stateless analysis)
+    knowledge_index.get_index(background=True) # Scholar passages build while the first patrol runs
     
-    # 2. Create Workers (Drones)
     watchlist = getattr(config, 'WATCHLIST', ['RELIANCE.NS'])
-    drones = [AsyncWorker(sym, hive, oracle) for sym in watchlist]
-    
-    print(f"[HIVE] Deployed {len(drones)} Drones to the Swarm.")
     
-    # 3. Launch the Swarm
-    # gather() runs them all concurrently
-    await asyncio.gather(*(d.patrol() for d in drones))
+    # 2. Launch the Swarm
+    if getattr(config, 'SWARM_MODE', 'DRONES') == 'DRONES':
+        # One worker per asset (each calls Oracle.analyze on its own schedule)
+        drones = [AsyncWorker(sym, hive, oracle) for sym in watchlist]
+        print(f"[HIVE] Deployed {len(drones)} Drones to the Swarm.")
+        # gather() runs them all concurrently
+        await asyncio.gather(*(d.patrol() for d in drones))
+    else:
+        # One batched patrol for the whole watchlist
+        await hive.patrol(oracle, watchlist)
 
 if __name__ == "__main__":
     try:
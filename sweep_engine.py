@@ -0,0 +1,250 @@
+import sys
+import time
+import itertools
+import numpy as np
+import pandas as pd
+import columnar_history
+import feature_pipeline
+from screener import sma, rsi, load_universe
+
+# --- SWEEP ENGINE: Vectorized Parameter x Symbol Strategy Grid ---
+# Purpose: /api/backtest runs one fixed SMA 20/50 cross on one symbol per request. This evaluates a
+# whole grid of long-only rules over a whole universe of daily bars at once:
+#     entry   -> SMA(fast) > SMA(slow)  AND  rsi_low <= RSI(14) <= rsi_high  AND  confidence >= min_confidence
+#                (sma_fast=1 is the price itself: fast=1/slow=200/RSI 40-50 is the daily_bot screen)
+#     exit    -> SMA(fast) <= SMA(slow) at the close, or the stop / target price touched intraday
+#     fills   -> signals act at the NEXT bar's open; stops fill at the stop (or the open on a gap
+#                through it), targets likewise; COST_PER_SIDE per entry and per exit
+# Indicators are computed once per distinct window on the aligned (symbols x bars) panel. Signals
+# are broadcast into (params x symbols x bars) tensors; the position state (entry price, stop,
+# target) is path dependent, so it is stepped along time with every (param, symbol) pair updated
+# per step. Params are processed in chunks sized to CHUNK_BYTES, so memory stays bounded.
+
+MODEL_NAME = "reliance_rf"     # Registry brain whose probabilities feed min_confidence
+RSI_LENGTH = 14
+COST_PER_SIDE = 0.001          # 0.1% per trade, same as /api/backtest
+BARS_PER_YEAR = 252
+CHUNK_BYTES = 256 * 1024 ** 2  # Working-set budget per parameter chunk
+TENSORS_PER_PARAM = 8          # (symbols x bars) float64-sized arrays alive per param inside a chunk
+PARAMS = ("sma_fast", "sma_slow", "rsi_low", "rsi_high", "min_confidence", "stop_pct", "target_pct")
+METRICS = ("roi_pct", "sharpe", "max_dd_pct", "win_rate_pct", "turnover", "trades", "exposure_pct")
+
+DEFAULT_GRID = {
+    "sma_fast": [1, 10, 20, 50],
+    "sma_slow": [50, 100, 200],
+    "rsi_low": [0, 30, 40],
+    "rsi_high": [50, 60, 100],
+    "min_confidence": [0.0],
+    "stop_pct": [0.0, 0.03, 0.05],      # 0 = no stop
+    "target_pct": [0.0, 0.05, 0.10],    # 0 = no target
+}
+
+
+def expand_grid(grid=None):
+    """Cartesian product of the grid (missing keys take DEFAULT_GRID) minus incoherent combos."""
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    rows = pd.DataFrame(list(itertools.product(*(grid[k] for k in PARAMS))), columns=list(PARAMS))
+    rows = rows[(rows.sma_fast < rows.sma_slow) & (rows.rsi_low < rows.rsi_high)]
+    return rows.drop_duplicates().reset_index(drop=True)
+
+
+def brain_confidence(frames, version=None):
+    """
+    {symbol: BUY probability per bar} from a registry brain on the shared daily features
+    (what the Oracle compares against MIN_CONFIDENCE). NaN while features warm up.
+    """
+    import model_registry
+    brain = model_registry.load(MODEL_NAME, version)
+    if brain is None:
+        raise ValueError(f"No registry version for {MODEL_NAME}")
+    predictor = brain.predictor
+    buy = list(predictor.classes_).index(1)
+    out = {}
+    for symbol, df in frames.items():
+        features = feature_pipeline.compute_features(df)[feature_pipeline.FEATURE_COLUMNS]
+        valid = features.notna().all(axis=1)
+        X = features[valid]
+        proba = predictor.predict_proba(X.to_numpy(dtype=float) if brain.scorer is not None else X)
+        out[symbol] = pd.Series(np.nan, index=df.index)
+        out[symbol][valid] = proba[:, buy]
+    return out
+
+
+class SweepData:
+    """Universe on one calendar: (S, T) matrices, NaN where a symbol has no bar."""
+    def __init__(self, frames, confidence=None):
+        frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            raise ValueError("No bars to sweep")
+        self.symbols = list(frames)
+        self.index = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values()))))
+        field = lambda name: np.vstack([frames[s][name].reindex(self.index).to_numpy(dtype=float)
+                                        for s in self.symbols])
+        self.open, self.high, self.low, self.close = (field(n) for n in ('Open', 'High', 'Low', 'Close'))
+        self.mark = pd.DataFrame(self.close.T).ffill().to_numpy().T    # Marking price on missing bars
+        self.rsi = rsi(self.close, RSI_LENGTH)
+        if confidence is None:
+            self.confidence = np.ones_like(self.close)
+        else:
+            self.confidence = np.vstack([confidence[s].reindex(self.index).to_numpy(dtype=float)
+                                         if s in confidence else np.full(len(self.index), np.nan)
+                                         for s in self.symbols])
+        self._sma = {}
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    def smas(self, windows):
+        """(W, S, T) stack of SMA(close) for the given windows (cached per window)."""
+        for w in windows:
+            if w not in self._sma:
+                self._sma[w] = self.close.copy() if w == 1 else sma(self.close, int(w))
+        return np.stack([self._sma[w] for w in windows])
+
+
+def _simulate(data, chunk, cost):
+    """
+    One parameter chunk -> per (param, symbol) bar returns and trade counts.
+    Returns (returns (P, S, T), trades (P, S), wins (P, S), bars_held (P, S)).
+    """
+    windows = sorted(set(chunk.sma_fast) | set(chunk.sma_slow))
+    stack = data.smas(windows)
+    pos = {w: i for i, w in enumerate(windows)}
+    fast = stack[[pos[w] for w in chunk.sma_fast]]
+    slow = stack[[pos[w] for w in chunk.sma_slow]]
+    col = lambda name: chunk[name].to_numpy(dtype=float)[:, None, None]
+
+    with np.errstate(invalid='ignore'):
+        entry = ((fast > slow) & (data.rsi >= col("rsi_low")) & (data.rsi <= col("rsi_high"))
+                 & (data.confidence >= col("min_confidence")))
+        exit_signal = fast <= slow
+    del fast, slow
+
+    stop = col("stop_pct")[:, :, 0]
+    target = col("target_pct")[:, :, 0]
+    P, (S, T) = len(chunk), data.shape
+    returns = np.zeros((P, S, T))
+    held = np.zeros((P, S), dtype=bool)
+    entry_px = np.full((P, S), np.nan)
+    trades = np.zeros((P, S), dtype=np.int64)
+    wins = np.zeros((P, S), dtype=np.int64)
+    bars_held = np.zeros((P, S), dtype=np.int64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for t in range(1, T):
+            o, h, l = data.open[:, t], data.high[:, t], data.low[:, t]
+            tradable = np.isfinite(o)
+            # 1. Orders from the previous close act at this open
+            enter = ~held & entry[:, :, t - 1] & tradable
+            signal_exit = held & exit_signal[:, :, t - 1] & tradable
+            open_now = held | enter
+            basis = np.where(enter, o, data.mark[:, t - 1])
+            entry_px = np.where(enter, o, entry_px)
+
+            # 2. Stop before target when one bar touches both (conservative)
+            stop_px = entry_px * (1 - stop)
+            target_px = entry_px * (1 + target)
+            live = open_now & ~signal_exit
+            hit_stop = live & (stop > 0) & (l <= stop_px)
+            hit_target = live & (target > 0) & (h >= target_px) & ~hit_stop
+            exit_px = np.where(signal_exit, o,
+                      np.where(hit_stop, np.minimum(o, stop_px), np.maximum(o, target_px)))
+            closed = signal_exit | hit_stop | hit_target
+
+            price = np.where(closed, exit_px, data.mark[:, t])
+            returns[:, :, t] = np.where(open_now, price / basis - 1, 0.0) - cost * (enter + closed)
+            net = exit_px / entry_px - 1 - 2 * cost
+            trades += closed
+            wins += closed & (net > 0)
+            bars_held += open_now
+
+            held = open_now & ~closed
+            entry_px = np.where(closed, np.nan, entry_px)
+    return returns, trades, wins, bars_held
+
+
+def _metrics(returns, trades, wins, bars_held, bars, symbols):
+    """Metric columns for returns (..., T); trades/wins/bars_held summed over `symbols` upstream."""
+    equity = np.cumprod(1 + returns, axis=-1)
+    peaks = np.maximum(np.maximum.accumulate(equity, axis=-1), 1.0)
+    mean, std = returns.mean(axis=-1), returns.std(axis=-1, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(BARS_PER_YEAR), 0.0)
+        win_rate = np.where(trades > 0, wins / trades * 100, 0.0)
+    return {
+        "roi_pct": (equity[..., -1] - 1) * 100,
+        "sharpe": sharpe,
+        "max_dd_pct": (equity / peaks - 1).min(axis=-1) * 100,
+        "win_rate_pct": win_rate,
+        "turnover": trades / symbols / (bars / BARS_PER_YEAR),     # Round trips per symbol per year
+        "trades": trades,
+        "exposure_pct": bars_held / symbols / bars * 100,
+    }
+
+
+def chunk_size(data, chunk_bytes=CHUNK_BYTES):
+    S, T = data.shape
+    return max(1, int(chunk_bytes // (S * T * 8 * TENSORS_PER_PARAM)))
+
+
+def run_sweep(frames, grid=None, confidence=None, cost=COST_PER_SIDE, rank_by="sharpe",
+              per_symbol=False, chunk_bytes=CHUNK_BYTES):
+    """
+    frames: {symbol: daily OHLC DataFrame}. grid: {param: [values]} (see DEFAULT_GRID).
+    confidence: {symbol: Series of BUY probabilities} (e.g. brain_confidence); without it every
+    bar passes the confidence gate. Returns one row per param set, best `rank_by` first: metrics
+    of the equal-weight portfolio of all symbols (rebalanced every bar). per_symbol=True returns
+    one row per (param set, symbol) instead.
+    """
+    data = frames if isinstance(frames, SweepData) else SweepData(frames, confidence)
+    params = expand_grid(grid)
+    S, T = data.shape
+    size = chunk_size(data, chunk_bytes)
+    print(f"[SWEEP] {len(params)} param sets x {S} symbols x {T} bars ({-(-len(params) // size)} chunks of {size}).")
+    started = time.time()
+
+    tables = []
+    for first in range(0, len(params), size):
+        chunk = params.iloc[first:first + size].reset_index(drop=True)
+        returns, trades, wins, bars_held = _simulate(data, chunk, cost)
+        if per_symbol:
+            metrics = _metrics(returns, trades, wins, bars_held, T, 1)
+            table = chunk.loc[chunk.index.repeat(S)].reset_index(drop=True)
+            table.insert(0, "symbol", np.tile(data.symbols, len(chunk)))
+            for name in METRICS:
+                table[name] = metrics[name].reshape(-1)
+        else:
+            listed = np.isfinite(data.mark)     # Symbols join the portfolio once they list
+            portfolio = np.where(listed, returns, 0.0).sum(axis=1) / np.maximum(listed.sum(axis=0), 1)
+            metrics = _metrics(portfolio, trades.sum(axis=1), wins.sum(axis=1), bars_held.sum(axis=1), T, S)
+            table = chunk.copy()
+            for name in METRICS:
+                table[name] = metrics[name]
+        tables.append(table)
+        del returns
+
+    result = pd.concat(tables, ignore_index=True)
+    result = result.sort_values(rank_by, ascending=False, kind="stable").reset_index(drop=True)
+    print(f"[SWEEP] Done in {time.time() - started:.1f}s. Best {rank_by}: {result[rank_by].iloc[0]:.2f}")
+    return result
+
+
+def load_frames(symbols, interval="1d"):
+    """Daily bars from the columnar history (CSV fallback); symbols without history are skipped."""
+    frames = {}
+    for symbol in symbols:
+        df = columnar_history.load_or_legacy(symbol, interval)
+        if df is not None and not df.empty:
+            frames[symbol] = df
+    return frames
+
+
+if __name__ == "__main__":
+    # python sweep_engine.py [SYMBOL ...]   (default: the Nifty 100 universe)
+    symbols = sys.argv[1:] or load_universe()
+    frames = load_frames(symbols)
+    print(f"[SWEEP] Loaded daily history for {len(frames)}/{len(symbols)} symbols.")
+    ranked = run_sweep(frames)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(ranked.head(20).round(3).to_string(index=False))
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import bar_store
+import columnar_history
+from bar_store import BarStore
+
+def _today():
+    return pd.Timestamp.now(tz=bar_store.EXCHANGE_TZ).tz_localize(None).normalize()
+
+def _bars(n, end, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=end, periods=n, freq="D", name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                         "Close": close, "Volume": 1000.0}, index=index)
+
+class _Network:
+    """Fake yfinance: serves `self.bars` and records every request."""
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def __call__(self, symbol, interval, period=None, start=None):
+        self.calls.append((symbol, "tail" if start is not None else "period", start))
+        if start is not None:
+            return self.bars[self.bars.index >= pd.Timestamp(start)]
+        return self.bars
+
+def test_tail_refresh_merge_and_persist():
+    print("--- Testing Bar Store (Tail Refresh / Merge / Closed Bars on Disk) ---")
+    root = tempfile.mkdtemp()
+    today = _today()
+    truth = _bars(400, end=today)
+    net = _Network(truth.iloc[140:390])     # The feed is 10 days behind at first
+    store = BarStore(root=root, offline=False, fetcher=net)
+    path = columnar_history.series_path("SBIN.NS", "1d", root)
+
+    first = store.get_bars("SBIN.NS", period="6mo", interval="1d")
+    assert [c[1] for c in net.calls] == ["period"] and first.index[-1] == truth.index[389]
+    assert len(columnar_history.read_history(path)) == 250
+    store.get_bars("SBIN.NS", period="6mo", interval="1d")
+    assert len(net.calls) == 1, "served from memory inside the refresh interval"
+    print("[PASS] First read fetches the period once; the next one is pure memory.")
+
+    revised = truth.copy()
+    revised.loc[truth.index[389], "Close"] = 555.0   # The last known bar was still partial
+    net.bars = revised.iloc[140:]
+    store._last_refresh.clear()
+    bars = store.get_bars("SBIN.NS", period="6mo", interval="1d")
+    assert net.calls[-1][1:] == ("tail", truth.index[389].to_pydatetime()), "tail starts at the last known bar"
+    assert bars.index[-1] == today and bars.loc[truth.index[389], "Close"] == 555.0
+    assert not bars.index.duplicated().any()
+    on_disk = columnar_history.read_history(path)
+    assert len(on_disk) == 259 and on_disk.index[-1] == today - pd.Timedelta(days=1)
+    print("[PASS] Tail refresh merges the revised bar; today's forming bar stays in memory only.")
+
+def test_backfill_rewrites_disk_once():
+    print("--- Testing Bar Store (Backfill Rewrite) ---")
+    root = tempfile.mkdtemp()
+    today = _today()
+    truth = _bars(500, end=today, seed=1)
+    net = _Network(truth.iloc[-100:])
+    BarStore(root=root, offline=False, fetcher=net).get_bars("TCS.NS", period="3mo", interval="1d")
+    path = columnar_history.series_path("TCS.NS", "1d", root)
+    assert len(columnar_history.read_history(path)) == 99
+
+    # A longer window than recorded: the period fetch reaches BEFORE the disk copy
+    net.bars = truth
+    store = BarStore(root=root, offline=False, fetcher=net)
+    bars = store.get_bars("TCS.NS", period="1y", interval="1d")
+    assert net.calls[-1][1] == "period" and bars.index[-1] == today
+    on_disk = columnar_history.read_history(path)
+    assert len(on_disk) == 499 and on_disk.index[0] == truth.index[0]
+    assert ("TCS.NS", "1d") not in store._rewrite, "back to appends after one rewrite"
+    print("[PASS] Backfill rewrites the series once with the older bars.")
+
+def test_offline_and_info_cache():
+    print("--- Testing Bar Store (Offline Mode / Fundamentals Cache) ---")
+    root, info_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    today = _today()
+    BarStore(root=root, offline=False, fetcher=_Network(_bars(50, end=today))).get_bars("INFY.NS", "1mo", "1d")
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("offline store touched the network")
+    offline = BarStore(root=root, offline=True, fetcher=no_network, group_fetcher=no_network,
+                       info_dir=info_dir, info_fetcher=no_network)
+    assert offline.get_bars("INFY.NS", "1mo", "1d").index[-1] == today - pd.Timedelta(days=1)
+    assert offline.get_many(["INFY.NS", "NONE.NS"], "1mo", "1d").keys() == {"INFY.NS"}
+    assert offline.get_info("INFY.NS") == {}
+    print("[PASS] Offline mode serves recorded bars only and never calls the network.")
+
+    fetched = []
+    def info_fetcher(symbol):
+        fetched.append(symbol)
+        return {"trailingPE": 23.45}
+    store = BarStore(root=root, offline=False, info_dir=info_dir, info_fetcher=info_fetcher)
+    assert store.get_info("INFY.NS") == {"trailingPE": 23.45}
+    assert store.get_info("INFY.NS") == {"trailingPE": 23.45} and fetched == ["INFY.NS"]
+    assert offline.get_info("INFY.NS", max_age=0) == {"trailingPE": 23.45}, "offline: stale cache is fine"
+    with open(os.path.join(info_dir, "INFY.NS.json"), "w") as f:
+        f.write("{not json")
+    assert store.get_info("INFY.NS") == {"trailingPE": 23.45} and len(fetched) == 2
+    with open(os.path.join(info_dir, "INFY.NS.json")) as f:
+        assert json.load(f)["info"] == {"trailingPE": 23.45}
+    print("[PASS] Fundamentals cached for a day; a corrupt cache file is refetched.")
+
+def test_slow_fetch_does_not_block_other_series():
+    print("--- Testing Bar Store (Per-Series Locks) ---")
+    root = tempfile.mkdtemp()
+    today = _today()
+    release, started = threading.Event(), threading.Event()
+    fast = _Network(_bars(30, end=today))
+
+    def fetcher(symbol, interval, period=None, start=None):
+        if symbol == "SLOW.NS":
+            started.set()
+            release.wait(5)
+        return fast(symbol, interval, period=period, start=start)
+    store = BarStore(root=root, offline=False, fetcher=fetcher)
+    slow = threading.Thread(target=store.get_bars, args=("SLOW.NS", "1mo", "1d"))
+    slow.start()
+    assert started.wait(5)
+    t0 = time.time()
+    assert not store.get_bars("FAST.NS", "1mo", "1d").empty
+    elapsed = time.time() - t0
+    release.set()
+    slow.join()
+    assert elapsed < 1.0 and not store.get_bars("SLOW.NS", "1mo", "1d").empty
+    print(f"[PASS] FAST.NS served in {elapsed * 1000:.0f} ms while SLOW.NS was still downloading.")
+
+if __name__ == "__main__":
+    test_tail_refresh_merge_and_persist()
+    test_backfill_rewrites_disk_once()
+    test_offline_and_info_cache()
+    test_slow_fetch_does_not_block_other_series()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import columnar_history as ch
+
+def test_columnar_roundtrip():
+    print("--- Testing Columnar History (Write / Append / Slice) ---")
+    root = tempfile.mkdtemp()
+    index = pd.date_range("2026-01-20 09:15", periods=300, freq="1min", tz="Asia/Kolkata")
+    df = pd.DataFrame({
+        "Open": np.linspace(100, 130, 300), "High": np.linspace(101, 131, 300),
+        "Low": np.linspace(99, 129, 300), "Close": np.linspace(100.5, 130.5, 300),
+        "Volume": np.arange(300) * 10,
+    }, index=index)
+
+    path = ch.series_path("TEST.NS", "1m", root)
+    ch.write_history(path, df.iloc[:200], symbol="TEST.NS", interval="1m")
+    ch.append_history(path, df.iloc[150:])  # Overlap must be ignored
+
+    back = ch.read_history(path)
+    assert len(back) == 300
+    assert back.index.equals(index)
+    assert np.allclose(back["Close"].to_numpy(), df["Close"].to_numpy(), rtol=1e-6)
+    assert back["Close"].dtype == np.float32 and back["Volume"].dtype == np.int64
+    print("[PASS] Append skips overlap and round-trips 300 bars.")
+
+    window = ch.read_history(path, start="2026-01-20 10:00", end="2026-01-20 10:09")
+    assert len(window) == 10 and window.index[0] == pd.Timestamp("2026-01-20 10:00", tz="Asia/Kolkata")
+    print("[PASS] Date slicing via binary search on mmapped timestamps.")
+
+def test_rewrite_never_touches_live_columns():
+    print("--- Testing Columnar History (Rewrite Commits on the Header) ---")
+    root = tempfile.mkdtemp()
+    index = pd.date_range("2024-01-01", periods=400, freq="D")
+    df = pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": np.arange(400.0), "Volume": 7}, index=index)
+    path = ch.series_path("TEST.NS", "1d", root)
+
+    # A series from before generations (plain ts.bin / Close.bin) stays readable
+    ch.write_history(path, df.iloc[:300])
+    meta = ch.read_meta(path)
+    for name in ["ts"] + list(meta["columns"]):
+        os.replace(os.path.join(path, f"{name}.1.bin"), os.path.join(path, f"{name}.bin"))
+    ch._write_meta(path, {k: v for k, v in meta.items() if k != "generation"})
+    reader = ch.ColumnarHistory(path)
+    before = reader.column("Close")
+    assert len(before) == 300 and before[-1] == 299.0
+
+    # Backfill: a longer, different series replaces it while the reader still has it mapped
+    ch.write_history(path, df.assign(Close=-df["Close"]))
+    assert before[-1] == 299.0 and len(before) == 300, "open maps keep the old generation"
+    fresh = ch.read_history(path)
+    assert len(fresh) == 400 and fresh["Close"].iloc[-1] == -399.0
+    assert sorted(os.listdir(path)) == sorted(["meta.json"] + [f"{n}.1.bin" for n in ["ts", "Open", "High", "Low", "Close", "Volume"]])
+    ch.append_history(path, pd.DataFrame({"Close": [5.0]}, index=[index[-1] + pd.Timedelta(days=1)]))
+    ch.write_history(path, df.iloc[:10])
+    assert len(ch.read_history(path)) == 10 and ch.read_meta(path)["generation"] == 2
+    assert not [f for f in os.listdir(path) if f.endswith(".1.bin")]
+    print("[PASS] Rewrites land in new generation files and commit with meta.json; old ones are dropped.")
+
+def test_convert_yfinance_multiheader_csv():
+    print("--- Testing Legacy CSV Conversion (yfinance two-row header) ---")
+    root = tempfile.mkdtemp()
+    csv_path = os.path.join(root, "nifty_intraday.csv")
+    with open(csv_path, "w") as f:
+        f.write("Price,Close,High,Low,Open,Volume\n")
+        f.write("Ticker,^NSEI,^NSEI,^NSEI,^NSEI,^NSEI\n")
+        f.write("Datetime,,,,,\n")
+        f.write("2026-01-23 03:45:00+00:00,25292.15,25344.9,25276.1,25338.25,0\n")
+        f.write("2026-01-23 03:46:00+00:00,25300.00,25310.0,25290.0,25292.15,0\n")
+
+    out = ch.convert_csv(csv_path, root=root)
+    meta = ch.read_meta(out)
+    assert meta["symbol"] == "^NSEI" and meta["interval"] == "1m" and meta["rows"] == 2
+    df = ch.load_history("^NSEI", "1m", root=root)
+    assert str(df.index.tz) == "Asia/Kolkata" and df.index[0].hour == 9
+    print("[PASS] Multi-header CSV converted with ticker, interval and timezone.")
+
+if __name__ == "__main__":
+    test_columnar_roundtrip()
+    test_rewrite_never_touches_live_columns()
+    test_convert_yfinance_multiheader_csv()
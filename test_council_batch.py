@@ -0,0 +1,52 @@
+import json
+from council import Council
+
+def _council(judge_text):
+    c = Council()
+    c._get_fundamentals = lambda symbol: {"pe_ratio": 20.0, "recommendation": "buy"}
+    c._load_world_view = lambda: {"risk_level": "SAFE", "regime": "TRENDING", "reasoning": "Calm"}
+    c.client = object()
+    prompts = []
+    def judge(prompt):
+        prompts.append(prompt)
+        return json.loads(judge_text)
+    c._judge = judge
+    return c, prompts
+
+def test_one_judge_call_per_watchlist():
+    print("--- Testing Council.convene_batch (One Judge Call per Patrol) ---")
+    q_votes = {
+        "RELIANCE.NS": {"signal": "BUY", "confidence": 0.91, "price": 2900.0},
+        "TCS.NS": {"signal": "SELL", "confidence": 0.7, "price": 3500.0},
+        "INFY.NS": {"signal": "HOLD", "confidence": 0.55, "price": 1500.0},
+    }
+    judge_text = json.dumps([
+        {"symbol": "RELIANCE.NS", "signal": "buy", "confidence": 0.88, "reason": "Sniper agrees"},
+        {"symbol": "TCS.NS", "signal": "HOLD", "confidence": "0.4", "reason": "Weak"},
+        {"symbol": "UNKNOWN.NS", "signal": "BUY", "confidence": 0.99, "reason": "Hallucinated"},
+    ])
+    c, prompts = _council(judge_text)
+    rulings = c.convene_batch(list(q_votes), q_votes=q_votes)
+
+    assert len(prompts) == 1, "the whole watchlist must cost one Judge call"
+    assert all(f"CASE {i}: {s}" in prompts[0] for i, s in enumerate(q_votes, 1))
+    print("[PASS] One multi-case prompt for 3 symbols.")
+
+    assert list(rulings) == list(q_votes)
+    assert rulings["RELIANCE.NS"]["signal"] == "BUY" and rulings["RELIANCE.NS"]["price"] == 2900.0
+    assert rulings["TCS.NS"]["confidence"] == 0.4
+    assert rulings["INFY.NS"] is q_votes["INFY.NS"], "unjudged case keeps its Oracle vote"
+    assert "UNKNOWN.NS" not in rulings
+    print("[PASS] JSON array parsed; missing cases fall back, unknown symbols ignored.")
+
+def test_batch_falls_back_on_bad_judge():
+    print("--- Testing Council.convene_batch (Judge Failure) ---")
+    q_votes = {"RELIANCE.NS": {"signal": "BUY", "confidence": 0.91, "price": 2900.0}}
+    c, prompts = _council("not json")
+    rulings = c.convene_batch(list(q_votes), q_votes=q_votes)
+    assert rulings == q_votes
+    print("[PASS] Unparseable verdict leaves the Oracle votes in place.")
+
+if __name__ == "__main__":
+    test_one_judge_call_per_watchlist()
+    test_batch_falls_back_on_bad_judge()
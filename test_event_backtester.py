@@ -0,0 +1,133 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import llm_cache
+from feature_pipeline import FEATURE_COLUMNS
+from event_backtester import EventBacktester, ReplayLLM, STUB_SCHOLAR_ANSWER
+
+class RsiScorer:
+    """Compiled-forest stand-in: BUY (class 1) while RSI is below 45."""
+    classes_ = np.array([0, 1])
+    feature_names = FEATURE_COLUMNS
+
+    def predict_proba(self, X):
+        buy = (X[:, FEATURE_COLUMNS.index('RSI')] < 45).astype(float) * 0.9
+        return np.c_[1 - buy, buy]
+
+def _session_bars(days, seed, vol=0.002, start="2026-10-12"):
+    """375 one-minute bars per trading day (09:15-15:29 IST), random walk."""
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(f"{day} 09:15", periods=375, freq="1min", tz="Asia/Kolkata")
+        for day in pd.bdate_range(start, periods=days).strftime("%Y-%m-%d")]))
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, vol, len(index))))
+    opens = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({"Open": opens, "High": np.maximum(opens, close) * 1.0005,
+                         "Low": np.minimum(opens, close) * 0.9995, "Close": close,
+                         "Volume": 50000}, index=index)
+
+def _frames(days=2, symbols=3):
+    frames = {f"SYM{i}.NS": _session_bars(days, seed=i) for i in range(symbols)}
+    frames["^NSEI"] = _session_bars(days, seed=99, vol=0.0005)
+    return frames
+
+class _Library:
+    """The Scholar only runs with research passages: serve one without a knowledge index on disk."""
+    def passages(self, query, k=5):
+        return "Buy oversold dips in a trend."
+
+def _memories():
+    """(path, mtime) of everything under memories/ (a replay must not write there)."""
+    return {(os.path.join(folder, name), os.path.getmtime(os.path.join(folder, name)))
+            for folder, _, files in os.walk("memories") for name in files}
+
+def test_replay_runs_the_live_pipeline():
+    print("--- Testing Event Backtester (Oracle -> Council -> Risk -> Exchange) ---")
+    live_cache = llm_cache._cache
+    before = _memories()
+    replay = EventBacktester(frames=_frames(), broker="exchange", cash=1_000_000, brain=RsiScorer(),
+                             regime_window=375, library=_Library())
+    # Judge stand-in: takes profits every 40th patrol, otherwise confirms the Oracle
+    replay.council._judge = lambda prompt: [
+        {"symbol": s, "signal": "SELL" if replay.stats["patrols"] % 40 == 0 else "BUY",
+         "confidence": 0.95, "reason": "test"} for s in replay.symbols if s in prompt]
+    with replay:
+        report = replay.run()
+        assert replay.store.path.startswith(replay.workdir), "journal and scoreboard in a throwaway store"
+        assert not replay._order_pnl, "PnL of partly filled orders booked by the end of the run"
+    assert not os.path.exists(replay.workdir), "close() removes the replay's workdir"
+
+    assert report["events"] == 750 and report["patrols"] == 750
+    assert report["signals"] > 0 and report["llm"]["stubbed"] > 0, "Scholar consulted through the replay LLM"
+    assert report["gates"].get("open", 0) > 0 and report["gates"].get("close", 0) > 0, report["gates"]
+    assert report["fills"] > 0 and report["charges"] > 0, "fills pay tax_engine charges"
+    sells = [t for t in report["trades"] if t["action"] == "SELL"]
+    assert sells and all(t["result"] is not None for t in sells)
+    assert str(report["trades"][0]["ts"]).startswith("2026-10-12"), "fills stamped on the simulated clock"
+    assert [p["date"] for p in report["equity_curve"]] == ["2026-10-12", "2026-10-13"]
+    assert replay.risk.today == "2026-10-13" and replay.risk.stats["date"] == "2026-10-13"
+    assert llm_cache._cache is live_cache, "live LLM cache restored"
+    print(f"[PASS] {report['orders']} orders, {report['fills']} fills, gates {report['gates']}, "
+          f"charges {report['charges']:.2f}, equity {report['end_equity']:.2f}.")
+
+    # Throughput: a year of 1m bars is ~250 x 375 = 93,750 events for the watchlist
+    per_year = 250 * 375 / report["events_per_s"]
+    print(f"[PASS] {report['events_per_s']:,.0f} events/s ({len(report['symbols'])} symbols): "
+          f"one year of 1m bars in ~{per_year / 60:.1f} min.")
+
+    # Paper broker on a throwaway ledger: same pipeline, instant fills, journal in the temp store
+    with EventBacktester(frames=_frames(days=1), broker="mock", cash=5_000_000, brain=RsiScorer(), council=False,
+                         regime_window=375, library=_Library()) as paper:
+        assert paper.start_equity == 5_000_000, "mock ledger opened with the requested cash"
+        report = paper.run()
+        assert len(paper.store.journal(origin="BOT")) == report["fills"]
+    assert not os.path.exists(paper.workdir)
+    assert report["orders"] > 0 and report["fills"] == report["orders"] - report["rejected"]
+    assert report["charges"] > 0 and report["end_equity"] < report["start_equity"] + 1e6
+    print(f"[PASS] Mock broker replay: {report['fills']} paper fills journaled in the replay store.")
+
+    # Default brain / library: read-only registry and knowledge index
+    with EventBacktester(frames=_frames(days=1), brain=None, council=False, regime_window=375) as replay:
+        replay.run()
+    assert _memories() == before, "replays must not write under memories/"
+    print("[PASS] Nothing under memories/ written by the replays.")
+
+def test_regime_gates_and_recorded_answers():
+    print("--- Testing Event Backtester (CRASH Gate, Recorded LLM) ---")
+    frames = _frames(days=1)
+    index = frames["^NSEI"]
+    # Calm morning, then a volatility spike: CRASH halts the patrols that follow
+    wide = index.index >= index.index[250]
+    index.loc[wide, "High"] = index.loc[wide, "Close"] * 1.02
+    index.loc[wide, "Low"] = index.loc[wide, "Close"] * 0.98
+    with EventBacktester(frames=frames, brain=RsiScorer(), council=False, regime_window=200, library=_Library()) as replay:
+        report = replay.run()
+    assert report["gates"].get("crash", 0) > 0, report["gates"]
+    assert report["patrols"] == report["events"]
+    assert not any(pd.Timestamp(t["ts"]) > index.index[251] + pd.Timedelta(minutes=20)
+                   for t in report["trades"] if t["action"] == "BUY"), "no new buys once the spike starts"
+    print(f"[PASS] Regime replayed from index bars: gates {report['gates']}.")
+
+    # A recorded llm_cache.db answers the exact prompt (expired or not); others fall back to the stub
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm_cache.db")
+        recorded = llm_cache.LLMCache(path=path)
+        prompt = ["RESEARCH PASSAGES:\nBuy dips.\n\nMarket Data: Price 1012.345, RSI 31.234"]
+        key = llm_cache.cache_key("gemini-2.5-flash", prompt, None, 1)
+        recorded.put(key, "NO. Lost money on the last dip.", "oracle.scholar", "gemini-2.5-flash", ttl=1, now=1.0)
+        recorded._db.close()
+
+        llm = ReplayLLM(recorded_path=path)
+        scholar = llm.scholar()
+        assert scholar.generate_content(prompt).text.startswith("NO.")
+        # Rounded to the Scholar's 1 decimal place: the same key
+        assert scholar.generate_content(["RESEARCH PASSAGES:\nBuy dips.\n\nMarket Data: Price 1012.31, RSI 31.2"]).text.startswith("NO.")
+        assert scholar.generate_content(["something else"]).text == STUB_SCHOLAR_ANSWER
+        assert llm.stats == {"recorded": 2, "stubbed": 1, "judge_missed": 0}
+        llm.recorded.close()
+    print("[PASS] Recorded Scholar rulings replayed by prompt key, unknown prompts stubbed.")
+
+if __name__ == "__main__":
+    test_replay_runs_the_live_pipeline()
+    test_regime_gates_and_recorded_answers()
@@ -0,0 +1,120 @@
+import time
+import numpy as np
+import pandas as pd
+from exchange_simulator import ExchangeSimulator
+
+def _bars(closes, volume=10000, start="2024-01-01 09:15", freq="1min", spread=1.0):
+    index = pd.date_range(start, periods=len(closes), freq=freq, tz="Asia/Kolkata")
+    closes = np.asarray(closes, dtype=float)
+    opens = np.r_[closes[0], closes[:-1]]
+    return pd.DataFrame({"Open": opens, "High": np.maximum(opens, closes) + spread,
+                         "Low": np.minimum(opens, closes) - spread, "Close": closes,
+                         "Volume": np.full(len(closes), volume)}, index=index)
+
+def test_order_types_and_partial_fills():
+    print("--- Testing Exchange Simulator (Order Types / Partial Fills) ---")
+    sim = ExchangeSimulator(cash=10_000_000, charges=False, latency_jitter_ms=0)
+    sim.load_bars("SBIN", _bars([100.0] * 10, volume=1000))
+
+    # Participation 10% of 1000 shares = 100 per bar: a 250-share market order needs three bars
+    big = sim.place_order("SBIN", 250, "BUY", 100.0)
+    assert big["status"] == "success" and big["order_status"] == "PENDING"
+    assert sim.get_order(big["order_id"])["filled_quantity"] == 0, "nothing fills before the exchange sees it"
+    sim.step()
+    first = sim.get_order(big["order_id"])
+    assert first["status"] == "PARTIAL" and first["filled_quantity"] == 100, first
+    assert first["avg_price"] > 100.0, "buyer pays the spread, the walk and the slippage"
+    sim.step(); sim.step()
+    done = sim.get_order(big["order_id"])
+    assert done["status"] == "FILLED" and done["filled_quantity"] == 250
+    assert len([f for f in sim.fills if f["order_id"] == big["order_id"]]) > 3
+    print(f"[PASS] 250-share market order: partial fills over 3 bars, avg {done['avg_price']:.2f}.")
+
+    # The hold shrinks with each fill: paid shares no longer block cash twice
+    sim = ExchangeSimulator(cash=30_000, latency_jitter_ms=0)
+    sim.load_bars("SBIN", _bars([100.0] * 10, volume=1000))
+    big = sim.place_order("SBIN", 250, "BUY", 100.0)["order_id"]
+    held = sim.reserved_cash
+    sim.step()
+    assert sim.get_order(big)["filled_quantity"] == 100
+    assert abs(sim.reserved_cash - held * 150 / 250) < 1e-6
+    assert sim.cash - sim.reserved_cash > 0, "spendable cash after a partial fill"
+    assert sim.place_order("SBIN", 10, "BUY", 100.0)["status"] == "success"
+    sim.cancel_order(big)
+    assert abs(sim.reserved_cash - sim.orders[next(o for o in sim.orders if o != big)].reserved) < 1e-6
+    print("[PASS] Partial fills release their share of the cash hold; cancel releases the rest.")
+
+    # Resting limits only fill when a bar trades through them; stops trigger on the bar's range
+    sim = ExchangeSimulator(cash=10_000_000, charges=False, latency_jitter_ms=0)
+    sim.load_bars("TCS", _bars([100, 100, 97, 97, 104, 104], volume=100000))
+    limit = sim.place_order("TCS", 50, "BUY", 98.0, order_type="LIMIT")["order_id"]
+    stop = sim.place_order("TCS", 30, "BUY", 103.0, order_type="SL-M", trigger_price=103.0)["order_id"]
+    stop_limit = sim.place_order("TCS", 20, "BUY", 103.5, order_type="SL", trigger_price=103.0)["order_id"]
+    sim.step(); sim.step()      # 100 -> 100 (low 99): nothing crosses 98 or 103
+    assert [sim.get_order(o)["status"] for o in (limit, stop, stop_limit)] == ["OPEN"] * 3
+    sim.step()                  # 100 -> 97 (low 96): limit trades through
+    assert sim.get_order(limit)["status"] == "FILLED" and sim.get_order(limit)["avg_price"] <= 98.0
+    sim.step(); sim.step()      # 97 -> 104 (high 105): both stops trigger
+    assert sim.get_order(stop)["status"] == "FILLED" and sim.get_order(stop)["avg_price"] >= 103.0
+    assert sim.get_order(stop_limit)["status"] == "FILLED" and sim.get_order(stop_limit)["avg_price"] <= 103.5
+    assert sim.get_portfolio("BOT") == {"TCS": 100}
+    print("[PASS] LIMIT fills only on a trade-through; SL-M and SL trigger on the bar's high.")
+
+    # Long-only bot sells are capped, unaffordable buys rejected
+    sell = sim.place_order("TCS", 500, "SELL", 104.0)
+    assert sell["status"] == "success" and sim.get_order(sell["order_id"])["quantity"] == 100
+    assert sim.place_order("TCS", 1, "SELL", 104.0)["message"] == "NO_HOLDINGS"
+    assert sim.place_order("TCS", 10 ** 7, "BUY", 104.0)["message"] == "INSUFFICIENT_FUNDS"
+    print("[PASS] BOT sells capped at holdings (in-flight sells counted); unaffordable buys rejected.")
+
+def test_latency_slippage_and_throughput():
+    print("--- Testing Exchange Simulator (Latency / Slippage / Throughput) ---")
+    # Bars one second apart and 800 ms of latency: an order sent after bar 1 misses bar 2
+    sim = ExchangeSimulator(cash=10_000_000, charges=False, network_latency_ms=800, latency_jitter_ms=0,
+                            queue_latency_ms=300)
+    sim.load_bars("INFY", _bars([100, 110, 120, 130], freq="1s", spread=0.5))
+    sim.step()
+    fast = sim.place_order("INFY", 1, "BUY", 100.0)["order_id"]     # arrives at +0.8s: bar 2
+    slow = sim.place_order("INFY", 1, "BUY", 100.0)["order_id"]     # +0.8s + 0.3s queue: bar 3
+    sim.step(); sim.step()
+    assert 100 <= sim.get_order(fast)["avg_price"] < 101, sim.get_order(fast)
+    assert 110 <= sim.get_order(slow)["avg_price"] < 111, sim.get_order(slow)
+    print("[PASS] Network + queue latency pushes an order onto the next bar (no look-ahead fills).")
+
+    flat = ExchangeSimulator(cash=10_000_000, charges=False, slippage_bps=0)
+    slipped = ExchangeSimulator(cash=10_000_000, charges=False, slippage_bps=50)
+    for s in (flat, slipped):
+        s.load_bars("HDFC", _bars([200.0] * 3, volume=100000))
+        s.place_order("HDFC", 10, "BUY", 200.0)
+        s.run()
+    ratio = slipped.fills[0]["price"] / flat.fills[0]["price"]
+    assert abs(ratio - 1.005) < 1e-9, ratio
+    print("[PASS] Slippage applied on top of the book price (50 bps).")
+
+    symbols = [f"SYM{i}" for i in range(20)]
+    sim = ExchangeSimulator(cash=1e12)
+    for i, symbol in enumerate(symbols):
+        sim.load_bars(symbol, _bars(100 + np.sin(np.arange(500) / 10 + i) * 5, volume=50000))
+    rng = np.random.default_rng(0)
+    kinds = ["MARKET", "LIMIT", "SL-M", "SL"]
+
+    def trade(sim, ts):
+        for _ in range(20):
+            symbol = symbols[rng.integers(len(symbols))]
+            kind = kinds[rng.integers(4)]
+            ref = sim.books[symbol].last_price()
+            side = "BUY" if rng.random() < 0.6 else "SELL"
+            sim.place_order(symbol, int(rng.integers(1, 50)), side, ref * (0.99 if side == "BUY" else 1.01),
+                            order_type=kind, trigger_price=ref * (1.01 if side == "BUY" else 0.99))
+
+    start = time.perf_counter()
+    stats = sim.run(on_bar=trade)
+    elapsed = time.perf_counter() - start
+    rate = stats["orders"] / elapsed
+    assert stats["orders"] > 5000 and stats["fills"] > 1000
+    assert rate > 2000, f"only {rate:.0f} orders/s"
+    print(f"[PASS] {stats['orders']} orders / {stats['fills']} fills across {len(symbols)} symbols: {rate:,.0f} orders/s.")
+
+if __name__ == "__main__":
+    test_order_types_and_partial_fills()
+    test_latency_slippage_and_throughput()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import extraction_cache
+from extraction_cache import ExtractionCache
+
+def _docs(n=3):
+    root = tempfile.mkdtemp()
+    paths = []
+    for i in range(n):
+        path = os.path.join(root, f"paper_{i}.md")
+        with open(path, "w") as f:
+            f.write(f"# Paper {i}\nRisk management rule number {i}.\n")
+        paths.append(path)
+    return root, paths
+
+def test_cache_hits_and_invalidation():
+    print("--- Testing Extraction Cache (Content-Addressed Text) ---")
+    root, paths = _docs()
+    cache = ExtractionCache(cache_dir=os.path.join(root, "_cache"), workers=2)
+    calls = []
+    real = extraction_cache.extract_file
+    extraction_cache._memory.clear()
+
+    first = cache.extract_many(paths)  # Cold: 3 misses through the process pool
+    assert [first[p]["text"] for p in paths] == [open(p).read() for p in paths]
+    assert len(os.listdir(cache.cache_dir)) == 4  # 3 entries + paths.json
+    print("[PASS] Cold extraction through the process pool matches the files.")
+
+    extraction_cache.extract_file = lambda path: calls.append(path) or real(path)
+    try:
+        cache.extract_many(paths)
+        extraction_cache._memory.clear()
+        reopened = ExtractionCache(cache_dir=cache.cache_dir)
+        assert reopened.extract_many(paths)[paths[0]]["text"] == first[paths[0]]["text"]
+        assert calls == []
+        print("[PASS] Unchanged files served from memory, then from disk after a restart.")
+
+        copy = os.path.join(root, "renamed.md")
+        shutil.copy(paths[1], copy)
+        assert cache.extract(copy)["text"] == first[paths[1]]["text"] and calls == []
+        print("[PASS] Copied file hits by content hash.")
+
+        with open(paths[2], "a") as f:
+            f.write("Addendum.\n")
+        assert cache.extract(paths[2])["text"].endswith("Addendum.\n")
+        assert calls == [paths[2]]
+        print("[PASS] Edited file re-extracted, others untouched.")
+    finally:
+        extraction_cache.extract_file = real
+
+def test_page_boundaries():
+    print("--- Testing Extraction Cache (Page Boundaries) ---")
+    entry = {"text": "page one\npage two\n", "pages": [[1, 0], [2, 9]]}
+    assert extraction_cache.page_texts(entry) == [(1, "page one\n"), (2, "page two\n")]
+    assert extraction_cache.page_texts({"text": "plain", "pages": [[None, 0]]}) == [(None, "plain")]
+    print("[PASS] Page slices rebuilt from stored offsets.")
+
+if __name__ == "__main__":
+    test_cache_hits_and_invalidation()
+    test_page_boundaries()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import feature_pipeline as fp
+from indicator_engine import IndicatorState, IndicatorEngine
+
+def _make_daily(n=700, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 2500 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    dates = pd.date_range("2023-01-02", periods=n, freq="B")
+    return pd.DataFrame({"Date": dates, "Open": close, "High": high, "Low": low,
+                         "Close": close, "Volume": rng.integers(1e5, 1e6, n)})
+
+def test_batch_matches_streaming_engine():
+    print("--- Testing Feature Pipeline vs Streaming IndicatorEngine (Training/Live Parity) ---")
+    df = _make_daily()
+    batch = fp.compute_features(df)
+
+    state = IndicatorState()
+    rows = [state.update(h, l, c) for h, l, c in zip(df['High'], df['Low'], df['Close'])]
+
+    for col in fp.FEATURE_COLUMNS:
+        got = np.array([np.nan if r[col] is None else r[col] for r in rows], dtype=float)
+        want = batch[col].to_numpy(dtype=float)
+        assert np.array_equal(np.isnan(got), np.isnan(want)), f"{col}: warm-up mismatch"
+        mask = ~np.isnan(want)
+        assert np.allclose(got[mask], want[mask], rtol=1e-9, atol=1e-9), f"{col}: live/training drift"
+        print(f"[PASS] {col} identical in batch and streaming paths.")
+
+    # The Oracle's live row for the forming bar equals the batch row at that bar
+    engine = IndicatorEngine()
+    live = engine.ingest("TEST.NS", df.set_index("Date"))
+    last = batch.iloc[-1]
+    for col in fp.FEATURE_COLUMNS:
+        assert abs(live[col] - last[col]) < 1e-9, f"{col}: live row drift"
+    print("[PASS] Oracle live feature row matches the training features.")
+
+def test_disk_cache():
+    print("--- Testing Feature Cache (symbol, interval, version, data hash) ---")
+    cache_dir = tempfile.mkdtemp()
+    df = _make_daily()
+
+    first = fp.build_features(df, symbol="TEST.NS", interval="1d", cache_dir=cache_dir)
+    files = os.listdir(cache_dir)
+    assert len(files) == 1 and fp.FEATURE_VERSION in files[0]
+
+    again = fp.build_features(df, symbol="TEST.NS", interval="1d", cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(first, again)
+    print("[PASS] Unchanged history is served from the cache.")
+
+    edited = df.copy()
+    edited.loc[edited.index[-1], 'Close'] *= 1.02
+    changed = fp.build_features(edited, symbol="TEST.NS", interval="1d", cache_dir=cache_dir)
+    assert changed['Close'].iloc[-1] == edited['Close'].iloc[-1]
+    assert len(os.listdir(cache_dir)) == 1, "stale cache entry should be replaced"
+    print("[PASS] Edited bars invalidate the cache entry.")
+
+if __name__ == "__main__":
+    test_batch_matches_streaming_engine()
+    test_disk_cache()
@@ -0,0 +1,62 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+import forest_compiler as fc
+
+FEATURES = ['RSI', 'Trend_Signal', 'Volatility', 'SMA_50', 'SMA_200']
+
+def _model(seed=3):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'RSI': rng.uniform(5, 95, 1500), 'Trend_Signal': rng.integers(0, 2, 1500).astype(float),
+        'Volatility': rng.uniform(0, 0.05, 1500), 'SMA_50': rng.uniform(900, 1600, 1500),
+        'SMA_200': rng.uniform(900, 1600, 1500),
+    })
+    y = ((X['RSI'] < 45) & (X['SMA_50'] > X['SMA_200']) | (rng.random(1500) < 0.1)).astype(int)
+    return RandomForestClassifier(n_estimators=100, min_samples_split=10, random_state=42).fit(X, y)
+
+def test_bit_exact_parity():
+    print("--- Testing Compiled Forest vs sklearn (Bit-Exact) ---")
+    model = _model()
+    forest = fc.compile_forest(model)
+
+    X = pd.DataFrame(fc.probe_rows(forest, n_rows=3000), columns=FEATURES)
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(forest.predict(X), model.predict(X))
+    print("[PASS] Batch probabilities identical (including rows sitting exactly on thresholds).")
+
+    for i in range(50):
+        row = X.iloc[[i]]
+        assert np.array_equal(forest.predict_proba(row.to_numpy()[0]), model.predict_proba(row))
+    print("[PASS] Single-row hot path identical.")
+
+def test_memory_mapped_artifact():
+    print("--- Testing Memory-Mapped Artifact (Save / Load / Staleness) ---")
+    root = tempfile.mkdtemp()
+    model_path = os.path.join(root, "rf.joblib")
+    import joblib
+    model = _model()
+    joblib.dump(model, model_path)
+
+    assert fc.load_for_model(model_path) is None
+    forest = fc.load_for_model(model_path, compile_missing=True)
+    assert os.path.exists(os.path.join(root, "rf.forest", "meta.json"))
+    assert isinstance(np.memmap(os.path.join(root, "rf.forest", "leaf.bin"), mode='r'), np.memmap)
+
+    X = pd.DataFrame(fc.probe_rows(forest, n_rows=500, seed=9), columns=FEATURES)
+    assert fc.verify(model, forest, X)
+
+    start = time.perf_counter()
+    fc.load_for_model(model_path)
+    print(f"[PASS] Artifact reloads in {(time.perf_counter() - start) * 1e3:.2f} ms with identical scores.")
+
+    joblib.dump(_model(seed=4), model_path)
+    assert fc.load_for_model(model_path) is None, "artifact from an older model must be rejected"
+    print("[PASS] Stale artifact detected after retraining.")
+
+if __name__ == "__main__":
+    test_bit_exact_parity()
+    test_memory_mapped_artifact()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from indicator_engine import IndicatorEngine, IndicatorState
+
+def _make_bars(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    high = close * (1 + rng.uniform(0, 0.003, n))
+    low = close * (1 - rng.uniform(0, 0.003, n))
+    index = pd.date_range("2026-01-20 09:15", periods=n, freq="1min")
+    return pd.DataFrame({"Open": close, "High": high, "Low": low, "Close": close}, index=index)
+
+def _reference(df):
+    """The batch math Oracle.analyze used to run (pandas_ta formulas, written out in pandas)."""
+    close = df['Close']
+    out = pd.DataFrame(index=df.index)
+
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+    loss = delta.clip(upper=0).ewm(alpha=1 / 14, min_periods=14).mean()
+    out['RSI'] = 100 * gain / (gain + loss.abs())
+
+    def seeded_ema(s, n):
+        s = s.copy()
+        first = s.first_valid_index()
+        s = s.loc[first:]
+        seed = s.iloc[:n].mean()
+        s.iloc[:n - 1] = np.nan
+        s.iloc[n - 1] = seed
+        return s.ewm(span=n, adjust=False).mean().reindex(df.index)
+
+    macd = seeded_ema(close, 12) - seeded_ema(close, 26)
+    out['MACD_12_26_9'] = macd
+    out['MACDs_12_26_9'] = seeded_ema(macd, 9)
+
+    prev = close.shift(1)
+    tr = pd.concat([df['High'] - df['Low'], (df['High'] - prev).abs(), (prev - df['Low']).abs()], axis=1).max(axis=1)
+    tr.iloc[0] = np.nan
+    out['ATR'] = tr.ewm(alpha=1 / 14, min_periods=14).mean()
+
+    out['SMA_50'] = close.rolling(50).mean()
+    out['SMA_200'] = close.rolling(200).mean()
+    out['Volatility'] = close.pct_change().rolling(20).std()
+    return out
+
+def test_streaming_matches_batch():
+    print("--- Testing Streaming Indicator Engine vs Batch Recompute ---")
+    df = _make_bars()
+    ref = _reference(df)
+
+    state = IndicatorState()
+    rows = [state.update(h, l, c) for h, l, c in zip(df['High'], df['Low'], df['Close'])]
+
+    for col in ref.columns:
+        got = np.array([np.nan if r[col] is None else r[col] for r in rows], dtype=float)
+        want = ref[col].to_numpy()
+        assert np.array_equal(np.isnan(got), np.isnan(want)), f"{col}: warm-up mismatch"
+        mask = ~np.isnan(want)
+        assert np.allclose(got[mask], want[mask], rtol=1e-9, atol=1e-9), f"{col}: value drift"
+        print(f"[PASS] {col} matches batch computation.")
+
+def test_incremental_ingest():
+    print("--- Testing Incremental Ingest (Live Bar Peek) ---")
+    df = _make_bars()
+    engine = IndicatorEngine()
+
+    # Patrol 1: 400 bars visible, last one still forming
+    row_a = engine.ingest("TEST.NS", df.iloc[:400])
+    ref = _reference(df.iloc[:400]).iloc[-1]
+    assert abs(row_a['RSI'] - ref['RSI']) < 1e-9
+    assert abs(row_a['SMA_200'] - ref['SMA_200']) < 1e-9
+
+    # The forming bar ticks (same timestamp, new close) -> state must not be polluted
+    ticked = df.iloc[:400].copy()
+    ticked.iloc[-1, ticked.columns.get_loc('Close')] *= 1.01
+    engine.ingest("TEST.NS", ticked)
+
+    # Patrol 2: window rolls forward (old bars dropped, new bars appended)
+    row_b = engine.ingest("TEST.NS", df.iloc[100:600])
+    ref_b = _reference(df).iloc[-1]
+    for col in ['RSI', 'ATR', 'SMA_50', 'SMA_200', 'Volatility', 'MACDs_12_26_9']:
+        assert abs(row_b[col] - ref_b[col]) < 1e-9, f"{col} drifted after incremental ingest"
+    print("[PASS] Incremental ingest matches full recompute.")
+
+if __name__ == "__main__":
+    test_streaming_matches_batch()
+    test_incremental_ingest()
@@ -0,0 +1,69 @@
+import os
+import time
+import tempfile
+import instrument_master
+from instrument_master import InstrumentMaster, build_master
+
+DETAILED_HEADER = "EXCH_ID,SEGMENT,SECURITY_ID,ISIN,INSTRUMENT,UNDERLYING_SYMBOL,SYMBOL_NAME,SERIES,LOT_SIZE,TICK_SIZE\n"
+COMPACT_HEADER = "SEM_EXM_EXCH_ID,SEM_SEGMENT,SEM_SMST_SECURITY_ID,SEM_INSTRUMENT_NAME,SEM_TRADING_SYMBOL,SEM_LOT_UNITS,SEM_TICK_SIZE,SEM_SERIES,SM_SYMBOL_NAME\n"
+
+def _write(path, header, lines):
+    with open(path, 'w') as f:
+        f.write(header + "\n".join(lines) + "\n")
+    return path
+
+def test_lookups_and_isin_join():
+    print("--- Testing Instrument Master (Lookups / ISIN Join) ---")
+    root = tempfile.mkdtemp()
+    csv = _write(os.path.join(root, "master.csv"), DETAILED_HEADER, [
+        "NSE,E,1333,INE040A01034,EQUITY,HDFCBANK,HDFC BANK LTD,EQ,1,5.0000",
+        "BSE,E,500180,INE040A01034,EQUITY,HDFCBANK,HDFC BANK LTD,A,1,5.0000",
+        "NSE,E,2885,INE002A01018,EQUITY,RELIANCE,RELIANCE INDUSTRIES LTD,EQ,1,10.0000",
+        "NSE,E,13,INE117A01022,EQUITY,ABB,ABB INDIA LIMITED,BE,1,5.0000",
+        "NSE,E,14,INE117A01022,EQUITY,ABB,ABB INDIA LIMITED,EQ,1,5.0000",
+        "NSE,D,35001,,FUTSTK,HDFCBANK,HDFCBANK-Dec2026-FUT,,550,0.05",
+    ])
+    meta = build_master(csv, root=root)
+    master = InstrumentMaster(root)
+    assert master.loaded and meta["rows"] == 6 and not master.is_stale()
+
+    assert master.security_id("HDFCBANK.NS") == "1333"
+    assert master.security_id("HDFCBANK.BO", series="A") == "500180"
+    assert master.security_id("hdfcbank") == "1333", "bare tickers default to NSE"
+    assert master.security_id("NOSUCH.NS") is None
+    assert master.tick_size("RELIANCE.NS") == 0.10 and master.lot_size("HDFCBANK", segment="D", series="") == 550
+    rec = master.by_security_id("2885")
+    assert rec["symbol"] == "RELIANCE" and rec["isin"] == "INE002A01018"
+    print("[PASS] Ticker -> security ID (NSE/BSE/F&O), reverse lookup, lot and tick size.")
+
+    assert master.by_isin("INE117A01022")["security_id"] == "14", "EQ series preferred over BE for an ISIN"
+    mapping = master.map_universe()
+    assert mapping["HDFCBANK"] == "1333" and mapping["RELIANCE"] == "2885" and mapping["ABB"] == "14"
+    assert mapping["ADANIENT"] is None and len(mapping) >= 100
+    print("[PASS] data/ind_nifty100list.csv joined on ISIN.")
+
+def test_daily_rebuild_and_lookup_speed():
+    print("--- Testing Instrument Master (Daily Build / Speed) ---")
+    root = tempfile.mkdtemp()
+    rows = [f"NSE,E,{i},EQUITY,INSTR{i},{1 if i % 3 else 50},5.0,EQ,NAME {i}" for i in range(1, 50001)]
+    csv = _write(os.path.join(root, "compact.csv"), COMPACT_HEADER, rows)
+
+    build_master(csv, root=root, day="2000-01-01")
+    master = InstrumentMaster(root)
+    assert master.is_stale(), "yesterday's build must be refreshed"
+    assert master.refresh(csv_path=csv) and not master.is_stale()
+    build_master(csv, root=root, day="2000-01-02")
+    assert len([d for d in os.listdir(root) if d[:2] == "20"]) == instrument_master.KEEP_BUILDS
+    print("[PASS] Stale build detected and replaced; old builds pruned.")
+
+    start = time.perf_counter()
+    for i in range(1, 20001):
+        assert master.security_id(f"INSTR{i}.NS") == str(i)
+    per_lookup_us = (time.perf_counter() - start) / 20000 * 1e6
+    assert master.by_security_id(300)["lot_size"] == 50
+    assert per_lookup_us < 50, per_lookup_us
+    print(f"[PASS] 50k-instrument master: {per_lookup_us:.1f} us per security-ID lookup (memory-mapped).")
+
+if __name__ == "__main__":
+    test_lookups_and_isin_join()
+    test_daily_rebuild_and_lookup_speed()
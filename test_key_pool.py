@@ -0,0 +1,96 @@
+import time
+import threading
+from utils.key_manager import AsyncClientPool
+
+class _Models:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        return self.owner.call(contents)
+
+class _Client:
+    """Stands in for genai.Client: records calls, optionally fails with a 429."""
+    _lock = threading.Lock()
+
+    def __init__(self, name, fail_quota=False, delay=0.0, log=None, tracker=None):
+        self.name = name
+        self.tracker = tracker if tracker is not None else {"active": 0, "peak": 0}
+        self.fail_quota = fail_quota
+        self.delay = delay
+        self.log = log if log is not None else []
+        self.models = _Models(self)
+
+    def call(self, contents):
+        with self._lock:
+            self.tracker["active"] += 1
+            self.tracker["peak"] = max(self.tracker["peak"], self.tracker["active"])
+        try:
+            time.sleep(self.delay)
+            if self.fail_quota:
+                raise Exception("429 RESOURCE_EXHAUSTED: quota exceeded")
+            self.log.append((self.name, contents))
+            return f"{self.name}:{contents}"
+        finally:
+            with self._lock:
+                self.tracker["active"] -= 1
+
+def test_spread_and_in_flight_cap():
+    print("--- Testing Key Pool (Headroom / Concurrency Cap) ---")
+    tracker = {"active": 0, "peak": 0}
+    clients = [_Client(f"k{i}", delay=0.02, tracker=tracker) for i in (1, 2, 3)]
+    pool = AsyncClientPool(clients, rpm=60, tpm=100000, max_in_flight=2)
+    futures = [pool.generate("gemini-2.0-flash", f"prompt {i}") for i in range(9)]
+    results = [f.result(timeout=10) for f in futures]
+    assert len(results) == 9
+
+    served = [s.served for s in pool.slots]
+    assert served == [3, 3, 3], served
+    print(f"[PASS] Requests spread by headroom across keys: {served}")
+
+    stats = pool.stats()
+    assert stats["completed"] == 9 and stats["in_flight"] == 0
+    assert tracker["peak"] == 2, tracker
+    print("[PASS] In-flight cap respected, futures resolved.")
+
+def test_priority_order():
+    print("--- Testing Key Pool (Priority Queue) ---")
+    log = []
+    gate = threading.Event()
+    client = _Client("k1", log=log)
+    pool = AsyncClientPool([client], rpm=600, tpm=100000, max_in_flight=1)
+
+    # Occupy the only slot, then queue a Scribe log before a trade decision
+    blocker = pool.submit(lambda c: gate.wait(5), priority="trade")
+    time.sleep(0.05)
+    late_log = pool.generate("m", "scribe log", priority="log")
+    intel = pool.generate("m", "cortex intel", priority="intel")
+    trade = pool.generate("m", "judge trade", priority="trade")
+    time.sleep(0.05)
+    gate.set()
+    for f in (blocker, late_log, intel, trade):
+        f.result(timeout=10)
+    assert [c for _, c in log] == ["judge trade", "cortex intel", "scribe log"], log
+    print("[PASS] Trade decisions served before intel and Scribe logs.")
+
+def test_quota_failover_and_rate_limit():
+    print("--- Testing Key Pool (429 Failover / Token Bucket) ---")
+    bad, good = _Client("bad", fail_quota=True), _Client("good")
+    pool = AsyncClientPool([bad, good], rpm=600, tpm=100000, max_in_flight=4, cooldown=30)
+    results = [pool.generate("m", f"p{i}").result(timeout=10) for i in range(4)]
+    assert all(r.startswith("good:") for r in results), results
+    assert pool.slots[0].throttled == 1 and pool.stats()["requeued"] == 1
+    print("[PASS] 429 on one key cools it down and re-routes to the other.")
+
+    tiny = AsyncClientPool([_Client("solo")], rpm=120, tpm=100000)  # 2 requests/sec once the burst is spent
+    tiny.slots[0].requests.tokens = 0.0
+    start = time.monotonic()
+    tiny.generate("m", "wait for a token").result(timeout=10)
+    waited = time.monotonic() - start
+    assert 0.3 < waited < 2.0, waited
+    print(f"[PASS] Empty RPM bucket delays the request ({waited:.2f}s) instead of hitting a 429.")
+
+if __name__ == "__main__":
+    test_spread_and_in_flight_cap()
+    test_priority_order()
+    test_quota_failover_and_rate_limit()
@@ -0,0 +1,113 @@
+import os
+import time
+import tempfile
+import threading
+import knowledge_index
+from knowledge_index import KnowledgeIndex
+
+DOCS = {
+    "Risk_Management.md": "Always place a stop loss below support. Position sizing limits drawdown. " * 30,
+    "Momentum.txt": "Trend following buys breakouts above the moving average when momentum is strong. " * 30,
+    "news/NEWS_ET_RELIANCE.txt": "RELIANCE Industries shares rallied after refinery margins improved. " * 10,
+    "prices.csv": "Date,Close\n2026-01-01,100\n2026-01-02,101\n",
+}
+
+def _library():
+    root = tempfile.mkdtemp()
+    for rel, text in DOCS.items():
+        os.makedirs(os.path.dirname(os.path.join(root, rel)), exist_ok=True)
+        with open(os.path.join(root, rel), "w") as f:
+            f.write(text)
+    return root, KnowledgeIndex(root=root, index_dir=os.path.join(root, "_index"))
+
+def test_hybrid_ranking():
+    print("--- Testing Knowledge Index (BM25 + TF-IDF Retrieval) ---")
+    root, index = _library()
+    report = index.update()
+    assert sorted(report["added"]) == sorted(DOCS)
+    assert index.stats()["documents"] == len(DOCS)
+
+    hits = index.search("stop loss drawdown", k=3)
+    assert hits and hits[0]["source"] == "Risk_Management.md"
+    hits = index.search(knowledge_index.regime_query("TREND"), k=2)
+    assert hits[0]["source"] == "Momentum.txt"
+    hits = index.search("RELIANCE.NS refinery", k=1)
+    assert hits[0]["source"] == "news/NEWS_ET_RELIANCE.txt"
+    print("[PASS] Regime/symbol queries rank the relevant passages first (news folder included).")
+
+    text = index.passages("stop loss", k=5, max_chars=400)
+    assert text.startswith("[Risk_Management.md]") and len(text) < 2000
+    assert index.search("zzzunknownterm") == []
+    print("[PASS] Prompt block carries source labels and respects the size cap.")
+
+def test_incremental_update():
+    print("--- Testing Knowledge Index (Incremental Updates) ---")
+    root, index = _library()
+    index.update()
+    assert index.update() == {"added": [], "changed": [], "removed": []}
+
+    # Touched but identical: hashed, not re-extracted
+    path = os.path.join(root, "Momentum.txt")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    assert index.update() == {"added": [], "changed": [], "removed": []}
+
+    with open(path, "w") as f:
+        f.write("Mean reversion fades oversold oscillators in a sideways range. " * 20)
+    os.remove(os.path.join(root, "prices.csv"))
+    report = index.update()
+    assert report["changed"] == ["Momentum.txt"] and report["removed"] == ["prices.csv"]
+    assert index.search("oversold oscillators", k=1)[0]["source"] == "Momentum.txt"
+    assert not index.search("breakouts moving average")
+    print("[PASS] Only the edited file is re-indexed; deleted files drop out.")
+
+    reopened = KnowledgeIndex(root=root, index_dir=index.index_dir)
+    assert reopened.update() == {"added": [], "changed": [], "removed": []}
+    assert reopened.stats() == index.stats()
+    print("[PASS] A new process reuses the on-disk index without re-extracting.")
+
+def test_background_build_and_snapshots():
+    print("--- Testing Knowledge Index (Background Build / Immutable Snapshots) ---")
+    root, index = _library()
+    gate, inside = threading.Event(), threading.Event()
+    build = index._build
+    def slow_build():
+        inside.set()
+        gate.wait(5)
+        return build()
+    index._build = slow_build
+    previous = knowledge_index._index
+    knowledge_index._index = index
+    try:
+        start = time.time()
+        assert knowledge_index.retrieve("stop loss") == "", "no inline build on the hot path"
+        assert inside.wait(5) and time.time() - start < 1.0 and not index.ready()
+        gate.set()
+        deadline = time.time() + 10
+        while not index.ready() and time.time() < deadline:
+            time.sleep(0.01)
+        assert knowledge_index.retrieve("stop loss").startswith("[Risk_Management.md]")
+        print("[PASS] First retrieve() starts a background build and returns at once.")
+
+        # A rebuild in flight: searches keep reading the published corpus, never a mix
+        old = index._corpus
+        with open(os.path.join(root, "Momentum.txt"), "w") as f:
+            f.write("Mean reversion fades oversold oscillators in a sideways range. " * 20)
+        gate.clear()
+        inside.clear()
+        index._scanned = 0.0
+        index.refresh(background=True)
+        assert inside.wait(5)
+        assert index._corpus is old and index.search("breakouts moving average", k=1)[0]["source"] == "Momentum.txt"
+        gate.set()
+        while index._corpus is old and time.time() < deadline:
+            time.sleep(0.01)
+        assert index._corpus is not old and not index.search("breakouts moving average")
+        print("[PASS] Rebuilds publish a new corpus in one assignment; readers never block.")
+    finally:
+        gate.set()
+        knowledge_index._index = previous
+
+if __name__ == "__main__":
+    test_hybrid_ranking()
+    test_incremental_update()
+    test_background_build_and_snapshots()
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta
+import librarian
+
+class _Remote:
+    def __init__(self, name, display_name):
+        self.name = name
+        self.uri = f"https://generativelanguage.googleapis.com/v1beta/{name}"
+        self.mime_type = "text/plain"
+        self.display_name = display_name
+        self.state = "ACTIVE"
+        self.expiration_time = datetime.now() + timedelta(hours=48)
+
+class _Files:
+    """Fake client.files: counts network calls and tracks how many run at once."""
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.gets, self.uploads = [], []
+        self.active = self.peak = 0
+        self.remote = {}
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+
+    def upload(self, file, config):
+        self._enter()
+        with self._lock:
+            name = f"files/{len(self.remote)}"
+            self.uploads.append(config['display_name'])
+            self.remote[name] = _Remote(name, config['display_name'])
+        return self.remote[name]
+
+    def get(self, name):
+        self._enter()
+        self.gets.append(name)
+        return self.remote[name]
+
+class _Client:
+    def __init__(self):
+        self.files = _Files()
+
+def _vault(n=6):
+    root = tempfile.mkdtemp()
+    for i in range(n):
+        with open(os.path.join(root, f"Risk_Paper_{i}.txt"), "w") as f:
+            f.write(f"paper {i}")
+    librarian.KNOWLEDGE_DIR = root
+    librarian.LIBRARY_CARD = os.path.join(root, "library_card.json")
+    librarian.api_key = "test-key"
+    librarian.client = _Client()
+    return root, librarian.client.files
+
+def test_card_skips_remote_checks():
+    print("--- Testing Librarian (Library Card Expiry Cache) ---")
+    root, files = _vault()
+    first = librarian.get_knowledge_base()
+    assert len(first) == 6 and len(files.uploads) == 6
+    assert files.peak > 1, "uploads should run concurrently"
+    print(f"[PASS] Cold start: 6 uploads, {files.peak} in flight at once.")
+
+    files.gets.clear()
+    files.uploads.clear()
+    again = librarian.get_knowledge_base(regime="CRASH")
+    assert len(again) == 6 and files.gets == [] and files.uploads == []
+    assert [f.display_name for f in again] == [f.display_name for f in first]
+    assert again[0].name == first[0].name
+    print("[PASS] Steady state: zero network calls, same File references.")
+
+    # Edited file -> re-upload only that one; expiring file -> remote check only for it
+    with open(os.path.join(root, "Risk_Paper_2.txt"), "w") as f:
+        f.write("paper 2, second edition")
+    with open(librarian.LIBRARY_CARD) as f:
+        card = json.load(f)
+    card["Risk_Paper_4.txt"]["expires"] = time.time() + 60
+    with open(librarian.LIBRARY_CARD, "w") as f:
+        json.dump(card, f)
+
+    librarian.get_knowledge_base()
+    assert files.uploads == ["Risk_Paper_2.txt"], files.uploads
+    assert files.gets == [card["Risk_Paper_4.txt"]["uri"]], files.gets
+    print("[PASS] Only the edited and the near-expiry papers touched the network.")
+
+def test_touched_file_is_not_reuploaded():
+    print("--- Testing Librarian (Touched but Unchanged) ---")
+    root, files = _vault(n=2)
+    librarian.get_knowledge_base()
+    files.uploads.clear()
+    path = os.path.join(root, "Risk_Paper_0.txt")
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    assert len(librarian.get_knowledge_base()) == 2 and files.uploads == [] and files.gets == []
+    print("[PASS] Same content hash: no re-upload after a timestamp change.")
+
+if __name__ == "__main__":
+    test_card_skips_remote_checks()
+    test_touched_file_is_not_reuploaded()
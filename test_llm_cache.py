@@ -0,0 +1,77 @@
+import os
+import tempfile
+import llm_cache
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+class _File:
+    def __init__(self, name):
+        self.name = name
+
+def _cache(**kwargs):
+    return llm_cache.LLMCache(path=os.path.join(tempfile.mkdtemp(), "llm.db"), **kwargs)
+
+def test_hits_misses_and_persistence():
+    print("--- Testing LLM Cache (Keying / Persistence / Metrics) ---")
+    cache = _cache()
+    calls = []
+    def call():
+        calls.append(1)
+        return _Response("YES. Trend intact.")
+
+    books = [_File("files/abc123"), _File("files/def456")]
+    first = cache.generate("oracle.scholar", "gemini-2.0-flash", books + ["Price 1523.45, RSI 43.17"], call)
+    again = cache.generate("oracle.scholar", "gemini-2.0-flash", books + ["Price  1523.47,  RSI 43.21"], call)
+    assert len(calls) == 1 and again.text == first.text and again.cached
+    print("[PASS] Near-identical Scholar prompt served from cache.")
+
+    # Decimal places, not significant digits: prices ten rupees apart never share an answer
+    assert llm_cache.normalize_prompt("Price 1523.45, P/E 23.45, Vol 0.0123", 1) == "Price 1523.5, P/E 23.4, Vol 0.012"
+    assert llm_cache.normalize_prompt("Price 1533.45", 1) != llm_cache.normalize_prompt("Price 1523.45", 1)
+    print("[PASS] Numbers rounded to decimal places; small ratios keep their leading digits.")
+
+    cache.generate("oracle.scholar", "gemini-2.0-flash", [_File("files/zzz")] + ["Price 1523.45, RSI 43.17"], call)
+    cache.generate("oracle.scholar", "gemini-1.5-pro", books + ["Price 1523.45, RSI 43.17"], call)
+    assert len(calls) == 3, "different files or model must miss"
+    stats = cache.stats()["oracle.scholar"]
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    print("[PASS] File IDs and model are part of the key; metrics counted.")
+
+    reopened = llm_cache.LLMCache(path=cache.path)
+    hit = reopened.generate("oracle.scholar", "gemini-2.0-flash", books + ["Price 1523.45, RSI 43.17"], call)
+    assert len(calls) == 3 and hit.text == "YES. Trend intact."
+    print("[PASS] Cache survives a restart (disk persistence).")
+
+def test_ttl_and_lru():
+    print("--- Testing TTL Expiry and LRU Eviction ---")
+    cache = _cache(max_entries=3, memory_entries=2)
+    cache.put("a", "A", "default", "m", ttl=-1)
+    assert cache.get("a") is None
+    print("[PASS] Expired entries are not served.")
+
+    for i, key in enumerate("bcdef"):
+        cache.put(key, key.upper(), "default", "m", ttl=60, now=1e12 + i)
+    cache.get("b", now=1e12 + 10)  # 'b' becomes most recently used
+    cache._evict(now=1e12 + 11)
+    kept = {row[0] for row in cache._db.execute("SELECT key FROM responses")}
+    assert kept == {"b", "e", "f"}, kept
+    print("[PASS] Least recently used entries evicted beyond max_entries.")
+
+def test_errors_are_not_cached():
+    cache = _cache()
+    def failing():
+        raise RuntimeError("429 quota")
+    try:
+        cache.generate("council.judge", "gemini-2.0-flash", "prompt", failing)
+        assert False
+    except RuntimeError:
+        pass
+    assert cache.generate("council.judge", "gemini-2.0-flash", "prompt", lambda: _Response("ok")).text == "ok"
+    print("[PASS] Failed calls propagate and are not cached.")
+
+if __name__ == "__main__":
+    test_hits_misses_and_persistence()
+    test_ttl_and_lru()
+    test_errors_are_not_cached()
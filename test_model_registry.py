@@ -0,0 +1,57 @@
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+import model_registry as mr
+
+FEATURES = ['RSI', 'Trend_Signal', 'Volatility', 'SMA_50', 'SMA_200']
+
+def _model(seed):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(400, 5)), columns=FEATURES)
+    return RandomForestClassifier(n_estimators=15, random_state=seed).fit(X, (X['RSI'] + rng.normal(0, 0.5, 400) > 0).astype(int))
+
+def test_register_and_promote():
+    print("--- Testing Model Registry (Versions / Metadata / Promotion) ---")
+    registry = mr.ModelRegistry(tempfile.mkdtemp())
+    v1 = registry.register("rf", _model(1), {"feature_version": "v2", "metrics": {"accuracy": 0.55},
+                                             "training_window": {"start": "2015-01-01", "end": "2023-12-29"}})
+    v2 = registry.register("rf", _model(2), {"feature_version": "v2"}, promote=False)
+    assert (v1, v2) == ("v0001", "v0002")
+    assert registry.versions("rf") == ["v0001", "v0002"] and registry.current_version("rf") == "v0001"
+
+    loaded = registry.load("rf")
+    assert loaded.meta["metrics"]["accuracy"] == 0.55 and loaded.meta["compiled"]
+    base = loaded.scorer.leaf
+    while base.base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap), "compiled scorer should be backed by the mmapped file"
+    assert loaded._model is None, "sklearn pickle must not be opened until asked for"
+
+    X = pd.DataFrame(np.random.default_rng(0).normal(size=(50, 5)), columns=FEATURES)
+    assert np.array_equal(loaded.scorer.predict_proba(X), loaded.model.predict_proba(X))
+    print("[PASS] Versions are immutable, metadata is stored, scorer is memory-mapped and lazy.")
+
+    registry.promote("rf", "v0002")
+    assert registry.load("rf").version == "v0002"
+    print("[PASS] Promotion moves the CURRENT pointer.")
+
+def test_hot_swap():
+    print("--- Testing LiveModel Hot Swap ---")
+    registry = mr.ModelRegistry(tempfile.mkdtemp())
+    registry.register("rf", _model(1), {"feature_version": "v2"})
+    live = mr.LiveModel("rf", registry=registry, poll_seconds=0)
+    before = live.current()
+    assert before.version == "v0001"
+
+    registry.register("rf", _model(3), {"feature_version": "v2"})  # Nightly retrain promotes v0002
+    snapshot = live.current()  # Never blocks: may still be v0001 while v0002 loads
+    assert snapshot.version in ("v0001", "v0002")
+    assert live.wait_for("v0002")
+    assert live.current().version == "v0002"
+    assert before.scorer.predict_proba([0.1] * 5).shape == (1, 2), "old snapshot stays usable"
+    print("[PASS] Newly promoted version swapped in without restarting.")
+
+if __name__ == "__main__":
+    test_register_and_promote()
+    test_hot_swap()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+import forest_compiler
+from oracle import Oracle
+from feature_pipeline import FEATURE_COLUMNS
+
+def _frames(n_symbols=12, bars=400, seed=5):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2026-10-16 09:15", periods=bars, freq="1min", tz="Asia/Kolkata")
+    frames = {}
+    for i in range(n_symbols):
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+        frames[f"SYM{i}.NS"] = pd.DataFrame({"Open": close, "High": close * 1.001, "Low": close * 0.999,
+                                             "Close": close, "Volume": 100}, index=index)
+    return frames
+
+def test_batch_matches_per_symbol_inference():
+    print("--- Testing Oracle.analyze_batch (One predict_proba per Patrol) ---")
+    rng = np.random.default_rng(1)
+    oracle = Oracle()
+    X = pd.DataFrame(rng.normal(size=(300, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    oracle.model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, (X['RSI'] > 0).astype(int))
+    oracle.scorer = None
+    # Scholar check is an LLM call; replace it with the RF decision alone
+    oracle._verdict = lambda symbol, price, row, prediction, confidence: {
+        "signal": "BUY" if prediction == 1 else "HOLD", "confidence": confidence, "reason": "RF", "price": price}
+
+    calls = []
+    proba = oracle.model.predict_proba
+    oracle.model.predict_proba = lambda X: calls.append(len(X)) or proba(X)
+
+    frames = _frames()
+    results = oracle.analyze_batch(list(frames) + ["EMPTY.NS"], frames=frames)
+    assert calls == [len(frames)], f"expected one model call, got {calls}"
+    assert results["EMPTY.NS"]["reason"] == "No Data"
+    print("[PASS] Whole watchlist scored with a single predict_proba call.")
+
+    for symbol, data in frames.items():
+        X_live = pd.DataFrame([oracle.indicators.ingest(symbol, data)])[FEATURE_COLUMNS]
+        prediction = oracle.model.predict(X_live)[0]
+        probabilities = proba(X_live)[0]
+        confidence = float(probabilities[1] if prediction == 1 else probabilities[0])
+        assert results[symbol]["confidence"] == confidence
+        assert (results[symbol]["signal"] == "BUY") == (prediction == 1)
+    print("[PASS] Batched predictions/confidences equal per-symbol predict + predict_proba.")
+
+    oracle.scorer = forest_compiler.compile_forest(oracle.model)
+    calls.clear()
+    compiled = oracle.analyze_batch(list(frames), frames=frames)
+    assert calls == [], "compiled scorer must not call sklearn"
+    for symbol in frames:
+        assert compiled[symbol] == results[symbol]
+    print("[PASS] Compiled forest scorer gives identical patrol results.")
+
+if __name__ == "__main__":
+    test_batch_matches_per_symbol_inference()
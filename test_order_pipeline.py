@@ -0,0 +1,74 @@
+import time
+import asyncio
+import threading
+from order_pipeline import OrderPipeline
+
+class _SlowBroker:
+    """Blocking place_order with a fixed round-trip; records execution order and overlap."""
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.log = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def place_order(self, symbol, quantity, action, price):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.log.append((symbol, action, quantity))
+        if quantity <= 0:
+            raise ValueError("bad quantity")
+        return {"status": "success", "order_id": f"ORD-{symbol}-{len(self.log)}"}
+
+def test_pipelined_submissions():
+    print("--- Testing Order Pipeline (Pipelining / Per-Symbol Order) ---")
+    broker = _SlowBroker(delay=0.2)
+    fills = []
+
+    async def scenario():
+        pipeline = OrderPipeline(broker, on_fill=lambda order, result: fills.append((order.symbol, order.action)),
+                                 max_concurrent=4)
+        start = time.perf_counter()
+        futures = [pipeline.submit(sym, "BUY", 1, 100.0) for sym in ["SBIN", "TCS", "INFY", "HDFC"]]
+        submit_ms = (time.perf_counter() - start) * 1000
+        futures += [pipeline.submit("SBIN", "SELL", 1, 101.0), pipeline.submit("SBIN", "BUY", 2, 99.0)]
+        results = await asyncio.gather(*futures)
+        elapsed = time.perf_counter() - start
+        await pipeline.stop()
+        return pipeline, results, submit_ms, elapsed
+
+    pipeline, results, submit_ms, elapsed = asyncio.run(scenario())
+    assert all(r["status"] == "success" for r in results)
+    assert submit_ms < 50, "submit must not wait for the broker"
+    assert broker.peak == 4 and elapsed < 0.2 * 6 * 0.75, (broker.peak, elapsed)
+    print(f"[PASS] 6 orders in {elapsed:.2f}s (serial would be 1.2s); submit took {submit_ms:.1f} ms.")
+
+    sbin = [(a, q) for s, a, q in broker.log if s == "SBIN"]
+    assert sbin == [("BUY", 1), ("SELL", 1), ("BUY", 2)], sbin
+    assert len(fills) == 6 and pipeline.stats["filled"] == 6 and pipeline.pending() == 0
+    print("[PASS] SBIN orders executed in submission order; a callback ran for every fill.")
+
+def test_broker_errors_are_reported():
+    print("--- Testing Order Pipeline (Broker Errors) ---")
+    broker = _SlowBroker(delay=0.01)
+    seen = []
+
+    async def scenario():
+        pipeline = OrderPipeline(broker, on_fill=lambda order, result: seen.append(result["status"]))
+        bad = pipeline.submit("SBIN", "BUY", 0, 100.0)
+        good = pipeline.submit("SBIN", "BUY", 1, 100.0)
+        results = await bad, await good
+        await pipeline.stop()
+        return results + (pipeline,)
+
+    bad, good, pipeline = asyncio.run(scenario())
+    assert bad["status"] == "failure" and "bad quantity" in bad["message"] and good["status"] == "success"
+    assert seen == ["failure", "success"] and pipeline.stats["errors"] == 1
+    print("[PASS] A broker exception becomes a failure result; later orders on the symbol still run.")
+
+if __name__ == "__main__":
+    test_pipelined_submissions()
+    test_broker_errors_are_reported()
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from screener import Panel, Screener, compute_indicators
+
+def _frames():
+    rng = np.random.default_rng(3)
+    frames = {}
+    for i, n in enumerate([300, 220, 150, 260]):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        index = pd.date_range(end="2026-10-16", periods=n, freq="B")
+        frames[f"SYM{i}.NS"] = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0}, index=index)
+    return frames
+
+def test_panel_matches_per_symbol_pandas():
+    print("--- Testing Vectorized Screener vs Per-Symbol Pandas ---")
+    frames = _frames()
+    panel = Panel.from_frames(frames)
+    ind = compute_indicators(panel)
+
+    for i, sym in enumerate(panel.symbols):
+        close = frames[sym]["Close"].iloc[-260:]
+        delta = close.diff()
+        gain = delta.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+        loss = delta.clip(upper=0).abs().ewm(alpha=1 / 14, min_periods=14).mean()
+        want_rsi = (100 * gain / (gain + loss)).iloc[-1]
+        want_sma = close.rolling(200).mean().iloc[-1]
+
+        assert abs(ind["rsi"][i] - want_rsi) < 1e-9, f"{sym} RSI mismatch"
+        if np.isnan(want_sma):
+            assert np.isnan(ind["sma200"][i]), f"{sym} should not have an SMA200 yet"
+        else:
+            assert abs(ind["sma200"][i] - want_sma) < 1e-9, f"{sym} SMA200 mismatch"
+    print("[PASS] Panel indicators match per-symbol pandas (including short histories).")
+
+def test_rules_are_masks():
+    print("--- Testing Rule Masks -> Candidate Table ---")
+    panel = Panel.from_frames(_frames())
+    table = Screener(rules=lambda ind: {"all": np.ones(len(ind["price"]), dtype=bool)}).run(panel)
+    assert list(table["symbol"]) == panel.symbols
+    assert set(table.columns) == {"symbol", "price", "rsi", "sma200", "bars", "timestamp"}
+
+    table = Screener().run(panel)
+    assert (table["bars"] >= 200).all() and (table["price"] > table["sma200"]).all()
+    print(f"[PASS] Candidate table is compact ({len(table)} matches).")
+
+if __name__ == "__main__":
+    test_panel_matches_per_symbol_pandas()
+    test_rules_are_masks()
@@ -0,0 +1,114 @@
+import os
+import json
+import tempfile
+import multiprocessing
+import state_store
+from state_store import StateFile, VersionConflict
+
+def _bump(path, n):
+    state = StateFile(path)
+    for _ in range(n):
+        state.update(lambda data: data.update(count=data.get("count", 0) + 1))
+
+def _rewrite(path, n):
+    state = StateFile(path)
+    for i in range(n):
+        state.write({"i": i, "payload": ["x" * 100] * 500})
+
+def test_no_lost_updates_across_processes():
+    print("--- Testing State Store (Cross-Process Writers) ---")
+    path = os.path.join(tempfile.mkdtemp(), "bot_brain.json")
+    workers = [multiprocessing.Process(target=_bump, args=(path, 50)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert StateFile(path).read()["count"] == 200
+    print("[PASS] 4 processes x 50 locked read-modify-writes: no update lost.")
+
+    writer = multiprocessing.Process(target=_rewrite, args=(path, 200))
+    writer.start()
+    reads = 0
+    while writer.is_alive() or reads == 0:
+        with open(path) as f:
+            data = json.load(f)  # Plain reader: must never hit a half-written file
+        assert "count" in data or len(data["payload"]) == 500
+        reads += 1
+    writer.join()
+    assert not [f for f in os.listdir(os.path.dirname(path)) if f.endswith(".tmp")]
+    print(f"[PASS] {reads} unlocked reads during 200 rewrites: always a complete document.")
+
+def test_optimistic_versions():
+    print("--- Testing State Store (Optimistic Versions) ---")
+    path = os.path.join(tempfile.mkdtemp(), "world_view.json")
+    state = StateFile(path)
+    assert state.read_versioned() == ({}, None)
+    v1 = state.write({"regime": "BULL"}, expected_version=None)
+    data, version = state.read_versioned()
+    assert version == v1 and data == {"regime": "BULL"}
+    state.write({"regime": "CRASH"}, expected_version=version)
+    try:
+        state.write({"regime": "SIDEWAYS"}, expected_version=version)
+        raise AssertionError("stale write accepted")
+    except VersionConflict:
+        pass
+    assert state.read()["regime"] == "CRASH"
+    state.update(lambda data: data.update(vix=14.2))
+    try:
+        state.write({"regime": "SIDEWAYS"}, expected_version=version)
+        raise AssertionError("stale write accepted after update()")
+    except VersionConflict:
+        pass
+    print("[PASS] Stale version rejected instead of overwriting a newer commit.")
+
+def test_merge_and_trade_lists():
+    print("--- Testing State Store (Merge / Concurrent Trade Lists) ---")
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        import trade_ledger
+        import trade_store
+        from memory_manager import MemoryManager
+        os.makedirs("memories")
+        state_store.get_state_file(trade_ledger.MEMORY_PATH).write({"mood": "Conservative", "wallet_balance": 1.0})
+        mm = MemoryManager(store=trade_store.TradeStore(auto_migrate=False))
+        # Another process (ledger snapshot) commits the wallet after the manager loaded the brain
+        state_store.get_state_file(trade_ledger.MEMORY_PATH).update(lambda b: b.update(wallet_balance=99.0))
+        mm.memory["mood"] = "Aggressive"
+        mm.save_memory()
+        brain = StateFile(os.path.abspath(trade_ledger.MEMORY_PATH)).read()
+        assert brain == {"mood": "Aggressive", "wallet_balance": 99.0}, brain
+        assert mm.memory["wallet_balance"] == 99.0
+        print("[PASS] MemoryManager saves only its own changes; the ledger's wallet survives.")
+
+        # Nobody wrote since the last save: committed at the version it holds, then stale for others
+        stale = MemoryManager(store=trade_store.TradeStore(auto_migrate=False))
+        mm.memory["mood"] = "Conservative"
+        mm.save_memory()
+        assert mm._version == state_store.get_state_file(trade_ledger.MEMORY_PATH).version()
+        stale.memory["karma_score"] = 42.0
+        stale.save_memory()
+        brain = StateFile(os.path.abspath(trade_ledger.MEMORY_PATH)).read()
+        assert brain["mood"] == "Conservative" and brain["karma_score"] == 42.0, brain
+        print("[PASS] A stale MemoryManager conflicts and merges instead of overwriting.")
+
+        # Two managers (sentinel + dashboard) loaded the same brain: neither may drop the other's trades
+        store = trade_store.TradeStore(auto_migrate=False)
+        first, second = MemoryManager(store=store), MemoryManager(store=store)
+        first.log_trade({"symbol": "SBIN.NS", "price": 100.0})
+        second.log_trade({"symbol": "TCS.NS", "price": 200.0})
+        first.resolve_active_trades({"SBIN.NS": 106.0})     # Loaded before TCS was logged
+        brain = StateFile(os.path.abspath(trade_ledger.MEMORY_PATH)).read()
+        assert [t["symbol"] for t in brain["active_trades"]] == ["TCS.NS"], brain["active_trades"]
+        assert [(t["symbol"], t["result"]) for t in brain["past_trades"]] == [("SBIN.NS", "WIN")]
+        assert brain["karma_score"] == 100.0 and brain["wallet_balance"] == 99.0
+        second.update_heartbeat()
+        assert StateFile(os.path.abspath(trade_ledger.MEMORY_PATH)).read()["past_trades"] == brain["past_trades"]
+        print("[PASS] Trade appends and resolutions apply to the latest brain: no trade lost.")
+    finally:
+        os.chdir(cwd)
+
+if __name__ == "__main__":
+    test_no_lost_updates_across_processes()
+    test_optimistic_versions()
+    test_merge_and_trade_lists()
@@ -0,0 +1,118 @@
+import os
+import time
+import asyncio
+import tempfile
+import threading
+import config
+import trade_store
+from risk_manager import RiskManager
+from swarm_engine import HiveMind
+
+class _PaperBroker:
+    """MockDhanClient's race in miniature: read the balance, pause, then book the debit."""
+    def __init__(self, balance, delay=0.1):
+        self.balance = balance
+        self.delay = delay
+        self.lowest = balance
+        self._lock = threading.Lock()
+
+    def get_fund_balance(self):
+        return self.balance
+
+    def place_order(self, symbol, quantity, action, price):
+        cost = quantity * price
+        if self.balance < cost:
+            return {"status": "failure", "message": "Insufficient Funds"}
+        time.sleep(self.delay)
+        with self._lock:
+            self.balance -= cost
+            self.lowest = min(self.lowest, self.balance)
+        return {"status": "success", "order_id": f"ORD-{symbol}"}
+
+class _HoldingBroker(_PaperBroker):
+    """Paper broker that also reports the bot's holdings (the SELL portfolio check)."""
+    def __init__(self, holdings):
+        super().__init__(balance=0.0, delay=0.0)
+        self.holdings = holdings
+        self.sold = []
+
+    def get_portfolio(self, origin=None):
+        return dict(self.holdings)
+
+    def place_order(self, symbol, quantity, action, price):
+        self.sold.append((symbol, quantity, action))
+        return {"status": "success", "order_id": f"ORD-{symbol}", "realized_pnl": 12.5}
+
+def _hive(balance, delay=0.1):
+    store = trade_store.TradeStore(os.path.join(tempfile.mkdtemp(), "risk.db"), auto_migrate=False)
+    return HiveMind(broker=_PaperBroker(balance, delay), risk_manager=RiskManager(store=store))
+
+def test_reservations_cover_orders_in_flight():
+    print("--- Testing HiveMind (Cash Reserved for Orders in Flight) ---")
+    price = 100.0
+    full = int(config.MAX_TRADE_AMOUNT // price)    # Shares per full-size order
+    hive = _hive(balance=2.5 * full * price)
+
+    async def scenario():
+        conf = config.MIN_CONFIDENCE + 0.1
+        futures = [await hive.request_action(f"SYM{i}.NS", "BUY", conf, price, {}) for i in range(4)]
+        during = (hive.in_flight(), hive.reserved_cash)
+        results = await asyncio.gather(*[f for f in futures if f is not None])
+        await hive.settle()
+        return futures, results, during
+
+    futures, results, (in_flight, reserved) = asyncio.run(scenario())
+    # Full, full, the half-size remainder, then nothing left to promise
+    assert [f is not None for f in futures] == [True, True, True, False]
+    assert in_flight == 3 and reserved == 2.5 * full * price
+    assert all(r["status"] == "success" for r in results)
+    assert hive.broker.lowest >= 0, "wallet overdrawn by concurrent orders"
+    assert hive.reserved_cash == 0 and hive.pending == {}
+    assert hive.risk_manager.stats["trade_count"] == 3, "every fill booked in the scoreboard"
+    print("[PASS] 4 concurrent BUYs on 2.5 orders of cash: 3 sent (last one sized down), wallet never negative.")
+
+def test_in_flight_orders_count_in_risk_gate():
+    print("--- Testing HiveMind (Daily Trade Cap Counts Orders in Flight) ---")
+    hive = _hive(balance=10 ** 9, delay=0.2)
+    hive.risk_manager.stats["trade_count"] = config.MAX_TRADES_PER_DAY - 2
+    booked_on_loop = []
+
+    async def scenario():
+        conf = config.MIN_CONFIDENCE + 0.1
+        sent = [await hive.request_action(f"SYM{i}.NS", "BUY", conf, 100.0, {}) for i in range(4)]
+        # The scoreboard write runs in a worker thread: the loop keeps ticking meanwhile
+        update = hive.risk_manager.update_pnl
+        hive.risk_manager.update_pnl = lambda amount: booked_on_loop.append(
+            threading.current_thread() is threading.main_thread()) or update(amount)
+        await hive.settle()
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert [f is not None for f in sent] == [True, True, False, False], "cap reached by orders still in flight"
+    assert hive.risk_manager.stats["trade_count"] == config.MAX_TRADES_PER_DAY
+    assert booked_on_loop == [False, False], "update_pnl must run off the event loop"
+    print("[PASS] In-flight orders fill the daily cap; fills are booked from a worker thread.")
+
+def test_sell_closes_holdings_only():
+    print("--- Testing HiveMind (SELL Portfolio Check) ---")
+    store = trade_store.TradeStore(os.path.join(tempfile.mkdtemp(), "risk.db"), auto_migrate=False)
+    hive = HiveMind(broker=_HoldingBroker({"SBIN.NS": 7}), risk_manager=RiskManager(store=store))
+    blind = _hive(balance=10 ** 6)
+
+    async def scenario():
+        conf = config.MIN_CONFIDENCE + 0.1
+        sent = [await hive.request_action(s, "SELL", conf, 100.0, {}) for s in ("SBIN.NS", "TCS.NS")]
+        assert hive.reserved_cash == 0, "SELLs reserve no cash"
+        await hive.settle()
+        return sent, await blind.request_action("SBIN.NS", "SELL", conf, 100.0, {})
+
+    (held, not_held), unknown = asyncio.run(scenario())
+    assert held is not None and not_held is None and unknown is None
+    assert hive.broker.sold == [("SBIN.NS", 7, "SELL")] and hive.pending == {}
+    assert hive.risk_manager.stats["trade_count"] == 1
+    print("[PASS] SELL closes the whole holding; nothing held (or no holdings reported) -> skipped.")
+
+if __name__ == "__main__":
+    test_reservations_cover_orders_in_flight()
+    test_in_flight_orders_count_in_risk_gate()
+    test_sell_closes_holdings_only()
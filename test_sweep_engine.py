@@ -0,0 +1,96 @@
+import time
+import numpy as np
+import pandas as pd
+import sweep_engine
+from sweep_engine import SweepData, run_sweep, expand_grid
+
+def _frames(n_symbols=4, bars=600, seed=11):
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for i in range(n_symbols):
+        n = bars - bars // (2 * n_symbols) * i      # Later listings: shorter histories on the shared calendar
+        index = pd.bdate_range(end="2026-10-16", periods=n)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, n)))
+        opens = close * np.exp(rng.normal(0, 0.005, n))
+        frames[f"SYM{i}.NS"] = pd.DataFrame({
+            "Open": opens, "High": np.maximum(opens, close) * (1 + rng.uniform(0, 0.02, n)),
+            "Low": np.minimum(opens, close) * (1 - rng.uniform(0, 0.02, n)), "Close": close,
+            "Volume": 1e5}, index=index)
+    return frames
+
+def _reference(df, p, rsi, cost=sweep_engine.COST_PER_SIDE):
+    """Plain per-bar loop over one symbol and one param set (the behaviour the tensors must match)."""
+    close = df["Close"]
+    fast = close if p.sma_fast == 1 else close.rolling(int(p.sma_fast)).mean()
+    slow = close.rolling(int(p.sma_slow)).mean()
+    held, entry, trades, wins, rets = False, None, 0, 0, [0.0]
+    for t in range(1, len(df)):
+        o, h, l, c, pc = df["Open"].iloc[t], df["High"].iloc[t], df["Low"].iloc[t], close.iloc[t], close.iloc[t - 1]
+        r, basis, exit_px = 0.0, pc, None
+        if held and fast.iloc[t - 1] <= slow.iloc[t - 1]:
+            exit_px = o
+        elif not held and fast.iloc[t - 1] > slow.iloc[t - 1] and p.rsi_low <= rsi[t - 1] <= p.rsi_high:
+            held, entry, basis, r = True, o, o, -cost
+        if held and exit_px is None:
+            if p.stop_pct > 0 and l <= entry * (1 - p.stop_pct):
+                exit_px = min(o, entry * (1 - p.stop_pct))
+            elif p.target_pct > 0 and h >= entry * (1 + p.target_pct):
+                exit_px = max(o, entry * (1 + p.target_pct))
+        if held:
+            r += (exit_px if exit_px is not None else c) / basis - 1
+        if exit_px is not None:
+            r -= cost
+            trades += 1
+            wins += exit_px / entry - 1 - 2 * cost > 0
+            held = False
+        rets.append(r)
+    return np.prod(1 + np.array(rets)) - 1, trades, wins
+
+def test_tensor_sweep_matches_reference_loop():
+    print("--- Testing Sweep Engine (Tensors vs Per-Symbol Loop) ---")
+    frames = _frames(n_symbols=2, bars=400)
+    grid = {"sma_fast": [1, 10], "sma_slow": [30, 60], "rsi_low": [0, 40], "rsi_high": [60, 100],
+            "stop_pct": [0.0, 0.03], "target_pct": [0.0, 0.06]}
+    table = run_sweep(frames, grid, per_symbol=True)
+    assert len(table) == len(expand_grid(grid)) * 2 == 128
+
+    data = SweepData(frames)
+    for _, row in table.sample(24, random_state=0).iterrows():
+        df = frames[row.symbol]
+        rsi = pd.Series(data.rsi[data.symbols.index(row.symbol)], index=data.index).reindex(df.index).to_numpy()
+        roi, trades, wins = _reference(df, row, rsi)
+        assert abs(row.roi_pct - roi * 100) < 1e-6, (row.to_dict(), roi)
+        assert row.trades == trades and abs(row.win_rate_pct - (wins / trades * 100 if trades else 0)) < 1e-9
+    print("[PASS] ROI, trades and win rate match a bar-by-bar loop (stops, targets, signal exits).")
+
+def test_chunking_ranking_and_gates():
+    print("--- Testing Sweep Engine (Chunks / Ranking / Confidence Gate) ---")
+    frames = _frames()
+    grid = {"sma_fast": [1, 20], "sma_slow": [50, 200], "min_confidence": [0.0, 0.6, 1.01]}
+    whole = run_sweep(frames, grid)
+    per_param = 4 * 600 * 8 * sweep_engine.TENSORS_PER_PARAM
+    chunked = run_sweep(frames, grid, chunk_bytes=7 * per_param)       # 7 param sets per chunk
+    pd.testing.assert_frame_equal(whole, chunked)
+    assert whole["sharpe"].is_monotonic_decreasing
+    assert set(sweep_engine.METRICS) <= set(whole.columns)
+    print(f"[PASS] {len(whole)} param sets: identical results in 1 chunk or 7-param chunks; ranked by Sharpe.")
+
+    # Confidence gate: a constant 0.7 probability passes 0.6 and blocks everything at 1.01
+    confidence = {s: pd.Series(0.7, index=df.index) for s, df in frames.items()}
+    gated = run_sweep(frames, grid, confidence=confidence)
+    assert (gated[gated.min_confidence > 1]["trades"] == 0).all()
+    assert (gated[gated.min_confidence > 1]["exposure_pct"] == 0).all()
+    loose = gated[gated.min_confidence == 0.6].drop(columns="min_confidence").set_index(["sma_fast", "sma_slow", "rsi_low", "rsi_high", "stop_pct", "target_pct"])
+    free = whole[whole.min_confidence == 0.0].drop(columns="min_confidence").set_index(loose.index.names)
+    pd.testing.assert_frame_equal(loose.sort_index(), free.sort_index())
+    print("[PASS] min_confidence gates entries on the supplied brain probabilities.")
+
+    # Throughput: the default grid on a Nifty-100-sized universe, 4 years of daily bars
+    big = _frames(n_symbols=100, bars=1000, seed=3)
+    started = time.time()
+    table = run_sweep(big)
+    print(f"[PASS] {len(table)} param sets x 100 symbols x 1000 bars in {time.time() - started:.1f}s.")
+
+if __name__ == "__main__":
+    test_tensor_sweep_matches_reference_loop()
+    test_chunking_ranking_and_gates()
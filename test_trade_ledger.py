@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import trade_ledger
+import trade_store
+from trade_ledger import TradeLedger
+
+def _workspace(n_legacy=0, balance=50000.0):
+    """Temp cwd holding legacy memories/ files (MockDhanClient writes its CSVs relative to cwd)."""
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, "memories"))
+    trades = [{"symbol": f"SYM{i % 10}", "quantity": 1, "avg_price": 100, "action": "BUY",
+               "timestamp": "2026-01-20 10:00:00", "status": "OPEN", "origin": "BOT"} for i in range(n_legacy)]
+    with open(os.path.join(root, trade_ledger.PAPER_TRADES_PATH), "w") as f:
+        json.dump(trades, f)
+    with open(os.path.join(root, trade_ledger.MEMORY_PATH), "w") as f:
+        json.dump({"wallet_balance": balance, "score": 7, "mood": "Conservative"}, f)
+    return root
+
+def test_bootstrap_and_append():
+    print("--- Testing Trade Ledger (Bootstrap / One Append per Fill) ---")
+    cwd = os.getcwd()
+    os.chdir(_workspace(n_legacy=30))
+    try:
+        ledger = TradeLedger()
+        assert ledger.get_balance() == 50000.0 and ledger.get_score() == 7
+        assert len(ledger.trades()) == 30 and ledger.get_holdings()["SYM0"] == 3
+        print("[PASS] Legacy paper_trades.json / bot_brain.json adopted on first run.")
+
+        trade = {"order_id": "ORD-1-SBIN", "symbol": "SBIN", "quantity": 10, "avg_price": 500.0, "action": "BUY",
+                 "timestamp": "2026-10-16 10:00:00", "status": "OPEN", "origin": "BOT"}
+        before = os.path.getmtime(trade_ledger.PAPER_TRADES_PATH)
+        assert ledger.record_fill(trade, -5010.0, score=14) == 44990.0
+        assert os.path.getmtime(trade_ledger.PAPER_TRADES_PATH) == before, "no JSON rewrite per fill"
+        assert ledger.find("ORD-1-SBIN") == trade
+        print("[PASS] Fill booked in the ledger without touching the JSON files.")
+
+        reopened = TradeLedger()
+        assert reopened.get_balance() == 44990.0 and reopened.get_score() == 14
+        assert reopened.get_holdings(origin="BOT")["SBIN"] == 10
+
+        # Another process (connection) commits: the first one sees it on its next read
+        reopened.record_fill(dict(trade, order_id="ORD-2-SBIN", action="SELL", quantity=4), 1990.0)
+        assert ledger.get_balance() == 46980.0 and ledger.get_holdings()["SBIN"] == 6
+        print("[PASS] State survives restart; commits from another connection are picked up.")
+
+        ledger.snapshot()
+        with open(trade_ledger.PAPER_TRADES_PATH) as f:
+            assert len(json.load(f)) == 32
+        with open(trade_ledger.MEMORY_PATH) as f:
+            brain = json.load(f)
+        assert brain["wallet_balance"] == 46980.0 and brain["mood"] == "Conservative"
+        print("[PASS] Snapshot exports legacy JSON and keeps other bot_brain fields.")
+    finally:
+        os.chdir(cwd)
+
+def test_mock_broker_on_ledger():
+    print("--- Testing MockDhanClient on the Ledger ---")
+    cwd = os.getcwd()
+    os.chdir(_workspace(n_legacy=3000, balance=1_000_000.0))
+    try:
+        trade_ledger._ledgers.clear()
+        trade_store._stores.clear()
+        from mock_broker import MockDhanClient
+        broker = MockDhanClient()
+        before = os.path.getmtime(trade_ledger.PAPER_TRADES_PATH)
+        start = time.perf_counter()
+        for _ in range(25):
+            assert broker.place_order("SBIN", 1, "BUY", 500.0)["status"] == "success"
+        per_order = (time.perf_counter() - start) / 25
+        assert os.path.getmtime(trade_ledger.PAPER_TRADES_PATH) == before, "legacy export stays off the order path"
+        assert len(broker.store.journal(symbol="SBIN")) == 25
+        assert broker.get_portfolio(origin="BOT")["SBIN"] == 25
+        result = broker.place_order("SBIN", 50, "SELL", 510.0)
+        assert result["status"] == "success" and "SBIN" not in broker.get_portfolio()
+        assert broker.place_order("TCS", 1, "SELL", 10.0)["message"] == "NO_HOLDINGS"
+        assert broker.get_fund_balance() == trade_ledger.get_ledger().get_balance() != 1_000_000.0
+        print(f"[PASS] Orders on a 3000-trade history: {per_order * 1000:.2f} ms each; SELL capped to holdings.")
+
+        # The journal receipt is part of the fill's transaction: if it fails, nothing is booked
+        balance = broker.get_fund_balance()
+        broker.store.fill_statements = lambda *a: [("INSERT INTO no_such_table VALUES (1)", ())]
+        try:
+            broker.place_order("SBIN", 1, "BUY", 500.0)
+            raise AssertionError("a failing receipt must fail the order")
+        except Exception as e:
+            assert "no_such_table" in str(e)
+        assert broker.get_fund_balance() == balance and broker.get_portfolio().get("SBIN") is None
+        print("[PASS] Fill, wallet, journal row and equity point commit (or roll back) together.")
+    finally:
+        trade_ledger._ledgers.clear()
+        trade_store._stores.clear()
+        os.chdir(cwd)
+
+def test_concurrent_bootstrap_imports_once():
+    print("--- Testing Trade Ledger (Two Processes Bootstrapping Together) ---")
+    cwd = os.getcwd()
+    root = _workspace(n_legacy=200)
+    os.chdir(root)
+    try:
+        # Legacy rows without order_id have no UNIQUE guard: a double import would duplicate them
+        gate, ledgers, errors = threading.Barrier(4), [], []
+        def start():
+            gate.wait()
+            try:
+                ledgers.append(TradeLedger())
+            except Exception as e:
+                errors.append(e)
+        workers = [threading.Thread(target=start) for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        assert errors == [] and len(ledgers) == 4
+        assert len(ledgers[0].trades()) == 200
+        assert ledgers[0]._db.execute("SELECT COUNT(*) FROM wallet").fetchone()[0] == 1
+        print("[PASS] 4 connections opened at once: legacy history imported exactly once.")
+    finally:
+        os.chdir(cwd)
+
+def test_materialized_positions():
+    print("--- Testing Trade Ledger (Materialized Positions) ---")
+    pos = trade_ledger.new_position()
+    for action, qty, price in [("BUY", 10, 100.0), ("BUY", 10, 110.0), ("SELL", 15, 120.0)]:
+        trade_ledger.apply_fill(pos, action, qty, price)
+    assert pos["quantity"] == 5 and pos["lots"] == [[5, 110.0]] and pos["avg_cost"] == 110.0
+    assert pos["realized_pnl"] == 10 * 20.0 + 5 * 10.0
+    trade_ledger.apply_fill(pos, "SELL", 8, 100.0)  # Flip to a 3-share short
+    assert pos["quantity"] == -3 and pos["lots"] == [[-3, 100.0]] and pos["realized_pnl"] == 250.0 - 50.0
+    print("[PASS] FIFO lots, average cost and realized PnL (long, then flipped short).")
+
+    cwd = os.getcwd()
+    os.chdir(_workspace(n_legacy=40))
+    try:
+        ledger = TradeLedger()
+        assert ledger.get_position("SYM3")["quantity"] == 4  # Replayed once from the imported history
+        base = {"symbol": "SBIN", "status": "OPEN", "origin": "USER", "timestamp": "2026-10-16 10:00:00"}
+        ledger.record_fill(dict(base, order_id="A", action="BUY", quantity=10, avg_price=500.0), -5000.0)
+        ledger.record_fill(dict(base, order_id="B", action="SELL", quantity=4, avg_price=550.0), 2200.0)
+        sbin = ledger.get_position("SBIN", origin="USER")
+        assert sbin["quantity"] == 6 and sbin["realized_pnl"] == 200.0 and sbin["avg_cost"] == 500.0
+        assert ledger.get_holdings(origin="BOT").get("SBIN") is None
+
+        calls = []
+        trade_ledger_apply = trade_ledger.apply_fill
+        trade_ledger.apply_fill = lambda *a: calls.append(a) or trade_ledger_apply(*a)
+        try:
+            reopened = TradeLedger()
+        finally:
+            trade_ledger.apply_fill = trade_ledger_apply
+        assert calls == [] and reopened.get_position("SBIN", origin="USER") == sbin
+        print("[PASS] Positions persisted with each fill; restart loads them without a replay.")
+
+        reopened._db.execute("DELETE FROM positions")
+        reopened._set_meta("positions_fill_id", 0)
+        assert TradeLedger().get_position("SBIN", origin="USER") == sbin
+        print("[PASS] A stale positions table is rebuilt from the fills at startup.")
+    finally:
+        os.chdir(cwd)
+
+if __name__ == "__main__":
+    test_bootstrap_and_append()
+    test_mock_broker_on_ledger()
+    test_concurrent_bootstrap_imports_once()
+    test_materialized_positions()
@@ -0,0 +1,98 @@
+import os
+import json
+import tempfile
+from datetime import datetime
+import trade_ledger
+import trade_store
+from trade_store import TradeStore
+
+JOURNAL = """timestamp,order_id,symbol,action,price,quantity,taxes,total_cost,source,oracle_confidence
+2026-01-25 17:15:01.570827,ORD-1,RELIANCE.NS,SELL,2400.0,1,0,0,USER,0.0
+2026-01-25 18:18:40.690614,TEST.NS,BUY,100.0,45.0,0,OPEN,Conservative,0.95,0.0
+2026-01-28 01:30:37.712097,ORD-24E7-RELIANCE,RELIANCE,BUY,2400.0,1,2.86,2402.86,USER
+"""
+ARCHIVE = """timestamp,symbol,action,price,rsi,sma,result,mood_at_time,oracle_confidence
+2026-01-18 21:48:13.283834,ADANIPOWER.NS,BUY,142.63,45.52,0,OPEN,Conservative
+"""
+
+def _workspace():
+    """Temp cwd with the legacy journal / equity / daily stats files."""
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, "memories"))
+    files = {trade_store.JOURNAL_PATH: JOURNAL, trade_store.JOURNAL_ARCHIVE_PATH: ARCHIVE,
+             trade_store.HISTORY_PATH: "date,equity\nJan 23,97497.02\nJan 24,91309.77\n"}
+    for path, text in files.items():
+        with open(os.path.join(root, path), "w") as f:
+            f.write(text)
+    with open(os.path.join(root, trade_store.DAILY_STATS_PATH), "w") as f:
+        json.dump({"date": "2026-01-31", "daily_pnl": -120.0, "trade_count": 3,
+                   "is_cautious_mode": False, "yesterday_pnl": 0.0, "status": "ACTIVE"}, f)
+    return root
+
+def test_migration():
+    print("--- Testing Trade Store (Legacy Migration) ---")
+    cwd = os.getcwd()
+    os.chdir(_workspace())
+    try:
+        store = TradeStore()  # First open migrates automatically
+        rows = store.journal()
+        assert [(r["symbol"], r["schema"]) for r in rows] == [
+            ("ADANIPOWER.NS", "V1"), ("RELIANCE.NS", "V2"), ("TEST.NS", "V1"), ("RELIANCE", "V2")]
+        assert rows[2]["price"] == 100.0 and rows[2]["rsi"] == 45.0 and rows[2]["mood"] == "Conservative"
+        assert rows[3]["total_cost"] == 2402.86 and rows[3]["origin"] == "USER"
+        print("[PASS] Mixed V1/V2 journal rows normalized into one schema, in time order.")
+
+        assert store.equity_curve() == [{"date": "Jan 23", "equity": 97497.02}, {"date": "Jan 24", "equity": 91309.77}]
+        assert store.get_daily_stats()["daily_pnl"] == -120.0
+        print("[PASS] Equity curve and daily stats imported.")
+
+        with open(trade_store.JOURNAL_PATH, "a") as f:
+            f.write("2026-01-29 09:00:00.000000,ORD-9,SBIN,BUY,500.0,2,1.0,1001.0,BOT\n")
+        assert store.migrate() == {"journal": 1, "equity": 0, "daily_stats": 0}
+        assert TradeStore().migrate()["journal"] == 0
+        print("[PASS] Re-running the migration only adds rows appended since the last run.")
+    finally:
+        os.chdir(cwd)
+
+def test_indexed_queries():
+    print("--- Testing Trade Store (Indexed Queries) ---")
+    cwd = os.getcwd()
+    os.chdir(_workspace())
+    try:
+        trade_ledger._ledgers.clear()
+        trade_store._stores.clear()
+        from mock_broker import MockDhanClient
+        broker = MockDhanClient()
+        store = trade_store.get_store()
+        broker.place_order("SBIN", 2, "BUY", 500.0)
+        broker.place_order("TCS", 1, "BUY", 3000.0, origin="USER")
+        broker.place_order("SBIN", 1, "SELL", 510.0)
+
+        today = store.todays_trades()
+        assert [t["symbol"] for t in today] == ["SBIN", "TCS", "SBIN"]
+        assert [t["action"] for t in store.trades(origin="BOT", symbol="SBIN")] == ["BUY", "SELL"]
+        assert store.journal_counts(day=datetime.now().strftime("%Y-%m-%d")) == {"BOT": 2, "USER": 1}
+        assert store.journal_tail(1)[0]["total_cost"] < 0  # SELL receipt is a credit
+        assert store.equity_curve()[-1]["equity"] == broker.get_fund_balance()
+        print("[PASS] Broker receipts land in the journal/equity tables; today / BOT+SBIN queries match.")
+
+        where, args = store._where(origin="BOT", symbol="SBIN")
+        plan = " ".join(store.query_plan("SELECT raw FROM fills" + where, args))
+        assert "USING INDEX fills_origin" in plan, plan
+        where, args = store._where(day="2026-10-17")
+        assert "USING INDEX journal_ts" in " ".join(store.query_plan("SELECT * FROM journal" + where, args))
+        print("[PASS] Origin/symbol and day filters are index lookups, not table scans.")
+
+        store.save_daily_stats({"date": "2026-10-17", "daily_pnl": 55.0, "trade_count": 1,
+                                "is_cautious_mode": True, "yesterday_pnl": -120.0, "status": "ACTIVE"})
+        assert store.get_daily_stats()["is_cautious_mode"] is True
+        assert store.get_daily_stats("2026-01-31")["daily_pnl"] == -120.0
+        print("[PASS] Daily stats kept one row per day.")
+    finally:
+        trade_ledger._ledgers.clear()
+        trade_store._stores.clear()
+        os.chdir(cwd)
+
+if __name__ == "__main__":
+    test_migration()
+    test_indexed_queries()
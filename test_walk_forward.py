@@ -0,0 +1,70 @@
+import tempfile
+import numpy as np
+import pandas as pd
+import brain_factory
+import model_registry
+import walk_forward
+
+def _frames(n_symbols=3, bars=1400, seed=21):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2026-10-16", periods=bars)
+    frames = {}
+    for i in range(n_symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+        frames[f"SYM{i}.NS"] = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                                             "Close": close, "Volume": 1e5}, index=index)
+    return frames
+
+def test_folds_are_purged_and_embargoed():
+    print("--- Testing Walk-Forward Folds (Purge / Embargo / Windows) ---")
+    days = pd.bdate_range("2020-01-01", periods=1000)
+    gap = brain_factory.TARGET_HORIZON + 3
+    for window in ("expanding", "rolling"):
+        folds = walk_forward.make_folds(days, n_folds=4, test_days=100, window=window, train_days=300, embargo=3)
+        assert folds[-1]["test_end"] == days[-1]
+        for a, b in zip(folds, folds[1:]):
+            assert b["test_start"] == days[days.get_loc(a["test_end"]) + 1], "test blocks tile the tail"
+        for f in folds:
+            # The 5-day answer key of the last training date must end before the test block
+            assert days.get_loc(f["test_start"]) - days.get_loc(f["train_end"]) == gap + 1
+            span = days.get_loc(f["train_end"]) - days.get_loc(f["train_start"]) + 1
+            if window == "rolling":
+                assert span == 300
+            else:
+                assert f["train_start"] == days[0]
+    try:
+        walk_forward.make_folds(days[:200], n_folds=4, test_days=100)
+        raise AssertionError("too few dates must be rejected")
+    except ValueError:
+        pass
+    print(f"[PASS] Test blocks tile the tail; {gap} dates purged+embargoed before each; rolling windows fixed.")
+
+def test_parallel_study_registers_metrics():
+    print("--- Testing Walk-Forward Study (Process Pool / Registry) ---")
+    registry = model_registry.ModelRegistry(tempfile.mkdtemp())
+    common = dict(n_folds=3, test_days=120, window="rolling", train_days=500, n_estimators=20, cache_dir=None)
+    serial = walk_forward.run_study(_frames(), workers=1, n_jobs=1, register=False, **common)
+    parallel = walk_forward.run_study(_frames(), workers=3, n_jobs=1, registry=registry, **common)
+
+    strip = lambda study: [dict(f, metrics={k: v for k, v in f["metrics"].items() if k != "seconds"})
+                           for f in study["folds"]]
+    assert strip(serial) == strip(parallel), "process pool must not change the folds' results"
+    assert parallel["config"]["symbols"] == ["SYM0.NS", "SYM1.NS", "SYM2.NS"]
+    for fold in parallel["folds"]:
+        assert fold["train_end"] < fold["test_start"]
+        assert fold["metrics"]["test_rows"] == 3 * 120, "every symbol's rows for each test date"
+        assert abs(sum(fold["importances"].values()) - 1.0) < 1e-9
+    print(f"[PASS] {len(parallel['folds'])} folds in a 3-process pool match the serial run "
+          f"(mean accuracy {parallel['summary']['accuracy_mean']:.2%}).")
+
+    version = parallel["version"]
+    assert version == "v0001" and registry.current_version(walk_forward.MODEL_NAME) is None, "not promoted by default"
+    meta = registry.read_meta(walk_forward.MODEL_NAME, version)
+    assert len(meta["walk_forward"]["folds"]) == 3 and meta["walk_forward"]["config"]["purge_days"] == 5
+    assert set(meta["metrics"]["walk_forward"]["importances"]) == set(meta["feature_columns"])
+    assert registry.load(walk_forward.MODEL_NAME, version).scorer is not None
+    print(f"[PASS] Final brain registered as {version} with per-fold metrics and importances (unpromoted).")
+
+if __name__ == "__main__":
+    test_folds_are_purged_and_embargoed()
+    test_parallel_study_registers_metrics()
@@ -0,0 +1,386 @@
+import os
+import sys
+import json
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+import state_store
+
+# --- TRADE LEDGER: Append-Only Paper Trading Book (SQLite, WAL) ---
+# Purpose: MockDhanClient used to json.load + re-dump bot_brain.json (up to 3x) and the whole
+# paper_trades.json on EVERY order, so order latency grew with trade history.
+# Now every fill is ONE small transaction in memories/sovereign.db:
+#     fills   -> one row per executed order (the original trade dict kept verbatim in `raw`)
+#     wallet  -> every cash movement with the balance after it (equity curve for free)
+#     meta    -> small scalars (RL score, snapshot counters)
+#     positions -> materialized (origin, symbol) book: quantity, avg cost, realized PnL, open lots
+#                  (updated in the same transaction as the fill; replayed from `fills` only at
+#                  startup if it is behind the last fill)
+# Wallet balance, score and positions live in memory. If another process commits
+# (PRAGMA data_version changes), the in-memory state is reloaded before the next read/write.
+# paper_trades.json / bot_brain.json are exported off the order path for tools that read them
+# directly: at interpreter exit (process-wide ledger) or on demand (`python trade_ledger.py export`).
+
+LEDGER_PATH = os.path.join("memories", "sovereign.db")
+PAPER_TRADES_PATH = "memories/paper_trades.json"
+MEMORY_PATH = "memories/bot_brain.json"
+STARTING_BALANCE = 100000.0     # Fresh wallet (1L), same as the old bot_brain default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT UNIQUE,
+    ts TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    action TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL,
+    taxes REAL,
+    cash_delta REAL,
+    origin TEXT NOT NULL DEFAULT 'BOT',
+    raw TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wallet (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    amount REAL NOT NULL,
+    balance REAL NOT NULL,
+    ref TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS positions (
+    origin TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    avg_cost REAL NOT NULL,
+    realized_pnl REAL NOT NULL,
+    lots TEXT NOT NULL,
+    updated TEXT,
+    PRIMARY KEY (origin, symbol)
+);
+"""
+
+
+def _now():
+    return str(datetime.now())
+
+
+# --- POSITION MATH ---
+def new_position():
+    return {"quantity": 0, "avg_cost": 0.0, "realized_pnl": 0.0, "lots": []}
+
+
+def apply_fill(position, action, quantity, price):
+    """
+    Updates a position (in place) with one fill. Lots are FIFO [signed qty, price] pairs:
+    positive = long, negative = short (USER may short). A fill against the open side closes
+    lots first (realizing PnL vs each lot's price); any remainder opens a new lot.
+    Realized PnL is gross of taxes (charges are in the wallet movements).
+    """
+    signed = quantity if action == "BUY" else -quantity if action == "SELL" else 0
+    price = float(price or 0.0)
+    lots = position["lots"]
+    remaining = signed
+    while remaining and lots and (lots[0][0] > 0) != (remaining > 0):
+        lot_qty, lot_price = lots[0]
+        closed = min(abs(remaining), abs(lot_qty))
+        direction = 1 if lot_qty > 0 else -1           # Long lot closed by a SELL, short by a BUY
+        position["realized_pnl"] += direction * closed * (price - lot_price)
+        lot_qty -= direction * closed
+        remaining += direction * closed
+        if lot_qty:
+            lots[0][0] = lot_qty
+        else:
+            lots.pop(0)
+    if remaining:
+        lots.append([remaining, price])
+
+    position["quantity"] = _as_number(sum(q for q, _ in lots))
+    open_qty = sum(abs(q) for q, _ in lots)
+    position["avg_cost"] = sum(abs(q) * p for q, p in lots) / open_qty if open_qty else 0.0
+    return position
+
+
+class TradeLedger:
+    def __init__(self, path=LEDGER_PATH, paper_trades_path=PAPER_TRADES_PATH, memory_path=MEMORY_PATH):
+        self.path = path
+        self.paper_trades_path = os.path.abspath(paper_trades_path)  # Exports may run at exit, from another cwd
+        self.memory_path = os.path.abspath(memory_path)
+        self._lock = threading.RLock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # WAL: durable at checkpoints, no fsync per fill
+        self._db.executescript(SCHEMA)
+
+        self.balance = STARTING_BALANCE
+        self.score = 0
+        self.positions = {}     # (origin, symbol) -> {quantity, avg_cost, realized_pnl, lots}
+        self._version = None
+        self._fills_since_snapshot = 0
+
+        with self._lock:
+            self._bootstrap()
+            self._rebuild_positions_if_stale()
+            self._reload()
+
+    # --- STARTUP ---
+    def _bootstrap(self):
+        """
+        First run: adopt the existing paper_trades.json history and bot_brain.json wallet.
+        The empty-wallet check runs inside the write transaction, so of two processes starting
+        together only the first imports (the second sees its OPENING row and skips).
+        """
+        trades, brain = [], {}
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if self._db.execute("SELECT COUNT(*) FROM wallet").fetchone()[0]:
+                self._db.execute("COMMIT")
+                return
+            try:
+                with open(self.paper_trades_path, 'r') as f:
+                    trades = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+            try:
+                with open(self.memory_path, 'r') as f:
+                    brain = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+
+            balance = float(brain.get("wallet_balance", STARTING_BALANCE))
+            for trade in trades:
+                self._insert_fill(trade, cash_delta=None)
+            self._db.execute("INSERT INTO wallet (ts, kind, amount, balance, ref) VALUES (?, 'OPENING', ?, ?, ?)",
+                             (_now(), balance, balance, "bot_brain.json" if brain else None))
+            self._set_meta("score", brain.get("score", 0))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        if trades:
+            print(f"[LEDGER] Imported {len(trades)} trades from {self.paper_trades_path}.")
+
+    def _rebuild_positions_if_stale(self):
+        """Startup check: replays `fills` into `positions` if the table is behind the last fill."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            last_fill = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM fills").fetchone()[0]
+            if json.loads(self._get_meta("positions_fill_id", "0")) == last_fill:
+                self._db.execute("COMMIT")
+                return
+            positions = {}
+            for origin, symbol, action, qty, price in self._db.execute(
+                    "SELECT origin, symbol, action, quantity, price FROM fills ORDER BY id"):
+                apply_fill(positions.setdefault((origin, symbol), new_position()), action, _as_number(qty), price)
+
+            self._db.execute("DELETE FROM positions")
+            for key, position in positions.items():
+                self._save_position(key, position)
+            self._set_meta("positions_fill_id", last_fill)
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        print(f"[LEDGER] Positions rebuilt from {last_fill} fills.")
+
+    def _reload(self):
+        """Loads the in-memory wallet/score/positions from the database (no history replay)."""
+        row = self._db.execute("SELECT balance FROM wallet ORDER BY id DESC LIMIT 1").fetchone()
+        self.balance = row[0] if row else STARTING_BALANCE
+        self.score = json.loads(self._get_meta("score", "0"))
+        self.positions = {}
+        for origin, symbol, qty, avg_cost, realized, lots in self._db.execute(
+                "SELECT origin, symbol, quantity, avg_cost, realized_pnl, lots FROM positions"):
+            self.positions[(origin, symbol)] = {"quantity": _as_number(qty), "avg_cost": avg_cost,
+                                                "realized_pnl": realized, "lots": json.loads(lots)}
+        self._version = self._data_version()
+
+    def _data_version(self):
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self):
+        """Picks up commits made by other processes (dashboard, swarm, sentinel)."""
+        if self._data_version() != self._version:
+            self._reload()
+
+    # --- LOW LEVEL ---
+    def _get_meta(self, key, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _save_position(self, key, position):
+        self._db.execute(
+            "INSERT OR REPLACE INTO positions (origin, symbol, quantity, avg_cost, realized_pnl, lots, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key[0], key[1], position["quantity"], position["avg_cost"], position["realized_pnl"],
+             json.dumps(position["lots"]), _now()))
+
+    def _insert_fill(self, trade, cash_delta):
+        cursor = self._db.execute(
+            "INSERT INTO fills (order_id, ts, symbol, action, quantity, price, taxes, cash_delta, origin, raw) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (trade.get("order_id"), trade.get("timestamp") or _now(), trade["symbol"], trade["action"],
+             trade["quantity"], trade.get("avg_price"), trade.get("taxes_paid"), cash_delta,
+             trade.get("origin", "BOT"), json.dumps(trade)))
+        return cursor.lastrowid
+
+    # --- WRITE ---
+    def record_fill(self, trade, cash_delta, score=None, receipt=None):
+        """
+        Books one executed order: the fill row, the wallet movement, the updated position and
+        (optionally) the new score, in a single transaction. Returns the balance after the fill.
+        receipt: optional callable(balance) -> [(sql, args)] run in the same transaction (the trade
+        store's journal row and equity point, when it shares this database file).
+        """
+        key = (trade.get("origin", "BOT"), trade["symbol"])
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+                balance = self.balance + cash_delta
+                position = json.loads(json.dumps(self.positions.get(key) or new_position()))
+                apply_fill(position, trade["action"], trade["quantity"], trade.get("avg_price"))
+                fill_id = self._insert_fill(trade, cash_delta)
+                self._save_position(key, position)
+                self._set_meta("positions_fill_id", fill_id)
+                self._db.execute("INSERT INTO wallet (ts, kind, amount, balance, ref) VALUES (?, ?, ?, ?, ?)",
+                                 (trade.get("timestamp") or _now(), trade["action"], cash_delta, balance,
+                                  trade.get("order_id")))
+                if score is not None:
+                    self._set_meta("score", score)
+                for sql, args in (receipt(balance) if receipt else ()):
+                    self._db.execute(sql, args)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+            self.balance = balance
+            if score is not None:
+                self.score = score
+            self.positions[key] = position
+            self._version = self._data_version()
+            self._fills_since_snapshot += 1
+            return balance
+
+    def set_score(self, score):
+        with self._lock:
+            self._set_meta("score", score)
+            self.score = score
+            self._version = self._data_version()
+
+    # --- READ ---
+    def get_balance(self):
+        with self._lock:
+            self._sync()
+            return self.balance
+
+    def get_score(self):
+        with self._lock:
+            self._sync()
+            return self.score
+
+    def get_holdings(self, origin=None):
+        """{symbol: net quantity} (all origins summed unless `origin` is given). Zero positions dropped."""
+        with self._lock:
+            self._sync()
+            portfolio = {}
+            for (o, symbol), position in self.positions.items():
+                if origin and o != origin:
+                    continue
+                portfolio[symbol] = portfolio.get(symbol, 0) + position["quantity"]
+            return {k: v for k, v in portfolio.items() if v != 0}
+
+    def get_position(self, symbol, origin="BOT"):
+        """One (origin, symbol) position: {quantity, avg_cost, realized_pnl, lots} (flat if never traded)."""
+        with self._lock:
+            self._sync()
+            position = self.positions.get((origin, symbol))
+            return json.loads(json.dumps(position)) if position else new_position()
+
+    def get_positions(self, origin=None, include_flat=False):
+        """{(origin, symbol): position} from the materialized table."""
+        with self._lock:
+            self._sync()
+            return {key: json.loads(json.dumps(p)) for key, p in self.positions.items()
+                    if (not origin or key[0] == origin) and (include_flat or p["quantity"] != 0)}
+
+    def trades(self, origin=None, symbol=None):
+        """Executed trades (paper_trades.json format), oldest first."""
+        query, args = "SELECT raw FROM fills", []
+        clauses = []
+        if origin:
+            clauses.append("origin=?")
+            args.append(origin)
+        if symbol:
+            clauses.append("symbol=?")
+            args.append(symbol)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return [json.loads(r[0]) for r in self._db.execute(query + " ORDER BY id", args)]
+
+    def find(self, order_id):
+        with self._lock:
+            row = self._db.execute("SELECT raw FROM fills WHERE order_id=?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- LEGACY EXPORT ---
+    def snapshot(self):
+        """
+        Exports paper_trades.json and the wallet/score fields of bot_brain.json through the state
+        store (locked + atomic; other bot_brain fields written meanwhile are kept).
+        Never called from record_fill: it re-reads every fill, so it stays off the order path.
+        """
+        with self._lock:
+            self._sync()
+            state_store.get_state_file(self.paper_trades_path, default=list).write(self.trades())
+            balance, score = self.balance, self.score
+            state_store.get_state_file(self.memory_path).update(
+                lambda brain: brain.update(wallet_balance=balance, score=score))
+            self._fills_since_snapshot = 0
+
+    def _export_at_exit(self):
+        """atexit hook: one legacy export if this process booked fills since the last one."""
+        if self._fills_since_snapshot:
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"[LEDGER] Legacy export at exit failed: {e}")
+
+
+def _as_number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(path=LEDGER_PATH):
+    """Process-wide ledger per database file (the broker, dashboard and tools share one)."""
+    with _ledgers_lock:
+        if path not in _ledgers:
+            _ledgers[path] = TradeLedger(path)
+            atexit.register(_ledgers[path]._export_at_exit)
+        return _ledgers[path]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    ledger = get_ledger()
+    if command == "export":
+        ledger.snapshot()
+        print(f"[LEDGER] Exported {len(ledger.trades())} trades to {ledger.paper_trades_path} "
+              f"(balance {ledger.get_balance():.2f}).")
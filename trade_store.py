@@ -0,0 +1,351 @@
+import os
+import csv
+import sys
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import trade_ledger
+
+# --- TRADE STORE: One Indexed Database for Trades, Journal, Equity and Daily Stats ---
+# Purpose: dashboard, guardian, trophy_cabinet, daily_debrief, audit_bot, scribe and the Oracle
+# each re-parsed trading_journal.csv (mixed V1/V2 rows), account_history.csv, paper_trades.json
+# and daily_stats.json in full to answer small questions ("today's trades", "last 3 USER orders").
+# Everything now lives next to the trade ledger in memories/sovereign.db:
+#     fills       -> executed orders (owned by trade_ledger; indexed here by ts / symbol / origin)
+#     journal     -> normalized journal rows: V2 broker receipts and V1 Sentinel entries in one schema
+#     equity      -> equity curve points (wallet balance after each fill; legacy "Jan 23" labels kept)
+#     daily_stats -> RiskManager scoreboard, one row per day
+# Timestamps are stored as "YYYY-MM-DD HH:MM:SS.ffffff" text, so a day is an index range scan.
+# Migration: `python trade_store.py migrate` ingests the legacy CSV/JSON files (idempotent; also
+# runs automatically the first time the store is opened).
+
+STORE_PATH = trade_ledger.LEDGER_PATH
+JOURNAL_PATH = "trading_journal.csv"
+JOURNAL_ARCHIVE_PATH = "memories/trading_journal_legacy_archive.csv"
+HISTORY_PATH = "memories/account_history.csv"
+DAILY_STATS_PATH = "memories/daily_stats.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    action TEXT NOT NULL,
+    price REAL,
+    quantity REAL,
+    taxes REAL,
+    total_cost REAL,
+    origin TEXT NOT NULL DEFAULT 'BOT',
+    order_id TEXT,
+    rsi REAL,
+    sma REAL,
+    result TEXT,
+    mood TEXT,
+    oracle_confidence REAL,
+    schema TEXT NOT NULL,
+    import_ref TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS journal_ts ON journal(ts);
+CREATE INDEX IF NOT EXISTS journal_symbol ON journal(symbol, ts);
+CREATE INDEX IF NOT EXISTS journal_origin ON journal(origin, ts);
+CREATE INDEX IF NOT EXISTS journal_order ON journal(order_id);
+
+CREATE TABLE IF NOT EXISTS equity (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT,
+    label TEXT NOT NULL,
+    equity REAL NOT NULL,
+    ref TEXT,
+    import_ref TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS equity_ts ON equity(ts);
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day TEXT PRIMARY KEY,
+    daily_pnl REAL NOT NULL DEFAULT 0,
+    trade_count INTEGER NOT NULL DEFAULT 0,
+    is_cautious_mode INTEGER NOT NULL DEFAULT 0,
+    yesterday_pnl REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'ACTIVE',
+    updated TEXT
+);
+
+CREATE INDEX IF NOT EXISTS fills_ts ON fills(ts);
+CREATE INDEX IF NOT EXISTS fills_symbol ON fills(symbol, ts);
+CREATE INDEX IF NOT EXISTS fills_origin ON fills(origin, symbol, ts);
+"""
+
+JOURNAL_COLUMNS = ["ts", "symbol", "action", "price", "quantity", "taxes", "total_cost", "origin", "order_id",
+                   "rsi", "sma", "result", "mood", "oracle_confidence", "schema"]
+
+
+def _float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _day_range(day):
+    """[start, end) timestamp strings covering one YYYY-MM-DD day."""
+    start = datetime.strptime(str(day)[:10], "%Y-%m-%d")
+    return start.strftime("%Y-%m-%d"), (start + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+# --- LEGACY PARSING ---
+def parse_journal_row(fields):
+    """
+    One trading_journal.csv row -> normalized journal dict (None for headers / garbage).
+    The file mixes two layouts under a single header, so rows are recognized by shape:
+        V2 (broker receipt): timestamp, order_id, symbol, action, price, quantity, taxes, total_cost[, origin[, conf]]
+        V1 (Sentinel entry): timestamp, symbol, action, price, rsi, sma, result, mood[, oracle_confidence]
+    """
+    fields = [f.strip() for f in fields]
+    if len(fields) < 4 or fields[0] in ("", "timestamp"):
+        return None
+    if fields[3] in ("BUY", "SELL") and len(fields) >= 8:
+        return {
+            "ts": fields[0], "order_id": fields[1] or None, "symbol": fields[2], "action": fields[3],
+            "price": _float(fields[4]), "quantity": _float(fields[5]), "taxes": _float(fields[6]),
+            "total_cost": _float(fields[7]),
+            "origin": (fields[8] if len(fields) > 8 and fields[8] else "BOT"),
+            "oracle_confidence": _float(fields[9]) if len(fields) > 9 else None,
+            "schema": "V2",
+        }
+    if fields[2] in ("BUY", "SELL"):
+        padded = fields + [""] * (9 - len(fields))
+        return {
+            "ts": padded[0], "symbol": padded[1], "action": padded[2], "price": _float(padded[3]),
+            "rsi": _float(padded[4]), "sma": _float(padded[5]), "result": padded[6] or None,
+            "mood": padded[7] or None, "oracle_confidence": _float(padded[8]),
+            "origin": "BOT", "schema": "V1",
+        }
+    return None
+
+
+class TradeStore:
+    def __init__(self, path=STORE_PATH, auto_migrate=True):
+        self.path = path
+        self._lock = threading.RLock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(trade_ledger.SCHEMA + SCHEMA)  # fills must exist before its indexes
+        if auto_migrate and not self._db.execute("SELECT 1 FROM meta WHERE key='store_migrated'").fetchone():
+            self.migrate()
+
+    def _write(self, statements):
+        """Runs [(sql, args)] in one IMMEDIATE transaction."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, args in statements:
+                    self._db.execute(sql, args)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _select(self, sql, args=()):
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, args)]
+
+    # --- MIGRATION ---
+    def migrate(self, journal_paths=(JOURNAL_ARCHIVE_PATH, JOURNAL_PATH), history_path=HISTORY_PATH,
+                stats_path=DAILY_STATS_PATH):
+        """
+        Ingests the legacy files. Every imported row carries an import_ref (file:line), so re-running
+        adds only rows appended since the last run. Returns {"journal": n, "equity": n, "daily_stats": n}.
+        """
+        statements, counts = [], {"journal": 0, "equity": 0, "daily_stats": 0}
+        for path in journal_paths:
+            for line_no, fields in self._read_csv(path):
+                row = parse_journal_row(fields)
+                if row:
+                    statements.append(self._journal_insert(row, import_ref=f"{os.path.basename(path)}:{line_no}"))
+
+        for line_no, fields in self._read_csv(history_path):
+            if len(fields) >= 2 and fields[0] != "date" and _float(fields[1]) is not None:
+                statements.append(("INSERT OR IGNORE INTO equity (ts, label, equity, ref, import_ref) "
+                                   "VALUES (NULL, ?, ?, 'account_history.csv', ?)",
+                                   (fields[0], _float(fields[1]), f"{os.path.basename(history_path)}:{line_no}")))
+
+        stats = {}
+        try:
+            with open(stats_path, 'r') as f:
+                stats = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        if stats.get("date"):
+            statements.append(("INSERT OR IGNORE INTO daily_stats (day, daily_pnl, trade_count, is_cautious_mode, "
+                               "yesterday_pnl, status, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               self._stats_args(stats)))
+
+        statements.append(("INSERT OR REPLACE INTO meta (key, value) VALUES ('store_migrated', ?)",
+                           (json.dumps(str(datetime.now())),)))
+        with self._lock:
+            before = {table: self._count(table) for table in counts}
+            self._write(statements)
+            counts = {table: self._count(table) - before[table] for table in counts}
+        if any(counts.values()):
+            print(f"[STORE] Migrated {counts['journal']} journal rows, {counts['equity']} equity points, "
+                  f"{counts['daily_stats']} daily stats.")
+        return counts
+
+    def _count(self, table):
+        return self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    @staticmethod
+    def _read_csv(path):
+        try:
+            with open(path, 'r', newline='', encoding="utf-8", errors="ignore") as f:
+                return list(enumerate(csv.reader(f), 1))
+        except FileNotFoundError:
+            return []
+
+    # --- WRITE ---
+    @staticmethod
+    def _journal_insert(row, import_ref=None):
+        values = [row.get(c) for c in JOURNAL_COLUMNS]
+        values[JOURNAL_COLUMNS.index("ts")] = row.get("ts") or trade_ledger._now()
+        values[JOURNAL_COLUMNS.index("origin")] = row.get("origin") or "BOT"
+        values[JOURNAL_COLUMNS.index("schema")] = row.get("schema") or "V2"
+        return (f"INSERT OR IGNORE INTO journal ({', '.join(JOURNAL_COLUMNS)}, import_ref) "
+                f"VALUES ({', '.join('?' * (len(JOURNAL_COLUMNS) + 1))})", values + [import_ref])
+
+    def log_journal(self, row):
+        """Appends one journal row (keys from JOURNAL_COLUMNS; missing ones stay NULL)."""
+        self._write([self._journal_insert(row)])
+
+    def log_fill(self, trade, total_cost, balance):
+        """Broker receipt: the V2 journal row and the equity point after it, in one transaction."""
+        self._write(self.fill_statements(trade, total_cost, balance))
+
+    def fill_statements(self, trade, total_cost, balance):
+        """[(sql, args)] of log_fill, for a caller that books them inside its own transaction."""
+        ts = trade.get("timestamp") or trade_ledger._now()
+        row = {"ts": ts, "order_id": trade.get("order_id"), "symbol": trade["symbol"], "action": trade["action"],
+               "price": trade.get("avg_price"), "quantity": trade.get("quantity"), "taxes": trade.get("taxes_paid"),
+               "total_cost": total_cost, "origin": trade.get("origin", "BOT"), "schema": "V2"}
+        label = datetime.strptime(ts[:10], "%Y-%m-%d").strftime("%b %d")
+        return [self._journal_insert(row),
+                ("INSERT INTO equity (ts, label, equity, ref) VALUES (?, ?, ?, ?)",
+                 (ts, label, balance, trade.get("order_id")))]
+
+    @staticmethod
+    def _stats_args(stats):
+        return (stats["date"], stats.get("daily_pnl", 0.0), stats.get("trade_count", 0),
+                int(bool(stats.get("is_cautious_mode", False))), stats.get("yesterday_pnl", 0.0),
+                stats.get("status", "ACTIVE"), trade_ledger._now())
+
+    def save_daily_stats(self, stats):
+        """Upserts the RiskManager scoreboard dict ({date, daily_pnl, trade_count, ...})."""
+        self._write([("INSERT OR REPLACE INTO daily_stats (day, daily_pnl, trade_count, is_cautious_mode, "
+                      "yesterday_pnl, status, updated) VALUES (?, ?, ?, ?, ?, ?, ?)", self._stats_args(stats))])
+
+    # --- QUERY API ---
+    @staticmethod
+    def _where(origin=None, symbol=None, day=None, since=None):
+        clauses, args = [], []
+        if origin:
+            clauses.append("origin=?")
+            args.append(origin)
+        if symbol:
+            clauses.append("symbol=?")
+            args.append(symbol)
+        if day:
+            start, end = _day_range(day)
+            clauses.append("ts >= ? AND ts < ?")
+            args += [start, end]
+        if since:
+            clauses.append("ts >= ?")
+            args.append(str(since))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    @staticmethod
+    def _order(newest_first, limit):
+        return (" ORDER BY ts DESC, id DESC" if newest_first else " ORDER BY ts, id") + \
+               (f" LIMIT {int(limit)}" if limit else "")
+
+    def trades(self, origin=None, symbol=None, day=None, since=None, limit=None, newest_first=False):
+        """Executed orders from the ledger (paper_trades.json dicts), filtered through the indexes."""
+        where, args = self._where(origin, symbol, day, since)
+        rows = self._select("SELECT raw FROM fills" + where + self._order(newest_first, limit), args)
+        return [json.loads(r["raw"]) for r in rows]
+
+    def todays_trades(self, origin=None):
+        return self.trades(origin=origin, day=datetime.now().strftime("%Y-%m-%d"))
+
+    def journal(self, origin=None, symbol=None, day=None, since=None, limit=None, newest_first=False):
+        """Normalized journal rows (both V1 and V2), oldest first unless newest_first."""
+        where, args = self._where(origin, symbol, day, since)
+        return self._select(f"SELECT id, {', '.join(JOURNAL_COLUMNS)} FROM journal" + where +
+                            self._order(newest_first, limit), args)
+
+    def journal_tail(self, n=5, origin=None):
+        """Last `n` journal rows, oldest first."""
+        return self.journal(origin=origin, limit=n, newest_first=True)[::-1]
+
+    def journal_counts(self, day=None):
+        """{origin: rows} (optionally for one day)."""
+        where, args = self._where(day=day)
+        return {r["origin"]: r["n"] for r in
+                self._select("SELECT origin, COUNT(*) AS n FROM journal" + where + " GROUP BY origin", args)}
+
+    def equity_curve(self, since=None):
+        """[{"date": label, "equity": value}] in booking order (legacy points have no timestamp)."""
+        where, args = ("", []) if since is None else (" WHERE ts >= ?", [str(since)])
+        return [{"date": r["label"], "equity": r["equity"]} for r in
+                self._select("SELECT label, equity FROM equity" + where + " ORDER BY id", args)]
+
+    def get_daily_stats(self, day=None):
+        """Scoreboard dict for `day` (latest day if None); {} if nothing was recorded."""
+        if day:
+            rows = self._select("SELECT * FROM daily_stats WHERE day=?", (day,))
+        else:
+            rows = self._select("SELECT * FROM daily_stats ORDER BY day DESC LIMIT 1")
+        if not rows:
+            return {}
+        row = rows[0]
+        return {"date": row["day"], "daily_pnl": row["daily_pnl"], "trade_count": row["trade_count"],
+                "is_cautious_mode": bool(row["is_cautious_mode"]), "yesterday_pnl": row["yesterday_pnl"],
+                "status": row["status"]}
+
+    def query_plan(self, sql, args=()):
+        """EXPLAIN QUERY PLAN details (to check a query hits an index)."""
+        with self._lock:
+            return [row[-1] for row in self._db.execute("EXPLAIN QUERY PLAN " + sql, args)]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=STORE_PATH):
+    """Process-wide store per database file (every module shares one connection)."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = TradeStore(path)
+        return _stores[path]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    store = get_store()
+    if command == "migrate":
+        print(f"[STORE] {store.migrate()}")
+    elif command == "today":
+        for trade in store.todays_trades():
+            print(f"{trade.get('timestamp')} {trade.get('origin')} {trade['action']} {trade['quantity']} "
+                  f"{trade['symbol']} @ {trade.get('avg_price')}")
+    elif command == "trades":
+        origin = sys.argv[2] if len(sys.argv) > 2 else None
+        symbol = sys.argv[3] if len(sys.argv) > 3 else None
+        for trade in store.trades(origin=origin, symbol=symbol):
+            print(f"{trade.get('timestamp')} {trade['action']} {trade['quantity']} {trade['symbol']} @ {trade.get('avg_price')}")
+    else:
+        print("usage: python trade_store.py [migrate | today | trades [ORIGIN] [SYMBOL]]")
@@ -6,7 +6,8 @@ import random
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
-import librarian  # Imports the librarian module
+import knowledge_index  # Local passage retrieval over training_raw
+import columnar_history
 
 # --- PERSISTENT SECRETS LOADING ---
 load_dotenv()
@@ -25,30 +26,33 @@ genai.configure(api_key=api_key)
 model = genai.GenerativeModel('gemini-2.0-flash') 
 
 def start_training_session():
-    # 1. Load the "Textbooks" from training_raw
+    # 1. Open the "Textbooks" index over training_raw
     print("\n[DOJO] ENTERING THE DOJO...")
-    textbooks = librarian.get_knowledge_base()
+    library = knowledge_index.get_index() # Built up front here (the Scholar's retrieve() never waits for it)
     
-    if not textbooks:
+    if not library.chunks:
+        print("[WARN] EMPTY VAULT: Nothing indexed in training_raw.")
         return
 
     # 2. Load Historical Data
-    # For now, we try to grab the first CSV we find in memories/history since that exists
+    # First recorded daily series (memory-mapped columnar store), falling back to the legacy CSVs
     history_dir = "memories/history"
-    data_file = None
+    df = None
     
-    if os.path.exists(history_dir):
+    daily = [s for s in columnar_history.list_series() if s['interval'] == '1d']
+    if daily:
+        print(f"[DATA] Loading Training Data from: {daily[0]['path']}")
+        df = columnar_history.read_history(daily[0]['path']).astype(float).reset_index()
+    elif os.path.exists(history_dir):
         files = [f for f in os.listdir(history_dir) if f.endswith(".csv")]
         if files:
             data_file = os.path.join(history_dir, files[0])
+            print(f"[DATA] Loading Training Data from: {data_file}")
+            df = pd.read_csv(data_file)
     
-    if not data_file or not os.path.exists(data_file):
+    if df is None:
         print("[ERR] STOCK DATA MISSING. Please run the bot once to download NIFTY data.")
         return
-        
-    print(f"[DATA] Loading Training Data from: {data_file}")
-    print(f"[DATA] Loading Training Data from: {data_file}")
-    df = pd.read_csv(data_file)
     
     # Ensure numeric types
     num_cols = ['Close', 'Adj Close', 'High', 'Low', 'Open']
@@ -96,20 +100,21 @@ def start_training_session():
         print(f"[PRICE] {close_price:.2f} (Next: {next_close:.2f})")
         
         # 4. Ask the AI (The Test)
+        passages = library.passages("risk management rules chart patterns entry exit stop loss", k=6)
         prompt = (
+            f"RESEARCH PASSAGES:\n{passages}\n\n"
             f"You are a Sovereign Trading Bot. "
-            f"Consult the attached {len(textbooks)} research papers in your context. "
+            f"Consult the research passages above. "
             f"Current Market Data: Price {close_price:.2f}. "
             f"Based strictly on the risk management rules and chart patterns in these papers, "
             f"would you BUY or SELL here? "
             f"Cite the specific paper name and page number that justifies your decision."
         )
         
-        print("[THINKING] AI is thinking (Reading 25+ papers)...")
+        print("[THINKING] AI is thinking (Reading the retrieved passages)...")
         ai_response = ""
         try:
-             # Pass the uploaded files (textbooks) + the prompt
-             response = model.generate_content(textbooks + [prompt])
+             response = model.generate_content(prompt)
              ai_response = response.text
              print(f"\n[STRATEGY]:\n{ai_response[:200]}...") # Truncate for console if auto
         except Exception as e:
@@ -1,50 +1,290 @@
 import os
+import re
+import time
+import asyncio
 import itertools
+import threading
+import concurrent.futures
 from google import genai
-import time
+
+# --- ASYNC CLIENT POOL SETTINGS ---
+# Per-key quota (Gemini free tier defaults; override per account tier)
+KEY_RPM = int(os.getenv("GEMINI_RPM", "15"))            # Requests per minute per key
+KEY_TPM = int(os.getenv("GEMINI_TPM", "1000000"))       # Tokens per minute per key
+MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "4"))
+QUOTA_COOLDOWN = 60                                       # Seconds a key rests after a 429
+FILE_TOKEN_ESTIMATE = 1000                                # Budget for an attached file part
+
+# Lower number = served first (trade decisions before narrative logs)
+PRIORITIES = {"trade": 0, "intel": 5, "log": 9}
+
+
+def _is_quota_error(error):
+    return "429" in str(error) or "quota" in str(error).lower()
+
+
+def estimate_tokens(contents):
+    """Rough request size for the TPM bucket (~4 characters per token)."""
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    total = 0
+    for part in parts:
+        total += len(part) // 4 + 1 if isinstance(part, str) else FILE_TOKEN_ESTIMATE
+    return total
+
+
+class TokenBucket:
+    """Refills continuously at capacity / 60 per second (RPM / TPM windows)."""
+    def __init__(self, capacity, per_seconds=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self, now):
+        self._refill(now)
+        self.tokens = 0.0
+
+    def fill_ratio(self, now):
+        self._refill(now)
+        return self.tokens / self.capacity
+
+
+class KeySlot:
+    """One API key: its client, RPM/TPM buckets and 429 cooldown."""
+    def __init__(self, index, client, rpm, tpm):
+        self.index = index
+        self.client = client
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.served = 0
+        self.throttled = 0
+
+    def wait_time(self, tokens, now):
+        return max(self.cooldown_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def headroom(self, now):
+        return min(self.requests.fill_ratio(now), self.tokens.fill_ratio(now))
+
+    def take(self, tokens, now):
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+
+    def cool_down(self, seconds, now):
+        self.cooldown_until = now + seconds
+        self.requests.drain(now)
+        self.throttled += 1
+
+
+class _Job:
+    __slots__ = ("fn", "tokens", "future", "attempts")
+
+    def __init__(self, fn, tokens, future):
+        self.fn = fn
+        self.tokens = tokens
+        self.future = future
+        self.attempts = 0
+
+
+class AsyncClientPool:
+    """
+    Spreads Gemini calls over ALL configured keys.
+    - Each key has RPM/TPM token buckets; a request goes to the key with the most headroom.
+    - At most `max_in_flight` requests run at once; the rest wait in a priority queue.
+    - A 429 rests that key and re-queues the request on another one.
+    Runs its own event loop on a daemon thread, so blocking code (Oracle, Scribe) and asyncio
+    code (swarm, dashboard) share one scheduler. submit() returns a concurrent.futures.Future;
+    inside a coroutine use `await pool.submit_async(...)`.
+    """
+    def __init__(self, clients, rpm=KEY_RPM, tpm=KEY_TPM, max_in_flight=MAX_IN_FLIGHT, cooldown=QUOTA_COOLDOWN):
+        self.slots = [KeySlot(i, c, rpm, tpm) for i, c in enumerate(clients) if c is not None]
+        self.max_in_flight = max_in_flight
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.metrics = {"submitted": 0, "completed": 0, "failed": 0, "requeued": 0}
+        self._seq = itertools.count()
+        self._loop = None
+        self._queue = None
+        self._changed = None
+        self._start_lock = threading.Lock()
+
+    # --- LIFECYCLE ---
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._run, args=(ready,), name="llm-pool", daemon=True).start()
+            ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.PriorityQueue()
+        self._changed = asyncio.Event()
+        self._loop.create_task(self._dispatch())
+        ready.set()
+        self._loop.run_forever()
+
+    # --- SUBMISSION ---
+    def submit(self, fn, priority="trade", tokens=1):
+        """
+        Schedules fn(client) (blocking or async) on the best key. Returns a concurrent Future.
+        priority: 'trade' | 'intel' | 'log' or an int (lower runs first).
+        """
+        future = concurrent.futures.Future()
+        if not self.slots:
+            future.set_exception(RuntimeError("No Gemini API keys configured"))
+            return future
+        self._ensure_started()
+        rank = PRIORITIES.get(priority, priority) if isinstance(priority, str) else priority
+        self.metrics["submitted"] += 1
+        job = _Job(fn, tokens, future)
+        self._loop.call_soon_threadsafe(self._enqueue, rank, job)
+        return future
+
+    def submit_async(self, fn, priority="trade", tokens=1):
+        """Awaitable version of submit() for coroutines."""
+        return asyncio.wrap_future(self.submit(fn, priority=priority, tokens=tokens))
+
+    def generate(self, model, contents, config=None, priority="trade"):
+        """client.models.generate_content(...) through the pool. Returns a Future of the response."""
+        def call(client):
+            return client.models.generate_content(model=model, contents=contents, config=config)
+        return self.submit(call, priority=priority, tokens=estimate_tokens(contents))
+
+    def _enqueue(self, rank, job):
+        self._queue.put_nowait((rank, next(self._seq), job))
+        self._changed.set()
+
+    # --- SCHEDULER (runs on the pool loop) ---
+    def _pick(self, tokens):
+        """(slot with most headroom, None) or (None, seconds until something frees up)."""
+        if self.in_flight >= self.max_in_flight:
+            return None, 1.0
+        now = time.monotonic()
+        best, best_headroom, wait = None, -1.0, float("inf")
+        for slot in self.slots:
+            slot_wait = slot.wait_time(tokens, now)
+            if slot_wait > 0:
+                wait = min(wait, slot_wait)
+                continue
+            headroom = slot.headroom(now)
+            if headroom > best_headroom:
+                best, best_headroom = slot, headroom
+        return best, wait
+
+    async def _dispatch(self):
+        while True:
+            rank, seq, job = await self._queue.get()
+            if job.future.cancelled():
+                continue
+            slot, wait = self._pick(job.tokens)
+            if slot is None:
+                # Put it back (a higher-priority job may arrive meanwhile) and wait for capacity
+                self._queue.put_nowait((rank, seq, job))
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            slot.take(job.tokens, time.monotonic())
+            slot.in_flight += 1
+            self.in_flight += 1
+            self._loop.create_task(self._execute(slot, rank, seq, job))
+
+    async def _execute(self, slot, rank, seq, job):
+        try:
+            if asyncio.iscoroutinefunction(job.fn):
+                result = await job.fn(slot.client)
+            else:
+                result = await asyncio.to_thread(job.fn, slot.client)
+            slot.served += 1
+            self.metrics["completed"] += 1
+            if not job.future.cancelled():
+                job.future.set_result(result)
+        except Exception as e:
+            if _is_quota_error(e) and job.attempts < len(self.slots):
+                print(f"[KEY MANAGER] Key #{slot.index + 1} hit quota. Resting {self.cooldown}s, re-routing request.")
+                slot.cool_down(self.cooldown, time.monotonic())
+                job.attempts += 1
+                self.metrics["requeued"] += 1
+                self._queue.put_nowait((rank, seq, job))
+            else:
+                self.metrics["failed"] += 1
+                if not job.future.cancelled():
+                    job.future.set_exception(e)
+        finally:
+            slot.in_flight -= 1
+            self.in_flight -= 1
+            self._changed.set()
+
+    def stats(self):
+        now = time.monotonic()
+        return dict(self.metrics, in_flight=self.in_flight, keys=[
+            {"key": s.index + 1, "served": s.served, "throttled": s.throttled, "in_flight": s.in_flight,
+             "headroom": round(s.headroom(now), 3), "cooling": max(0.0, round(s.cooldown_until - now, 1))}
+            for s in self.slots])
+
 
 class KeyManager:
     def __init__(self):
         # Initial Keys (Will be populated by User)
         self.keys = []
-        
-        # Load from multiple env vars
+        self.clients = []
+        self._pool = None
+
+        # Load from multiple env vars: GEMINI_API_KEY, GEMINI_API_KEY_2, GEMINI_API_KEY_3, ...
         base_key = os.getenv("GEMINI_API_KEY", "")
         if base_key: self.keys.append(base_key)
-        
-        # Check for backup keys
-        for i in range(2, 6): # Check GEMINI_API_KEY_2 ... _5
-            k = os.getenv(f"GEMINI_API_KEY_{i}", "")
-            if k: self.keys.append(k)
-        
-        # Deduplicate
-        self.keys = list(set(self.keys))
+
+        numbered = sorted((int(m.group(1)), v) for k, v in os.environ.items()
+                          if (m := re.fullmatch(r"GEMINI_API_KEY_(\d+)", k)))
+        self.keys.extend(v for _, v in numbered)
+
+        # Deduplicate (keep order: primary key first)
+        self.keys = list(dict.fromkeys(self.keys))
         self.keys = [k for k in self.keys if k and len(k) > 10]
-        
+
         if not self.keys:
             print("[KEY MANAGER] ⚠️ No API Keys found!")
             self.iterator = itertools.cycle(["NO_KEY"])
         else:
             print(f"[KEY MANAGER] Loaded {len(self.keys)} API Keys.")
             # Create a client for EACH key to be ready
-            self.clients = []
             for k in self.keys:
                 try:
                     # Handle Encrypted Keys
                     if k.startswith("ENC:"):
                         from crypto_vault import decrypt_secret
                         k = decrypt_secret(k[4:])
-                    
+
                     client = genai.Client(api_key=k)
                     self.clients.append(client)
                 except Exception as e:
                     print(f"[KEY MANAGER] Bad Key: {e}")
-            
+
             if self.clients:
                 self.iterator = itertools.cycle(self.clients)
             else:
                 self.iterator = itertools.cycle([None])
-            
+
         self.current_client = next(self.iterator)
 
     def get_client(self):
@@ -54,10 +294,16 @@ class KeyManager:
     def rotate_key(self):
         """Switches to the next available client/key."""
         if not self.clients: return False
-        
+
         print(f"[KEY MANAGER] 🔄 Rotating API Key (Load Balancing)...")
         self.current_client = next(self.iterator)
         return True
 
+    def pool(self):
+        """Shared AsyncClientPool over every loaded key (created on first use)."""
+        if self._pool is None:
+            self._pool = AsyncClientPool(self.clients)
+        return self._pool
+
 # Global Instance
 key_rotator = KeyManager()
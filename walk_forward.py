@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+import brain_factory
+import columnar_history
+import feature_pipeline
+import model_registry
+
+# --- WALK-FORWARD STUDY: Rolling / Expanding Retrains for brain_factory ---
+# Purpose: train_brain fits once (train <= 2023, test >= 2024) on one symbol. This replays how the
+# brain would have been retrained through history, on a pooled multi-symbol panel:
+#     folds   -> the last n_folds blocks of trading dates are test sets; each trains on the dates
+#                before it (expanding: everything since the start, rolling: the last train_days)
+#     gap     -> purge: the TARGET_HORIZON dates before each test block are dropped from training
+#                (their 5-day answer key reads prices inside the test block); embargo: extra dates
+#                dropped on top, for the slow rolling features (SMA_200) that straddle the boundary
+#     compute -> folds run in a process pool; each forest uses n_jobs cores (workers x n_jobs ~ cores)
+#     output  -> a final forest on the latest window is registered with per-fold metrics and
+#                feature importances in its meta.json (not promoted unless asked)
+# Folds split on dates, never on rows, so a test day is never in training for any symbol.
+
+MODEL_NAME = brain_factory.MODEL_NAME
+N_FOLDS = 6
+TEST_DAYS = 126                 # ~6 months of trading dates per fold
+TRAIN_DAYS = 5 * 252            # Rolling window length
+EMBARGO_DAYS = 5
+
+
+def prepare(frames, cache_dir=feature_pipeline.CACHE_DIR):
+    """{symbol: daily OHLCV} -> one labeled panel (Date, symbol, features, Target, Target_Return)."""
+    panels = []
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+        df = df.copy()
+        df.index.name = 'Date'
+        labeled = brain_factory.build_features(df.reset_index(), symbol=symbol, cache_dir=cache_dir)
+        labeled['symbol'] = symbol
+        panels.append(labeled[['Date', 'symbol'] + feature_pipeline.FEATURE_COLUMNS + ['Target', 'Target_Return']])
+    if not panels:
+        raise ValueError("No labeled rows")
+    panel = pd.concat(panels, ignore_index=True)
+    panel['Date'] = pd.to_datetime(panel['Date'])
+    return panel.sort_values(['Date', 'symbol'], kind='stable').reset_index(drop=True)
+
+
+def make_folds(dates, n_folds=N_FOLDS, test_days=TEST_DAYS, window="expanding", train_days=TRAIN_DAYS,
+               purge=brain_factory.TARGET_HORIZON, embargo=EMBARGO_DAYS):
+    """
+    Fold boundaries on the sorted unique trading dates. Returns
+    [{"fold", "train_start", "train_end", "test_start", "test_end"}] (inclusive Timestamps).
+    """
+    if window not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown window '{window}' (expanding | rolling)")
+    days = pd.DatetimeIndex(sorted(pd.unique(pd.DatetimeIndex(dates))))
+    gap = purge + embargo
+    first_test = len(days) - n_folds * test_days
+    if first_test - gap < 1:
+        raise ValueError(f"{len(days)} dates cannot hold {n_folds} x {test_days} test days plus a {gap}-day gap")
+    folds = []
+    for i in range(n_folds):
+        test_lo = first_test + i * test_days
+        train_hi = test_lo - gap                # Exclusive
+        train_lo = max(0, train_hi - train_days) if window == "rolling" else 0
+        folds.append({"fold": i + 1, "train_start": days[train_lo], "train_end": days[train_hi - 1],
+                      "test_start": days[test_lo], "test_end": days[test_lo + test_days - 1]})
+    return folds
+
+
+def _run_fold(fold, X_train, y_train, X_test, y_test, forward, n_jobs, n_estimators):
+    """One retrain + out-of-sample exam (runs in a pool worker)."""
+    started = time.time()
+    model = brain_factory.make_forest(n_jobs=n_jobs, n_estimators=n_estimators)
+    model.fit(X_train, y_train)
+    predictions = model.predict(X_test)
+    proba = model.predict_proba(X_test)[:, list(model.classes_).index(1)] if 1 in model.classes_ else np.zeros(len(X_test))
+    buys = predictions == 1
+    metrics = {
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+        "accuracy": float(accuracy_score(y_test, predictions)),
+        "precision": float(precision_score(y_test, predictions, zero_division=0)),
+        "recall": float(recall_score(y_test, predictions, zero_division=0)),
+        "roc_auc": float(roc_auc_score(y_test, proba)) if len(np.unique(y_test)) > 1 else None,
+        "base_rate": float(np.mean(y_test)),
+        "buy_rate": float(buys.mean()),
+        # Mean 5-day return of the rows the brain would buy vs all rows (edge in the test block)
+        "buy_forward_return": float(forward[buys].mean()) if buys.any() else None,
+        "all_forward_return": float(forward.mean()),
+        "seconds": round(time.time() - started, 2),
+    }
+    importances = dict(zip(feature_pipeline.FEATURE_COLUMNS, map(float, model.feature_importances_)))
+    window = {k: (v if k == "fold" else str(v.date())) for k, v in fold.items()}
+    return dict(window, metrics=metrics, importances=importances)
+
+
+def _default_workers(n_folds):
+    return max(1, min(n_folds, os.cpu_count() or 1))
+
+
+def run_study(frames=None, symbols=None, n_folds=N_FOLDS, test_days=TEST_DAYS, window="expanding",
+              train_days=TRAIN_DAYS, embargo=EMBARGO_DAYS, workers=None, n_jobs=None, n_estimators=100,
+              register=True, promote=False, registry=None, cache_dir=feature_pipeline.CACHE_DIR):
+    """
+    Walk-forward study over `frames` ({symbol: daily OHLCV}) or the stored daily history of
+    `symbols`. workers: fold processes (default: one per fold, capped at the core count);
+    n_jobs: cores per forest (default: the cores left per worker).
+    Returns {"config", "folds", "summary", "version"}.
+    """
+    if frames is None:
+        symbols = symbols or [brain_factory.SYMBOL]
+        frames = {s: columnar_history.load_or_legacy(s, "1d", brain_factory.HISTORY_DIR) for s in symbols}
+    panel = prepare(frames, cache_dir=cache_dir)
+    folds = make_folds(panel['Date'], n_folds, test_days, window, train_days,
+                       brain_factory.TARGET_HORIZON, embargo)
+    workers = workers or _default_workers(n_folds)
+    n_jobs = n_jobs or max(1, (os.cpu_count() or 1) // workers)
+    config = {"symbols": sorted(panel['symbol'].unique()), "n_folds": n_folds, "test_days": test_days,
+              "window": window, "train_days": train_days if window == "rolling" else None,
+              "purge_days": brain_factory.TARGET_HORIZON, "embargo_days": embargo,
+              "workers": workers, "n_jobs": n_jobs, "n_estimators": n_estimators,
+              "feature_version": feature_pipeline.FEATURE_VERSION}
+    print(f"[WALK-FORWARD] {len(panel)} rows, {len(config['symbols'])} symbols, {n_folds} {window} folds "
+          f"({workers} workers x {n_jobs} cores per forest)...")
+
+    features = feature_pipeline.FEATURE_COLUMNS
+    dates = panel['Date']
+    X, y, forward = panel[features], panel['Target'].to_numpy(), panel['Target_Return'].to_numpy()
+    jobs = []
+    for fold in folds:
+        train = ((dates >= fold["train_start"]) & (dates <= fold["train_end"])).to_numpy()
+        test = ((dates >= fold["test_start"]) & (dates <= fold["test_end"])).to_numpy()
+        jobs.append((fold, X[train], y[train], X[test], y[test], forward[test], n_jobs, n_estimators))
+
+    started = time.time()
+    if workers == 1:
+        results = [_run_fold(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_fold, *zip(*jobs)))
+    for r in results:
+        m = r["metrics"]
+        print(f"   [FOLD {r['fold']}] train {r['train_start']}..{r['train_end']} | test {r['test_start']}..{r['test_end']} "
+              f"| acc {m['accuracy']:.2%} prec {m['precision']:.2%} ({m['seconds']}s)")
+
+    summary = _summarize(results)
+    print(f"[WALK-FORWARD] Mean accuracy {summary['accuracy_mean']:.2%} (+/- {summary['accuracy_std']:.2%}), "
+          f"precision {summary['precision_mean']:.2%} in {time.time() - started:.1f}s.")
+    study = {"config": config, "folds": results, "summary": summary, "version": None}
+
+    if register:
+        study["version"] = _register_final(panel, study, n_jobs * workers, n_estimators,
+                                           promote, registry or model_registry.ModelRegistry())
+    return study
+
+
+def _summarize(results):
+    metrics = pd.DataFrame([r["metrics"] for r in results])
+    importances = pd.DataFrame([r["importances"] for r in results])
+    summary = {}
+    for name in ("accuracy", "precision", "recall", "roc_auc", "base_rate", "buy_forward_return"):
+        values = pd.to_numeric(metrics[name], errors='coerce')
+        summary[f"{name}_mean"] = float(values.mean()) if values.notna().any() else None
+        summary[f"{name}_std"] = float(values.std(ddof=0)) if values.notna().any() else None
+    summary["importances"] = {c: {"mean": float(importances[c].mean()), "std": float(importances[c].std(ddof=0))}
+                              for c in importances.columns}
+    return summary
+
+
+def _register_final(panel, study, n_jobs, n_estimators, promote, registry):
+    """Fits the deployable forest on the latest window (same window rule, no test block held out)."""
+    dates = panel['Date']
+    end = dates.max()
+    if study["config"]["window"] == "rolling":
+        days = pd.DatetimeIndex(sorted(dates.unique()))
+        start = days[max(0, len(days) - study["config"]["train_days"])]
+    else:
+        start = dates.min()
+    rows = panel[(dates >= start) & (dates <= end)]
+    model = brain_factory.make_forest(n_jobs=n_jobs, n_estimators=n_estimators)
+    model.fit(rows[feature_pipeline.FEATURE_COLUMNS], rows['Target'])
+    model.set_params(n_jobs=None)   # Threaded predict_proba sums trees out of order: no bit-exact compile
+
+    metadata = {
+        "feature_version": feature_pipeline.FEATURE_VERSION,
+        "feature_columns": list(feature_pipeline.FEATURE_COLUMNS),
+        "symbol": ",".join(study["config"]["symbols"]),
+        "interval": "1d",
+        "training_window": {"start": str(start.date()), "end": str(end.date())},
+        "test_window": {"start": study["folds"][0]["test_start"], "end": study["folds"][-1]["test_end"]},
+        "metrics": {"accuracy": study["summary"]["accuracy_mean"], "walk_forward": study["summary"]},
+        "walk_forward": {"config": study["config"], "folds": study["folds"]},
+        "params": model.get_params(),
+    }
+    version = registry.register(MODEL_NAME, model, metadata, promote=promote)
+    print(f"[WALK-FORWARD] Final brain registered as {MODEL_NAME}/{version}" + (" (promoted)" if promote else ""))
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward retrain study for the Oracle brain")
+    parser.add_argument("symbols", nargs="*", default=[brain_factory.SYMBOL])
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--test-days", type=int, default=TEST_DAYS)
+    parser.add_argument("--window", choices=["expanding", "rolling"], default="expanding")
+    parser.add_argument("--train-days", type=int, default=TRAIN_DAYS)
+    parser.add_argument("--embargo", type=int, default=EMBARGO_DAYS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--no-register", action="store_true")
+    parser.add_argument("--promote", action="store_true")
+    args = parser.parse_args()
+    try:
+        run_study(symbols=args.symbols, n_folds=args.folds, test_days=args.test_days, window=args.window,
+                  train_days=args.train_days, embargo=args.embargo, workers=args.workers, n_jobs=args.n_jobs,
+                  register=not args.no_register, promote=args.promote)
+    except ValueError as e:
+        print(f"[WALK-FORWARD] {e}")
+        sys.exit(1)